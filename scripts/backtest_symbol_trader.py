@@ -0,0 +1,63 @@
+import sys
+import os
+import logging
+import argparse
+import pandas as pd
+
+# Add src to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+bot_dir = os.path.join(src_dir, 'trading_bot')
+for path in (src_dir, bot_dir):
+    if path not in sys.path: sys.path.append(path)
+
+from data.mt5_replay import MT5Replay, ReplayClock, install
+from data.history_store import HistoryStore
+from core.tick_backtester import TickBacktester
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("TickBacktestScript")
+
+# Timeframes the SymbolTrader pipeline reads
+TIMEFRAMES = (MT5Replay.TIMEFRAME_M1, MT5Replay.TIMEFRAME_M5, MT5Replay.TIMEFRAME_M15, MT5Replay.TIMEFRAME_H1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded history through SymbolTrader.process_tick")
+    parser.add_argument('--symbol', default='GOLD')
+    parser.add_argument('--start', required=True, help="Replay start (YYYY-MM-DD)")
+    parser.add_argument('--end', required=True, help="Replay end (YYYY-MM-DD)")
+    parser.add_argument('--warmup-days', type=int, default=5, help="History before --start visible to the analyzers")
+    parser.add_argument('--ticks', help="Parquet file of recorded ticks (time_msc/time, bid, ask); bars are used otherwise")
+    parser.add_argument('--balance', type=float, default=10000.0)
+    parser.add_argument('--slippage', type=int, default=0, help="Slippage in points")
+    args = parser.parse_args()
+
+    start, end = pd.Timestamp(args.start), pd.Timestamp(args.end)
+    broker = MT5Replay(ReplayClock(start), balance=args.balance, slippage_points=args.slippage)
+    history = HistoryStore()
+    loaded = broker.load_history_store(history, args.symbol, TIMEFRAMES, start - pd.Timedelta(days=args.warmup_days), end)
+    logger.info(f"Loaded bars per timeframe: {loaded}")
+    if args.ticks:
+        logger.info(f"Loaded {broker.load_ticks_parquet(args.symbol, args.ticks)} ticks from {args.ticks}")
+
+    # The bot modules must see the replay as MetaTrader5
+    install(broker)
+    from main import SymbolTrader
+
+    trader = SymbolTrader(args.symbol, timeframe=MT5Replay.TIMEFRAME_M5)
+    report = TickBacktester(trader, broker).run(start=start, end=end)
+
+    logger.info(f"Ticks: {report['ticks']} in {report['wall_seconds']:.1f}s ({report['ticks_per_second']:.0f}/s), "
+                f"simulated {report['sim_seconds'] / 3600:.1f}h, errors: {report['errors']}")
+    logger.info(f"Trades: {len(report['trades'])} | Net profit: {report['net_profit']:.2f} | "
+                f"Max drawdown: {report['max_drawdown']:.2f} | Open positions: {report['open_positions']}")
+    for stage, stats in report['latency'].items():
+        logger.info(f"  {stage:<26} calls={stats['calls']:<7} mean={stats['mean_ms']:.3f}ms "
+                    f"p95={stats['p95_ms']:.3f}ms max={stats['max_ms']:.3f}ms")
+    if report['trades']:
+        print(pd.DataFrame(report['trades']).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import time
+import argparse
+import pandas as pd
+import numpy as np
+
+# Add src to path
+current_dir = os.path.dirname(os.path.abspath(__file__))
+src_dir = os.path.join(current_dir, '..', 'src')
+if src_dir not in sys.path: sys.path.append(src_dir)
+bot_dir = os.path.join(src_dir, 'trading_bot')
+if bot_dir not in sys.path: sys.path.append(bot_dir)
+
+# analysis/__init__ pulls in MT5-dependent modules; this benchmark only needs the kernel
+try:
+    import MetaTrader5  # noqa: F401
+except ImportError:
+    from unittest.mock import MagicMock
+    sys.modules['MetaTrader5'] = MagicMock()
+
+from trading_bot.analysis.fast_grid_backtest import (run_fast_grid_backtest, run_reference_grid_backtest,
+                                                     run_batch_grid_backtest)
+
+M15_BARS_PER_DAY = 96
+
+
+def synthetic_m15(days=30, seed=0):
+    """Random-walk gold-like M15 candles (used when no CSV is given)."""
+    n = days * M15_BARS_PER_DAY
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 2, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        'time': pd.date_range(end=pd.Timestamp.now().floor('15min'), periods=n, freq='15min'),
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n) * 2,
+        'low': np.minimum(open_, close) - rng.random(n) * 2,
+        'close': close,
+    })
+
+
+def evaluations_per_second(func, df, param_sets, min_seconds):
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for params in param_sets:
+            func(df, params)
+        count += len(param_sets)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the grid backtest kernel (evaluations/second)")
+    parser.add_argument('--csv', help="CSV with open/high/low/close columns (e.g. exported M15 history)")
+    parser.add_argument('--days', type=int, default=30, help="Days of synthetic M15 data when no CSV is given")
+    parser.add_argument('--params', type=int, default=30, help="Random parameter sets per round (WOAm population)")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Minimum timing duration per kernel")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv) if args.csv else synthetic_m15(args.days)
+
+    # Same search space as scripts/optimize_strategy_params.py
+    rng = np.random.default_rng(1)
+    param_sets = [[rng.uniform(100.0, 500.0), rng.uniform(1.1, 2.0), rng.uniform(10.0, 100.0)]
+                  for _ in range(args.params)]
+
+    mismatches = sum(abs(run_fast_grid_backtest(df, p) - run_reference_grid_backtest(df, p)) > 1e-6
+                     for p in param_sets)
+
+    before = evaluations_per_second(run_reference_grid_backtest, df, param_sets, args.seconds)
+    after = evaluations_per_second(run_fast_grid_backtest, df, param_sets, args.seconds)
+    batched = evaluations_per_second(lambda data, population: run_batch_grid_backtest(data, population),
+                                     df, [np.array(param_sets)], args.seconds) * len(param_sets)
+
+    print(f"Candles: {len(df)} | Parameter sets: {len(param_sets)} | Score mismatches: {mismatches}")
+    print(f"Before (list-based loop): {before:10.1f} evals/s")
+    print(f"After  (array kernel):    {after:10.1f} evals/s")
+    print(f"Batch  (whole population):{batched:10.1f} evals/s")
+    print(f"Speedup: {after / before:.1f}x (single), {batched / before:.1f}x (batch)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import sys
 import os
+import json
 import logging
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -8,12 +10,16 @@ from datetime import datetime, timedelta
 # Add src to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 src_dir = os.path.join(current_dir, '..', 'src')
-if src_dir not in sys.path: sys.path.append(src_dir)
+bot_dir = os.path.join(src_dir, 'trading_bot')
+for path in (src_dir, bot_dir):
+    if path not in sys.path: sys.path.append(path)
 
 # Import Modules
 from trading_bot.analysis.optimization import WOAm
-from trading_bot.analysis.fast_grid_backtest import run_fast_grid_backtest
+from trading_bot.analysis.fast_grid_backtest import run_fast_grid_backtest, GridBacktestObjective
+from trading_bot.analysis.walk_forward import WalkForwardOptimizer
 from trading_bot.data.mt5_data_processor import MT5DataProcessor
+from trading_bot.data.history_store import HistoryStore
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -27,15 +33,103 @@ def real_objective_function(params, df):
     score = run_fast_grid_backtest(df, params)
     return score
 
+PARAM_NAMES = ['grid_step_points', 'lot_multiplier', 'global_tp']
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Optimize the grid strategy parameters")
+    parser.add_argument('--mode', choices=('walk-forward', 'single'), default='walk-forward',
+                        help="Rolling train/test folds (default) or one fit over the whole range")
+    parser.add_argument('--days', type=int, default=120, help="History used (single mode: last 30 days)")
+    parser.add_argument('--train-days', type=float, default=30)
+    parser.add_argument('--test-days', type=float, default=7)
+    return parser.parse_args()
+
+def run_single(candles, bounds, steps, cache_dir):
+    """One WOAm fit over the whole range (no out-of-sample check)."""
+    # Scores are cached on disk per dataset fingerprint, so reruns on the same candles start warm
+    optimizer = WOAm(pop_size=30, power_dist_coeff=20.0, cache_path=os.path.join(cache_dir, 'grid_optimizer_cache.pkl'))
+    logger.info(f"Optimizing parameters over 30 epochs (Population: 30)...")
+    
+    # Batch-capable objective: each epoch scores the whole population in one sweep.
+    best_params, best_score = optimizer.optimize(
+        objective_function=GridBacktestObjective(candles),
+        bounds=bounds,
+        steps=steps,
+        epochs=30,
+        n_jobs=-1 # GIL-bound objective: one worker process per core, candles in shared memory
+    )
+    
+    logger.info("Optimization Complete!")
+    logger.info(f"Best Score (Net Profit - Drawdown Penalty): {best_score:.2f}")
+    logger.info("Best Parameters:")
+    logger.info(f"  Grid Step: {best_params[0]:.1f}")
+    logger.info(f"  Lot Multiplier: {best_params[1]:.1f}")
+    logger.info(f"  TP Pips: {best_params[2]:.1f}")
+    report = optimizer.get_report()
+    logger.info(f"Evaluations: {report['evaluations']} | Cache hits: {report['cache_hits']} | "
+                f"misses: {report['cache_misses']} ({report['cache_hit_rate']:.1%})")
+    return best_params
+
+def run_walk_forward(candles, symbol, bounds, steps, args, cache_dir):
+    """
+    Rolling train/test folds, one WOAm run per fold in parallel.
+
+    Returns the newest fold's parameters and the out-of-sample summary; the full
+    report is written next to the grid config.
+    """
+    # Optimized folds are cached per symbol, so a rerun a day later only fits the new fold
+    walk_forward = WalkForwardOptimizer(bounds, steps, train_days=args.train_days, test_days=args.test_days,
+                                        epochs=30, pop_size=30, power_dist_coeff=20.0, param_names=PARAM_NAMES,
+                                        cache_path=os.path.join(cache_dir, f'walk_forward_{symbol}.pkl'))
+    logger.info(f"Walk-forward: {args.train_days}d train / {args.test_days}d test over {len(candles)} candles...")
+    report = walk_forward.run(candles, n_jobs=-1)
+    if not report['folds']:
+        logger.error("Not enough history for a single fold. Aborting.")
+        return None, None
+    
+    for fold in report['folds']:
+        logger.info(f"  Fold {fold['fold']:>2} test {fold['test_start']:%Y-%m-%d}..{fold['test_end']:%Y-%m-%d} "
+                    f"IS {fold['in_sample_score']:>9.2f} OOS {fold['out_of_sample_score']:>9.2f} "
+                    f"params {[round(p, 2) for p in fold['params']]}{' (cached)' if fold['cached'] else ''}")
+    summary = report['summary']
+    efficiency = 'n/a' if summary['efficiency'] is None else f"{summary['efficiency']:.2f}"
+    logger.info(f"Out-of-sample: total {summary['oos_total']:.2f} | mean {summary['oos_mean']:.2f} "
+                f"± {summary['oos_std']:.2f} | positive folds {summary['oos_positive_ratio']:.0%} | "
+                f"efficiency {efficiency}")
+    for name, stats in report['stability'].items():
+        logger.info(f"  {name:<18} median {stats['median']:.2f} | std {stats['std']:.2f} "
+                    f"({stats['range_std']:.0%} of range)")
+    
+    report_path = os.path.join(src_dir, 'trading_bot', 'config', 'walk_forward_report.json')
+    try:
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump({'symbol': symbol, 'summary': summary, 'stability': report['stability'],
+                       'folds': report['folds']}, f, indent=4, default=str)
+        logger.info(f"Walk-forward report saved to {report_path}")
+    except Exception as e:
+        logger.error(f"Failed to save walk-forward report: {e}")
+    
+    # The newest fold was trained on the most recent window, closest to live conditions
+    return report['recommended_params'], summary
+
 def main():
+    args = parse_args()
     logger.info("Starting REAL Strategy Parameter Optimization...")
     
     # 1. Fetch Historical Data
-    processor = MT5DataProcessor()
+    # Local columnar history: only bars newer than the stored ones are fetched from MT5
+    try:
+        history = HistoryStore()
+    except ImportError as e:
+        logger.warning(f"History store unavailable ({e}), fetching everything from MT5")
+        history = None
+    processor = MT5DataProcessor(history_store=history)
     symbol = "GOLD" # Or XAUUSD based on availability
     
     end_date = datetime.now()
-    start_date = end_date - timedelta(days=30) # Last 30 Days
+    days = args.days if args.mode == 'walk-forward' else 30
+    start_date = end_date - timedelta(days=days)
     
     logger.info(f"Fetching {symbol} data from {start_date} to {end_date}...")
     df = processor.get_historical_data(symbol, None, start_date, end_date) # Default M15
@@ -67,40 +161,28 @@ def main():
         5.0   # TP
     ]
     
-    # 3. Initialize Optimizer
-    optimizer = WOAm(pop_size=30, power_dist_coeff=20.0)
+    # 3. Optimize
+    # Closed bars from the history store are memory-mapped, so workers share them without copies
+    candles = history.read(symbol, 'M15', start_date, end_date) if history is not None else None
+    if candles is None or not len(candles):
+        candles = df
+    cache_dir = os.path.join(src_dir, 'trading_bot', 'cache')
     
-    # 4. Run Optimization
-    # Use lambda/partial to pass df
-    logger.info(f"Optimizing parameters over 30 epochs (Population: 30)...")
-    
-    # Wrapper for joblib serialization compatibility
-    # We define it here to capture 'df'
-    def obj_func_wrapper(p):
-        return real_objective_function(p, df)
-    
-    best_params, best_score = optimizer.optimize(
-        objective_function=obj_func_wrapper,
-        bounds=bounds,
-        steps=steps,
-        epochs=30,
-        n_jobs=1 # Use 1 job for debugging/simplicity, or higher if stable
-    )
-    
-    # 5. Output Results
-    logger.info("Optimization Complete!")
-    logger.info(f"Best Score (Net Profit - Drawdown Penalty): {best_score:.2f}")
-    logger.info("Best Parameters:")
-    logger.info(f"  Grid Step: {best_params[0]:.1f}")
-    logger.info(f"  Lot Multiplier: {best_params[1]:.1f}")
-    logger.info(f"  TP Pips: {best_params[2]:.1f}")
+    if args.mode == 'walk-forward':
+        best_params, summary = run_walk_forward(candles, symbol, bounds, steps, args, cache_dir)
+        if best_params is None:
+            processor.close()
+            return
+    else:
+        best_params = run_single(candles, bounds, steps, cache_dir)
+        summary = None
     
     print("\nRecommended Config Update:")
     print(f"grid_step_points = {int(best_params[0])}")
     print(f"lot_multiplier = {best_params[1]:.1f}")
     print(f"global_tp = {best_params[2]:.1f}")
 
-    # 6. Save to JSON for Bot Auto-Loading
+    # 4. Save to JSON for Bot Auto-Loading
     config_path = os.path.join(src_dir, 'trading_bot', 'config', 'grid_config.json')
     os.makedirs(os.path.dirname(config_path), exist_ok=True)
     
@@ -110,9 +192,10 @@ def main():
         "global_tp": round(float(best_params[2]), 2),
         "updated_at": datetime.now().isoformat()
     }
+    if summary is not None:
+        new_config["walk_forward"] = summary
     
     try:
-        import json
         with open(config_path, 'w') as f:
             json.dump(new_config, f, indent=4)
         logger.info(f"Configuration saved to {config_path}")
@@ -41,13 +41,14 @@ class AIBacktester:
     AI交易策略回测器
     """
     
-    def __init__(self, initial_capital=100000.0, risk_per_trade=1.0):
+    def __init__(self, initial_capital=100000.0, risk_per_trade=1.0, history_store=None):
         """
         初始化回测器
         
         Args:
             initial_capital (float): 初始资金
             risk_per_trade (float): 每笔交易风险百分比
+            history_store (HistoryStore): 可选的本地列式历史库，已覆盖的区间不再重复拉取
         """
         self.initial_capital = initial_capital
         self.current_capital = initial_capital
@@ -56,7 +57,7 @@ class AIBacktester:
         self.entry_price = 0.0
         self.trades = []
         self.equity_curve = []
-        self.data_processor = MT5DataProcessor()
+        self.data_processor = MT5DataProcessor(history_store=history_store)
         
         # 初始化AI客户端 - 使用硅基流动API服务，基于ValueCell的模型工厂模式
         ai_clients = initialize_ai_clients()
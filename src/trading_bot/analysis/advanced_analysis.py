@@ -11,6 +11,12 @@ try:
 except ImportError:
     pass
 
+try:
+    from data.bar_store import get_bar_store
+except ImportError:
+    from ..data.bar_store import get_bar_store
+from .swing_points import find_swing_points
+
 class AdvancedMarketAnalysis:
     """
     高级市场分析工具类
@@ -609,15 +615,17 @@ class SMCAnalyzer:
         self.swing_lookback = 5
         self.atr_threshold = 0.002
         self.allow_bos = True; self.allow_ob = True; self.allow_fvg = True; self.use_sentiment = True
+        self.bar_store = None
 
     def calculate_ema(self, series, period):
         return series.ewm(span=period, adjust=False).mean()
 
     def get_mtf_data(self, symbol, timeframe, count=250):
         try:
-            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
-            if rates is None or len(rates) == 0: return None
-            return pd.DataFrame(rates)
+            if self.bar_store is None: self.bar_store = get_bar_store()
+            df = self.bar_store.get_dataframe(symbol, timeframe, count)
+            if df is None or len(df) == 0: return None
+            return df
         except: return None
 
     def get_market_sentiment(self, df_current, symbol):
@@ -632,14 +640,11 @@ class SMCAnalyzer:
         elif current_price_htf < ema_long and deviation > self.atr_threshold: higher_tf_bias = -1
         
         def check_structure(df):
-            highs = df['high'].values; lows = df['low'].values; n = len(df)
-            swing_highs = []; swing_lows = []
-            for i in range(n - 3, 2, -1):
-                if len(swing_highs) < 2:
-                    if (highs[i] > highs[i-1] and highs[i] > highs[i-2] and highs[i] > highs[i+1] and highs[i] > highs[i+2]): swing_highs.append(highs[i])
-                if len(swing_lows) < 2:
-                    if (lows[i] < lows[i-1] and lows[i] < lows[i-2] and lows[i] < lows[i+1] and lows[i] < lows[i+2]): swing_lows.append(lows[i])
-                if len(swing_highs) >= 2 and len(swing_lows) >= 2: break
+            highs = df['high'].values; lows = df['low'].values
+            # 2-bar fractals from bar 3 onwards, most recent first
+            sh_idx, sl_idx = find_swing_points(highs, lows, 2)
+            swing_highs = list(highs[sh_idx[sh_idx >= 3][::-1][:2]])
+            swing_lows = list(lows[sl_idx[sl_idx >= 3][::-1][:2]])
             is_bull = False; is_bear = False
             if len(swing_highs) >= 2 and len(swing_lows) >= 2:
                 if swing_highs[0] > swing_highs[1] and swing_lows[0] > swing_lows[1]: is_bull = True
@@ -792,23 +797,14 @@ class SMCAnalyzer:
         points = []
         
         # 使用动态回溯，寻找分形点
-        # Fractal: High[i] > High[i-2...i+2]
-        for i in range(n-3, 2, -1):
-            is_sh = True
-            is_sl = True
-            
-            # Check Swing High
-            for k in range(1, 4): # Look left and right 3 bars
-                if i-k >= 0 and highs[i] <= highs[i-k]: is_sh = False
-                if i+k < n and highs[i] <= highs[i+k]: is_sh = False
-            
-            # Check Swing Low
-            for k in range(1, 4):
-                if i-k >= 0 and lows[i] >= lows[i-k]: is_sl = False
-                if i+k < n and lows[i] >= lows[i+k]: is_sl = False
-                
-            if is_sh: points.append({'type': 'SH', 'price': highs[i], 'index': i, 'time': df.index[i]})
-            if is_sl: points.append({'type': 'SL', 'price': lows[i], 'index': i, 'time': df.index[i]})
+        # Fractal: High[i] > High[i-3...i+3], bars near the right edge compare what exists
+        sh_idx, sl_idx = find_swing_points(highs, lows, 3, partial=True)
+        is_sh = np.zeros(n, dtype=bool); is_sh[sh_idx] = True
+        is_sl = np.zeros(n, dtype=bool); is_sl[sl_idx] = True
+        candidates = np.flatnonzero(is_sh | is_sl)
+        for i in candidates[(candidates >= 3) & (candidates <= n - 3)][::-1]:
+            if is_sh[i]: points.append({'type': 'SH', 'price': highs[i], 'index': int(i), 'time': df.index[i]})
+            if is_sl[i]: points.append({'type': 'SL', 'price': lows[i], 'index': int(i), 'time': df.index[i]})
             
             if len(points) >= 10: break # 只找最近的10个点
             
@@ -1174,14 +1170,10 @@ class MTFAnalyzer:
             for i in range(len(rates)-14, len(rates)): tr_sum += (rates[i]['high'] - rates[i]['low'])
             atr = tr_sum / 14 if tr_sum > 0 else 0.001
             box_width = atr * 1.0; swing_len = self.swing_length
-            highs = np.array([r['high'] for r in rates]); lows = np.array([r['low'] for r in rates])
-            for i in range(swing_len, len(rates) - swing_len):
-                is_low = True; curr_low = lows[i]
-                if np.min(lows[i-swing_len:i]) < curr_low or np.min(lows[i+1:i+swing_len+1]) < curr_low: is_low = False
-                if is_low and len(self.demand_zones) < 50: self.demand_zones.append((curr_low + box_width, curr_low))
-                is_high = True; curr_high = highs[i]
-                if np.max(highs[i-swing_len:i]) > curr_high or np.max(highs[i+1:i+swing_len+1]) > curr_high: is_high = False
-                if is_high and len(self.supply_zones) < 50: self.supply_zones.append((curr_high, curr_high - box_width))
+            highs = np.asarray(rates['high'], dtype=float); lows = np.asarray(rates['low'], dtype=float)
+            sh_idx, sl_idx = find_swing_points(highs, lows, swing_len, strict=False)
+            self.demand_zones = [(lows[i] + box_width, lows[i]) for i in sl_idx[:50]]
+            self.supply_zones = [(highs[i], highs[i] - box_width) for i in sh_idx[:50]]
         except: pass
     def is_in_zone(self, price, is_demand):
         tolerance = 0.0005
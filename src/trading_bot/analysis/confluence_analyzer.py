@@ -6,36 +6,27 @@ from scipy import stats
 import time
 import logging
 from datetime import datetime
+from data.bar_store import get_bar_store
+from data.indicator_engine import get_indicator_engine
+from .swing_points import find_swing_points
 
 logger = logging.getLogger("ConfluenceAnalyzer")
 
 class TrendlineAnalyzer:
     """趋势线分析器"""
     
-    def __init__(self, config):
+    def __init__(self, config, bar_store=None):
         self.config = config
-        self.cache = {}
+        self.bar_store = bar_store or get_bar_store()
         
     def get_data(self, symbol, timeframe):
         """获取分析所需的数据"""
-        cache_key = f"{symbol}_{timeframe}"
-        if cache_key in self.cache and time.time() - self.cache[cache_key]['time'] < 60:
-            return self.cache[cache_key]['data']
-        
         # Use a config-defined lookback or default to 1000
         lookback = getattr(self.config, 'trendline_lookback', 1000)
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, lookback)
-        if rates is None or len(rates) == 0:
+        df = self.bar_store.get_dataframe(symbol, timeframe, lookback)
+        if df is None or len(df) == 0:
             logger.error(f"获取趋势线数据失败: {symbol}")
             return None
-            
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        self.cache[cache_key] = {
-            'data': df,
-            'time': time.time()
-        }
         
         return df
     
@@ -44,41 +35,13 @@ class TrendlineAnalyzer:
         if df is None or len(df) < lookback * 2:
             return [], []
         
-        highs = []
-        lows = []
-        
-        for i in range(lookback, len(df) - lookback):
-            # 寻找波峰
-            is_swing_high = True
-            for j in range(i - lookback, i + lookback + 1):
-                if j == i:
-                    continue
-                if df['high'].iloc[j] >= df['high'].iloc[i]:
-                    is_swing_high = False
-                    break
-            
-            if is_swing_high:
-                highs.append({
-                    'index': i,
-                    'price': df['high'].iloc[i],
-                    'time': df['time'].iloc[i]
-                })
-            
-            # 寻找波谷
-            is_swing_low = True
-            for j in range(i - lookback, i + lookback + 1):
-                if j == i:
-                    continue
-                if df['low'].iloc[j] <= df['low'].iloc[i]:
-                    is_swing_low = False
-                    break
-            
-            if is_swing_low:
-                lows.append({
-                    'index': i,
-                    'price': df['low'].iloc[i],
-                    'time': df['time'].iloc[i]
-                })
+        high = df['high'].values
+        low = df['low'].values
+        times = df['time']
+        high_idx, low_idx = find_swing_points(high, low, lookback)
+        
+        highs = [{'index': int(i), 'price': high[i], 'time': times.iloc[i]} for i in high_idx]
+        lows = [{'index': int(i), 'price': low[i], 'time': times.iloc[i]} for i in low_idx]
         
         return highs, lows
     
@@ -238,28 +201,17 @@ class TrendlineAnalyzer:
 class MomentumAnalyzer:
     """动量分析器"""
     
-    def __init__(self, config):
+    def __init__(self, config, bar_store=None, indicator_engine=None):
         self.config = config
-        self.cache = {}
+        self.bar_store = bar_store or get_bar_store()
+        self.indicators = indicator_engine or get_indicator_engine()
         
     def get_data(self, symbol, timeframe):
         """获取分析所需的数据"""
-        cache_key = f"{symbol}_{timeframe}"
-        if cache_key in self.cache and time.time() - self.cache[cache_key]['time'] < 60:
-            return self.cache[cache_key]['data']
-        
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, 100)
-        if rates is None or len(rates) == 0:
+        df = self.bar_store.get_dataframe(symbol, timeframe, 100)
+        if df is None or len(df) == 0:
             logger.error(f"获取动量数据失败: {symbol}")
             return None
-            
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        self.cache[cache_key] = {
-            'data': df,
-            'time': time.time()
-        }
         
         return df
     
@@ -302,15 +254,26 @@ class MomentumAnalyzer:
     
     def analyze(self, symbol, timeframe):
         """分析动量指标"""
-        df = self.get_data(symbol, timeframe)
-        if df is None:
+        rates = self.bar_store.get_rates(symbol, timeframe, 100)
+        if rates is None or len(rates) < 2:
+            logger.error(f"获取动量数据失败: {symbol}")
             return None
         
-        current_price = df['close'].iloc[-1]
+        current_price = float(rates['close'][-1])
+        
+        # EMA/MACD are kept incrementally; only bars closed since the last pass are consumed
+        ema_params = {'period': getattr(self.config, 'ema_period', 12)}
+        macd_params = {
+            'fast': getattr(self.config, 'macd_fast', 12),
+            'slow': getattr(self.config, 'macd_slow', 26),
+            'signal': getattr(self.config, 'macd_signal', 9),
+        }
+        self.indicators.register(symbol, timeframe, 'ema', **ema_params)
+        self.indicators.register(symbol, timeframe, 'macd', **macd_params)
+        self.indicators.update(symbol, timeframe, rates)
         
         # 计算EMA
-        ema = self.calculate_ema(df, getattr(self.config, 'ema_period', 12))
-        current_ema = ema.iloc[-1]
+        current_ema = self.indicators.current(symbol, timeframe, 'ema', **ema_params)
         
         # 判断价格相对于EMA的位置
         ema_position = 0
@@ -320,7 +283,10 @@ class MomentumAnalyzer:
             ema_position = -1  # 价格在EMA下方，看跌
         
         # 计算MACD
-        macd_line, signal_line, histogram = self.calculate_macd(df)
+        macd_tail = self.indicators.tail(symbol, timeframe, 'macd', 3, **macd_params)
+        if len(macd_tail) < 2:
+            return None
+        macd_line, signal_line, histogram = (pd.Series(v) for v in zip(*macd_tail))
         current_macd = macd_line.iloc[-1]
         current_signal = signal_line.iloc[-1]
         current_hist = histogram.iloc[-1]
@@ -19,7 +19,7 @@ import warnings
 warnings.filterwarnings('ignore')
 
 # 导入项目模块
-from .optimization import WOAm, TETA
+from .optimization import WOAm, TETA, EarlyStopping
 from .llm_parameter_optimizer import LLMParameterOptimizer
 from .bayesian_llm_optimizer import BayesianLLMOptimizer
 from .parameter_history_learner import ParameterHistoryLearner
@@ -82,7 +82,14 @@ class EnhancedOptimizationEngine:
             },
             'switch_threshold': 0.1,  # 性能下降超过此值时切换方法
             'min_history_size': 10,  # 最小历史记录数
-            'adaptive_window': 20    # 自适应窗口
+            'adaptive_window': 20,   # 自适应窗口
+            # 传统算法提前停止：平坦目标函数下不必跑满全部迭代
+            'early_stopping': {
+                'patience': 10,          # 连续多少代无提升即停止
+                'min_delta': 1e-6,
+                'diversity_floor': 1e-3, # 种群多样性下限（相对参数范围）
+                'time_budget': 300.0     # 单次优化最长耗时（秒）
+            }
         }
         
         logger.info(f"增强优化引擎初始化完成，模式: {optimization_mode}")
@@ -178,7 +185,10 @@ class EnhancedOptimizationEngine:
                               n_iterations: int) -> Tuple[Dict, Dict]:
         """传统算法优化（WOAm）"""
         if 'woam' not in self.traditional_optimizers:
-            self.traditional_optimizers['woam'] = WOAm(pop_size=200)
+            self.traditional_optimizers['woam'] = WOAm(
+                pop_size=200,
+                early_stopping=EarlyStopping(**self.config['early_stopping'])
+            )
         
         optimizer = self.traditional_optimizers['woam']
         
@@ -200,7 +210,9 @@ class EnhancedOptimizationEngine:
         # 评估最优参数
         best_performance = objective_function(best_params)
         
-        logger.info(f"传统优化完成，得分: {best_score:.4f}")
+        report = optimizer.get_report()
+        logger.info(f"传统优化完成，得分: {best_score:.4f}，迭代 {report['epochs_run']}/{n_iterations}"
+                    + (f"，提前停止: {report['stop_reason']}" if report['stop_reason'] else ""))
         return best_params, best_performance
     
     def _llm_optimize(self,
@@ -546,6 +558,9 @@ class EnhancedOptimizationEngine:
         }
         
         # 添加各优化器的统计
+        if self.traditional_optimizers:
+            report['traditional_reports'] = {name: opt.get_report() for name, opt in self.traditional_optimizers.items()}
+        
         if self.llm_optimizer:
             report['llm_stats'] = self.llm_optimizer.get_optimization_stats()
         
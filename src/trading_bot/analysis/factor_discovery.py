@@ -189,12 +189,11 @@ class FactorDiscovery:
         features['volume_ratio'] = features['volume_sma_5'] / (features['volume_sma_10'] + 1e-6)
         
         # 9. ATR指标特征
-        features['atr_14'] = self._calculate_atr(df, 14) / df['close']
-        features['atr_14_ratio'] = self._calculate_atr(df, 14) / self._calculate_atr(df, 7) if \
-                                 self._calculate_atr(df, 7) > 0 else 0.5
-        features['atr_ratio'] = (self._calculate_atr(df, 14) - self._calculate_atr(df, 7) - 1.0) / \
-                            (self._calculate_atr(df, 7) + 1e-6) if \
-                            self._calculate_atr(df, 7) > 0 else 0.0
+        atr_14 = self._calculate_atr(df, 14)
+        atr_7 = self._calculate_atr(df, 7)
+        features['atr_14'] = atr_14 / df['close']
+        features['atr_14_ratio'] = atr_14 / atr_7 if atr_7 > 0 else 0.5
+        features['atr_ratio'] = (atr_14 - atr_7 - 1.0) / (atr_7 + 1e-6) if atr_7 > 0 else 0.0
         
         # 10. 价格形态指标特征
         features['candle_body_ratio'] = (df['close'] - df['open']).abs() / \
@@ -1,13 +1,44 @@
+import hashlib
 import pandas as pd
 import numpy as np
 import logging
 
+from .parallel_eval import SharedArrays
+
 logger = logging.getLogger("FastBacktest")
 
+# Constants
+POINT = 0.01 # Assuming Gold/Standard
+INITIAL_BALANCE = 10000.0
+BASE_LOT = 0.01
+GRID_LEVELS = 5 # Limit orders on each side
+CONTRACT_SIZE = 100 # Standard Gold: 1 lot = 100 oz. 0.01 lot = 1 oz. $1 move = $1.
+DD_PENALTY = 1.5
+
+# Bars scanned per vectorized block while the book is unchanged
+MIN_CHUNK = 16
+MAX_CHUNK = 1024
+
+# Bump whenever the scoring logic changes so persisted optimizer caches are invalidated
+KERNEL_VERSION = 1
+
+
+def _hlc(df):
+    """High/low/close as float arrays from a DataFrame or any column mapping (e.g. SharedArrays)."""
+    return tuple(np.ascontiguousarray(np.asarray(df[col], dtype=float)) for col in ('high', 'low', 'close'))
+
+
 def run_fast_grid_backtest(df: pd.DataFrame, params: list):
     """
     Fast Event-Driven Backtester for Grid Strategy.
-    
+
+    Limit orders fill from the grid level nearest the anchor outwards, so the
+    order book is a preallocated price/volume array per side and the position
+    book is just the number of filled levels on each side. Between book changes
+    the fill checks, floating PnL and drawdown are evaluated for a whole block
+    of bars at once; only bars where an order fills or the basket TP hits are
+    stepped individually.
+
     Params:
     [0]: grid_step_points (float)
     [1]: lot_multiplier (float)
@@ -17,44 +48,283 @@ def run_fast_grid_backtest(df: pd.DataFrame, params: list):
     grid_step_points = params[0]
     lot_multiplier = params[1]
     global_tp = params[2]
-    
-    # Constants
-    POINT = 0.01 # Assuming Gold/Standard
-    initial_balance = 10000.0
-    balance = initial_balance
-    
+
+    highs, lows, closes = _hlc(df)
+    n_candles = len(closes)
+
+    # Grid layout is fixed per parameter set: level k sits k steps from the anchor
+    step_price = grid_step_points * POINT
+    offsets = step_price * np.arange(1, GRID_LEVELS + 1)
+    volumes = BASE_LOT * (lot_multiplier ** np.arange(GRID_LEVELS)) * CONTRACT_SIZE
+    # Cumulative exposure of the first n filled levels (index 0 = nothing filled)
+    cum_volume = np.concatenate([[0.0], np.cumsum(volumes)]).tolist()
+
+    # Order book (refilled on every deployment) and position book
+    buy_prices = np.empty(GRID_LEVELS)
+    sell_prices = np.empty(GRID_LEVELS)
+    cum_buy_cost = cum_sell_cost = None
+    buy_filled = sell_filled = 0
+    grid_active = False
+
+    balance = INITIAL_BALANCE
+    floating_pnl = 0.0
+    peak = INITIAL_BALANCE
+    max_dd = 0.0
+
+    i = 0
+    chunk = MIN_CHUNK
+    while i < n_candles:
+        has_positions = buy_filled > 0 or sell_filled > 0
+        if has_positions:
+            exposure = cum_volume[buy_filled] - cum_volume[sell_filled]
+            cost = cum_buy_cost[buy_filled] - cum_sell_cost[sell_filled]
+
+        if grid_active:
+            # 1. Scan ahead for the first bar that changes the book
+            end = min(i + chunk, n_candles)
+            buy_trigger = buy_prices[buy_filled] if buy_filled < GRID_LEVELS else -np.inf
+            sell_trigger = sell_prices[sell_filled] if sell_filled < GRID_LEVELS else np.inf
+            event = (lows[i:end] <= buy_trigger) | (highs[i:end] >= sell_trigger)
+            if has_positions:
+                # Floating PnL of a fixed basket is linear in the close
+                block_pnl = closes[i:end] * exposure - cost
+                event |= block_pnl >= global_tp
+
+            stop = int(event.argmax()) if event.any() else end - i
+            if stop > 0:
+                # Quiet bars: equity only moves with the open basket
+                if has_positions:
+                    equity = balance + block_pnl[:stop]
+                    running_peak = np.maximum(np.maximum.accumulate(equity), peak)
+                    max_dd = max(max_dd, float((running_peak - equity).max()))
+                    peak = float(running_peak[-1])
+                    floating_pnl = float(block_pnl[stop - 1])
+                else:
+                    floating_pnl = 0.0
+                    peak = max(peak, balance)
+                    max_dd = max(max_dd, peak - balance)
+                # Grow the scan window while the book stays quiet
+                chunk = min(chunk * 2, MAX_CHUNK) if i + stop == end else MIN_CHUNK
+                i += stop
+                continue
+            chunk = MIN_CHUNK
+
+            # 2. Fill pending orders on the event bar
+            # Buy Limit: Executed if Low <= Price
+            # Sell Limit: Executed if High >= Price
+            current_low = lows[i]
+            current_high = highs[i]
+            while buy_filled < GRID_LEVELS and buy_prices[buy_filled] >= current_low:
+                buy_filled += 1
+            while sell_filled < GRID_LEVELS and sell_prices[sell_filled] <= current_high:
+                sell_filled += 1
+
+        current_close = closes[i]
+        has_positions = buy_filled > 0 or sell_filled > 0
+        floating_pnl = 0.0
+        if has_positions:
+            exposure = cum_volume[buy_filled] - cum_volume[sell_filled]
+            cost = cum_buy_cost[buy_filled] - cum_sell_cost[sell_filled]
+            floating_pnl = current_close * exposure - cost
+
+        # 3. Check Basket TP
+        if has_positions and floating_pnl >= global_tp:
+            balance += floating_pnl
+            buy_filled = sell_filled = 0
+            grid_active = False # Cancel pending on TP
+
+        # 4. Deploy Grid if Empty
+        if not grid_active:
+            buy_prices[:] = current_close - offsets
+            sell_prices[:] = current_close + offsets
+            cum_buy_cost = np.concatenate([[0.0], np.cumsum(volumes * buy_prices)]).tolist()
+            cum_sell_cost = np.concatenate([[0.0], np.cumsum(volumes * sell_prices)]).tolist()
+            grid_active = True
+
+        # Record Equity
+        equity = balance + floating_pnl
+        peak = max(peak, equity)
+        max_dd = max(max_dd, peak - equity)
+        i += 1
+
+    # Return Score (Net Profit - Drawdown Penalty)
+    final_equity = balance + floating_pnl
+    profit = final_equity - INITIAL_BALANCE
+
+    # Objective: Maximize Profit, Minimize DD
+    score = profit - (max_dd * DD_PENALTY)
+
+    return score
+
+
+def run_batch_grid_backtest(df: pd.DataFrame, population) -> np.ndarray:
+    """
+    Score a whole population of parameter vectors in one pass over the candles.
+
+    Every individual runs the same simulation as :func:`run_fast_grid_backtest`,
+    but in lockstep: the per-candle state (filled levels, balance, drawdown) is a
+    vector over the population, so the OHLC arrays are walked once per
+    population instead of once per individual.
+
+    Args:
+        df (pd.DataFrame): Candles with high/low/close columns
+        population (array-like): (pop_size, 3) matrix of
+            [grid_step_points, lot_multiplier, global_tp] rows
+
+    Returns:
+        np.ndarray: Score per row, identical to ``run_fast_grid_backtest``
+    """
+    population = np.atleast_2d(np.asarray(population, dtype=float))
+    pop_size = len(population)
+    highs, lows, closes = _hlc(df)
+    n_candles = len(closes)
+    if n_candles == 0 or pop_size == 0:
+        return np.zeros(pop_size)
+
+    grid_step_points = population[:, 0]
+    lot_multiplier = population[:, 1]
+    global_tp = population[:, 2]
+
+    # Same grid layout as run_fast_grid_backtest, one row per individual
+    step_price = grid_step_points * POINT
+    offsets = step_price[:, None] * np.arange(1, GRID_LEVELS + 1)
+    volumes = BASE_LOT * (lot_multiplier[:, None] ** np.arange(GRID_LEVELS)) * CONTRACT_SIZE
+    cum_volume = np.zeros((pop_size, GRID_LEVELS + 1))
+    cum_volume[:, 1:] = np.cumsum(volumes, axis=1)
+
+    buy_prices = np.empty((pop_size, GRID_LEVELS))
+    sell_prices = np.empty((pop_size, GRID_LEVELS))
+    cum_buy_cost = np.zeros((pop_size, GRID_LEVELS + 1))
+    cum_sell_cost = np.zeros((pop_size, GRID_LEVELS + 1))
+    buy_filled = np.zeros(pop_size, dtype=np.intp)
+    sell_filled = np.zeros(pop_size, dtype=np.intp)
+    # Flat offsets of each row in the (pop_size, GRID_LEVELS + 1) cumulative tables
+    row_offset = np.arange(pop_size) * (GRID_LEVELS + 1)
+
+    def deploy(mask, price):
+        buy_prices[mask] = price - offsets[mask]
+        sell_prices[mask] = price + offsets[mask]
+        cum_buy_cost[mask, 1:] = np.cumsum(volumes[mask] * buy_prices[mask], axis=1)
+        cum_sell_cost[mask, 1:] = np.cumsum(volumes[mask] * sell_prices[mask], axis=1)
+        buy_filled[mask] = 0
+        sell_filled[mask] = 0
+
+    balance = np.full(pop_size, INITIAL_BALANCE)
+    floating_pnl = np.zeros(pop_size)
+    peak = np.full(pop_size, INITIAL_BALANCE)
+    max_dd = np.zeros(pop_size)
+
+    # The first candle only deploys the grids
+    deploy(np.ones(pop_size, dtype=bool), closes[0])
+
+    for i in range(1, n_candles):
+        # 1. Fills: levels are ordered from the anchor outwards
+        np.maximum(buy_filled, (buy_prices >= lows[i]).sum(axis=1), out=buy_filled)
+        np.maximum(sell_filled, (sell_prices <= highs[i]).sum(axis=1), out=sell_filled)
+
+        # 2. Floating PnL of the filled basket
+        has_positions = (buy_filled + sell_filled) > 0
+        buy_idx = row_offset + buy_filled
+        sell_idx = row_offset + sell_filled
+        exposure = cum_volume.take(buy_idx) - cum_volume.take(sell_idx)
+        cost = cum_buy_cost.take(buy_idx) - cum_sell_cost.take(sell_idx)
+        floating_pnl = np.where(has_positions, closes[i] * exposure - cost, 0.0)
+
+        # 3. Basket TP, then redeploy at this close
+        take_profit = has_positions & (floating_pnl >= global_tp)
+        if take_profit.any():
+            balance = balance + np.where(take_profit, floating_pnl, 0.0)
+            deploy(take_profit, closes[i])
+
+        # Record Equity
+        equity = balance + floating_pnl
+        np.maximum(peak, equity, out=peak)
+        np.maximum(max_dd, peak - equity, out=max_dd)
+
+    profit = balance + floating_pnl - INITIAL_BALANCE
+    return profit - (max_dd * DD_PENALTY)
+
+
+class GridBacktestObjective:
+    """
+    Optimizer objective for the grid backtest on a fixed candle set.
+
+    Callable with a single parameter vector; optimizers detect
+    ``evaluate_batch`` and score the whole population in one sweep. The
+    kernels are Python loops, so the objective is flagged ``gil_bound`` and
+    parallel optimizer runs use worker processes reading the candles from
+    shared memory.
+    """
+
+    gil_bound = True
+
+    # Below this size the lockstep sweep's per-candle overhead outweighs the
+    # event-skipping single kernel
+    MIN_BATCH_SIZE = 64
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._fingerprint = None
+
+    def fingerprint(self) -> str:
+        """Digest of the candles and kernel constants, so optimizer caches can be reused across runs on the same data."""
+        if self._fingerprint is None:
+            digest = hashlib.sha1()
+            # Scores depend on the kernel as well as the candles
+            kernel = (KERNEL_VERSION, POINT, INITIAL_BALANCE, BASE_LOT, GRID_LEVELS, CONTRACT_SIZE, DD_PENALTY)
+            digest.update(repr(kernel).encode())
+            for column in _hlc(self.df):
+                digest.update(column.tobytes())
+            self._fingerprint = f"grid:{len(self.df)}:{digest.hexdigest()}"
+        return self._fingerprint
+
+    def __call__(self, params):
+        return run_fast_grid_backtest(self.df, params)
+
+    def evaluate_batch(self, population):
+        if len(population) < self.MIN_BATCH_SIZE:
+            return np.array([run_fast_grid_backtest(self.df, params) for params in population])
+        return run_batch_grid_backtest(self.df, population)
+
+    def share_memory(self):
+        """Copy of this objective whose candles live in shared memory (for process pools)."""
+        if getattr(self.df, 'memory_mapped', False):
+            # Memory-mapped history (data/history_store.py) pickles by reference; workers share the page cache
+            return self
+        return GridBacktestObjective(SharedArrays({col: np.asarray(self.df[col], dtype=float)
+                                                   for col in ('high', 'low', 'close')}))
+
+    def release_memory(self):
+        if isinstance(self.df, SharedArrays):
+            self.df.unlink()
+
+
+def run_reference_grid_backtest(df: pd.DataFrame, params: list):
+    """
+    Original list-based implementation of :func:`run_fast_grid_backtest`.
+
+    Kept as the behavioural reference for tests and benchmarks; use
+    ``run_fast_grid_backtest`` everywhere else.
+    """
+    grid_step_points = params[0]
+    lot_multiplier = params[1]
+    global_tp = params[2]
+
+    balance = INITIAL_BALANCE
     positions = [] # List of {'type': 1/-1, 'price': float, 'volume': float}
     pending_orders = [] # List of {'type': 1/-1, 'price': float, 'volume': float}
-    
-    # State
     equity_curve = []
-    
-    # Pre-calculate Numpy arrays for speed
-    opens = df['open'].values
+
     highs = df['high'].values
     lows = df['low'].values
     closes = df['close'].values
-    
-    n_candles = len(closes)
-    
-    # Simplified logic: 
-    # If no positions, deploy grid around current close.
-    # Check execution.
-    # Check TP.
-    
-    base_lot = 0.01
-    
-    for i in range(n_candles):
-        current_open = opens[i]
+    floating_pnl = 0.0
+
+    for i in range(len(closes)):
         current_high = highs[i]
         current_low = lows[i]
         current_close = closes[i]
-        
-        # 1. Check Pending Orders Execution
-        # Buy Limit: Executed if Low <= Price
-        # Sell Limit: Executed if High >= Price
-        # (Simplified: assuming price touches limit)
-        
+
         executed_indices = []
         for idx, order in enumerate(pending_orders):
             if order['type'] == 1: # Buy Limit
@@ -65,66 +335,42 @@ def run_fast_grid_backtest(df: pd.DataFrame, params: list):
                 if current_high >= order['price']:
                     positions.append(order)
                     executed_indices.append(idx)
-        
-        # Remove executed (iterate reverse to avoid index shift)
+
         for idx in sorted(executed_indices, reverse=True):
             del pending_orders[idx]
-            
-        # 2. Calculate Floating PnL
+
         floating_pnl = 0.0
-        if positions:
-            for pos in positions:
-                if pos['type'] == 1: # Buy
-                    diff = current_close - pos['price']
-                else: # Sell
-                    diff = pos['price'] - current_close
-                
-                # Profit = Diff * Volume * ContractSize (100 for Gold usually, or 1 for simplified)
-                # Let's assume 1 pip = $1 for 0.01 lot for simplicity or use standard calculation
-                # Standard Gold: 1 lot = 100 oz. 0.01 lot = 1 oz. $1 move = $1.
-                floating_pnl += diff * pos['volume'] * 100 
-        
-        # 3. Check Basket TP
+        for pos in positions:
+            if pos['type'] == 1: # Buy
+                diff = current_close - pos['price']
+            else: # Sell
+                diff = pos['price'] - current_close
+            floating_pnl += diff * pos['volume'] * CONTRACT_SIZE
+
         if positions and floating_pnl >= global_tp:
             balance += floating_pnl
             positions = []
-            pending_orders = [] # Cancel pending on TP
-            
-        # 4. Deploy Grid if Empty
+            pending_orders = []
+
         if not positions and not pending_orders:
-            # Simple Grid Deployment: 
-            # 5 Buy Limits below, 5 Sell Limits above
             step_price = grid_step_points * POINT
-            
-            # Buy Grid
-            for k in range(1, 6):
-                price = current_close - (step_price * k)
-                vol = base_lot * (lot_multiplier ** (k-1))
-                pending_orders.append({'type': 1, 'price': price, 'volume': vol})
-                
-            # Sell Grid
-            for k in range(1, 6):
-                price = current_close + (step_price * k)
-                vol = base_lot * (lot_multiplier ** (k-1))
-                pending_orders.append({'type': -1, 'price': price, 'volume': vol})
-                
-        # Record Equity
+            for k in range(1, GRID_LEVELS + 1):
+                pending_orders.append({'type': 1, 'price': current_close - (step_price * k),
+                                       'volume': BASE_LOT * (lot_multiplier ** (k-1))})
+            for k in range(1, GRID_LEVELS + 1):
+                pending_orders.append({'type': -1, 'price': current_close + (step_price * k),
+                                       'volume': BASE_LOT * (lot_multiplier ** (k-1))})
+
         equity_curve.append(balance + floating_pnl)
-        
-    # Return Score (Net Profit - Drawdown Penalty)
+
     final_equity = balance + floating_pnl
-    profit = final_equity - initial_balance
-    
-    # Calculate Max Drawdown
-    peak = initial_balance
+    profit = final_equity - INITIAL_BALANCE
+
+    peak = INITIAL_BALANCE
     max_dd = 0.0
     for eq in equity_curve:
         if eq > peak: peak = eq
         dd = peak - eq
         if dd > max_dd: max_dd = dd
-        
-    # Objective: Maximize Profit, Minimize DD
-    # Score = Profit - (MaxDD * 2)
-    score = profit - (max_dd * 1.5)
-    
-    return score
+
+    return profit - (max_dd * DD_PENALTY)
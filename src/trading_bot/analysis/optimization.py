@@ -2,17 +2,139 @@ import numpy as np
 import random
 import logging
 import math
+import os
+import time
+import pickle
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import List, Dict, Callable, Tuple, Optional
 from joblib import Parallel, delayed
 
+from .parallel_eval import ProcessPoolEvaluator, resolve_n_jobs, is_gil_bound
+
 logger = logging.getLogger(__name__)
 
+class EvaluationCache:
+    """
+    Bounded LRU cache of objective scores.
+
+    Keys are (data fingerprint, quantized parameter tuple). Objectives that expose
+    ``fingerprint()`` (a stable digest of their market data) get entries that can
+    be persisted to ``path`` and reused by later runs on the same dataset; other
+    objectives are keyed by identity, only cached in memory, and only for the
+    objective currently in use (switching objectives drops those entries, since
+    CPython reuses the id of a garbage-collected closure).
+    """
+    # Parameters snapped to a step grid differ only by float noise
+    DECIMALS = 9
+
+    def __init__(self, maxsize: int = 100000, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Objective that identity-keyed entries belong to (held so its id stays unique)
+        self._scoped_objective = None
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def fingerprint(self, objective_function: Callable):
+        fingerprint = getattr(objective_function, 'fingerprint', None)
+        if fingerprint is not None:
+            return fingerprint()
+        if objective_function is not self._scoped_objective:
+            self.clear_scoped()
+            self._scoped_objective = objective_function
+        return ('id', id(objective_function))
+
+    def clear_scoped(self):
+        """Drop identity-keyed entries (objectives without a fingerprint)."""
+        for key in [k for k in self._entries if isinstance(k[0], tuple)]:
+            del self._entries[key]
+        self._scoped_objective = None
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, fingerprint, params) -> tuple:
+        return (fingerprint, tuple(round(float(x), self.DECIMALS) for x in params))
+
+    def get(self, key):
+        score = self._entries.get(key)
+        if score is not None:
+            self._entries.move_to_end(key)
+        return score
+
+    def put(self, key, score: float):
+        self._entries[key] = score
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': self.hits / total if total else 0.0,
+            'cache_size': len(self._entries),
+        }
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                entries = pickle.load(f)
+            for key, score in entries:
+                self.put(key, score)
+            logger.info(f"Loaded {len(entries)} cached evaluations from {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to load evaluation cache {self.path}: {e}")
+
+    def save(self):
+        """Persist fingerprinted entries (identity-keyed ones are meaningless in another run)."""
+        if not self.path:
+            return
+        entries = [(k, v) for k, v in self._entries.items() if not isinstance(k[0], tuple)]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save evaluation cache {self.path}: {e}")
+
+@dataclass
+class EarlyStopping:
+    """
+    Convergence criteria checked after every epoch; None disables a criterion.
+
+    Attributes:
+        patience: Stop after this many epochs without the best score improving by more than min_delta
+        min_delta: Minimum improvement that resets the patience counter
+        diversity_floor: Stop when the population's mean per-dimension std, relative to the
+            bound range, falls below this value
+        time_budget: Wall-clock seconds allowed for one optimize() call
+    """
+    patience: Optional[int] = None
+    min_delta: float = 0.0
+    diversity_floor: Optional[float] = None
+    time_budget: Optional[float] = None
+
 class Optimizer:
     """
     Base Optimizer Class (Enhanced with Vectorization Support)
     Uses PCG64 for high-performance random number generation.
     """
-    def __init__(self, name: str = "BaseOptimizer", seed: Optional[int] = None, dtype=np.float64):
+    def __init__(self, name: str = "BaseOptimizer", seed: Optional[int] = None, dtype=np.float64,
+                 cache_size: int = 100000, cache_path: Optional[str] = None,
+                 early_stopping: Optional[EarlyStopping] = None):
         self.name = name
         # Optimization: Use PCG64 Generator (35x faster than random.random)
         self.rng = np.random.default_rng(seed)
@@ -20,6 +142,13 @@ class Optimizer:
         self.best_solution = None
         self.best_score = -float('inf') # Maximization assumption in this project
         self.history = []
+        self.evaluations = 0
+        # Memoize scores: discretized search spaces revisit the same vectors (cache_size=0 disables)
+        self.cache = EvaluationCache(cache_size, cache_path) if cache_size > 0 else None
+        self.early_stopping = early_stopping
+        self.epochs_run = 0
+        self.stop_reason = None
+        self.stop_epoch = None
 
     def _initialize_population(self, pop_size, dim, bounds):
         """Vectorized Population Initialization"""
@@ -28,6 +157,151 @@ class Optimizer:
         # Broadcasting to generate (N, D) matrix
         return self.rng.uniform(lb, ub, size=(pop_size, dim)).astype(self.dtype)
 
+    def _evaluate_population(self, objective_function: Callable, population: np.ndarray, parallel_pool=None) -> np.ndarray:
+        """
+        Score every row of the population, skipping vectors already in the cache.
+
+        Duplicates inside the population are evaluated once. The remaining rows go
+        to :meth:`_score_population`.
+        """
+        if self.cache is None:
+            self.evaluations += len(population)
+            return self._score_population(objective_function, population, parallel_pool)
+
+        fingerprint = self.cache.fingerprint(objective_function)
+        scores = np.empty(len(population), dtype=float)
+        pending = OrderedDict() # key -> rows sharing that parameter vector
+        for i, ind in enumerate(population):
+            key = self.cache.make_key(fingerprint, ind)
+            cached = self.cache.get(key)
+            if cached is not None:
+                scores[i] = cached
+            else:
+                pending.setdefault(key, []).append(i)
+
+        self.cache.misses += len(pending)
+        self.cache.hits += len(population) - len(pending)
+        if pending:
+            rows = [idx[0] for idx in pending.values()]
+            fresh = self._score_population(objective_function, np.asarray(population)[rows], parallel_pool)
+            self.evaluations += len(rows)
+            for (key, idx), score in zip(pending.items(), fresh):
+                scores[idx] = score
+                self.cache.put(key, float(score))
+        return scores
+
+    def _score_population(self, objective_function: Callable, population: np.ndarray, parallel_pool=None) -> np.ndarray:
+        """
+        Run the objective on every row.
+
+        Objectives exposing ``evaluate_batch(population)`` (e.g. GridBacktestObjective)
+        are scored in a single vectorized call; plain callables are evaluated per
+        individual, through the joblib pool when one is given. A process pool
+        splits the population across workers, which apply the same rules.
+        """
+        if isinstance(parallel_pool, ProcessPoolEvaluator):
+            return parallel_pool.evaluate(population)
+        evaluate_batch = getattr(objective_function, 'evaluate_batch', None)
+        if evaluate_batch is not None:
+            return np.asarray(evaluate_batch(population), dtype=float)
+        if parallel_pool:
+            return np.array(parallel_pool(delayed(objective_function)(ind) for ind in population))
+        return np.array([objective_function(ind) for ind in population])
+
+    @contextmanager
+    def _evaluation_pool(self, objective_function: Callable, n_jobs: int):
+        """
+        Pick the evaluation backend for one optimize() run.
+
+        GIL-bound objectives (``gil_bound = True``, e.g. pure-Python backtests) get a
+        process pool with the market data in shared memory; everything else keeps
+        the joblib threading backend, which avoids multiprocessing issues on Windows
+        and is efficient when NumPy releases the GIL. Yields None for n_jobs == 1.
+        """
+        n_workers = resolve_n_jobs(n_jobs)
+        if n_workers == 1:
+            yield None
+        elif is_gil_bound(objective_function):
+            logger.info(f"{self.name}: evaluating on {n_workers} worker processes")
+            with ProcessPoolEvaluator(objective_function, n_workers) as pool:
+                yield pool
+        else:
+            with Parallel(n_jobs=n_jobs, backend="threading") as parallel:
+                yield parallel
+
+    def _start_run(self):
+        """Reset per-run counters and the convergence tracking."""
+        self.evaluations = 0
+        if self.cache is not None:
+            self.cache.reset_counters()
+            self.cache.clear_scoped()
+        self.epochs_run = 0
+        self.stop_reason = None
+        self.stop_epoch = None
+        self._run_started = time.perf_counter()
+        self._plateau_score = -float('inf')
+        self._plateau_epoch = -1
+
+    def _should_stop(self, epoch: int, population: np.ndarray, bounds: List[Tuple[float, float]]) -> bool:
+        """
+        Check the early-stopping criteria after ``epoch`` (0-based) has been evaluated.
+
+        Records which criterion fired in ``stop_reason``/``stop_epoch``.
+        """
+        self.epochs_run = epoch + 1
+        criteria = self.early_stopping
+        if criteria is None:
+            return False
+
+        reason = None
+        if criteria.patience is not None:
+            if self.best_score > self._plateau_score + criteria.min_delta:
+                self._plateau_score = self.best_score
+                self._plateau_epoch = epoch
+            elif epoch - self._plateau_epoch >= criteria.patience:
+                reason = 'no_improvement'
+
+        if reason is None and criteria.diversity_floor is not None:
+            span = np.array([b[1] - b[0] for b in bounds], dtype=float)
+            span[span == 0] = 1.0
+            diversity = float(np.mean(np.std(population, axis=0) / span))
+            if diversity < criteria.diversity_floor:
+                reason = 'diversity_floor'
+
+        if reason is None and criteria.time_budget is not None:
+            if time.perf_counter() - self._run_started >= criteria.time_budget:
+                reason = 'time_budget'
+
+        if reason is not None:
+            self.stop_reason = reason
+            self.stop_epoch = epoch
+            logger.info(f"{self.name}: early stop at epoch {epoch} ({reason}), best score {self.best_score:.4f}")
+            return True
+        return False
+
+    def get_report(self) -> Dict:
+        """Summary of the last optimize() run, including evaluation-cache counters."""
+        report = {
+            'optimizer': self.name,
+            'best_score': self.best_score,
+            'best_solution': None if self.best_solution is None else list(self.best_solution),
+            'evaluations': self.evaluations,
+            'epochs_run': self.epochs_run,
+            'stop_reason': self.stop_reason,
+            'stop_epoch': self.stop_epoch,
+        }
+        if self.cache is not None:
+            report.update(self.cache.stats())
+        return report
+
+    def _finish_run(self):
+        """Persist the cache and log the run summary."""
+        if self.cache is not None:
+            self.cache.save()
+            stats = self.cache.stats()
+            logger.info(f"{self.name}: {self.evaluations} evaluations, cache hits {stats['cache_hits']} / "
+                        f"misses {stats['cache_misses']} ({stats['cache_hit_rate']:.1%})")
+
     def optimize(self, objective_function: Callable, bounds: List[Tuple[float, float]], steps: List[float] = None, epochs: int = 100, n_jobs: int = 1, historical_data: List[Dict] = None):
         raise NotImplementedError("Subclasses must implement optimize method")
 
@@ -36,8 +310,10 @@ class WOAm(Optimizer):
     Whale Optimization Algorithm M (Modified) - Vectorized Implementation
     High-Performance Matrix Algebra Version based on HPC analysis.
     """
-    def __init__(self, pop_size: int = 200, power_dist_coeff: float = 30.0):
-        super().__init__("WOAm")
+    def __init__(self, pop_size: int = 200, power_dist_coeff: float = 30.0,
+                 cache_size: int = 100000, cache_path: Optional[str] = None,
+                 early_stopping: Optional[EarlyStopping] = None):
+        super().__init__("WOAm", cache_size=cache_size, cache_path=cache_path, early_stopping=early_stopping)
         self.pop_size = pop_size
         self.power_dist_coeff = power_dist_coeff
         
@@ -46,6 +322,7 @@ class WOAm(Optimizer):
         Vectorized optimization loop using NumPy broadcasting and Joblib parallelism.
         """
         dim = len(bounds)
+        self._start_run()
         X = self._initialize_population(self.pop_size, dim, bounds)
         
         # Pre-allocate loop constants
@@ -76,16 +353,11 @@ class WOAm(Optimizer):
 
         # Helper for evaluation to avoid code duplication and manage parallel pool
         def evaluate(population, parallel_pool=None):
-            if parallel_pool:
-                return np.array(parallel_pool(delayed(objective_function)(ind) for ind in population))
-            else:
-                return np.array([objective_function(ind) for ind in population])
+            return self._evaluate_population(objective_function, population, parallel_pool)
 
         # --- Optimization Loop with Resource Management ---
-        # Use threading backend on Windows to completely avoid resource_tracker/multiprocessing issues
-        # NumPy releases GIL for vector operations, so threading is efficient and safe here.
-        with Parallel(n_jobs=n_jobs, backend="threading") as parallel:
-            pool = parallel if n_jobs != 1 else None
+        # Process pool for GIL-bound objectives, threads otherwise (see _evaluation_pool)
+        with self._evaluation_pool(objective_function, n_jobs) as pool:
 
             # --- Initial Evaluation ---
             fitness = evaluate(X, pool)
@@ -185,7 +457,13 @@ class WOAm(Optimizer):
                 if t % 10 == 0 or t == epochs - 1:
                     # logger.info(f"WOAm Epoch {t}: Best Score = {self.best_score:.4f}")
                     pass
+                
+                if self._should_stop(t, X, bounds):
+                    break
+            
+            self.history = self.history[:self.epochs_run]
             
+        self._finish_run()
         return self.best_solution, self.best_score
 
 class TETA(Optimizer):
@@ -193,12 +471,55 @@ class TETA(Optimizer):
     Time Evolution Travel Algorithm (TETA)
     Updated to use PCG64 RNG from Base Class.
     """
-    def __init__(self, pop_size: int = 200):
-        super().__init__("TETA")
+    def __init__(self, pop_size: int = 200, cache_size: int = 100000, cache_path: Optional[str] = None,
+                 early_stopping: Optional[EarlyStopping] = None):
+        super().__init__("TETA", cache_size=cache_size, cache_path=cache_path, early_stopping=early_stopping)
         self.pop_size = pop_size
 
+    def _move(self, population: np.ndarray, local_best_pos: np.ndarray, bounds: List[Tuple[float, float]], steps: List[float]) -> np.ndarray:
+        """
+        Vectorized TETA move step over a population sorted best-first.
+
+        Each (agent, dimension) draws rnd = u^2 and pairs with agent int(rnd * (N - 1)):
+        a better agent drifts by rnd towards the pair's local best, a worse one jumps
+        (1 - rnd) of the way (or straight onto it with probability rnd), and an agent
+        paired with itself samples around the global best.
+        """
+        n, dim = population.shape
+        lb = np.array([b[0] for b in bounds], dtype=float)
+        ub = np.array([b[1] for b in bounds], dtype=float)
+        step_arr = np.asarray(steps, dtype=float)
+
+        rnd = self.rng.random((n, dim))
+        rnd *= rnd
+        pair = np.clip((rnd * (n - 1)).astype(np.intp), 0, n - 1)
+        agent = np.arange(n)[:, None]
+        cols = np.arange(dim)[None, :]
+
+        own_best = local_best_pos
+        pair_best = local_best_pos[pair, cols]
+
+        # i is better
+        better = population + rnd * (pair_best - own_best)
+        # i is worse
+        jump = self.rng.random((n, dim)) > rnd
+        worse = np.where(jump, own_best + (1.0 - rnd) * (pair_best - own_best), pair_best)
+        # Gaussian around the global best
+        gaussian = self.rng.normal(self.best_solution, (ub - lb) / 6.0, size=(n, dim))
+
+        new_pop = np.where(agent < pair, better, np.where(agent > pair, worse, gaussian))
+
+        # Bound
+        new_pop = np.clip(new_pop, lb, ub)
+        discrete = step_arr > 0
+        if discrete.any():
+            snapped = np.round(new_pop / np.where(discrete, step_arr, 1.0)) * step_arr
+            new_pop = np.where(discrete, snapped, new_pop)
+        return new_pop
+
     def optimize(self, objective_function: Callable, bounds: List[Tuple[float, float]], steps: List[float] = None, epochs: int = 100, n_jobs: int = 1, historical_data: List[Dict] = None):
         dim = len(bounds)
+        self._start_run()
         if steps is None:
             steps = [0.0] * dim
             
@@ -207,15 +528,11 @@ class TETA(Optimizer):
         
         # Helper for evaluation to avoid code duplication and manage parallel pool
         def evaluate(pop, parallel_pool=None):
-            if parallel_pool:
-                return np.array(parallel_pool(delayed(objective_function)(ind) for ind in pop))
-            else:
-                return np.array([objective_function(ind) for ind in pop])
+            return self._evaluate_population(objective_function, pop, parallel_pool)
 
         # --- Optimization Loop with Resource Management ---
-        # Use threading backend on Windows to completely avoid resource_tracker/multiprocessing issues
-        with Parallel(n_jobs=n_jobs, backend="threading") as parallel:
-            pool = parallel if n_jobs != 1 else None
+        # Process pool for GIL-bound objectives, threads otherwise (see _evaluation_pool)
+        with self._evaluation_pool(objective_function, n_jobs) as pool:
 
             # Parallel Evaluation
             fitness = evaluate(population, pool)
@@ -233,41 +550,12 @@ class TETA(Optimizer):
             fitness = fitness[sort_idx]
             local_best_pos = local_best_pos[sort_idx]
             local_best_fit = local_best_fit[sort_idx]
+            
+            self.history = np.zeros(epochs)
     
             for epoch in range(epochs):
-                # Moving (Partially vectorized logic)
-                # TETA logic is pairwise, harder to fully vectorize without adjacency matrix.
-                # Keeping loop for now but using numpy arrays for speed.
-                
-                new_pop = population.copy()
-                
-                for i in range(self.pop_size):
-                    for j in range(dim):
-                        rnd = self.rng.random()
-                        rnd *= rnd
-                        
-                        pair = int(rnd * (self.pop_size - 1))
-                        pair = max(0, min(self.pop_size - 1, pair))
-                        
-                        val = 0.0
-                        
-                        if i != pair:
-                            if i < pair: # i is better
-                                val = population[i, j] + rnd * (local_best_pos[pair, j] - local_best_pos[i, j])
-                            else: # i is worse
-                                if self.rng.random() > rnd:
-                                    val = local_best_pos[i, j] + (1.0 - rnd) * (local_best_pos[pair, j] - local_best_pos[i, j])
-                                else:
-                                    val = local_best_pos[pair, j]
-                        else:
-                            # Gaussian
-                            sigma = (bounds[j][1] - bounds[j][0]) / 6.0
-                            val = self.rng.normal(self.best_solution[j], sigma)
-                        
-                        # Bound
-                        val = max(bounds[j][0], min(bounds[j][1], val))
-                        if steps[j] > 0: val = round(val / steps[j]) * steps[j]
-                        new_pop[i, j] = val
+                # Moving: every (agent, dimension) pair is drawn at once
+                new_pop = self._move(population, local_best_pos, bounds, steps)
     
                 population = new_pop
                 
@@ -292,6 +580,13 @@ class TETA(Optimizer):
                 local_best_pos = local_best_pos[sort_idx]
                 local_best_fit = local_best_fit[sort_idx]
                 
+                self.history[epoch] = self.best_score
+                if self._should_stop(epoch, population, bounds):
+                    break
+            
+            self.history = self.history[:self.epochs_run]
+                
+        self._finish_run()
         return self.best_solution, self.best_score
 
 # Compatibility aliases/placeholders for others if needed
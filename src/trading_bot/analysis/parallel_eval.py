@@ -0,0 +1,153 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger("ParallelEval")
+
+
+class SharedArrays:
+    """
+    Read-only float64 columns packed into one ``multiprocessing.shared_memory`` block.
+
+    Pickling sends only the block name and layout; unpickling in a worker
+    attaches to the same memory, so market data crosses the process boundary
+    once and without copies. Columns are looked up like a DataFrame
+    (``arrays['close']``).
+    """
+
+    def __init__(self, arrays: dict):
+        columns = {name: np.asarray(values, dtype=np.float64) for name, values in arrays.items()}
+        self._layout = []
+        offset = 0
+        for name, values in columns.items():
+            self._layout.append((name, offset, len(values)))
+            offset += values.nbytes
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self._owner = True
+        self._columns = self._map_columns()
+        for name, values in columns.items():
+            self._columns[name][:] = values
+            self._columns[name].flags.writeable = False
+
+    def _map_columns(self):
+        return {
+            name: np.ndarray((length,), dtype=np.float64, buffer=self._shm.buf, offset=offset)
+            for name, offset, length in self._layout
+        }
+
+    def __getstate__(self):
+        return {'name': self._shm.name, 'layout': self._layout}
+
+    def __setstate__(self, state):
+        self._layout = state['layout']
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._owner = False
+        self._columns = self._map_columns()
+        for values in self._columns.values():
+            values.flags.writeable = False
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return self._layout[0][2] if self._layout else 0
+
+    def keys(self):
+        return self._columns.keys()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        """Detach from the block (views handed out earlier become invalid)."""
+        self._columns = {}
+        try:
+            self._shm.close()
+        except BufferError:
+            logger.debug(f"Shared block {self._shm.name} still has live views, leaving it mapped")
+
+    def unlink(self):
+        """Detach and, in the creating process, free the block."""
+        self.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._owner = False
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """Translate a joblib-style ``n_jobs`` (-1 = all cores) into a worker count."""
+    cpu_count = os.cpu_count() or 1
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(1, cpu_count + 1 + n_jobs)
+    return n_jobs
+
+
+def is_gil_bound(objective_function) -> bool:
+    """Objectives declare ``gil_bound = True`` when they run pure-Python loops."""
+    return bool(getattr(objective_function, 'gil_bound', False))
+
+
+# Per-worker objective, installed once by the pool initializer
+_worker_objective = None
+
+
+def _init_worker(objective_function):
+    global _worker_objective
+    _worker_objective = objective_function
+
+
+def _evaluate_chunk(population):
+    evaluate_batch = getattr(_worker_objective, 'evaluate_batch', None)
+    if evaluate_batch is not None:
+        return np.asarray(evaluate_batch(population), dtype=float)
+    return np.array([_worker_objective(ind) for ind in population], dtype=float)
+
+
+class ProcessPoolEvaluator:
+    """
+    Evaluates populations on a pool of worker processes.
+
+    The objective is shipped to each worker once at start-up. Objectives that
+    implement ``share_memory()`` are first converted to a copy backed by
+    shared memory (and ``release_memory()`` is called on close), so per-epoch
+    traffic is only the parameter vectors and the scores.
+    """
+
+    def __init__(self, objective_function, n_workers: int):
+        share = getattr(objective_function, 'share_memory', None)
+        self._objective = share() if share is not None else objective_function
+        self.n_workers = n_workers
+        self._executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                             initargs=(self._objective,))
+
+    def evaluate(self, population) -> np.ndarray:
+        population = np.asarray(population)
+        if len(population) == 0:
+            return np.empty(0)
+        chunks = np.array_split(population, min(self.n_workers, len(population)))
+        return np.concatenate(list(self._executor.map(_evaluate_chunk, chunks)))
+
+    def close(self):
+        self._executor.shutdown()
+        release = getattr(self._objective, 'release_memory', None)
+        if release is not None:
+            release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
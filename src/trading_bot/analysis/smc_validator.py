@@ -5,6 +5,7 @@ import time
 import MetaTrader5 as mt5
 from .advanced_analysis import SMCAnalyzer, AdvancedMarketAnalysisAdapter
 from .breakout_quality_filter import BreakoutQualityFilter
+from data.bar_store import get_bar_store
 
 logger = logging.getLogger("SMCValidator")
 
@@ -14,32 +15,19 @@ class SMCQualityValidator:
     Validates ORB signals against Smart Money Concepts.
     """
     
-    def __init__(self, min_score_threshold=70):
+    def __init__(self, min_score_threshold=70, bar_store=None):
         self.smc_analyzer = SMCAnalyzer()
         self.advanced_analyzer = AdvancedMarketAnalysisAdapter()
         self.quality_filter = BreakoutQualityFilter()
         self.min_score_threshold = min_score_threshold
-        self.cache = {}
+        self.bar_store = bar_store or get_bar_store()
+        self.smc_analyzer.bar_store = self.bar_store
 
     def get_data(self, symbol, timeframe, lookback=500):
-        cache_key = f"{symbol}_{timeframe}"
-        cached = self.cache.get(cache_key)
-        if cached and time.time() - cached['time'] < 60:
-            return cached['data']
-
-        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, lookback)
-        if rates is None or len(rates) == 0:
+        df = self.bar_store.get_dataframe(symbol, timeframe, lookback)
+        if df is None or len(df) == 0:
             logger.error(f"获取SMC数据失败:  {symbol}")
             return None
-
-        df = pd.DataFrame(rates)
-        if 'time' in df.columns:
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-
-        self.cache[cache_key] = {
-            "data": df,
-            "time": time.time()
-        }
         return df
 
     def analyze_market_structure(self, symbol, timeframe):
@@ -0,0 +1,78 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _neighbour_extreme(values, left, right, fill, reduce):
+    """
+    Extreme of the ``left`` bars before and the ``right`` bars after every bar,
+    excluding the bar itself. Missing neighbours at the edges count as ``fill``.
+    """
+    n = len(values)
+    padded = np.concatenate([np.full(left, fill), values, np.full(right, fill)])
+    left_ext = np.full(n, fill)
+    right_ext = np.full(n, fill)
+    if left > 0:
+        left_ext = reduce(sliding_window_view(padded[:n + left - 1], left), axis=1)
+    if right > 0:
+        right_ext = reduce(sliding_window_view(padded[left + 1:], right), axis=1)[:n]
+    return left_ext, right_ext
+
+
+def swing_highs(high, left, right=None, strict=True, partial=False):
+    """
+    Indices of fractal highs: bars whose high exceeds the ``left`` bars before and
+    the ``right`` bars after it.
+
+    Args:
+        high (array-like): High prices, oldest first
+        left (int): Bars to compare on the left
+        right (int): Bars to compare on the right (defaults to ``left``)
+        strict (bool): Require ``>`` rather than ``>=`` against every neighbour
+        partial (bool): Also evaluate bars near the edges, ignoring missing neighbours
+
+    Returns:
+        np.ndarray: Ascending indices of the swing highs
+    """
+    high = np.asarray(high, dtype=float)
+    right = left if right is None else right
+    n = len(high)
+    if n == 0 or (not partial and n < left + right + 1):
+        return np.empty(0, dtype=np.intp)
+    left_max, right_max = _neighbour_extreme(high, left, right, -np.inf, np.max)
+    if strict:
+        mask = (high > left_max) & (high > right_max)
+    else:
+        mask = (high >= left_max) & (high >= right_max)
+    if not partial:
+        mask[:left] = False
+        mask[n - right:] = False
+    return np.flatnonzero(mask)
+
+
+def swing_lows(low, left, right=None, strict=True, partial=False):
+    """Indices of fractal lows, the mirror image of :func:`swing_highs`."""
+    low = np.asarray(low, dtype=float)
+    right = left if right is None else right
+    n = len(low)
+    if n == 0 or (not partial and n < left + right + 1):
+        return np.empty(0, dtype=np.intp)
+    left_min, right_min = _neighbour_extreme(low, left, right, np.inf, np.min)
+    if strict:
+        mask = (low < left_min) & (low < right_min)
+    else:
+        mask = (low <= left_min) & (low <= right_min)
+    if not partial:
+        mask[:left] = False
+        mask[n - right:] = False
+    return np.flatnonzero(mask)
+
+
+def find_swing_points(high, low, left, right=None, strict=True, partial=False):
+    """
+    Swing highs and lows in one call.
+
+    Returns:
+        tuple: (high_indices, low_indices) as ascending NumPy arrays
+    """
+    return (swing_highs(high, left, right, strict, partial),
+            swing_lows(low, left, right, strict, partial))
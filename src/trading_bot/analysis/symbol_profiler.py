@@ -14,7 +14,9 @@ class SymbolProfiler:
     分析MT5平台上的交易品种特征，为智能配置引擎提供基础数据
     """
 
-    def __init__(self):
+    def __init__(self, history_store=None):
+        # 可选的本地列式历史库 (data/history_store.py)，有足够数据时不再从MT5拉取
+        self.history_store = history_store
         self.timeframes = [
             mt5.TIMEFRAME_M1,
             mt5.TIMEFRAME_M5,
@@ -109,16 +111,30 @@ class SymbolProfiler:
             'time': info.time,
         }
 
+    def _get_rates(self, symbol: str, timeframe: int, count: int) -> Optional[pd.DataFrame]:
+        """最近count根K线：本地历史库足够时直接读取内存映射列，否则从MT5获取"""
+        if self.history_store is not None:
+            try:
+                bars = self.history_store.read(symbol, self.tf_names[timeframe], last=count)
+                if len(bars) >= count:
+                    return pd.DataFrame({name: bars[name] for name in bars.keys()})
+            except Exception as e:
+                logger.warning(f"Failed to read stored history for {symbol} {self.tf_names[timeframe]}: {e}")
+
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+        if rates is None:
+            return None
+        return pd.DataFrame(rates)
+
     def _analyze_volatility(self, symbol: str, days: int) -> Dict[str, Any]:
         """分析波动性特征"""
         volatility_data = {}
         
         for tf in self.timeframes:
-            rates = mt5.copy_rates_from_pos(symbol, tf, 0, int(days * 24 * 60 // self._get_minutes(tf)))
-            if rates is None or len(rates) < 50:
+            df = self._get_rates(symbol, tf, int(days * 24 * 60 // self._get_minutes(tf)))
+            if df is None or len(df) < 50:
                 continue
                 
-            df = pd.DataFrame(rates)
             df['returns'] = df['close'].pct_change()
             
             volatility_data[self.tf_names[tf]] = {
@@ -136,11 +152,10 @@ class SymbolProfiler:
         volume_data = {}
         
         for tf in self.timeframes:
-            rates = mt5.copy_rates_from_pos(symbol, tf, 0, int(days * 24 * 60 // self._get_minutes(tf)))
-            if rates is None or len(rates) < 50:
+            df = self._get_rates(symbol, tf, int(days * 24 * 60 // self._get_minutes(tf)))
+            if df is None or len(df) < 50:
                 continue
                 
-            df = pd.DataFrame(rates)
             vol_col = 'tick_volume' if 'tick_volume' in df.columns else 'volume'
             
             volume_data[self.tf_names[tf]] = {
@@ -0,0 +1,372 @@
+import os
+import time
+import pickle
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .optimization import WOAm
+from .fast_grid_backtest import GridBacktestObjective
+from .parallel_eval import SharedArrays, resolve_n_jobs
+
+logger = logging.getLogger("WalkForward")
+
+DAY = 86400
+
+# Bump when the fold result layout or the scoring protocol changes
+FOLD_CACHE_VERSION = 1
+
+
+def bar_times(candles) -> np.ndarray:
+    """Bar open times as int64 epoch seconds (DataFrame index/'time' column or a column mapping)."""
+    if isinstance(candles, pd.DataFrame) and 'time' not in candles.columns:
+        index = candles.index
+        if not isinstance(index, pd.DatetimeIndex):
+            raise ValueError("Candles need a DatetimeIndex or a 'time' column")
+        return index.as_unit('s').asi8
+    values = np.asarray(candles['time'])
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[s]').astype(np.int64)
+    if values.dtype == object:
+        return pd.to_datetime(values, format='ISO8601').as_unit('s').asi8
+    return values.astype(np.int64)
+
+
+class CandleWindow:
+    """
+    Rows ``[start, stop)`` of a column mapping, looked up like a DataFrame.
+
+    Columns are NumPy views, so a fold slices the shared candles (SharedArrays or
+    memory-mapped HistoryArrays) without copying.
+    """
+
+    def __init__(self, columns, start: int, stop: int):
+        self._columns = columns
+        self.start = start
+        self.stop = stop
+
+    def __getitem__(self, name):
+        return np.asarray(self._columns[name])[self.start:self.stop]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def keys(self):
+        return self._columns.keys()
+
+
+def make_folds(times: np.ndarray, train_days: float, test_days: float, step_days: Optional[float] = None,
+               min_test_bars: int = 1) -> List[Dict]:
+    """
+    Rolling train/test windows over sorted bar times.
+
+    Test windows start on multiples of ``step_days`` since the epoch (UTC
+    midnights for whole days) rather than relative to the first bar, so
+    extending the history never moves existing folds: it only grows the
+    newest, still partial test window or adds a fold.
+
+    Args:
+        times: bar open times, epoch seconds, ascending
+        train_days: length of the in-sample window
+        test_days: length of the out-of-sample window
+        step_days: distance between fold starts (defaults to test_days, i.e. back-to-back OOS windows)
+        min_test_bars: skip folds whose test window has fewer bars
+
+    Returns:
+        list of dicts: fold, train/test start/end (epoch seconds, end exclusive) and row ranges
+    """
+    step_days = step_days or test_days
+    train_s, test_s, step_s = int(train_days * DAY), int(test_days * DAY), int(step_days * DAY)
+    if len(times) == 0 or min(train_s, test_s, step_s) <= 0:
+        return []
+
+    folds = []
+    first, last = int(times[0]), int(times[-1])
+    # First boundary with a full training window behind it
+    test_start = -(-(first + train_s) // step_s) * step_s
+    while test_start <= last:
+        train_start, test_end = test_start - train_s, test_start + test_s
+        train_lo, train_hi, test_hi = np.searchsorted(times, [train_start, test_start, test_end], 'left')
+        if train_hi > train_lo and test_hi - train_hi >= min_test_bars:
+            folds.append({
+                'fold': len(folds),
+                'train_start': train_start, 'train_end': test_start,
+                'test_start': test_start, 'test_end': test_end,
+                'train_rows': (int(train_lo), int(train_hi)),
+                'test_rows': (int(train_hi), int(test_hi)),
+                # Bars after the test window mean it has fully elapsed
+                'complete': bool(test_hi < len(times)),
+            })
+        test_start += step_s
+    return folds
+
+
+def _optimize_fold(columns, objective_factory, task) -> Dict:
+    """Optimize on the fold's train rows and score the winner on its test rows."""
+    started = time.perf_counter()
+    optimizer = WOAm(pop_size=task['pop_size'], power_dist_coeff=task['power_dist_coeff'])
+    if task['seed'] is not None:
+        optimizer.rng = np.random.default_rng(task['seed'])
+    objective = objective_factory(CandleWindow(columns, *task['train_rows']))
+    # Folds already run one per core, so each optimizer stays single-process
+    params, in_sample = optimizer.optimize(objective, task['bounds'], steps=task['steps'],
+                                           epochs=task['epochs'], n_jobs=1)
+    out_of_sample = objective_factory(CandleWindow(columns, *task['test_rows']))(params)
+    return {
+        'params': [float(x) for x in params],
+        'in_sample_score': float(in_sample),
+        'out_of_sample_score': float(out_of_sample),
+        'evaluations': optimizer.evaluations,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+# Per-worker candles and objective factory, installed once by the pool initializer
+_worker_columns = None
+_worker_factory = None
+
+
+def _init_worker(columns, objective_factory):
+    global _worker_columns, _worker_factory
+    _worker_columns = columns
+    _worker_factory = objective_factory
+
+
+def _run_worker_fold(task):
+    return _optimize_fold(_worker_columns, _worker_factory, task)
+
+
+class WalkForwardOptimizer:
+    """
+    Walk-forward optimization of the grid parameters.
+
+    History is cut into rolling windows (see :func:`make_folds`). For every
+    fold WOAm is fitted on the train window and the winning parameters are
+    scored on the following, unseen test window. Folds are independent, so they
+    run one per worker process; the candles cross the process boundary once
+    (memory-mapped HistoryArrays by reference, DataFrames through
+    SharedArrays). Optimized folds are cached on disk keyed by the train data
+    fingerprint and the optimizer settings, so a rerun on a longer history only
+    optimizes folds whose training data is new and just rescores the rest.
+    """
+
+    def __init__(self, bounds: List[Tuple[float, float]], steps: List[float] = None,
+                 train_days: float = 30, test_days: float = 7, step_days: Optional[float] = None,
+                 epochs: int = 30, pop_size: int = 30, power_dist_coeff: float = 20.0,
+                 seed: Optional[int] = 0, min_test_bars: int = 1,
+                 objective_factory: Callable = GridBacktestObjective, cache_path: Optional[str] = None,
+                 param_names: Optional[List[str]] = None):
+        """
+        Args:
+            bounds, steps: search space, as for ``Optimizer.optimize``
+            train_days, test_days, step_days: window lengths (see :func:`make_folds`)
+            epochs, pop_size, power_dist_coeff: WOAm settings used for every fold
+            seed: base seed; each fold derives its own from it and its window, so
+                cached and recomputed folds agree (None = unseeded, no caching)
+            min_test_bars: skip folds with fewer out-of-sample bars
+            objective_factory: picklable callable building the objective from a candle
+                window; objectives with ``fingerprint()`` make folds cacheable
+            cache_path: pickle file for optimized folds (None = no persistence)
+            param_names: labels for the stability report (defaults to parameter indices)
+        """
+        self.bounds = [tuple(map(float, b)) for b in bounds]
+        self.steps = None if steps is None else [float(s) for s in steps]
+        self.train_days = train_days
+        self.test_days = test_days
+        self.step_days = step_days
+        self.epochs = epochs
+        self.pop_size = pop_size
+        self.power_dist_coeff = power_dist_coeff
+        self.seed = seed
+        self.min_test_bars = min_test_bars
+        self.objective_factory = objective_factory
+        self.cache_path = cache_path
+        self.param_names = list(param_names) if param_names else list(range(len(self.bounds)))
+        self._cache = self._load_cache()
+
+    # ------------------------------------------------------------------ cache
+
+    def _load_cache(self) -> Dict:
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                entries = pickle.load(f)
+            logger.info(f"Loaded {len(entries)} cached folds from {self.cache_path}")
+            return entries
+        except Exception as e:
+            logger.warning(f"Failed to load fold cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self._cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to save fold cache {self.cache_path}: {e}")
+
+    def _fold_key(self, columns, fold):
+        """Cache key of a fold's optimization, or None when the objective has no fingerprint."""
+        if self.seed is None:
+            return None
+        fingerprint = getattr(self.objective_factory(CandleWindow(columns, *fold['train_rows'])), 'fingerprint', None)
+        if fingerprint is None:
+            return None
+        settings = (FOLD_CACHE_VERSION, 'WOAm', self.pop_size, self.power_dist_coeff, self.epochs,
+                    tuple(self.bounds), None if self.steps is None else tuple(self.steps), self.seed)
+        return (fingerprint(), fold['train_start'], fold['train_end'], settings)
+
+    # ------------------------------------------------------------------ run
+
+    @staticmethod
+    def _columns(candles):
+        """Column mapping the folds slice (HistoryArrays and SharedArrays are used as they are)."""
+        if isinstance(candles, pd.DataFrame):
+            return {name: np.asarray(candles[name], dtype=float)
+                    for name in ('open', 'high', 'low', 'close', 'volume') if name in candles.columns}
+        return candles
+
+    def _task(self, fold) -> Dict:
+        return {
+            'train_rows': fold['train_rows'], 'test_rows': fold['test_rows'],
+            'bounds': self.bounds, 'steps': self.steps, 'epochs': self.epochs,
+            'pop_size': self.pop_size, 'power_dist_coeff': self.power_dist_coeff,
+            # Seeded by window, not fold number, so a fold keeps its seed as history grows
+            'seed': None if self.seed is None else [self.seed, fold['train_start']],
+        }
+
+    def _optimize_pending(self, columns, tasks, n_jobs) -> List[Dict]:
+        n_workers = min(resolve_n_jobs(n_jobs), len(tasks))
+        if n_workers <= 1:
+            return [_optimize_fold(columns, self.objective_factory, task) for task in tasks]
+
+        logger.info(f"Optimizing {len(tasks)} folds on {n_workers} worker processes")
+        shared = None
+        if not getattr(columns, 'memory_mapped', False) and not isinstance(columns, SharedArrays):
+            shared = columns = SharedArrays(columns)
+        try:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(columns, self.objective_factory)) as executor:
+                return list(executor.map(_run_worker_fold, tasks))
+        finally:
+            if shared is not None:
+                shared.unlink()
+
+    def run(self, candles, n_jobs: int = -1) -> Dict:
+        """
+        Walk the history forward.
+
+        Args:
+            candles: DataFrame (DatetimeIndex or 'time' column) or HistoryArrays with OHLC columns
+            n_jobs: worker processes for the folds (-1 = all cores)
+
+        Returns:
+            dict: 'folds' (per-fold windows, params and scores), 'summary' (aggregated
+                out-of-sample results), 'stability' (per-parameter dispersion across folds)
+                and 'recommended_params' (the newest fold's parameters)
+        """
+        started = time.perf_counter()
+        times = bar_times(candles)
+        columns = self._columns(candles)
+        folds = make_folds(times, self.train_days, self.test_days, self.step_days, self.min_test_bars)
+        if not folds:
+            logger.warning(f"History of {len(times)} bars is too short for {self.train_days}d train / "
+                           f"{self.test_days}d test windows")
+            return {'folds': [], 'summary': self.summarize([]), 'stability': {}, 'recommended_params': None}
+
+        keys = [self._fold_key(columns, fold) for fold in folds]
+        pending = [i for i, key in enumerate(keys) if key is None or key not in self._cache]
+        fresh = self._optimize_pending(columns, [self._task(folds[i]) for i in pending], n_jobs)
+        results = dict(zip(pending, fresh))
+
+        for i, fold in enumerate(folds):
+            if i in results:
+                fold.update(results[i], cached=False)
+                continue
+            # Optimized before: the params stand, only the (possibly longer) test window is rescored
+            cached = self._cache[keys[i]]
+            oos = self.objective_factory(CandleWindow(columns, *fold['test_rows']))(cached['params'])
+            fold.update(cached, out_of_sample_score=float(oos), cached=True)
+
+        # Keep only the folds of this history, so the file does not grow with every run
+        self._cache = {key: {name: fold[name] for name in ('params', 'in_sample_score', 'evaluations', 'seconds')}
+                       for key, fold in zip(keys, folds) if key is not None}
+        self._save_cache()
+
+        for fold in folds:
+            fold['train_bars'] = fold['train_rows'][1] - fold['train_rows'][0]
+            fold['test_bars'] = fold['test_rows'][1] - fold['test_rows'][0]
+            for name in ('train_start', 'train_end', 'test_start', 'test_end'):
+                fold[name] = pd.Timestamp(fold[name], unit='s')
+
+        logger.info(f"Walk-forward: {len(folds)} folds, {len(pending)} optimized, "
+                    f"{len(folds) - len(pending)} from cache, {time.perf_counter() - started:.1f}s")
+        return {
+            'folds': folds,
+            'summary': self.summarize(folds),
+            'stability': self.stability(folds),
+            'recommended_params': folds[-1]['params'],
+        }
+
+    # ------------------------------------------------------------------ reporting
+
+    @staticmethod
+    def summarize(folds: List[Dict]) -> Dict:
+        """
+        Aggregate out-of-sample results.
+
+        ``efficiency`` is the walk-forward efficiency: out-of-sample score per bar
+        over in-sample score per bar (folds with a non-positive in-sample score are
+        left out).
+        """
+        if not folds:
+            return {'folds': 0, 'oos_total': 0.0, 'oos_mean': 0.0, 'oos_std': 0.0,
+                    'oos_positive_ratio': 0.0, 'is_mean': 0.0, 'efficiency': None, 'cached_folds': 0}
+        oos = np.array([f['out_of_sample_score'] for f in folds])
+        ins = np.array([f['in_sample_score'] for f in folds])
+        ratios = [(f['out_of_sample_score'] / f['test_bars']) / (f['in_sample_score'] / f['train_bars'])
+                  for f in folds if f['in_sample_score'] > 0 and f['test_bars'] > 0]
+        return {
+            'folds': len(folds),
+            'oos_total': float(oos.sum()),
+            'oos_mean': float(oos.mean()),
+            'oos_std': float(oos.std()),
+            'oos_positive_ratio': float((oos > 0).mean()),
+            'is_mean': float(ins.mean()),
+            'efficiency': float(np.mean(ratios)) if ratios else None,
+            'cached_folds': sum(1 for f in folds if f.get('cached')),
+        }
+
+    def stability(self, folds: List[Dict]) -> Dict:
+        """
+        Dispersion of each parameter across folds.
+
+        ``range_std`` is the standard deviation relative to the search range, so
+        0 means every fold chose the same value and ~0.29 is no better than random.
+        """
+        if not folds:
+            return {}
+        params = np.array([f['params'] for f in folds], dtype=float)
+        report = {}
+        for i, (lo, hi) in enumerate(self.bounds):
+            values = params[:, i]
+            mean, std = float(values.mean()), float(values.std())
+            report[self.param_names[i]] = {
+                'mean': mean,
+                'std': std,
+                'median': float(np.median(values)),
+                'cv': std / abs(mean) if mean else None,
+                'range_std': std / (hi - lo) if hi > lo else 0.0,
+            }
+        return report
@@ -19,6 +19,7 @@ class BacktestEngine:
         self.initial_capital = initial_capital
         self.data = None
         self.strategy = None
+        self.vectorized = False
         self.results = None
         self.trades = None
     
@@ -31,14 +32,17 @@ class BacktestEngine:
         """
         self.data = data.copy()
     
-    def set_strategy(self, strategy_func):
+    def set_strategy(self, strategy_func, vectorized: bool = False):
         """
         设置回测策略
         
         Args:
-            strategy_func: 策略函数，接受数据和回测引擎实例，返回信号
+            strategy_func: 策略函数，接受数据和回测引擎实例。
+                逐K线模式下返回当前信号；向量化模式下一次性返回与数据等长的信号数组
+            vectorized (bool): 是否为向量化信号策略，默认为False（逐K线回调，适用于路径依赖策略）
         """
         self.strategy = strategy_func
+        self.vectorized = vectorized
     
     def run_backtest(self, risk_per_trade: float = 0.01):
         """
@@ -53,6 +57,10 @@ class BacktestEngine:
         if self.strategy is None:
             raise ValueError("No strategy set. Please call set_strategy() first.")
         
+        if self.vectorized:
+            self._run_vectorized(risk_per_trade)
+            return
+        
         # 初始化回测变量
         capital = self.initial_capital
         position = 0  # 持仓量，正数为多，负数为空
@@ -84,7 +92,7 @@ class BacktestEngine:
                 # 平仓（如果有空头仓位）
                 if position < 0:
                     exit_price = current_data['close']
-                    pnl = (exit_price - current_data['open']) * abs(position) * 100000
+                    pnl = (entry_price - exit_price) * abs(position) * 100000
                     capital += pnl
                     trades.append({
                         'entry_time': entry_time,
@@ -133,7 +141,82 @@ class BacktestEngine:
             
             equity_curve.append(current_capital)
         
-        # 保存结果
+        self._store_results(equity_curve, trades)
+    
+    def _run_vectorized(self, risk_per_trade: float):
+        """
+        向量化回测：策略一次性给出整段信号，仓位、盈亏、权益曲线和交易列表用数组运算得到。
+        
+        仓位大小依赖开仓时的已实现资金，因此只在有信号的K线上做一次顺序递推，
+        其余K线不再逐根切片；结果与逐K线模式一致。
+        
+        Args:
+            risk_per_trade (float): 每笔交易风险占比
+        """
+        data = self.data
+        n = len(data)
+        signals = np.asarray(self.strategy(data, self), dtype=float)
+        if signals.shape != (n,):
+            raise ValueError(f"Vectorized strategy must return {n} signals, got shape {signals.shape}")
+        signals = np.sign(np.nan_to_num(signals)).astype(np.int8)
+        
+        opens = data['open'].to_numpy(dtype=float)
+        closes = data['close'].to_numpy(dtype=float)
+        atr = data['atr'].to_numpy(dtype=float)
+        index = data.index
+        
+        capital = self.initial_capital
+        position = 0
+        entry_price = 0.0
+        entry_time = None
+        trades = []
+        # 仓位状态变化点：K线位置、变化后的仓位、开仓价、已实现资金
+        event_bars, event_pos, event_entry, event_capital = [], [], [], []
+        
+        for i in np.flatnonzero(signals):
+            signal = signals[i]
+            if not ((signal == 1 and position <= 0) or (signal == -1 and position >= 0)):
+                continue
+            
+            # 与逐K线模式相同：按平仓前的资金计算仓位
+            risk_amount = capital * risk_per_trade
+            position_size = int(risk_amount / (atr[i] * 100000)) if atr[i] > 0 else 1
+            
+            if position != 0:
+                exit_price = closes[i]
+                pnl = (exit_price - entry_price) * position * 100000
+                capital += pnl
+                trades.append({
+                    'entry_time': entry_time,
+                    'entry_price': entry_price,
+                    'exit_time': index[i],
+                    'exit_price': exit_price,
+                    'signal': 'buy' if position > 0 else 'sell',
+                    'pnl': pnl,
+                    'capital': capital
+                })
+            
+            position = int(signal) * position_size
+            entry_time = index[i]
+            entry_price = opens[i]
+            event_bars.append(i)
+            event_pos.append(position)
+            event_entry.append(entry_price)
+            event_capital.append(capital)
+        
+        # 每根K线对应最近一次状态变化（之前为空仓、初始资金）
+        state = np.searchsorted(np.asarray(event_bars, dtype=np.intp), np.arange(n), side='right')
+        pos = np.concatenate([[0.0], np.asarray(event_pos, dtype=float)])[state]
+        entry = np.concatenate([[0.0], np.asarray(event_entry, dtype=float)])[state]
+        realized = np.concatenate([[self.initial_capital], np.asarray(event_capital, dtype=float)])[state]
+        
+        equity = realized + np.where(pos != 0, (closes - entry) * pos * 100000, 0.0)
+        equity_curve = [self.initial_capital] + list(equity)
+        
+        self._store_results(equity_curve, trades)
+    
+    def _store_results(self, equity_curve: List[float], trades: List[Dict[str, Any]]):
+        """保存回测结果并计算性能指标"""
         self.results = {
             'equity_curve': equity_curve,
             'final_capital': equity_curve[-1],
@@ -166,16 +249,8 @@ class BacktestEngine:
         sharpe_ratio = annual_return / volatility if volatility > 0 else 0
         
         # 计算最大回撤
-        drawdowns = []
-        peak = equity.iloc[0]
-        
-        for value in equity:
-            if value > peak:
-                peak = value
-            drawdown = (peak - value) / peak
-            drawdowns.append(drawdown)
-        
-        max_drawdown = max(drawdowns)
+        drawdowns = self._drawdowns(equity)
+        max_drawdown = drawdowns.max()
         
         # 计算胜率
         winning_trades = 0
@@ -204,6 +279,13 @@ class BacktestEngine:
             'winning_trades': winning_trades
         })
     
+    @staticmethod
+    def _drawdowns(equity: pd.Series) -> np.ndarray:
+        """逐点回撤 (peak - value) / peak"""
+        values = equity.to_numpy(dtype=float)
+        peak = np.maximum.accumulate(values)
+        return (peak - values) / peak
+    
     def generate_report(self, report_path: str = None):
         """
         生成回测报告
@@ -272,13 +354,7 @@ class BacktestEngine:
         ax1.legend()
         
         # 绘制最大回撤
-        drawdowns = []
-        peak = equity.iloc[0]
-        for value in equity:
-            if value > peak:
-                peak = value
-            drawdown = (peak - value) / peak
-            drawdowns.append(drawdown)
+        drawdowns = self._drawdowns(equity)
         
         ax2.plot(equity.index, drawdowns, label='Drawdown', color='red')
         ax2.set_title('Backtest Results - Drawdown')
@@ -322,6 +398,29 @@ def example_strategy(data, engine):
         return 0  # 无信号
 
 
+def example_vectorized_strategy(data, engine):
+    """
+    示例向量化策略：与example_strategy相同的EMA交叉，一次性返回整段信号
+    
+    Args:
+        data (pd.DataFrame): 历史数据
+        engine (BacktestEngine): 回测引擎实例
+    
+    Returns:
+        np.ndarray: 信号数组，1=买入，-1=卖出，0=持有
+    """
+    fast = data['ema_fast'].to_numpy()
+    slow = data['ema_slow'].to_numpy()
+    prev_fast = np.roll(fast, 1)
+    prev_slow = np.roll(slow, 1)
+    
+    signals = np.zeros(len(data), dtype=np.int8)
+    signals[(fast > slow) & (prev_fast <= prev_slow)] = 1
+    signals[(fast < slow) & (prev_fast >= prev_slow)] = -1
+    signals[:25] = 0  # 与逐K线版本相同的预热期（数据不足26根时不出信号）
+    return signals
+
+
 def main():
     """
     主函数用于测试回测引擎
@@ -0,0 +1,278 @@
+import sys
+import time
+import logging
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("TickBacktester")
+
+# SymbolTrader methods timed per call (whichever the trader has)
+STAGES = ('process_tick', 'update_candle_data', '_analyze_confluence', '_execute_confluence_trade',
+          'manage_positions', 'close_positions')
+
+
+class SimulatedTime:
+    """
+    Stand-in for the ``time`` module inside replayed code.
+
+    ``time()`` / ``monotonic()`` follow the replay clock and ``sleep()``
+    advances it instead of waiting, so retry back-offs and throttles behave as
+    in live trading without costing wall time.
+    """
+
+    def __init__(self, clock):
+        self._clock = clock
+
+    def time(self):
+        return self._clock.now()
+
+    def monotonic(self):
+        return self._clock.now()
+
+    def sleep(self, seconds):
+        self._clock.advance(seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def ticks_from_bars(rates, bar_seconds, point, default_spread=0):
+    """
+    Synthetic ticks from OHLC bars (open, low/high by bar direction, close).
+
+    Args:
+        rates: MT5 rates array (time/open/high/low/close/spread)
+        bar_seconds: bar length
+        point: symbol point, to turn the bar spread into a price
+        default_spread: spread in points for bars without one
+
+    Returns:
+        pd.DataFrame: time_msc, bid, ask
+    """
+    up = rates['close'] >= rates['open']
+    # Bullish bars are assumed to dip first, bearish bars to rally first
+    path = np.column_stack([rates['open'], np.where(up, rates['low'], rates['high']),
+                            np.where(up, rates['high'], rates['low']), rates['close']])
+    offsets = (np.array([0.0, 0.3, 0.6, 0.95]) * bar_seconds * 1000).astype(np.int64)
+    time_msc = rates['time'].astype(np.int64)[:, None] * 1000 + offsets
+    spread = np.where(rates['spread'] > 0, rates['spread'], default_spread) * point
+    bid = path.ravel()
+    return pd.DataFrame({'time_msc': time_msc.ravel(), 'bid': bid, 'ask': bid + np.repeat(spread, 4)})
+
+
+class TickBacktester:
+    """
+    Event-driven backtest of the live decision pipeline on recorded ticks.
+
+    Every tick moves the replay clock straight to the tick time (idle time is
+    skipped, sleeps only advance the clock), then the tick is handed to
+    ``trader.process_tick``. That runs the real update/analysis/execution and
+    ``manage_positions`` path against the replay broker (data/mt5_replay.py),
+    which applies spread, slippage, fill rules and SL/TP. The run reports
+    closed trades, the equity curve and per-stage latency.
+    """
+
+    def __init__(self, trader, broker, symbol=None, equity_interval=60.0, modules=None):
+        """
+        Args:
+            trader: SymbolTrader (or any object with ``process_tick(tick)``) built against ``broker``
+            broker: MT5Replay installed as MetaTrader5
+            symbol: traded symbol (defaults to ``trader.symbol``)
+            equity_interval: simulated seconds between equity samples
+            modules: modules whose ``time`` follows the replay clock during the run
+                (defaults to the trader's module and data.bar_store)
+        """
+        self.trader = trader
+        self.broker = broker
+        self.symbol = symbol or trader.symbol
+        self.equity_interval = equity_interval
+        if modules is None:
+            modules = [sys.modules.get(type(trader).__module__), sys.modules.get('data.bar_store')]
+        self.modules = [m for m in modules if m is not None]
+        self.latencies = defaultdict(list)
+
+    # ------------------------------------------------------------------ instrumentation
+
+    def _timed(self, stage, method):
+        samples = self.latencies[stage]
+
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - started)
+        return wrapper
+
+    def _patch(self):
+        """Point module clocks, stage timers and the bar store at the replay; returns undo records."""
+        patches = []
+
+        def patch(target, name, value):
+            patches.append((target, name, name in vars(target), vars(target).get(name)))
+            setattr(target, name, value)
+
+        clock_time = SimulatedTime(self.broker.clock)
+        for module in self.modules:
+            if hasattr(module, 'time'):
+                patch(module, 'time', clock_time)
+        for stage in STAGES:
+            method = getattr(self.trader, stage, None)
+            if callable(method):
+                patch(self.trader, stage, self._timed(stage, method))
+        bar_store = getattr(self.trader, 'bar_store', None)
+        if bar_store is not None:
+            patch(bar_store, 'source', self.broker)
+            bar_store.invalidate(self.symbol)
+        return patches
+
+    @staticmethod
+    def _unpatch(patches):
+        for target, name, existed, value in reversed(patches):
+            if existed:
+                setattr(target, name, value)
+            else:
+                delattr(target, name)
+
+    # ------------------------------------------------------------------ run
+
+    def _ensure_ticks(self):
+        times = self.broker.tick_times(self.symbol)
+        if len(times):
+            return times
+        rates, seconds = self.broker.base_bars(self.symbol)
+        if rates is None:
+            raise ValueError(f"No ticks or bars loaded for {self.symbol}")
+        spec = self.broker.add_symbol(self.symbol)
+        logger.info(f"No recorded ticks for {self.symbol}, synthesizing 4 per bar from {len(rates)} bars")
+        self.broker.load_ticks(self.symbol, ticks_from_bars(rates, seconds, spec['point'], spec['spread']))
+        return self.broker.tick_times(self.symbol)
+
+    def run(self, start=None, end=None, max_ticks=None):
+        """
+        Replay the ticks in ``[start, end]`` through the trader.
+
+        Args:
+            start, end: datetimes / timestamps bounding the replay (None = all ticks)
+            max_ticks: stop after this many ticks
+
+        Returns:
+            dict: ticks, sim/wall seconds, ticks_per_second, errors, trades (list of dicts),
+                open_positions, equity (DataFrame), final_balance/equity, net_profit,
+                max_drawdown, latency ({stage: {calls, mean_ms, p50_ms, p95_ms, p99_ms, max_ms, total_ms}})
+        """
+        times = self._ensure_ticks()
+        lo = 0 if start is None else int(np.searchsorted(times, pd.Timestamp(start).timestamp() * 1000, 'left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, pd.Timestamp(end).timestamp() * 1000, 'right'))
+        if max_ticks is not None:
+            hi = min(hi, lo + max_ticks)
+        if hi <= lo:
+            raise ValueError("No ticks in the requested range")
+
+        clock = self.broker.clock
+        clock.set(max(clock.now(), times[lo] / 1000.0))
+        sim_start = clock.now()
+        equity = []
+        next_sample = sim_start
+        errors = 0
+        self.latencies.clear()
+
+        patches = self._patch()
+        wall_start = time.perf_counter()
+        try:
+            for i in range(lo, hi):
+                tick_time = times[i] / 1000.0
+                # Sleeps inside the trader may already have moved the clock past this tick
+                if tick_time > clock.now():
+                    clock.set(tick_time)
+                tick = self.broker.symbol_info_tick(self.symbol)
+                if tick is None:
+                    continue
+                try:
+                    self.trader.process_tick(tick)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"process_tick failed at {pd.Timestamp(tick_time, unit='s')}: {e}")
+                if clock.now() >= next_sample:
+                    account = self.broker.account_info()
+                    equity.append((clock.now(), account.balance, account.equity))
+                    next_sample = clock.now() + self.equity_interval
+        finally:
+            wall_seconds = time.perf_counter() - wall_start
+            self._unpatch(patches)
+
+        account = self.broker.account_info()
+        equity.append((clock.now(), account.balance, account.equity))
+        equity_df = pd.DataFrame(equity, columns=['time', 'balance', 'equity'])
+        equity_df['time'] = pd.to_datetime(equity_df['time'], unit='s')
+        peak = equity_df['equity'].cummax()
+        ticks = hi - lo
+        return {
+            'ticks': ticks,
+            'sim_seconds': clock.now() - sim_start,
+            'wall_seconds': wall_seconds,
+            'ticks_per_second': ticks / wall_seconds if wall_seconds > 0 else float('inf'),
+            'errors': errors,
+            'trades': self.trades(),
+            'open_positions': len(self.broker.positions_get(symbol=self.symbol)),
+            'equity': equity_df,
+            'final_balance': account.balance,
+            'final_equity': account.equity,
+            'net_profit': account.equity - self.broker.initial_balance,
+            'max_drawdown': float((peak - equity_df['equity']).max()),
+            'latency': self.latency_report(),
+        }
+
+    # ------------------------------------------------------------------ reporting
+
+    def trades(self):
+        """Closed trades from the broker's deal history (entry deal plus its exit deals)."""
+        broker = self.broker
+        entries, exits = {}, defaultdict(list)
+        for deal in broker.history_deals_get():
+            if deal.symbol != self.symbol:
+                continue
+            if deal.entry == broker.DEAL_ENTRY_IN:
+                entries[deal.position_id] = deal
+            else:
+                exits[deal.position_id].append(deal)
+        reasons = {broker.DEAL_REASON_SL: 'SL', broker.DEAL_REASON_TP: 'TP', broker.DEAL_REASON_EXPERT: 'EXPERT'}
+        trades = []
+        for ticket, entry in entries.items():
+            closes = exits.get(ticket)
+            if not closes:
+                continue
+            volume = sum(d.volume for d in closes)
+            trades.append({
+                'ticket': ticket,
+                'type': 'BUY' if entry.type == broker.DEAL_TYPE_BUY else 'SELL',
+                'volume': entry.volume,
+                'open_time': pd.Timestamp(entry.time_msc, unit='ms'),
+                'open_price': entry.price,
+                'close_time': pd.Timestamp(closes[-1].time_msc, unit='ms'),
+                'close_price': sum(d.price * d.volume for d in closes) / volume,
+                'profit': sum(d.profit for d in closes),
+                'commission': entry.commission + sum(d.commission for d in closes),
+                'reason': reasons.get(closes[-1].reason, str(closes[-1].reason)),
+                'magic': entry.magic,
+            })
+        return trades
+
+    def latency_report(self):
+        report = {}
+        for stage, samples in self.latencies.items():
+            if not samples:
+                continue
+            ms = np.asarray(samples) * 1000
+            report[stage] = {
+                'calls': len(ms),
+                'mean_ms': float(ms.mean()),
+                'p50_ms': float(np.percentile(ms, 50)),
+                'p95_ms': float(np.percentile(ms, 95)),
+                'p99_ms': float(np.percentile(ms, 99)),
+                'max_ms': float(ms.max()),
+                'total_ms': float(ms.sum()),
+            }
+        return report
@@ -0,0 +1,211 @@
+import os
+import glob
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger("ArchiveCatalog")
+
+ARCHIVE_PATTERN = "trading_data_*.db"
+CATALOG_FILE = "catalog.json"
+
+
+class ArchiveCatalog:
+    """
+    Catalog of archived trading databases (``archived_data/trading_data_*.db``).
+
+    For every archive it records the closed-trade count per symbol and the
+    min/max ``close_time``, keyed by the file's size and mtime so only new or
+    changed archives are rescanned. The catalog is persisted next to the
+    archives. Queries open only archives that hold matching trades, newest
+    first, and stop as soon as the limit is reached; read-only connections
+    are pooled across calls.
+    """
+
+    def __init__(self, archive_dir, catalog_path=None, refresh_interval=60.0, max_connections=8):
+        self.archive_dir = archive_dir
+        self.catalog_path = catalog_path or os.path.join(archive_dir, CATALOG_FILE)
+        self.refresh_interval = refresh_interval
+        self.max_connections = max_connections
+        self.entries = {}
+        self._last_refresh = 0.0
+        self._connections = {} # path -> (signature, connection), insertion order = LRU
+        self._lock = threading.RLock()
+        self.stats = {'scans': 0, 'opens': 0, 'queries': 0}
+        self._load()
+
+    # ------------------------------------------------------------------ catalog
+
+    def _load(self):
+        if not os.path.exists(self.catalog_path):
+            return
+        try:
+            with open(self.catalog_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load archive catalog {self.catalog_path}: {e}")
+            self.entries = {}
+
+    def _save(self):
+        try:
+            tmp_path = f"{self.catalog_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.catalog_path)
+        except Exception as e:
+            logger.warning(f"Failed to save archive catalog {self.catalog_path}: {e}")
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return [st.st_size, int(st.st_mtime_ns)]
+
+    def _scan(self, path):
+        """Closed-trade metadata of one archive."""
+        self.stats['scans'] += 1
+        entry = {'symbols': {}, 'min_close_time': None, 'max_close_time': None, 'closed_trades': 0}
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute('''
+                SELECT symbol, COUNT(*), MIN(close_time), MAX(close_time)
+                FROM trades
+                WHERE result = 'CLOSED'
+                GROUP BY symbol
+            ''').fetchall()
+        except sqlite3.OperationalError:
+            rows = [] # No trades table
+        finally:
+            conn.close()
+        for symbol, count, min_ct, max_ct in rows:
+            entry['symbols'][symbol] = count
+            entry['closed_trades'] += count
+            if min_ct is not None and (entry['min_close_time'] is None or min_ct < entry['min_close_time']):
+                entry['min_close_time'] = min_ct
+            if max_ct is not None and (entry['max_close_time'] is None or max_ct > entry['max_close_time']):
+                entry['max_close_time'] = max_ct
+        return entry
+
+    def refresh(self, force=False):
+        """Rescan new or modified archives and drop deleted ones (throttled to refresh_interval)."""
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh and now - self._last_refresh < self.refresh_interval:
+                return
+            self._last_refresh = now
+            if not os.path.isdir(self.archive_dir):
+                self.entries = {}
+                return
+
+            changed = False
+            seen = set()
+            for path in glob.glob(os.path.join(self.archive_dir, ARCHIVE_PATTERN)):
+                name = os.path.basename(path)
+                seen.add(name)
+                try:
+                    signature = self._signature(path)
+                    if self.entries.get(name, {}).get('signature') == signature:
+                        continue
+                    entry = self._scan(path)
+                    entry['signature'] = signature
+                    self.entries[name] = entry
+                    self._close_connection(path)
+                    changed = True
+                except Exception as e:
+                    logger.warning(f"Failed to catalog archive {name}: {e}")
+            for name in set(self.entries) - seen:
+                del self.entries[name]
+                self._close_connection(os.path.join(self.archive_dir, name))
+                changed = True
+            if changed:
+                self._save()
+
+    def plan(self, symbol=None, limit=None):
+        """
+        Archives that can contribute closed trades, newest ``max_close_time`` first.
+
+        With a ``limit`` the plan stops once the catalogued counts cover it.
+        """
+        self.refresh()
+        with self._lock:
+            candidates = []
+            for name, entry in self.entries.items():
+                count = entry['symbols'].get(symbol, 0) if symbol else entry['closed_trades']
+                if count:
+                    candidates.append((entry['max_close_time'] or '', name, count))
+        candidates.sort(reverse=True)
+
+        plan, covered = [], 0
+        for _, name, count in candidates:
+            if limit is not None and covered >= limit:
+                break
+            plan.append(os.path.join(self.archive_dir, name))
+            covered += count
+        return plan
+
+    # ------------------------------------------------------------------ queries
+
+    def _connection(self, path):
+        signature = self._signature(path)
+        cached = self._connections.pop(path, None)
+        if cached and cached[0] == signature:
+            self._connections[path] = cached
+            return cached[1]
+        if cached:
+            cached[1].close()
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        self.stats['opens'] += 1
+        self._connections[path] = (signature, conn)
+        while len(self._connections) > self.max_connections:
+            self._close_connection(next(iter(self._connections)))
+        return conn
+
+    def _close_connection(self, path):
+        cached = self._connections.pop(path, None)
+        if cached:
+            try:
+                cached[1].close()
+            except Exception:
+                pass
+
+    def fetch_closed_trades(self, columns, symbol=None, limit=1000):
+        """
+        Closed trades from the archives, most recent first.
+
+        Args:
+            columns: trade columns to select (e.g. ['profit', 'close_time'])
+            symbol: optional symbol filter
+            limit: maximum number of rows
+
+        Returns:
+            list: dicts keyed by ``columns``
+        """
+        rows = []
+        for path in self.plan(symbol, limit):
+            if len(rows) >= limit:
+                break
+            query = f"SELECT {', '.join(columns)} FROM trades WHERE result = 'CLOSED'"
+            params = []
+            if symbol:
+                query += " AND symbol = ?"
+                params.append(symbol)
+            query += " ORDER BY close_time DESC LIMIT ?"
+            params.append(limit - len(rows))
+            try:
+                with self._lock:
+                    conn = self._connection(path)
+                    self.stats['queries'] += 1
+                    fetched = conn.execute(query, tuple(params)).fetchall()
+                rows.extend(dict(row) for row in fetched)
+            except Exception as e:
+                logger.warning(f"Failed to read archive {os.path.basename(path)}: {e}")
+                with self._lock:
+                    self._close_connection(path)
+        return rows
+
+    def close(self):
+        with self._lock:
+            for path in list(self._connections):
+                self._close_connection(path)
@@ -0,0 +1,239 @@
+import logging
+import math
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import MetaTrader5 as mt5
+except ImportError:
+    mt5 = None
+
+logger = logging.getLogger("BarStore")
+
+
+class _SeriesBuffer:
+    """Bars of one (symbol, timeframe), oldest first, in a preallocated array."""
+
+    def __init__(self, rates, capacity):
+        self.capacity = capacity
+        self.buffer = np.empty(max(capacity * 2, len(rates)), dtype=rates.dtype)
+        self.size = 0
+        self.version = 0
+        self.fetched_at = 0.0
+        self.frames = {}
+        self.replace(rates)
+
+    @property
+    def watermark(self):
+        """Open time of the newest stored bar (the one still forming)."""
+        return int(self.buffer[self.size - 1]['time']) if self.size else None
+
+    @property
+    def bar_seconds(self):
+        if self.size < 2:
+            return None
+        return int(self.buffer[self.size - 1]['time'] - self.buffer[self.size - 2]['time']) or None
+
+    def view(self, count):
+        start = max(0, self.size - count)
+        view = self.buffer[start:self.size]
+        view.flags.writeable = False
+        return view
+
+    def replace(self, rates):
+        rates = rates[-self.buffer.shape[0]:]
+        self.buffer[:len(rates)] = rates
+        self.size = len(rates)
+        self._touch()
+
+    def merge(self, rates):
+        """
+        Overwrite the forming bar and append everything newer.
+
+        Returns:
+            bool: False if the fetched window does not overlap the watermark.
+        """
+        watermark = self.watermark
+        if len(rates) == 0 or int(rates[0]['time']) > watermark:
+            return False
+
+        fresh = rates[rates['time'] >= watermark]
+        if len(fresh) == 0:
+            return True
+
+        # The forming bar is rewritten in place, the rest goes after it
+        start = self.size - 1
+        end = start + len(fresh)
+        if end > self.buffer.shape[0]:
+            # Compact into a new array so views handed out earlier stay intact
+            keep = self.buffer[max(0, end - self.capacity):start]
+            buffer = np.empty_like(self.buffer)
+            buffer[:len(keep)] = keep
+            self.buffer = buffer
+            start = len(keep)
+            end = start + len(fresh)
+
+        self.buffer[start:end] = fresh
+        self.size = end
+        self._touch()
+        return True
+
+    def _touch(self):
+        self.version += 1
+        self.frames.clear()
+
+
+class BarStore:
+    """
+    Process-wide OHLC bar cache keyed by (symbol, timeframe).
+
+    The first request for a series pulls ``capacity`` bars from the terminal;
+    after that only the bars newer than the stored watermark are fetched and
+    merged in place. Every analyzer reads from the same buffer, so one cycle
+    costs one small ``copy_rates_from_pos`` call per timeframe.
+    """
+
+    def __init__(self, source=None, capacity=1000, min_refresh_interval=1.0):
+        """
+        Args:
+            source: Object exposing ``copy_rates_from_pos`` (defaults to MetaTrader5)
+            capacity (int): Minimum number of bars kept per series
+            min_refresh_interval (float): Seconds during which repeated reads reuse the last fetch
+        """
+        self.source = source
+        self.capacity = capacity
+        self.min_refresh_interval = min_refresh_interval
+        self._series = {}
+        self._lock = threading.RLock()
+        self.stats = {'full_fetches': 0, 'incremental_fetches': 0, 'cache_hits': 0}
+
+    def _source(self):
+        return self.source if self.source is not None else mt5
+
+    def _fetch(self, symbol, timeframe, count):
+        source = self._source()
+        if source is None:
+            return None
+        try:
+            rates = source.copy_rates_from_pos(symbol, timeframe, 0, int(count))
+        except Exception as e:
+            logger.error(f"copy_rates_from_pos failed for {symbol} {timeframe}: {e}")
+            return None
+        if rates is None or len(rates) == 0:
+            return None
+        return np.asarray(rates)
+
+    def _load(self, symbol, timeframe, capacity):
+        rates = self._fetch(symbol, timeframe, capacity)
+        if rates is None:
+            return None
+        self.stats['full_fetches'] += 1
+        series = self._series.get((symbol, timeframe))
+        if series is None or series.buffer.dtype != rates.dtype or series.buffer.shape[0] < len(rates):
+            series = _SeriesBuffer(rates, capacity)
+            self._series[(symbol, timeframe)] = series
+        else:
+            series.capacity = max(series.capacity, capacity)
+            series.replace(rates)
+        series.fetched_at = time.time()
+        return series
+
+    def refresh(self, symbol, timeframe, count=None, force=False):
+        """
+        Bring the series up to date and return its buffer.
+
+        Args:
+            symbol (str): Trading symbol
+            timeframe (int): MT5 timeframe constant
+            count (int): Number of bars the caller needs
+            force (bool): Ignore ``min_refresh_interval``
+
+        Returns:
+            _SeriesBuffer or None if the terminal returned no data.
+        """
+        count = int(count or self.capacity)
+        with self._lock:
+            series = self._series.get((symbol, timeframe))
+            if series is None or series.capacity < count:
+                return self._load(symbol, timeframe, max(count, self.capacity))
+
+            now = time.time()
+            if not force and now - series.fetched_at < self.min_refresh_interval:
+                self.stats['cache_hits'] += 1
+                return series
+
+            # Bars elapsed since the last fetch plus the forming bar and one spare
+            bar_seconds = series.bar_seconds or 60
+            needed = int(math.ceil((now - series.fetched_at) / bar_seconds)) + 2
+            if needed >= series.capacity:
+                return self._load(symbol, timeframe, series.capacity)
+
+            rates = self._fetch(symbol, timeframe, needed)
+            if rates is None:
+                return series
+            self.stats['incremental_fetches'] += 1
+            if not series.merge(rates):
+                # Gap larger than the probe window (e.g. terminal reconnect)
+                return self._load(symbol, timeframe, series.capacity)
+            series.fetched_at = now
+            return series
+
+    def get_rates(self, symbol, timeframe, count):
+        """
+        Read-only structured array view of the last ``count`` bars.
+
+        The view shares memory with the store; it is valid until the next refresh.
+        """
+        with self._lock:
+            series = self.refresh(symbol, timeframe, count)
+            if series is None:
+                return None
+            return series.view(count)
+
+    def get_dataframe(self, symbol, timeframe, count):
+        """
+        DataFrame of the last ``count`` bars with ``time`` converted to datetime.
+
+        Frames are built once per data version and shared between callers, so
+        they must not be modified in place (use ``.copy()`` or ``rename`` first).
+        """
+        with self._lock:
+            series = self.refresh(symbol, timeframe, count)
+            if series is None:
+                return None
+            df = series.frames.get(count)
+            if df is None:
+                df = pd.DataFrame(series.view(count))
+                df['time'] = pd.to_datetime(df['time'], unit='s')
+                series.frames[count] = df
+            return df
+
+    def watermark(self, symbol, timeframe):
+        """Open time (unix seconds) of the newest stored bar, or None."""
+        with self._lock:
+            series = self._series.get((symbol, timeframe))
+            return series.watermark if series else None
+
+    def invalidate(self, symbol=None, timeframe=None):
+        """Drop cached series, e.g. after a symbol switch or reconnect."""
+        with self._lock:
+            for key in list(self._series):
+                if (symbol is None or key[0] == symbol) and (timeframe is None or key[1] == timeframe):
+                    del self._series[key]
+
+
+_bar_store = None
+_bar_store_lock = threading.Lock()
+
+
+def get_bar_store():
+    """Return the process-wide BarStore, creating it on first use."""
+    global _bar_store
+    if _bar_store is None:
+        with _bar_store_lock:
+            if _bar_store is None:
+                _bar_store = BarStore()
+    return _bar_store
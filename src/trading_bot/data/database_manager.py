@@ -5,12 +5,28 @@ from datetime import datetime
 import logging
 import os
 import time
+import atexit
+import threading
 from utils.remote_storage import RemoteStorage
+from data.db_writer import DatabaseWriter
+from data.db_migrations import apply_migrations
+from data.partition_manager import PartitionManager
+from data.archive_catalog import ArchiveCatalog
 
 logger = logging.getLogger("DatabaseManager")
 
 class DatabaseManager:
-    def __init__(self, db_path="trading_data.db"):
+    """
+    Local SQLite store for market data, signals, trades and account metrics.
+
+    With ``write_behind=True`` (default) all writes are queued to a
+    DatabaseWriter thread that commits them in batches every ``flush_interval``
+    seconds, so callers on the trading thread never wait on SQLite. Reads go
+    through the regular connection and see writes once they are flushed; call
+    ``flush()`` when a read must observe the caller's own writes.
+    """
+    def __init__(self, db_path="trading_data.db", write_behind=True, flush_interval=0.5, max_queue=10000,
+                 maintenance_interval=6 * 3600, retention=None, archive_dir=None):
         # Initialize Remote Storage
         self.remote_storage = RemoteStorage()
         
@@ -24,10 +40,131 @@ class DatabaseManager:
         # 确保路径存在
         logger.info(f"Database path: {self.db_path}")
         self.conn = None
+        # Catalog of archived_data/trading_data_*.db (closed-trade history fallback)
+        if archive_dir is None:
+            project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+            archive_dir = os.path.join(project_root, "archived_data")
+        self.archives = ArchiveCatalog(archive_dir)
+        
+        # Monthly partitions / downsampling for market_data and account_metrics
+        self.partitions = PartitionManager(self.db_path, **(retention or {}))
         self._init_db()
         
         # Log suppression state
         self.last_remote_fetch_ts = 0
+        
+        # Latest stored bar per (symbol, timeframe) for incremental market data writes
+        self._market_data_watermarks = {}
+        
+        # Last saved account metrics, so heartbeat dedupe doesn't depend on unflushed rows
+        self._last_account_metrics = None
+        
+        # Last saved signal per (symbol, timeframe): (signal, reason, timestamp) for debounce
+        self._signal_index = {}
+        self._signal_index_lock = threading.Lock()
+        self._load_signal_index()
+        
+        # Write-behind queue (owns its own connection)
+        self.writer = None
+        if write_behind:
+            self.writer = DatabaseWriter(self.db_path, flush_interval=flush_interval, max_queue=max_queue)
+            atexit.register(self.close)
+        
+        # Periodic retention (None disables; call maintain_storage() manually)
+        self.maintenance_interval = maintenance_interval
+        self._maintenance_stop = threading.Event()
+        self._maintenance_thread = None
+        if maintenance_interval:
+            self._maintenance_thread = threading.Thread(target=self._maintenance_loop, name="DatabaseMaintenance", daemon=True)
+            self._maintenance_thread.start()
+
+    def _write(self, sql, params=()):
+        """Queue a write (or execute it inline when write-behind is disabled)."""
+        if self.writer is not None:
+            return self.writer.execute(sql, params)
+        conn = self._get_connection()
+        conn.execute(sql, params)
+        conn.commit()
+        return True
+
+    def _write_many(self, sql, rows):
+        if self.writer is not None:
+            return self.writer.executemany(sql, rows)
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(sql, rows)
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until all queued writes are committed."""
+        if self.writer is not None:
+            return self.writer.flush(timeout)
+        return True
+
+    def get_writer_stats(self):
+        """Write queue metrics: queue_depth, max_queue_depth, enqueued/written/failed/dropped, batches, last_flush_ms."""
+        if self.writer is None:
+            return {'queue_depth': 0, 'write_behind': False}
+        stats = self.writer.get_stats()
+        stats['write_behind'] = True
+        return stats
+
+    def _maintenance_loop(self):
+        while not self._maintenance_stop.is_set():
+            self.maintain_storage()
+            # Re-check hourly; maintain_storage itself honors maintenance_interval
+            self._maintenance_stop.wait(min(self.maintenance_interval, 3600))
+
+    def maintain_storage(self, force=False, now=None):
+        """
+        Downsample old account metrics and move closed months of market_data /
+        account_metrics into monthly partition files (see PartitionManager).
+
+        Runs at most once per ``maintenance_interval`` unless ``force`` is set.
+
+        Returns:
+            dict: PartitionManager.run() summary, or None if not due / failed
+        """
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=30.0)
+            try:
+                last_run = self.partitions.last_run(conn)
+                if not force and last_run and self.maintenance_interval and \
+                        (datetime.now() - last_run).total_seconds() < self.maintenance_interval:
+                    return None
+                # Partition moves must see queued rows
+                self.flush()
+                result = self.partitions.run(now)
+                self.partitions.mark_run(conn)
+                return result
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Storage maintenance failed: {e}")
+            return None
+
+    def close(self):
+        """Flush pending writes, stop the writer thread and close the connection."""
+        self._maintenance_stop.set()
+        if self._maintenance_thread is not None and self._maintenance_thread is not threading.current_thread():
+            self._maintenance_thread.join(timeout=30.0)
+            self._maintenance_thread = None
+        if self.writer is not None:
+            self.writer.shutdown()
+            self.writer = None
+            try:
+                atexit.unregister(self.close)
+            except Exception:
+                pass
+        if self.conn:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+            self.conn = None
+        self.archives.close()
+        # Send (or spool) records still buffered for the remote backend
+        self.remote_storage.close()
 
     def _get_connection(self):
         """Helper to get a database connection with proper timeout and retry"""
@@ -65,130 +202,26 @@ class DatabaseManager:
         raise sqlite3.OperationalError("Failed to connect to database after retries")
 
     def _init_db(self):
-        """Initialize the database tables"""
+        """Bring the schema up to date (only pending migrations run, see data/db_migrations.py)"""
         try:
             conn = self._get_connection()
-            cursor = conn.cursor()
+            applied = apply_migrations(conn)
+            if applied:
+                logger.info(f"Database schema migrated to version {applied[-1]}")
             
-            # Table for market data (OHLCV)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS market_data (
-                    timestamp DATETIME,
-                    symbol TEXT,
-                    timeframe TEXT,
-                    open REAL,
-                    high REAL,
-                    low REAL,
-                    close REAL,
-                    volume INTEGER,
-                    PRIMARY KEY (timestamp, symbol, timeframe)
-                )
-            ''')
-            
-            # Table for signals and analysis
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS signals (
-                    timestamp DATETIME,
-                    symbol TEXT,
-                    timeframe TEXT,
-                    signal TEXT,
-                    strength REAL,
-                    source TEXT, -- 'CRT', 'PriceEq', 'DeepSeek', 'Qwen', 'Hybrid'
-                    details TEXT -- JSON string with extra details
-                )
-            ''')
-            
-            # Table for trades
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trades (
-                    ticket INTEGER PRIMARY KEY,
-                    symbol TEXT,
-                    action TEXT, -- 'BUY', 'SELL'
-                    volume REAL,
-                    price REAL,
-                    time DATETIME,
-                    result TEXT, -- 'OPEN', 'CLOSED', 'ERROR'
-                    close_price REAL,
-                    close_time DATETIME,
-                    profit REAL,
-                    mfe REAL, -- Maximum Favorable Excursion
-                    mae REAL  -- Maximum Adverse Excursion
-                )
-            ''')
-            
-            # Attempt to add columns if they don't exist (for existing DB)
-            try:
-                cursor.execute("ALTER TABLE trades ADD COLUMN close_price REAL")
-            except: pass
-            try:
-                cursor.execute("ALTER TABLE trades ADD COLUMN close_time DATETIME")
-            except: pass
-            try:
-                cursor.execute("ALTER TABLE trades ADD COLUMN profit REAL")
-            except: pass
-            try:
-                cursor.execute("ALTER TABLE trades ADD COLUMN mfe REAL")
-            except: pass
-            try:
-                cursor.execute("ALTER TABLE trades ADD COLUMN mae REAL")
-            except: pass
-            
-            # Table for account metrics (Balance, Equity, etc.)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS account_metrics (
-                    timestamp DATETIME,
-                    balance REAL,
-                    equity REAL,
-                    margin REAL,
-                    free_margin REAL,
-                    margin_level REAL,
-                    total_profit REAL, -- Floating PnL
-                    symbol_pnl REAL, -- PnL for specific symbol (optional)
-                    PRIMARY KEY (timestamp)
-                )
-            ''')
-
-            # Table for optimization history
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS optimization_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME,
-                    algorithm TEXT,
-                    symbol TEXT,
-                    timeframe TEXT,
-                    params TEXT, -- JSON list of parameters
-                    score REAL
-                )
-            ''')
-            
-            # Table for trade reflections (Memory)
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS trade_reflections (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME,
-                    trade_id TEXT,
-                    symbol TEXT,
-                    outcome TEXT, -- 'WIN', 'LOSS'
-                    reasoning TEXT,
-                    shortcomings TEXT,
-                    improvements TEXT,
-                    rating REAL,
-                    full_json TEXT -- Complete JSON payload
-                )
-            ''')
-            
-            conn.commit()
-            # conn.close() # Persistent connection, do not close
-            
-            # Perform cleanup on startup
-            self.clean_duplicate_signals()
-            self.clean_redundant_metrics()
+            # No full-table cleanup on startup: new signals/metrics are debounced in memory
+            # and old history is downsampled/partitioned by maintain_storage()
             
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
 
     def clean_redundant_metrics(self):
-        """Remove redundant account metrics (heartbeats with no value change) from database"""
+        """
+        Remove redundant account metrics (heartbeats with no value change) from database.
+
+        Full-table scan, no longer run on startup: save_account_metrics dedupes
+        new heartbeats and maintain_storage() downsamples old history.
+        """
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -271,13 +304,14 @@ class DatabaseManager:
     def save_account_metrics(self, metrics):
         """Save account metrics (with deduplication)"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
             # Check for duplicate/unchanged state
-            # Get the very last record
-            cursor.execute('SELECT balance, equity, margin, free_margin, total_profit, timestamp FROM account_metrics ORDER BY timestamp DESC LIMIT 1')
-            last_row = cursor.fetchone()
+            # Get the very last record (from memory once known; queued rows may not be flushed yet)
+            last_row = self._last_account_metrics
+            if last_row is None:
+                conn = self._get_connection()
+                cursor = conn.cursor()
+                cursor.execute('SELECT balance, equity, margin, free_margin, total_profit, timestamp FROM account_metrics ORDER BY timestamp DESC LIMIT 1')
+                last_row = cursor.fetchone()
             
             should_save = True
             if last_row:
@@ -313,11 +347,12 @@ class DatabaseManager:
                     except: pass
             
             if should_save:
-                cursor.execute('''
+                timestamp = metrics.get('timestamp', datetime.now())
+                self._write('''
                     INSERT INTO account_metrics (timestamp, balance, equity, margin, free_margin, margin_level, total_profit, symbol_pnl)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
-                    metrics.get('timestamp', datetime.now()),
+                    timestamp,
                     metrics.get('balance', 0),
                     metrics.get('equity', 0),
                     metrics.get('margin', 0),
@@ -326,8 +361,11 @@ class DatabaseManager:
                     metrics.get('total_profit', 0),
                     metrics.get('symbol_pnl', 0)
                 ))
-                
-                conn.commit()
+                self._last_account_metrics = (
+                    metrics.get('balance', 0), metrics.get('equity', 0), metrics.get('margin', 0),
+                    metrics.get('free_margin', 0), metrics.get('total_profit', 0),
+                    timestamp.isoformat(" ") if isinstance(timestamp, datetime) else str(timestamp)
+                )
                 
                 # [Remote Sync]
                 self.remote_storage.save_account_metrics(metrics)
@@ -364,12 +402,13 @@ class DatabaseManager:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
-            # SQLite datetime modifier
-            cursor.execute(f"SELECT * FROM account_metrics WHERE timestamp <= datetime('now', '-{hours_ago} hours') ORDER BY timestamp DESC LIMIT 1")
-            row = cursor.fetchone()
+            # SQLite datetime modifier (older history may live in a partition)
+            rows = self.partitions.fetch_newest(
+                conn, "SELECT * FROM account_metrics WHERE timestamp <= datetime('now', ?) ORDER BY timestamp DESC LIMIT ?",
+                (f'-{hours_ago} hours',), 1)
             
-            if row:
-                return dict(row)
+            if rows:
+                return dict(rows[0])
             return None
         except Exception as e:
             logger.error(f"Failed to get historical metrics: {e}")
@@ -379,20 +418,11 @@ class DatabaseManager:
         """Get account metrics history for plotting"""
         try:
             conn = self._get_connection()
-            query = "SELECT timestamp, balance, equity, total_profit FROM account_metrics ORDER BY timestamp ASC LIMIT ?"
-            # Note: We want latest N but sorted ASC for plotting. 
-            # Subquery approach: SELECT * FROM (SELECT ... DESC LIMIT N) ORDER BY ASC
-            query = """
-                SELECT timestamp, balance, equity, total_profit 
-                FROM (
-                    SELECT timestamp, balance, equity, total_profit 
-                    FROM account_metrics 
-                    ORDER BY timestamp DESC 
-                    LIMIT ?
-                ) 
-                ORDER BY timestamp ASC
-            """
-            df = pd.read_sql_query(query, conn, params=(limit,))
+            # Latest N (across partitions), sorted ASC for plotting
+            rows = self.partitions.fetch_newest(
+                conn, "SELECT timestamp, balance, equity, total_profit FROM account_metrics ORDER BY timestamp DESC LIMIT ?",
+                (), limit)
+            df = pd.DataFrame([tuple(r) for r in reversed(rows)], columns=['timestamp', 'balance', 'equity', 'total_profit'])
             if not df.empty:
                 df['timestamp'] = pd.to_datetime(df['timestamp'])
             return df
@@ -424,26 +454,52 @@ class DatabaseManager:
             return None
 
     def save_market_data(self, df, symbol, timeframe):
+        """
+        Persist OHLCV candles (DataFrame indexed by bar time) in one transaction.
+
+        Rows older than the latest stored bar for (symbol, timeframe) are skipped;
+        the latest stored bar itself is rewritten because it may have been saved
+        while still forming.
+
+        Returns:
+            dict: {'rows_written', 'rows_skipped', 'elapsed_ms'}
+        """
+        started = time.perf_counter()
+        result = {'rows_written': 0, 'rows_skipped': 0, 'elapsed_ms': 0.0}
+        if df is None or df.empty:
+            return result
         try:
             conn = self._get_connection()
-            # Add symbol and timeframe columns if they don't exist in df
-            data_to_save = df.copy()
-            data_to_save['symbol'] = symbol
-            data_to_save['timeframe'] = timeframe
-            data_to_save['timestamp'] = data_to_save.index
-            
-            cursor = conn.cursor()
-            for index, row in data_to_save.iterrows():
-                cursor.execute('''
+            times = pd.DatetimeIndex(df.index)
+
+            latest = self._get_latest_market_timestamp(conn, symbol, timeframe)
+            keep = times >= latest if latest is not None else slice(None)
+            new_rows = df[keep]
+            times = times[keep]
+            result['rows_skipped'] = len(df) - len(new_rows)
+
+            if not new_rows.empty:
+                # Columnar batch: same timestamp text as the sqlite3 datetime adapter
+                timestamps = [t.isoformat(" ") for t in times.to_pydatetime()]
+                n = len(timestamps)
+                batch = zip(timestamps, [symbol] * n, [timeframe] * n,
+                            new_rows['open'].tolist(), new_rows['high'].tolist(),
+                            new_rows['low'].tolist(), new_rows['close'].tolist(),
+                            new_rows['volume'].tolist())
+                # Single transaction (one queued executemany in write-behind mode)
+                self._write_many('''
                     REPLACE INTO market_data (timestamp, symbol, timeframe, open, high, low, close, volume)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (row['timestamp'].to_pydatetime(), symbol, timeframe, row['open'], row['high'], row['low'], row['close'], row['volume']))
-            
-            conn.commit()
-            # conn.close()
-            
-            # [Remote Sync]
-            self.remote_storage.save_market_data_batch(df.copy(), symbol, timeframe)
+                ''', batch)
+                self._market_data_watermarks[(symbol, str(timeframe))] = times.max()
+                result['rows_written'] = n
+
+                # [Remote Sync] only the rows that changed
+                self.remote_storage.save_market_data_batch(new_rows.copy(), symbol, timeframe)
+
+            result['elapsed_ms'] = (time.perf_counter() - started) * 1000
+            logger.debug(f"Saved market data {symbol} {timeframe}: {result['rows_written']} written, "
+                         f"{result['rows_skipped']} skipped in {result['elapsed_ms']:.1f} ms")
         except sqlite3.OperationalError as e:
             if "database or disk is full" in str(e):
                 logger.warning(f"Database full error in save_market_data, attempting checkpoint: {e}")
@@ -451,65 +507,80 @@ class DatabaseManager:
             logger.error(f"Failed to save market data: {e}")
         except Exception as e:
             logger.error(f"Failed to save market data: {e}")
+        return result
+
+    def _get_latest_market_timestamp(self, conn, symbol, timeframe):
+        """Latest stored bar time for (symbol, timeframe), cached after the first lookup"""
+        key = (symbol, str(timeframe))
+        if key not in self._market_data_watermarks:
+            rows = self.partitions.fetch_newest(
+                conn, "SELECT timestamp FROM market_data WHERE symbol = ? AND timeframe = ? ORDER BY timestamp DESC LIMIT ?",
+                (symbol, timeframe), 1)
+            self._market_data_watermarks[key] = pd.Timestamp(rows[0][0]) if rows and rows[0][0] else None
+        return self._market_data_watermarks[key]
+
+    @staticmethod
+    def _parse_signal_timestamp(value):
+        """SQLite returns string, usually "YYYY-MM-DD HH:MM:SS.ssssss"."""
+        if isinstance(value, datetime):
+            return value
+        try:
+            if "." in value:
+                return datetime.strptime(value, "%Y-%m-%d %H:%M:%S.%f")
+            return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except Exception:
+            return None
+
+    def _load_signal_index(self):
+        """Warm the signal debounce index with the latest stored signal per (symbol, timeframe)."""
+        try:
+            conn = self._get_connection()
+            # SQLite returns the bare columns of the row holding MAX(timestamp)
+            rows = conn.execute('''
+                SELECT symbol, timeframe, signal, details, MAX(timestamp)
+                FROM signals
+                GROUP BY symbol, timeframe
+            ''').fetchall()
+            index = {}
+            for symbol, timeframe, signal, details_json, ts in rows:
+                try:
+                    reason = json.loads(details_json).get('reason')
+                except Exception:
+                    reason = None
+                index[(symbol, str(timeframe))] = (signal, reason, self._parse_signal_timestamp(ts))
+            with self._signal_index_lock:
+                self._signal_index = index
+        except Exception as e:
+            logger.error(f"Failed to load signal index: {e}")
 
     def save_signal(self, symbol, timeframe, signal_data):
         """Save analysis signal (with deduplication)"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
+            key = (symbol, str(timeframe))
+            reason = (signal_data.get('details') or {}).get('reason')
+            timestamp = datetime.now()
             
-            # Check for duplicate (Debounce)
+            # Check for duplicate (Debounce) against the in-memory index of the last saved signal
             # Only save if signal changed or reason changed or it's been > 15 minutes
-            cursor.execute('''
-                SELECT signal, details, timestamp 
-                FROM signals 
-                WHERE symbol = ? AND timeframe = ? 
-                ORDER BY timestamp DESC LIMIT 1
-            ''', (symbol, timeframe))
-            
-            last_row = cursor.fetchone()
-            should_save = True
-            
-            if last_row:
-                last_signal = last_row[0]
-                last_details_json = last_row[1]
-                last_ts_str = last_row[2]
-                
-                # Parse timestamp
-                try:
-                    # SQLite returns string, usually "YYYY-MM-DD HH:MM:SS.ssssss"
-                    if "." in last_ts_str:
-                        last_ts = datetime.strptime(last_ts_str, "%Y-%m-%d %H:%M:%S.%f")
-                    else:
-                        last_ts = datetime.strptime(last_ts_str, "%Y-%m-%d %H:%M:%S")
-                        
-                    time_diff = (datetime.now() - last_ts).total_seconds()
-                except:
-                    time_diff = 9999
-                
-                # Check content equality
-                if last_signal == signal_data['final_signal']:
-                    try:
-                        last_details = json.loads(last_details_json)
-                        # Compare reasons
-                        if last_details.get('reason') == signal_data['details'].get('reason'):
-                            # If identical signal and reason, and recent (< 15 mins), skip
-                            if time_diff < 900: 
-                                should_save = False
-                                # logger.debug(f"Skipping duplicate signal save for {symbol}")
-                    except: pass
+            with self._signal_index_lock:
+                last = self._signal_index.get(key)
+                should_save = True
+                if last:
+                    last_signal, last_reason, last_ts = last
+                    time_diff = (timestamp - last_ts).total_seconds() if last_ts else 9999
+                    if last_signal == signal_data['final_signal'] and last_reason == reason and time_diff < 900:
+                        # If identical signal and reason, and recent (< 15 mins), skip
+                        should_save = False
+                if should_save:
+                    self._signal_index[key] = (signal_data['final_signal'], reason, timestamp)
 
             if should_save:
-                timestamp = datetime.now()
-                
                 # Save Hybrid result
-                cursor.execute('''
+                self._write('''
                     INSERT INTO signals (timestamp, symbol, timeframe, signal, strength, source, details)
                     VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (timestamp, symbol, timeframe, signal_data['final_signal'], signal_data['strength'], 'Hybrid', json.dumps(signal_data['details'])))
                 
-                conn.commit()
-                
                 # [Remote Sync]
                 try:
                     remote_signal = {
@@ -529,7 +600,12 @@ class DatabaseManager:
             logger.error(f"Failed to save signal: {e}")
 
     def clean_duplicate_signals(self):
-        """Remove consecutive duplicate signals from the database"""
+        """
+        Remove consecutive duplicate signals from the database.
+
+        save_signal debounces against the in-memory index, so this is only needed
+        for signals written before that (it no longer runs on startup).
+        """
         try:
             conn = self._get_connection()
             cursor = conn.cursor()
@@ -613,10 +689,7 @@ class DatabaseManager:
     def save_trade(self, trade_data):
         """Save trade execution"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._write('''
                 INSERT OR REPLACE INTO trades (ticket, symbol, action, volume, price, time, result)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             ''', (
@@ -629,9 +702,6 @@ class DatabaseManager:
                 trade_data.get('result', 'OPEN')
             ))
             
-            conn.commit()
-            # conn.close()
-            
             # [Remote Sync]
             self.remote_storage.save_trade(trade_data)
         except sqlite3.OperationalError as e:
@@ -645,10 +715,7 @@ class DatabaseManager:
     def update_trade_performance(self, ticket, close_data):
         """Update trade with close info and performance metrics"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._write('''
                 UPDATE trades 
                 SET result = 'CLOSED',
                 close_price = ?,
@@ -666,9 +733,6 @@ class DatabaseManager:
                 ticket
             ))
             
-            conn.commit()
-            # conn.close()
-            
             # [Remote Sync]
             self.remote_storage.update_trade_performance(ticket, close_data)
         except sqlite3.OperationalError as e:
@@ -728,46 +792,14 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Failed to get trade stats locally: {e}")
 
-        # 2. Archived Data Fallback (Local Archive)
+        # 2. Archived Data Fallback (Local Archive; only archives holding matching trades are opened)
         if len(stats) < limit:
             try:
-                import glob
-                project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-                archive_dir = os.path.join(project_root, "archived_data")
-                if os.path.exists(archive_dir):
-                    archive_files = sorted(glob.glob(os.path.join(archive_dir, "trading_data_*.db")), reverse=True)
-                    
-                    for db_file in archive_files:
-                        if len(stats) >= limit: break
-                        try:
-                            conn_archive = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
-                            conn_archive.row_factory = sqlite3.Row
-                            cursor_archive = conn_archive.cursor()
-                            
-                            # Use same query as local
-                            query_arch = '''
-                                SELECT profit, mfe, mae, action, volume, close_time 
-                                FROM trades 
-                                WHERE result = 'CLOSED' 
-                            '''
-                            params_arch = []
-                            if symbol:
-                                query_arch += " AND symbol = ? "
-                                params_arch.append(symbol)
-                            
-                            query_arch += " ORDER BY close_time DESC LIMIT ?"
-                            params_arch.append(limit - len(stats))
-                            
-                            cursor_archive.execute(query_arch, tuple(params_arch))
-                            rows_arch = cursor_archive.fetchall()
-                            conn_archive.close()
-                            
-                            if rows_arch:
-                                logger.info(f"Loaded {len(rows_arch)} trades from archive: {os.path.basename(db_file)}")
-                                stats.extend([dict(row) for row in rows_arch])
-                                
-                        except Exception as ea:
-                            logger.warning(f"Failed to read archive {os.path.basename(db_file)}: {ea}")
+                rows_arch = self.archives.fetch_closed_trades(
+                    ['profit', 'mfe', 'mae', 'action', 'volume', 'close_time'], symbol, limit - len(stats))
+                if rows_arch:
+                    logger.debug(f"Loaded {len(rows_arch)} trades from archives")
+                    stats.extend(rows_arch)
             except Exception as e_arch:
                 logger.error(f"Archive fetch failed: {e_arch}")
 
@@ -784,7 +816,9 @@ class DatabaseManager:
                     self.last_remote_fetch_ts = now
                     
                 # Request a larger limit from remote to ensure coverage
-                remote_trades = self.remote_storage.get_trades(limit=limit, symbol=symbol)
+                remote_trades = self.remote_storage.get_trades(
+                    limit=limit, symbol=symbol, result='CLOSED',
+                    fields=['profit', 'mfe', 'mae', 'action', 'volume', 'close_time', 'result'])
                 
                 # Convert remote format if necessary and deduplicate
                 # Remote usually returns full trade objects. We need specific fields.
@@ -871,39 +905,17 @@ class DatabaseManager:
         # Archived Fallback
         if len(profits) < limit:
             try:
-                import glob
-                project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                archive_dir = os.path.join(project_root, "archived_data")
-                archive_files = sorted(glob.glob(os.path.join(archive_dir, "trading_data_*.db")), reverse=True)
-                
-                for db_file in archive_files:
-                    if len(profits) >= limit: break
-                    try:
-                        conn_archive = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
-                        cursor_archive = conn_archive.cursor()
-                        
-                        query_arch = "SELECT profit FROM trades WHERE result = 'CLOSED'"
-                        params_arch = []
-                        if symbol:
-                            query_arch += " AND symbol = ?"
-                            params_arch.append(symbol)
-                        query_arch += " ORDER BY close_time DESC LIMIT ?"
-                        params_arch.append(limit - len(profits))
-                        
-                        cursor_archive.execute(query_arch, tuple(params_arch))
-                        rows_arch = cursor_archive.fetchall()
-                        conn_archive.close()
-                        
-                        if rows_arch:
-                            profits.extend([r[0] for r in rows_arch])
-                    except: pass
-            except: pass
+                rows_arch = self.archives.fetch_closed_trades(['profit'], symbol, limit - len(profits))
+                profits.extend(r['profit'] for r in rows_arch)
+            except Exception as e_arch:
+                logger.error(f"Archive fetch failed: {e_arch}")
 
         # Remote Fallback
         if len(profits) < limit:
             try:
                 # logger.info("Fetching metrics data from Remote DB...")
-                remote_trades = self.remote_storage.get_trades(limit=limit, symbol=symbol)
+                remote_trades = self.remote_storage.get_trades(limit=limit, symbol=symbol, result='CLOSED',
+                                                               fields=['profit', 'result'])
                 profits = [rt.get('profit', 0) for rt in remote_trades if rt.get('result') == 'CLOSED']
             except Exception as re:
                 logger.error(f"Remote metrics fetch failed: {re}")
@@ -974,8 +986,10 @@ class DatabaseManager:
         """Get market data for dashboard"""
         try:
             conn = self._get_connection()
-            query = "SELECT * FROM market_data WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?"
-            df = pd.read_sql_query(query, conn, params=(symbol, limit))
+            columns = ['timestamp', 'symbol', 'timeframe', 'open', 'high', 'low', 'close', 'volume']
+            query = f"SELECT {', '.join(columns)} FROM market_data WHERE symbol = ? ORDER BY timestamp DESC LIMIT ?"
+            rows = self.partitions.fetch_newest(conn, query, (symbol,), limit)
+            df = pd.DataFrame([tuple(r) for r in rows], columns=columns)
             # conn.close()
             if not df.empty:
                 df['timestamp'] = pd.to_datetime(df['timestamp'])
@@ -988,10 +1002,7 @@ class DatabaseManager:
     def save_optimization_result(self, algo_name, symbol, timeframe, params, score):
         """Save optimization result to history"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._write('''
                 INSERT INTO optimization_history (timestamp, algorithm, symbol, timeframe, params, score)
                 VALUES (?, ?, ?, ?, ?, ?)
             ''', (
@@ -1003,8 +1014,6 @@ class DatabaseManager:
                 score
             ))
             
-            conn.commit()
-            
             # [Remote Sync] - Optional, can implement if remote DB supports this table
             # self.remote_storage.save_optimization_result(...)
             
@@ -1056,10 +1065,7 @@ class DatabaseManager:
     def save_trade_reflection(self, reflection_data):
         """Save trade reflection to database"""
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute('''
+            self._write('''
                 INSERT INTO trade_reflections (timestamp, trade_id, symbol, outcome, reasoning, shortcomings, improvements, rating, full_json)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
@@ -1073,8 +1079,6 @@ class DatabaseManager:
                 reflection_data.get('self_rating', 0.0),
                 json.dumps(reflection_data)
             ))
-            
-            conn.commit()
             logger.info(f"Saved trade reflection for Trade #{reflection_data.get('trade_id')}")
             
         except Exception as e:
@@ -0,0 +1,197 @@
+import logging
+from datetime import datetime
+
+logger = logging.getLogger("DatabaseMigrations")
+
+
+def _column_names(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _create_tables(conn):
+    # Table for market data (OHLCV)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS market_data (
+            timestamp DATETIME,
+            symbol TEXT,
+            timeframe TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (timestamp, symbol, timeframe)
+        )
+    ''')
+
+    # Table for signals and analysis
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS signals (
+            timestamp DATETIME,
+            symbol TEXT,
+            timeframe TEXT,
+            signal TEXT,
+            strength REAL,
+            source TEXT, -- 'CRT', 'PriceEq', 'DeepSeek', 'Qwen', 'Hybrid'
+            details TEXT -- JSON string with extra details
+        )
+    ''')
+
+    # Table for trades
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS trades (
+            ticket INTEGER PRIMARY KEY,
+            symbol TEXT,
+            action TEXT, -- 'BUY', 'SELL'
+            volume REAL,
+            price REAL,
+            time DATETIME,
+            result TEXT -- 'OPEN', 'CLOSED', 'ERROR'
+        )
+    ''')
+
+    # Table for account metrics (Balance, Equity, etc.)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS account_metrics (
+            timestamp DATETIME,
+            balance REAL,
+            equity REAL,
+            margin REAL,
+            free_margin REAL,
+            margin_level REAL,
+            total_profit REAL, -- Floating PnL
+            symbol_pnl REAL, -- PnL for specific symbol (optional)
+            PRIMARY KEY (timestamp)
+        )
+    ''')
+
+    # Table for optimization history
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS optimization_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            algorithm TEXT,
+            symbol TEXT,
+            timeframe TEXT,
+            params TEXT, -- JSON list of parameters
+            score REAL
+        )
+    ''')
+
+    # Table for trade reflections (Memory)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS trade_reflections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME,
+            trade_id TEXT,
+            symbol TEXT,
+            outcome TEXT, -- 'WIN', 'LOSS'
+            reasoning TEXT,
+            shortcomings TEXT,
+            improvements TEXT,
+            rating REAL,
+            full_json TEXT -- Complete JSON payload
+        )
+    ''')
+
+
+def _add_trade_close_columns(conn):
+    # Close info and performance metrics, added after the first release
+    existing = _column_names(conn, 'trades')
+    for column, col_type in (('close_price', 'REAL'), ('close_time', 'DATETIME'), ('profit', 'REAL'),
+                             ('mfe', 'REAL'), ('mae', 'REAL')):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE trades ADD COLUMN {column} {col_type}")
+
+
+def _create_query_indexes(conn):
+    # get_trade_performance_stats / get_performance_metrics:
+    #   WHERE result = 'CLOSED' [AND symbol = ?] ORDER BY close_time DESC (covering the selected columns)
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_result_close_time
+        ON trades (result, close_time, profit, mfe, mae, action, volume)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_trades_result_symbol_close_time
+        ON trades (result, symbol, close_time, profit, mfe, mae, action, volume)
+    ''')
+    # get_trades: ORDER BY time DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_time ON trades (time)")
+
+    # get_latest_signals: ORDER BY timestamp DESC; signal index warm-up: per (symbol, timeframe) MAX(timestamp)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_timestamp ON signals (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_signals_symbol_tf_timestamp ON signals (symbol, timeframe, timestamp)")
+
+    # get_market_data: WHERE symbol = ? ORDER BY timestamp DESC; watermark: MAX(timestamp) per (symbol, timeframe)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_market_data_symbol_timestamp ON market_data (symbol, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_market_data_symbol_tf_timestamp ON market_data (symbol, timeframe, timestamp)")
+
+    # get_recent_trade_reflections / get_top_optimization_results
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trade_reflections_symbol_timestamp ON trade_reflections (symbol, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trade_reflections_timestamp ON trade_reflections (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_optimization_history_symbol_score ON optimization_history (symbol, score)")
+
+
+def _create_maintenance_log(conn):
+    # Last run / progress watermark of periodic storage maintenance (see data/partition_manager.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS maintenance_log (
+            task TEXT PRIMARY KEY,
+            last_run DATETIME,
+            watermark TEXT
+        )
+    ''')
+
+
+# (version, description, apply(conn)) - append only, never edit a released migration
+MIGRATIONS = [
+    (1, "create base tables", _create_tables),
+    (2, "add trade close/performance columns", _add_trade_close_columns),
+    (3, "add secondary indexes for read queries", _create_query_indexes),
+    (4, "add maintenance log", _create_maintenance_log),
+]
+
+
+def get_schema_version(conn):
+    """Highest applied migration version (0 for a database that predates migrations)."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME
+        )
+    ''')
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn, migrations=MIGRATIONS):
+    """
+    Apply pending migrations, each in its own transaction.
+
+    Args:
+        conn: sqlite3 connection
+        migrations: list of (version, description, apply(conn)) sorted by version
+
+    Returns:
+        list: versions applied by this call
+    """
+    current = get_schema_version(conn)
+    conn.commit()
+    applied = []
+    for version, description, migrate in migrations:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN")
+            migrate(conn)
+            conn.execute("INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                         (version, description, datetime.now()))
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Migration {version} ({description}) failed: {e}")
+            raise
+        logger.info(f"Applied schema migration {version}: {description}")
+        applied.append(version)
+    return applied
@@ -0,0 +1,299 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("DatabaseWriter")
+
+_STOP = object()
+
+
+def _is_database_error(e):
+    """Errors about the database itself (not the statement) abort the whole batch."""
+    message = str(e).lower()
+    return any(m in message for m in ("locked", "busy", "full", "disk i/o", "readonly", "unable to open"))
+
+
+class _Write:
+    __slots__ = ('sql', 'params', 'many')
+
+    def __init__(self, sql, params, many):
+        self.sql = sql
+        self.params = params
+        self.many = many
+
+
+class DatabaseWriter:
+    """
+    Write-behind queue for a SQLite database.
+
+    A dedicated thread owns its own connection and drains a bounded queue,
+    committing everything that arrived within ``flush_interval`` as one
+    transaction. Each statement runs under its own savepoint, so a bad row is
+    logged and dropped without losing the rest of the batch. Callers only pay
+    for a ``queue.put``; disk stalls and WAL checkpoints delay the writer, not
+    the trading loop.
+    """
+
+    def __init__(self, db_path, flush_interval=0.5, max_queue=10000, put_timeout=5.0, busy_timeout=30.0,
+                 max_retry_delay=5.0, shutdown_retries=3):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.busy_timeout = busy_timeout
+        self.max_retry_delay = max_retry_delay
+        self.shutdown_retries = shutdown_retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._closed = False
+        self.stats = {
+            'enqueued': 0,
+            'written': 0,
+            'failed': 0,
+            'dropped': 0,
+            'batches': 0,
+            'retries': 0,
+            'pending': 0,
+            'max_queue_depth': 0,
+            'last_batch_size': 0,
+            'last_flush_ms': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="DatabaseWriter", daemon=True)
+        self._thread.start()
+
+    # ------------------------------------------------------------------ producer side
+
+    def execute(self, sql, params=()):
+        """Queue one statement. Returns False if it had to be dropped."""
+        return self._put(_Write(sql, params, False))
+
+    def executemany(self, sql, rows):
+        """Queue a batch statement (``rows`` is materialized on the caller's thread)."""
+        return self._put(_Write(sql, list(rows), True))
+
+    def _put(self, item):
+        if self._closed:
+            logger.error("DatabaseWriter is shut down, dropping write")
+            with self._lock:
+                self.stats['dropped'] += 1
+            return False
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            logger.error(f"Write queue full for {self.put_timeout}s, dropping write: {item.sql.split()[0]}")
+            with self._lock:
+                self.stats['dropped'] += 1
+            return False
+        with self._lock:
+            self.stats['enqueued'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queue.qsize())
+        return True
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        """Counters plus the current queue depth."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
+
+    def flush(self, timeout=None):
+        """
+        Block until every write queued before this call is committed.
+
+        Returns False if the flush marker could not be queued within
+        ``put_timeout`` (queue full) or the commit did not finish in ``timeout``.
+        """
+        if self._closed or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=self.put_timeout)
+        except queue.Full:
+            logger.warning(f"Write queue full for {self.put_timeout}s, flush not queued")
+            return False
+        return done.wait(timeout)
+
+    def shutdown(self, timeout=10.0):
+        """Commit outstanding writes, stop the thread and close its connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        try:
+            # Wake the writer early; if the queue is full it will see the stop flag once drained
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"DatabaseWriter did not stop within {timeout}s ({self._queue.qsize()} writes pending)")
+
+    # ------------------------------------------------------------------ writer thread
+
+    def _connect(self):
+        # Autocommit mode: transactions and savepoints are managed explicitly
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL;')
+        except sqlite3.OperationalError as e:
+            # WAL mode is persistent; DatabaseManager normally set it already
+            logger.warning(f"Could not set WAL mode on writer connection: {e}")
+        conn.execute('PRAGMA synchronous=NORMAL;')
+        return conn
+
+    def _run(self):
+        conn = None
+        carry, carry_events = [], [] # Batch held back after a database-level failure
+        failures = 0
+        try:
+            conn = self._connect()
+            running = True
+            while running:
+                first = None
+                if carry:
+                    # Retrying a failed batch: leave new writes in the queue so it stays bounded
+                    running = not self._stop.is_set()
+                else:
+                    try:
+                        first = self._queue.get(timeout=0.2)
+                    except queue.Empty:
+                        if not self._stop.is_set():
+                            continue
+                        running = False
+
+                batch, events = carry, carry_events
+                deadline = time.monotonic() + self.flush_interval
+                item = first
+                while item is not None:
+                    if item is _STOP:
+                        running = False
+                        break
+                    if isinstance(item, threading.Event):
+                        events.append(item)
+                        break # Flush requested: commit what we have now
+                    batch.append(item)
+                    remaining = deadline - time.monotonic()
+                    try:
+                        item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                if not running:
+                    # Commit whatever is still queued behind the stop signal
+                    events.extend(self._drain_into(batch))
+
+                committed = self._commit(conn, batch) if batch else True
+                while not committed and not running and failures < self.shutdown_retries:
+                    failures += 1
+                    time.sleep(min(0.1 * 2 ** failures, self.max_retry_delay))
+                    committed = self._commit(conn, batch)
+
+                if committed or not running:
+                    if not committed:
+                        logger.error(f"Giving up on {len(batch)} queued writes at shutdown")
+                        with self._lock:
+                            self.stats['failed'] += len(batch)
+                    carry, carry_events = [], []
+                    failures = 0
+                    for event in events:
+                        event.set()
+                else:
+                    # Locked/busy/IO error: keep the batch and retry with backoff, new writes join it
+                    carry, carry_events = batch, events
+                    failures += 1
+                    with self._lock:
+                        self.stats['retries'] += 1
+                    self._stop.wait(min(0.1 * 2 ** failures, self.max_retry_delay))
+
+                with self._lock:
+                    self.stats['pending'] = len(carry)
+        except Exception as e:
+            logger.error(f"DatabaseWriter thread failed: {e}", exc_info=True)
+        finally:
+            # Release anyone waiting on a flush
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+            for event in carry_events:
+                event.set()
+            if conn is not None:
+                conn.close()
+
+    def _drain_into(self, batch):
+        events = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return events
+            if isinstance(item, threading.Event):
+                events.append(item)
+            elif item is not _STOP:
+                batch.append(item)
+
+    def _commit(self, conn, batch):
+        """
+        Commit ``batch`` in one transaction.
+
+        Returns False (nothing committed, nothing counted) on database-level
+        errors such as SQLITE_BUSY so the caller can retry the batch.
+        """
+        started = time.perf_counter()
+        written = failed = 0
+        for attempt in range(2):
+            try:
+                conn.execute("BEGIN")
+                written = failed = 0
+                for item in batch:
+                    conn.execute("SAVEPOINT write_item")
+                    try:
+                        if item.many:
+                            conn.executemany(item.sql, item.params)
+                        else:
+                            conn.execute(item.sql, item.params)
+                        conn.execute("RELEASE write_item")
+                        written += 1
+                    except sqlite3.OperationalError as e:
+                        if _is_database_error(e):
+                            raise # Retry the whole batch
+                        conn.execute("ROLLBACK TO write_item")
+                        conn.execute("RELEASE write_item")
+                        failed += 1
+                        logger.error(f"Dropped failed write ({item.sql.split()[0]}): {e}")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO write_item")
+                        conn.execute("RELEASE write_item")
+                        failed += 1
+                        logger.error(f"Dropped failed write ({item.sql.split()[0]}): {e}")
+                conn.execute("COMMIT")
+                break
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                if attempt == 0 and "database or disk is full" in str(e):
+                    logger.warning(f"Database full during batch write, attempting checkpoint: {e}")
+                    try:
+                        conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+                    except Exception as e_ckpt:
+                        logger.warning(f"WAL Checkpoint failed: {e_ckpt}")
+                    continue
+                logger.warning(f"Failed to commit {len(batch)} queued writes, will retry: {e}")
+                return False
+
+        with self._lock:
+            self.stats['written'] += written
+            self.stats['failed'] += failed
+            self.stats['batches'] += 1
+            self.stats['last_batch_size'] = len(batch)
+            self.stats['last_flush_ms'] = (time.perf_counter() - started) * 1000
+        return True
@@ -0,0 +1,389 @@
+import os
+import glob
+import json
+import sqlite3
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("HistoryStore")
+
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+MANIFEST_FILE = "manifest.json"
+
+# MetaTrader5 TIMEFRAME_* constants, so timeframes resolve without the terminal
+TIMEFRAME_NAMES = {
+    1: 'M1', 2: 'M2', 3: 'M3', 4: 'M4', 5: 'M5', 6: 'M6', 10: 'M10', 12: 'M12', 15: 'M15', 20: 'M20', 30: 'M30',
+    16385: 'H1', 16386: 'H2', 16387: 'H3', 16388: 'H4', 16390: 'H6', 16392: 'H8', 16396: 'H12',
+    16408: 'D1', 32769: 'W1', 49153: 'MN1',
+}
+
+
+def timeframe_name(timeframe, default='M15'):
+    """'M15' style name of an MT5 timeframe constant (strings pass through)."""
+    if timeframe is None:
+        return default
+    if isinstance(timeframe, str):
+        return timeframe
+    return TIMEFRAME_NAMES.get(int(timeframe), str(timeframe))
+
+
+def _epoch_seconds(values):
+    """Bar times (datetimes, 'YYYY-MM-DD HH:MM:SS' text or epoch seconds) as int64 epoch seconds."""
+    values = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    times = pd.to_datetime(values, format='ISO8601') if values.dtype == object else pd.to_datetime(values)
+    if times.dt.tz is not None:
+        times = times.dt.tz_convert('UTC').dt.tz_localize(None)
+    return times.to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def _bound(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(_epoch_seconds([value])[0])
+
+
+def read_market_data(db_manager, symbol, timeframe, since=None):
+    """
+    ``market_data`` bars of one (symbol, timeframe) from the live database and its monthly partitions.
+
+    Args:
+        db_manager: DatabaseManager owning the market data (pending writes are flushed first)
+        symbol: trading symbol
+        timeframe: timeframe value as saved in ``market_data``
+        since: only bars after this 'YYYY-MM-DD HH:MM:SS' timestamp
+
+    Returns:
+        pd.DataFrame: time (text), open, high, low, close, volume; oldest first
+    """
+    db_manager.flush()
+    sql = '''
+        SELECT timestamp, open, high, low, close, volume FROM market_data
+        WHERE symbol = ? AND timeframe = ? AND timestamp > ?
+        ORDER BY timestamp
+    '''
+    params = (symbol, str(timeframe), since or '')
+    columns = ['time', 'open', 'high', 'low', 'close', 'volume']
+    frames = []
+    for path in [db_manager.db_path] + db_manager.partitions.partition_files():
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.OperationalError as e:
+            logger.debug(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        if rows:
+            frames.append(pd.DataFrame(rows, columns=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True).sort_values('time', kind='stable').reset_index(drop=True)
+
+
+class HistoryArrays:
+    """
+    OHLCV columns of one (symbol, timeframe) date range as read-only NumPy arrays.
+
+    Looked up like a DataFrame (``arrays['close']``), same as
+    ``SharedArrays``. When the range lies in a single segment the arrays are
+    zero-copy views into the memory-mapped Arrow file. Pickling sends only the
+    store location and the resolved range; unpickling in a worker maps the
+    same file again, so optimizer processes share the OS page cache instead of
+    each holding a copy.
+    """
+
+    memory_mapped = True
+
+    def __init__(self, columns, spec):
+        self._columns = columns
+        self._spec = spec
+        for values in self._columns.values():
+            values.flags.writeable = False
+
+    def __getstate__(self):
+        return {'spec': self._spec}
+
+    def __setstate__(self, state):
+        root, symbol, timeframe, start, end = state['spec']
+        restored = HistoryStore(root).read(symbol, timeframe, start, end)
+        self._columns = restored._columns
+        self._spec = restored._spec
+
+    def __getitem__(self, name):
+        return self._columns[name]
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __len__(self):
+        return len(self._columns['time'])
+
+    def keys(self):
+        return self._columns.keys()
+
+    @property
+    def times(self):
+        """Bar open times as datetime64[s]."""
+        return self._columns['time'].view('datetime64[s]')
+
+    def to_frame(self):
+        """DataFrame indexed by bar time, laid out like ``MT5DataProcessor.get_historical_data``."""
+        df = pd.DataFrame({name: self._columns[name] for name in COLUMNS[1:]},
+                          index=pd.DatetimeIndex(pd.to_datetime(self._columns['time'], unit='s'), name='time'))
+        return df
+
+
+class HistoryStore:
+    """
+    Columnar OHLCV history, one Arrow dataset per (symbol, timeframe).
+
+    Each dataset is a directory of immutable Arrow IPC segment files
+    (uncompressed, so they can be memory-mapped) listed in a
+    ``manifest.json``. Appends write a new segment with the bars newer than
+    the stored ones; once there are more than ``max_segments`` they are
+    compacted into one file. Reads map the segments and slice them by time,
+    returning :class:`HistoryArrays`.
+
+    Layout: ``<root>/<symbol>/<timeframe>/<first>_<last>.arrow`` (epoch seconds).
+    """
+
+    def __init__(self, root=None, max_segments=8):
+        if pa is None:
+            raise ImportError("pyarrow is required for the history store (pip install pyarrow)")
+        self.root = os.path.abspath(root or os.path.join(os.path.dirname(os.path.abspath(__file__)), "history"))
+        self.max_segments = max_segments
+        self._tables = {} # segment path -> memory-mapped pyarrow.Table
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------ layout
+
+    def dataset_dir(self, symbol, timeframe):
+        return os.path.join(self.root, str(symbol).replace(os.sep, '_'), timeframe_name(timeframe))
+
+    def _load_manifest(self, dataset):
+        path = os.path.join(dataset, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)['segments']
+        except Exception as e:
+            logger.warning(f"Failed to load history manifest {path}: {e}")
+            return []
+
+    def _save_manifest(self, dataset, segments):
+        path = os.path.join(dataset, MANIFEST_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': segments}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def segments(self, symbol, timeframe):
+        """Manifest entries ({'file', 'first', 'last', 'rows'}), oldest first."""
+        with self._lock:
+            return self._load_manifest(self.dataset_dir(symbol, timeframe))
+
+    def time_range(self, symbol, timeframe):
+        """(first, last) stored bar time in epoch seconds, or None when empty."""
+        segments = self.segments(symbol, timeframe)
+        if not segments:
+            return None
+        return segments[0]['first'], segments[-1]['last']
+
+    # ------------------------------------------------------------------ writes
+
+    @staticmethod
+    def _columns_from_frame(df):
+        """Sorted, de-duplicated OHLCV arrays from a DataFrame with a 'time' column or a DatetimeIndex."""
+        if 'time' in df.columns:
+            times = _epoch_seconds(df['time'])
+        elif isinstance(df.index, pd.DatetimeIndex):
+            times = _epoch_seconds(df.index)
+        else:
+            raise ValueError("History needs a 'time' column or a DatetimeIndex")
+        volume = df['volume'] if 'volume' in df.columns else df.get('tick_volume', pd.Series(0, index=df.index))
+        columns = {
+            'time': times,
+            'open': df['open'].to_numpy(dtype=np.float64),
+            'high': df['high'].to_numpy(dtype=np.float64),
+            'low': df['low'].to_numpy(dtype=np.float64),
+            'close': df['close'].to_numpy(dtype=np.float64),
+            'volume': np.asarray(volume, dtype=np.int64),
+        }
+        # Last occurrence wins for duplicated bars
+        order = np.argsort(times, kind='stable')
+        sorted_times = times[order]
+        keep = np.append(sorted_times[1:] != sorted_times[:-1], True) if len(order) else order.astype(bool)
+        return {name: values[order][keep] for name, values in columns.items()}
+
+    def _write_segment(self, dataset, columns):
+        first, last = int(columns['time'][0]), int(columns['time'][-1])
+        name = f"{first}_{last}.arrow"
+        table = pa.table({name_: columns[name_] for name_ in COLUMNS})
+        tmp_path = os.path.join(dataset, f"{name}.tmp")
+        # Single record batch per file, so every column maps to one contiguous buffer
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=max(len(table), 1))
+        os.replace(tmp_path, os.path.join(dataset, name))
+        return {'file': name, 'first': first, 'last': last, 'rows': len(table)}
+
+    def append(self, symbol, timeframe, df):
+        """
+        Append the bars newer than the stored history as a new segment.
+
+        Args:
+            symbol: trading symbol
+            timeframe: 'M15' style name or MT5 timeframe constant
+            df: candles with a 'time' column or DatetimeIndex and open/high/low/close[/volume|tick_volume]
+
+        Returns:
+            int: rows appended
+        """
+        if df is None or len(df) == 0:
+            return 0
+        columns = self._columns_from_frame(df)
+        with self._lock:
+            dataset = self.dataset_dir(symbol, timeframe)
+            os.makedirs(dataset, exist_ok=True)
+            segments = self._load_manifest(dataset)
+            if segments:
+                keep = columns['time'] > segments[-1]['last']
+                columns = {name: values[keep] for name, values in columns.items()}
+            if not len(columns['time']):
+                return 0
+            segments.append(self._write_segment(dataset, columns))
+            self._save_manifest(dataset, segments)
+            if len(segments) > self.max_segments:
+                self._compact(dataset, segments)
+        return len(columns['time'])
+
+    def compact(self, symbol, timeframe):
+        """Merge all segments of a dataset into one file (reads of any range become zero-copy)."""
+        with self._lock:
+            dataset = self.dataset_dir(symbol, timeframe)
+            segments = self._load_manifest(dataset)
+            if len(segments) > 1:
+                self._compact(dataset, segments)
+
+    def _compact(self, dataset, segments):
+        tables = [self._open(os.path.join(dataset, entry['file'])) for entry in segments]
+        merged = pa.concat_tables(tables).combine_chunks()
+        columns = {name: merged.column(name).to_numpy() for name in COLUMNS}
+        entry = self._write_segment(dataset, columns)
+        self._save_manifest(dataset, [entry])
+        for old in segments:
+            if old['file'] != entry['file']:
+                self._release(os.path.join(dataset, old['file']))
+        self._remove_orphans(dataset, {entry['file']})
+        logger.info(f"Compacted {len(segments)} history segments into {entry['file']} ({entry['rows']} rows)")
+
+    def _remove_orphans(self, dataset, live):
+        # Segments still mapped elsewhere cannot be deleted on Windows; retried on the next compaction
+        for path in glob.glob(os.path.join(dataset, "*.arrow")):
+            if os.path.basename(path) in live:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.debug(f"Keeping superseded history segment {os.path.basename(path)}: {e}")
+
+    def sync_from_database(self, db_manager, symbol, timeframe):
+        """
+        Append ``market_data`` bars newer than the stored history.
+
+        The newest stored bar is left out because it may still be forming
+        (``save_market_data`` rewrites it).
+
+        Args:
+            db_manager: DatabaseManager owning the market data
+            symbol: trading symbol
+            timeframe: timeframe value as saved in ``market_data``
+
+        Returns:
+            int: rows appended
+        """
+        stored = self.time_range(symbol, timeframe)
+        since = pd.Timestamp(stored[1], unit='s').isoformat(" ") if stored else None
+        df = read_market_data(db_manager, symbol, timeframe, since)
+        if df.empty:
+            return 0
+        # Drop the forming bar
+        return self.append(symbol, timeframe, df[df['time'] != df['time'].max()])
+
+    # ------------------------------------------------------------------ reads
+
+    def _open(self, path):
+        table = self._tables.get(path)
+        if table is None:
+            with pa.memory_map(path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            self._tables[path] = table
+        return table
+
+    def _release(self, path):
+        self._tables.pop(path, None)
+
+    def read(self, symbol, timeframe, start=None, end=None, last=None):
+        """
+        Bars with ``start <= time <= end`` from the memory-mapped segments.
+
+        Args:
+            symbol: trading symbol
+            timeframe: 'M15' style name or MT5 timeframe constant
+            start, end: datetimes / timestamps / epoch seconds (None = unbounded)
+            last: keep only the newest ``last`` bars of the range
+
+        Returns:
+            HistoryArrays: zero-copy views when the range lies in one segment
+        """
+        start, end = _bound(start), _bound(end)
+        with self._lock:
+            dataset = self.dataset_dir(symbol, timeframe)
+            parts = []
+            for entry in self._load_manifest(dataset):
+                if (start is not None and entry['last'] < start) or (end is not None and entry['first'] > end):
+                    continue
+                table = self._open(os.path.join(dataset, entry['file']))
+                parts.append({name: table.column(name).chunk(0).to_numpy(zero_copy_only=True) for name in COLUMNS})
+
+        sliced = []
+        for columns in parts:
+            times = columns['time']
+            lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+            hi = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+            if hi > lo:
+                sliced.append({name: values[lo:hi] for name, values in columns.items()})
+        if len(sliced) == 1:
+            columns = sliced[0]
+        elif sliced:
+            columns = {name: np.concatenate([part[name] for part in sliced]) for name in COLUMNS}
+        else:
+            columns = {name: np.empty(0, dtype=np.int64 if name in ('time', 'volume') else np.float64)
+                       for name in COLUMNS}
+        if last is not None:
+            columns = {name: values[max(len(values) - last, 0):] for name, values in columns.items()}
+
+        times = columns['time']
+        # Resolved bounds, so a pickled view maps the same bars even after later appends
+        spec = (self.root, symbol, timeframe_name(timeframe),
+                int(times[0]) if len(times) else start, int(times[-1]) if len(times) else end)
+        return HistoryArrays(columns, spec)
+
+    def close(self):
+        with self._lock:
+            self._tables.clear()
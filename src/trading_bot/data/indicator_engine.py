@@ -0,0 +1,381 @@
+import logging
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("IndicatorEngine")
+
+NAN = float('nan')
+
+
+class _RollingSum:
+    """Fixed-size window with an O(1) running sum (re-summed periodically to bound drift)."""
+
+    RESUM_EVERY = 1000
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self._updates = 0
+
+    def push(self, x):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        self._updates += 1
+        if self._updates >= self.RESUM_EVERY:
+            self.total = math.fsum(self.window)
+            self._updates = 0
+
+    def peek_total(self, x):
+        """Sum of the window if ``x`` were pushed, or None while it is not full yet."""
+        n = len(self.window)
+        if n + 1 < self.period:
+            return None
+        if n == self.period:
+            return self.total - self.window[0] + x
+        return self.total + x
+
+    @property
+    def full(self):
+        return len(self.window) == self.period
+
+
+class Indicator:
+    """
+    Base class for incremental indicators.
+
+    ``update`` consumes one closed bar and returns the new value, ``peek`` returns
+    the value the indicator would have with a provisional (forming) bar without
+    changing state. Both are O(1).
+    """
+
+    fields = ('close',)
+
+    def __init__(self, history=3):
+        self.history = deque(maxlen=max(1, history))
+
+    @property
+    def value(self):
+        return self.history[-1] if self.history else NAN
+
+    def update(self, *values):
+        value = self._step(*values, commit=True)
+        self.history.append(value)
+        return value
+
+    def peek(self, *values):
+        return self._step(*values, commit=False)
+
+    def _step(self, *values, commit):
+        raise NotImplementedError
+
+
+class EMA(Indicator):
+    """Matches ``series.ewm(span=period, adjust=False).mean()``."""
+
+    def __init__(self, period, field='close', history=3):
+        super().__init__(history)
+        self.period = period
+        self.fields = (field,)
+        self.alpha = 2.0 / (period + 1.0)
+        self.ema = None
+
+    def _step(self, x, commit):
+        ema = x if self.ema is None else self.alpha * x + (1.0 - self.alpha) * self.ema
+        if commit:
+            self.ema = ema
+        return ema
+
+
+class SMA(Indicator):
+    """Matches ``series.rolling(period).mean()``."""
+
+    def __init__(self, period, field='close', history=3):
+        super().__init__(history)
+        self.period = period
+        self.fields = (field,)
+        self.window = _RollingSum(period)
+
+    def _step(self, x, commit):
+        total = self.window.peek_total(x)
+        if commit:
+            self.window.push(x)
+        return NAN if total is None else total / self.period
+
+
+class RollingStd(Indicator):
+    """Matches ``series.rolling(period).std()`` (ddof=1)."""
+
+    def __init__(self, period, field='close', history=3):
+        super().__init__(history)
+        self.period = period
+        self.fields = (field,)
+        self.pivot = None
+        self.sums = _RollingSum(period)
+        self.squares = _RollingSum(period)
+
+    def _step(self, x, commit):
+        if self.pivot is None:
+            # Accumulate around the first value to keep the sum of squares well conditioned
+            if not commit:
+                return NAN
+            self.pivot = x
+        d = x - self.pivot
+        total = self.sums.peek_total(d)
+        total_sq = self.squares.peek_total(d * d)
+        if commit:
+            self.sums.push(d)
+            self.squares.push(d * d)
+        if total is None or self.period < 2:
+            return NAN
+        var = (total_sq - total * total / self.period) / (self.period - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class ATR(Indicator):
+    """
+    Average True Range.
+
+    ``smoothing='ema'`` matches ``MT5DataProcessor.calculate_atr``,
+    ``smoothing='sma'`` matches the rolling-mean ATR in ``KalmanGridStrategy``.
+    """
+
+    fields = ('high', 'low', 'close')
+
+    def __init__(self, period=14, smoothing='ema', history=3):
+        super().__init__(history)
+        if smoothing not in ('ema', 'sma'):
+            raise ValueError(f"Unknown ATR smoothing: {smoothing}")
+        self.period = period
+        self.prev_close = None
+        self.average = EMA(period) if smoothing == 'ema' else SMA(period)
+
+    def _step(self, high, low, close, commit):
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        if commit:
+            self.prev_close = close
+            return self.average.update(tr)
+        return self.average.peek(tr)
+
+
+class RSI(Indicator):
+    """Matches ``MT5DataProcessor.calculate_rsi`` (rolling-mean gains/losses)."""
+
+    def __init__(self, period=14, field='close', history=3):
+        super().__init__(history)
+        self.period = period
+        self.fields = (field,)
+        self.prev = None
+        self.gains = _RollingSum(period)
+        self.losses = _RollingSum(period)
+
+    def _step(self, x, commit):
+        delta = 0.0 if self.prev is None else x - self.prev
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        gain_total = self.gains.peek_total(gain)
+        loss_total = self.losses.peek_total(loss)
+        if commit:
+            self.prev = x
+            self.gains.push(gain)
+            self.losses.push(loss)
+        if gain_total is None:
+            return NAN
+        if loss_total == 0:
+            return NAN if gain_total == 0 else 100.0
+        rs = gain_total / loss_total
+        return 100.0 - 100.0 / (1.0 + rs)
+
+
+class OBV(Indicator):
+    """Matches ``MT5DataProcessor.calculate_obv``."""
+
+    def __init__(self, field='close', volume_field='volume', history=3):
+        super().__init__(history)
+        self.fields = (field, volume_field)
+        self.prev = None
+        self.obv = 0.0
+
+    def _step(self, x, volume, commit):
+        obv = self.obv
+        if self.prev is not None:
+            delta = x - self.prev
+            if delta > 0:
+                obv += volume
+            elif delta < 0:
+                obv -= volume
+        if commit:
+            self.prev = x
+            self.obv = obv
+        return obv
+
+
+class MACD(Indicator):
+    """Matches ``MT5DataProcessor.calculate_macd``; values are ``(macd, signal, hist)`` tuples."""
+
+    def __init__(self, fast=12, slow=26, signal=9, field='close', history=3):
+        super().__init__(history)
+        self.fields = (field,)
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+
+    @property
+    def value(self):
+        return self.history[-1] if self.history else (NAN, NAN, NAN)
+
+    def _step(self, x, commit):
+        if commit:
+            macd = self.fast.update(x) - self.slow.update(x)
+            signal = self.signal.update(macd)
+        else:
+            macd = self.fast.peek(x) - self.slow.peek(x)
+            signal = self.signal.peek(macd)
+        return macd, signal, macd - signal
+
+
+INDICATORS = {
+    'ema': EMA,
+    'sma': SMA,
+    'std': RollingStd,
+    'atr': ATR,
+    'rsi': RSI,
+    'obv': OBV,
+    'macd': MACD,
+}
+
+
+class _Tracked:
+    def __init__(self, indicator):
+        self.indicator = indicator
+        self.watermark = None
+        self.forming = None
+
+
+def _bar_columns(bars, fields):
+    """
+    Extract ``time`` (unix seconds) and the requested columns as NumPy arrays.
+
+    Bar times come from a ``time`` column or a DatetimeIndex. A positional index
+    can't be used: a sliding window re-presents the same positions, so the
+    watermark would never advance.
+    """
+    if isinstance(bars, pd.DataFrame):
+        if 'time' in bars.columns:
+            times = bars['time'].values
+        elif isinstance(bars.index, pd.DatetimeIndex):
+            times = bars.index.values
+        else:
+            raise ValueError("bars need a 'time' column or a DatetimeIndex")
+        columns = {f: bars[f].to_numpy(dtype=float) for f in fields}
+    else:
+        times = bars['time']
+        columns = {f: np.asarray(bars[f], dtype=float) for f in fields}
+
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.datetime64):
+        times = times.astype('datetime64[s]').astype(np.int64)
+    else:
+        times = times.astype(np.int64)
+    return times, columns
+
+
+class IndicatorEngine:
+    """
+    Stateful indicator store keyed by (symbol, timeframe, indicator, params).
+
+    Feed it the latest bars (DataFrame or MT5 rates array, oldest first) with
+    ``update``; only the closed bars newer than each indicator's watermark are
+    consumed, so a steady-state call costs O(1) per indicator. The last bar is
+    treated as still forming and is only applied provisionally via ``peek``.
+    """
+
+    def __init__(self, history=3):
+        self.history = history
+        self._tracked = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(symbol, timeframe, name, params):
+        return (symbol, timeframe, name, tuple(sorted(params.items())))
+
+    def _get(self, symbol, timeframe, name, params):
+        key = self._key(symbol, timeframe, name, params)
+        tracked = self._tracked.get(key)
+        if tracked is None:
+            if name not in INDICATORS:
+                raise ValueError(f"Unknown indicator: {name}")
+            tracked = _Tracked(INDICATORS[name](history=self.history, **params))
+            self._tracked[key] = tracked
+        return tracked
+
+    def register(self, symbol, timeframe, name, **params):
+        """Create (or return) the indicator so the next ``update`` warms it up."""
+        with self._lock:
+            return self._get(symbol, timeframe, name, params).indicator
+
+    def update(self, symbol, timeframe, bars):
+        """
+        Advance every indicator registered for (symbol, timeframe) to ``bars``.
+
+        Raises:
+            ValueError: if ``bars`` carries no bar times (``time`` column or DatetimeIndex)
+        """
+        if bars is None or len(bars) == 0:
+            return
+        with self._lock:
+            tracked = [t for k, t in self._tracked.items() if k[0] == symbol and k[1] == timeframe]
+            if not tracked:
+                return
+            fields = sorted({f for t in tracked for f in t.indicator.fields})
+            times, columns = _bar_columns(bars, fields)
+            n_closed = len(times) - 1
+
+            for t in tracked:
+                ind = t.indicator
+                start = 0 if t.watermark is None else int(np.searchsorted(times[:n_closed], t.watermark, side='right'))
+                cols = [columns[f] for f in ind.fields]
+                for i in range(start, n_closed):
+                    ind.update(*(c[i] for c in cols))
+                if n_closed > 0 and (t.watermark is None or times[n_closed - 1] > t.watermark):
+                    t.watermark = int(times[n_closed - 1])
+                t.forming = tuple(c[-1] for c in cols)
+
+    def current(self, symbol, timeframe, name, **params):
+        """Latest value including the forming bar."""
+        with self._lock:
+            t = self._get(symbol, timeframe, name, params)
+            if t.forming is None:
+                return t.indicator.value
+            return t.indicator.peek(*t.forming)
+
+    def tail(self, symbol, timeframe, name, n, **params):
+        """Last ``n`` values (oldest first), the final one including the forming bar."""
+        with self._lock:
+            t = self._get(symbol, timeframe, name, params)
+            values = list(t.indicator.history)
+            if t.forming is not None:
+                values.append(t.indicator.peek(*t.forming))
+            return values[-n:]
+
+
+_indicator_engine = None
+_indicator_engine_lock = threading.Lock()
+
+
+def get_indicator_engine():
+    """Return the process-wide IndicatorEngine, creating it on first use."""
+    global _indicator_engine
+    if _indicator_engine is None:
+        with _indicator_engine_lock:
+            if _indicator_engine is None:
+                _indicator_engine = IndicatorEngine()
+    return _indicator_engine
@@ -2,6 +2,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import platform
+try:
+    from data.history_store import timeframe_name
+except ImportError:
+    from .history_store import timeframe_name
 
 # Only attempt to import MetaTrader5 on Windows systems
 try:
@@ -17,9 +21,15 @@ except ImportError:
     print("Failed to import MetaTrader5, using mock data")
 
 class MT5DataProcessor:
-    def __init__(self):
-        """Initialize the MT5 data processor"""
+    def __init__(self, history_store=None):
+        """Initialize the MT5 data processor
+
+        Args:
+            history_store (HistoryStore): optional local columnar history; covered
+                ranges are read from it and only newer bars are fetched from MT5
+        """
         self.initialized = False
+        self.history_store = history_store
         if mt5 is not None:
             self.initialized = self._initialize_mt5()
 
@@ -44,21 +54,34 @@ class MT5DataProcessor:
         Returns:
             pd.DataFrame: 包含OHLCV数据的DataFrame
         """
+        stored = self._get_stored_data(symbol, timeframe, start_date, end_date)
+        if stored is not None and not self.initialized:
+            return stored
+
         # Try to get real data if MT5 is available
         if self.initialized:
             try:
                 # Default to M15 if None provided
                 if timeframe is None:
                     timeframe = mt5.TIMEFRAME_M15
-                    
-                rates = mt5.copy_rates_range(symbol, timeframe, start_date, end_date)
+
+                # Only the bars after the stored history are fetched
+                fetch_from = start_date
+                if stored is not None and len(stored):
+                    fetch_from = stored.index[-1].to_pydatetime() + timedelta(seconds=1)
+                rates = mt5.copy_rates_range(symbol, timeframe, fetch_from, end_date)
                 if rates is not None:
                     df = pd.DataFrame(rates)
                     df['time'] = pd.to_datetime(df['time'], unit='s')
                     df.set_index('time', inplace=True)
+                    self._store_history(symbol, timeframe, df)
+                    if stored is not None:
+                        df = pd.concat([stored, df.rename(columns={'tick_volume': 'volume'})[list(stored.columns)]])
                     return df
             except Exception as e:
                 print(f"Error getting MT5 data: {e}")
+            if stored is not None:
+                return stored
         
         # Generate mock data if real data unavailable
         print(f"Generating mock data for {symbol}")
@@ -85,6 +108,28 @@ class MT5DataProcessor:
         
         return df
 
+    def _get_stored_data(self, symbol, timeframe, start_date, end_date):
+        """Bars from the history store when it covers ``start_date``, else None."""
+        if self.history_store is None:
+            return None
+        try:
+            stored_range = self.history_store.time_range(symbol, timeframe_name(timeframe))
+            if stored_range is None or stored_range[0] > pd.Timestamp(start_date).timestamp():
+                return None
+            return self.history_store.read(symbol, timeframe_name(timeframe), start_date, end_date).to_frame()
+        except Exception as e:
+            print(f"Error reading stored history: {e}")
+            return None
+
+    def _store_history(self, symbol, timeframe, df):
+        """Append closed bars fetched from MT5 to the history store (the last bar may still be forming)."""
+        if self.history_store is None or len(df) < 2:
+            return
+        try:
+            self.history_store.append(symbol, timeframe_name(timeframe), df.iloc[:-1])
+        except Exception as e:
+            print(f"Error updating stored history: {e}")
+
     def calculate_ema(self, df, period, price_column='close'):
         """Calculate Exponential Moving Average
         
@@ -0,0 +1,675 @@
+import sys
+import time
+import logging
+import calendar
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from data.history_store import timeframe_name, read_market_data
+except ImportError:
+    from .history_store import timeframe_name, read_market_data
+
+logger = logging.getLogger("MT5Replay")
+
+# Same layout as MetaTrader5.copy_rates_* results
+RATES_DTYPE = np.dtype([('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+                        ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')])
+
+Tick = namedtuple('Tick', 'time bid ask last volume time_msc flags volume_real')
+SymbolInfo = namedtuple('SymbolInfo', 'name description path currency_base currency_profit currency_margin digits point '
+                                      'spread trade_tick_size trade_tick_value trade_contract_size trade_stops_level '
+                                      'trade_mode volume_min volume_max volume_step filling_mode visible select bid ask time')
+AccountInfo = namedtuple('AccountInfo', 'login name server currency leverage balance credit profit equity margin '
+                                        'margin_free margin_level trade_allowed trade_expert')
+TradePosition = namedtuple('TradePosition', 'ticket time time_msc time_update time_update_msc type magic identifier '
+                                            'reason volume price_open sl tp price_current swap profit symbol comment '
+                                            'external_id')
+TradeDeal = namedtuple('TradeDeal', 'ticket order time time_msc type entry magic position_id reason volume price '
+                                    'commission swap profit fee symbol comment external_id')
+OrderSendResult = namedtuple('OrderSendResult', 'retcode deal order volume price bid ask comment request_id '
+                                                'retcode_external request')
+TerminalInfo = namedtuple('TerminalInfo', 'connected trade_allowed name company path')
+
+# Gold-like contract, used for symbols without an explicit specification
+DEFAULT_SYMBOL_SPEC = {
+    'digits': 2, 'point': 0.01, 'spread': 20, 'trade_contract_size': 100.0, 'trade_stops_level': 0,
+    'volume_min': 0.01, 'volume_max': 100.0, 'volume_step': 0.01, 'filling_mode': 3, 'trade_mode': 4,
+    'currency_base': 'XAU', 'currency_profit': 'USD', 'currency_margin': 'USD',
+}
+
+
+def _to_epoch(value):
+    """Epoch seconds of a datetime (naive = UTC, like the terminal), Timestamp or number."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+        return value.timestamp()
+    raise TypeError(f"Unsupported time value: {value!r}")
+
+
+def timeframe_seconds(timeframe):
+    """Bar length of an MT5 timeframe constant."""
+    name = timeframe_name(timeframe)
+    unit, count = name.rstrip('0123456789'), int(name.lstrip('MHDWN') or 1)
+    return count * {'M': 60, 'H': 3600, 'D': 86400, 'W': 604800, 'MN': 2592000}[unit]
+
+
+class ReplayClock:
+    """
+    Simulated time for the replay broker.
+
+    Stepped explicitly (``set`` / ``advance``) by a harness, or with a
+    ``speed`` it runs that many times faster than the wall clock from
+    ``start``, so an unmodified polling loop replays history in accelerated
+    time.
+    """
+
+    def __init__(self, start=0.0, speed=None):
+        self._now = _to_epoch(start) or 0.0
+        self.speed = speed
+        self._wall_anchor = time.monotonic()
+
+    def now(self):
+        if self.speed:
+            return self._now + (time.monotonic() - self._wall_anchor) * self.speed
+        return self._now
+
+    def set(self, value):
+        self._now = _to_epoch(value)
+        self._wall_anchor = time.monotonic()
+
+    def advance(self, seconds):
+        self.set(self.now() + seconds)
+
+
+class MT5Replay:
+    """
+    Offline stand-in for the ``MetaTrader5`` module.
+
+    Serves recorded bars and ticks up to the simulated clock and runs a
+    hedging-account broker: market deals fill at the current bid/ask
+    plus ``slippage_points``, stops and targets are checked against the
+    recorded price path, and balance/equity/margin are tracked per account.
+    Nothing is served from beyond the clock: the forming bar is rebuilt from
+    the prices seen so far.
+
+    Install it with :func:`install` before the bot modules are imported (or
+    to re-point modules that already imported MetaTrader5), load data with
+    ``load_bars`` / ``load_ticks`` / ``load_history_store`` /
+    ``load_database``, then drive ``clock``.
+    """
+
+    # MetaTrader5 constants used across the bot
+    TIMEFRAME_M1, TIMEFRAME_M5, TIMEFRAME_M15, TIMEFRAME_M30 = 1, 5, 15, 30
+    TIMEFRAME_H1, TIMEFRAME_H4, TIMEFRAME_D1, TIMEFRAME_W1, TIMEFRAME_MN1 = 16385, 16388, 16408, 32769, 49153
+    ORDER_TYPE_BUY, ORDER_TYPE_SELL = 0, 1
+    POSITION_TYPE_BUY, POSITION_TYPE_SELL = 0, 1
+    TRADE_ACTION_DEAL, TRADE_ACTION_PENDING, TRADE_ACTION_SLTP = 1, 5, 6
+    ORDER_FILLING_FOK, ORDER_FILLING_IOC, ORDER_FILLING_RETURN = 0, 1, 2
+    ORDER_TIME_GTC = 0
+    DEAL_TYPE_BUY, DEAL_TYPE_SELL = 0, 1
+    DEAL_ENTRY_IN, DEAL_ENTRY_OUT = 0, 1
+    DEAL_REASON_EXPERT, DEAL_REASON_SL, DEAL_REASON_TP = 3, 4, 5
+    SYMBOL_TRADE_MODE_DISABLED, SYMBOL_TRADE_MODE_FULL = 0, 4
+    TRADE_RETCODE_REQUOTE = 10004
+    TRADE_RETCODE_DONE = 10009
+    TRADE_RETCODE_INVALID = 10013
+    TRADE_RETCODE_INVALID_VOLUME = 10014
+    TRADE_RETCODE_INVALID_PRICE = 10015
+    TRADE_RETCODE_INVALID_STOPS = 10016
+    TRADE_RETCODE_MARKET_CLOSED = 10018
+    TRADE_RETCODE_NO_MONEY = 10019
+    TRADE_RETCODE_POSITION_CLOSED = 10036
+    TRADE_RETCODE_INVALID_FILL = 10030
+
+    def __init__(self, clock=None, balance=10000.0, leverage=100, currency='USD', slippage_points=0,
+                 commission_per_lot=0.0):
+        self.clock = clock or ReplayClock()
+        self.initial_balance = balance
+        self.balance = balance
+        self.leverage = leverage
+        self.currency = currency
+        self.slippage_points = slippage_points
+        self.commission_per_lot = commission_per_lot
+
+        self._symbols = {}      # symbol -> spec dict
+        self._bars = {}         # (symbol, timeframe) -> rates array, oldest first
+        self._ticks = {}        # symbol -> dict of arrays (time_msc, bid, ask, last, volume)
+        self._positions = {}    # ticket -> position dict
+        self._deals = []
+        self._next_ticket = 1
+        self._checked_until = {} # symbol -> clock time up to which stops were evaluated
+        self._last_error = (1, "Success")
+        self._lock = threading.RLock()
+        self._installed = None
+
+    # ------------------------------------------------------------------ data
+
+    def add_symbol(self, symbol, **spec):
+        """Register (or update) a symbol's contract specification."""
+        current = self._symbols.get(symbol, dict(DEFAULT_SYMBOL_SPEC))
+        current.update(spec)
+        self._symbols[symbol] = current
+        return current
+
+    def load_bars(self, symbol, timeframe, data):
+        """
+        Recorded bars for (symbol, MT5 timeframe constant).
+
+        Args:
+            data: MT5 rates array, HistoryArrays, or DataFrame with a 'time'
+                column / DatetimeIndex and open/high/low/close[/volume|tick_volume][/spread]
+        """
+        if symbol not in self._symbols:
+            self.add_symbol(symbol)
+        if isinstance(data, np.ndarray) and data.dtype.names:
+            rates = np.zeros(len(data), dtype=RATES_DTYPE)
+            for name in data.dtype.names:
+                if name in RATES_DTYPE.names:
+                    rates[name] = data[name]
+        else:
+            if isinstance(data, pd.DataFrame):
+                if 'time' in data.columns:
+                    times = data['time']
+                else:
+                    times = data.index
+                if not pd.api.types.is_numeric_dtype(times):
+                    times = pd.to_datetime(times).to_numpy(dtype='datetime64[s]').astype(np.int64)
+                columns = data
+            else:
+                times, columns = data['time'], data
+            rates = np.zeros(len(times), dtype=RATES_DTYPE)
+            rates['time'] = np.asarray(times, dtype=np.int64)
+            for name in ('open', 'high', 'low', 'close'):
+                rates[name] = columns[name]
+            volume = 'tick_volume' if 'tick_volume' in columns else 'volume'
+            if volume in columns:
+                rates['tick_volume'] = np.asarray(columns[volume], dtype=np.uint64)
+            rates['spread'] = columns['spread'] if 'spread' in columns else self._symbols[symbol]['spread']
+        rates = rates[np.argsort(rates['time'], kind='stable')]
+        self._bars[(symbol, int(timeframe))] = rates
+        return len(rates)
+
+    def load_ticks(self, symbol, data):
+        """
+        Recorded ticks for a symbol.
+
+        Args:
+            data: DataFrame with 'time_msc' (epoch ms), a 'time' column or a
+                DatetimeIndex, and bid/ask[/last][/volume]
+        """
+        if symbol not in self._symbols:
+            self.add_symbol(symbol)
+        if 'time_msc' in data.columns:
+            time_msc = data['time_msc'].to_numpy(dtype=np.int64)
+        else:
+            times = data['time'] if 'time' in data.columns else data.index
+            if pd.api.types.is_numeric_dtype(times):
+                time_msc = (np.asarray(times, dtype=np.float64) * 1000).astype(np.int64)
+            else:
+                time_msc = pd.to_datetime(times).to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        order = np.argsort(time_msc, kind='stable')
+        bid = data['bid'].to_numpy(dtype=np.float64)[order]
+        self._ticks[symbol] = {
+            'time_msc': time_msc[order],
+            'bid': bid,
+            'ask': data['ask'].to_numpy(dtype=np.float64)[order],
+            'last': data['last'].to_numpy(dtype=np.float64)[order] if 'last' in data.columns else bid,
+            'volume': (data['volume'].to_numpy(dtype=np.int64)[order] if 'volume' in data.columns
+                       else np.zeros(len(bid), dtype=np.int64)),
+        }
+        return len(bid)
+
+    def load_ticks_parquet(self, symbol, path):
+        """Recorded ticks from a Parquet file (see ``load_ticks`` for the columns)."""
+        return self.load_ticks(symbol, pd.read_parquet(path))
+
+    def load_history_store(self, store, symbol, timeframes, start=None, end=None):
+        """Bars from the columnar history store (data/history_store.py) for each timeframe constant."""
+        return {tf: self.load_bars(symbol, tf, store.read(symbol, timeframe_name(tf), start, end))
+                for tf in timeframes}
+
+    def load_database(self, db_manager, symbol, timeframes):
+        """
+        Bars from ``market_data`` (live database and partitions).
+
+        Args:
+            timeframes: dict of MT5 timeframe constant -> timeframe value saved in ``market_data``
+        """
+        return {tf: self.load_bars(symbol, tf, read_market_data(db_manager, symbol, saved))
+                for tf, saved in timeframes.items()}
+
+    def tick_times(self, symbol):
+        """Recorded tick times (epoch ms) of a symbol, oldest first."""
+        ticks = self._ticks.get(symbol)
+        return ticks['time_msc'] if ticks else np.empty(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------ prices
+
+    def base_bars(self, symbol):
+        """Finest recorded timeframe of a symbol, used when no ticks are loaded."""
+        frames = [(timeframe_seconds(tf), rates) for (sym, tf), rates in self._bars.items() if sym == symbol]
+        if not frames:
+            return None, None
+        seconds, rates = min(frames, key=lambda item: item[0])
+        return rates, seconds
+
+    def _quote(self, symbol, now):
+        """(bid, ask, last, volume, time_msc) at ``now`` or None before the first price."""
+        spec = self._symbols[symbol]
+        ticks = self._ticks.get(symbol)
+        if ticks is not None and len(ticks['time_msc']):
+            i = int(np.searchsorted(ticks['time_msc'], int(now * 1000), side='right')) - 1
+            if i >= 0:
+                return (ticks['bid'][i], ticks['ask'][i], ticks['last'][i], int(ticks['volume'][i]),
+                        int(ticks['time_msc'][i]))
+        rates, _ = self.base_bars(symbol)
+        if rates is None:
+            return None
+        i = int(np.searchsorted(rates['time'], now, side='right')) - 1
+        if i < 0:
+            return None
+        # Only the open of the forming bar is known at ``now``
+        bid = float(rates['open'][i])
+        spread = (rates['spread'][i] or spec['spread']) * spec['point']
+        return bid, bid + spread, bid, 0, int(rates['time'][i]) * 1000
+
+    def _price_path(self, symbol, start, end):
+        """
+        Prices seen in (start, end]: arrays of (time, bid_low, bid_high, ask_low, ask_high, bid).
+
+        Ticks when recorded, otherwise the finest bars that closed in the window.
+        """
+        ticks = self._ticks.get(symbol)
+        if ticks is not None and len(ticks['time_msc']):
+            lo = int(np.searchsorted(ticks['time_msc'], int(start * 1000), side='right'))
+            hi = int(np.searchsorted(ticks['time_msc'], int(end * 1000), side='right'))
+            bid, ask = ticks['bid'][lo:hi], ticks['ask'][lo:hi]
+            return ticks['time_msc'][lo:hi] / 1000.0, bid, bid, ask, ask, bid
+        rates, seconds = self.base_bars(symbol)
+        if rates is None:
+            return (np.empty(0),) * 6
+        close_times = rates['time'] + seconds
+        lo = int(np.searchsorted(close_times, start, side='right'))
+        hi = int(np.searchsorted(close_times, end, side='right'))
+        bars = rates[lo:hi]
+        spread = np.where(bars['spread'] > 0, bars['spread'], self._symbols[symbol]['spread']) * self._symbols[symbol]['point']
+        return (close_times[lo:hi].astype(np.float64), bars['low'], bars['high'], bars['low'] + spread,
+                bars['high'] + spread, bars['close'])
+
+    def _forming_bar(self, symbol, bar, now):
+        """Recorded bar still open at ``now``, rebuilt from the prices seen since its open."""
+        bar = bar.copy()
+        _, bid_low, bid_high, _, _, _ = self._price_path(symbol, float(bar['time']), now)
+        quote = self._quote(symbol, now)
+        close = quote[0] if quote else bar['open']
+        bar['high'] = max([bar['open'], close] + ([bid_high.max()] if len(bid_high) else []))
+        bar['low'] = min([bar['open'], close] + ([bid_low.min()] if len(bid_low) else []))
+        bar['close'] = close
+        bar['tick_volume'] = len(bid_low)
+        return bar
+
+    def _visible(self, symbol, timeframe):
+        """Bars opened up to the clock (a view) and the clock time, or (None, now) without data."""
+        now = self.clock.now()
+        rates = self._bars.get((symbol, int(timeframe)))
+        if rates is None:
+            self._last_error = (-1, f"No bars for {symbol} {timeframe_name(timeframe)}")
+            return None, now
+        return rates[:int(np.searchsorted(rates['time'], now, side='right'))], now
+
+    def _select(self, symbol, timeframe, visible, lo, hi, now):
+        """Copy of ``visible[lo:hi]`` with the forming bar rebuilt when it is included."""
+        selected = visible[max(lo, 0):max(hi, 0)].copy()
+        if len(selected) and hi >= len(visible) and selected['time'][-1] + timeframe_seconds(timeframe) > now:
+            selected[-1] = self._forming_bar(symbol, selected[-1], now)
+        return selected
+
+    # ------------------------------------------------------------------ terminal API
+
+    def initialize(self, *args, **kwargs):
+        return True
+
+    def login(self, *args, **kwargs):
+        return True
+
+    def shutdown(self):
+        return True
+
+    def last_error(self):
+        return self._last_error
+
+    def version(self):
+        return (500, 0, 'replay')
+
+    def terminal_info(self):
+        return TerminalInfo(True, True, 'MT5Replay', 'replay', '')
+
+    def symbols_total(self):
+        return len(self._symbols)
+
+    def symbols_get(self, group=None):
+        return tuple(self.symbol_info(symbol) for symbol in self._symbols)
+
+    def symbol_select(self, symbol, enable=True):
+        return symbol in self._symbols
+
+    def symbol_info(self, symbol):
+        spec = self._symbols.get(symbol)
+        if spec is None:
+            self._last_error = (-1, f"Unknown symbol {symbol}")
+            return None
+        quote = self._quote(symbol, self.clock.now())
+        bid, ask = (quote[0], quote[1]) if quote else (0.0, 0.0)
+        return SymbolInfo(
+            name=symbol, description=f"{symbol} (replay)", path=f"Replay\\{symbol}",
+            currency_base=spec['currency_base'], currency_profit=spec['currency_profit'],
+            currency_margin=spec['currency_margin'], digits=spec['digits'], point=spec['point'],
+            spread=spec['spread'], trade_tick_size=spec['point'],
+            trade_tick_value=spec['point'] * spec['trade_contract_size'],
+            trade_contract_size=spec['trade_contract_size'], trade_stops_level=spec['trade_stops_level'],
+            trade_mode=spec['trade_mode'], volume_min=spec['volume_min'], volume_max=spec['volume_max'],
+            volume_step=spec['volume_step'], filling_mode=spec['filling_mode'], visible=True, select=True,
+            bid=bid, ask=ask, time=int(quote[4] // 1000) if quote else 0)
+
+    def symbol_info_tick(self, symbol):
+        if symbol not in self._symbols:
+            self._last_error = (-1, f"Unknown symbol {symbol}")
+            return None
+        self._check_stops()
+        quote = self._quote(symbol, self.clock.now())
+        if quote is None:
+            return None
+        bid, ask, last, volume, time_msc = quote
+        return Tick(time_msc // 1000, float(bid), float(ask), float(last), volume, time_msc, 6, float(volume))
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        visible, now = self._visible(symbol, timeframe)
+        if visible is None:
+            return None
+        end = len(visible) - start_pos
+        return self._select(symbol, timeframe, visible, end - count, end, now)
+
+    def copy_rates_from(self, symbol, timeframe, date_from, count):
+        visible, now = self._visible(symbol, timeframe)
+        if visible is None:
+            return None
+        end = int(np.searchsorted(visible['time'], _to_epoch(date_from), side='right'))
+        return self._select(symbol, timeframe, visible, end - count, end, now)
+
+    def copy_rates_range(self, symbol, timeframe, date_from, date_to):
+        visible, now = self._visible(symbol, timeframe)
+        if visible is None:
+            return None
+        lo = int(np.searchsorted(visible['time'], _to_epoch(date_from), side='left'))
+        hi = int(np.searchsorted(visible['time'], _to_epoch(date_to), side='right'))
+        return self._select(symbol, timeframe, visible, lo, hi, now)
+
+    # ------------------------------------------------------------------ account
+
+    def _position_profit(self, position, bid, ask):
+        spec = self._symbols[position['symbol']]
+        if position['type'] == self.POSITION_TYPE_BUY:
+            current = bid
+            diff = bid - position['price_open']
+        else:
+            current = ask
+            diff = position['price_open'] - ask
+        return current, diff * position['volume'] * spec['trade_contract_size']
+
+    def _floating(self):
+        profit, margin = 0.0, 0.0
+        now = self.clock.now()
+        for position in self._positions.values():
+            quote = self._quote(position['symbol'], now)
+            if quote:
+                profit += self._position_profit(position, quote[0], quote[1])[1]
+            spec = self._symbols[position['symbol']]
+            margin += position['volume'] * spec['trade_contract_size'] * position['price_open'] / self.leverage
+        return profit, margin
+
+    def account_info(self):
+        with self._lock:
+            self._check_stops()
+            profit, margin = self._floating()
+        equity = self.balance + profit
+        return AccountInfo(
+            login=0, name='Replay', server='Replay', currency=self.currency, leverage=self.leverage,
+            balance=self.balance, credit=0.0, profit=profit, equity=equity, margin=margin,
+            margin_free=equity - margin, margin_level=equity / margin * 100 if margin else 0.0,
+            trade_allowed=True, trade_expert=True)
+
+    def _snapshot(self, position, now):
+        quote = self._quote(position['symbol'], now)
+        current, profit = self._position_profit(position, quote[0], quote[1]) if quote else (position['price_open'], 0.0)
+        return TradePosition(
+            ticket=position['ticket'], time=int(position['time']), time_msc=int(position['time'] * 1000),
+            time_update=int(position['time_update']), time_update_msc=int(position['time_update'] * 1000),
+            type=position['type'], magic=position['magic'], identifier=position['ticket'], reason=3,
+            volume=position['volume'], price_open=position['price_open'], sl=position['sl'], tp=position['tp'],
+            price_current=current, swap=0.0, profit=profit, symbol=position['symbol'],
+            comment=position['comment'], external_id='')
+
+    def positions_get(self, symbol=None, group=None, ticket=None):
+        with self._lock:
+            self._check_stops()
+            now = self.clock.now()
+            return tuple(self._snapshot(p, now) for p in self._positions.values()
+                         if (symbol is None or p['symbol'] == symbol) and (ticket is None or p['ticket'] == ticket))
+
+    def positions_total(self):
+        return len(self._positions)
+
+    def orders_get(self, symbol=None, group=None, ticket=None):
+        # Pending orders are not simulated
+        return ()
+
+    def orders_total(self):
+        return 0
+
+    def history_deals_get(self, date_from=None, date_to=None, group=None, ticket=None, position=None):
+        lo = _to_epoch(date_from) if date_from is not None else float('-inf')
+        hi = _to_epoch(date_to) if date_to is not None else float('inf')
+        return tuple(d for d in self._deals
+                     if lo <= d.time_msc / 1000 <= hi and (ticket is None or d.ticket == ticket)
+                     and (position is None or d.position_id == position))
+
+    # ------------------------------------------------------------------ trading
+
+    def _result(self, retcode, request, comment, deal=0, order=0, volume=0.0, price=0.0, bid=0.0, ask=0.0):
+        if retcode != self.TRADE_RETCODE_DONE:
+            self._last_error = (retcode, comment)
+        return OrderSendResult(retcode, deal, order, volume, price, bid, ask, comment, 0, 0, request)
+
+    def _record_deal(self, position, deal_type, entry, volume, price, profit, reason, now):
+        commission = -self.commission_per_lot * volume
+        self.balance += profit + commission
+        deal = TradeDeal(
+            ticket=self._next_ticket, order=self._next_ticket, time=int(now), time_msc=int(now * 1000),
+            type=deal_type, entry=entry, magic=position['magic'], position_id=position['ticket'], reason=reason,
+            volume=volume, price=price, commission=commission, swap=0.0, profit=profit, fee=0.0,
+            symbol=position['symbol'], comment=position['comment'], external_id='')
+        self._next_ticket += 1
+        self._deals.append(deal)
+        return deal
+
+    def _close(self, position, volume, price, reason, now):
+        spec = self._symbols[position['symbol']]
+        sign = 1 if position['type'] == self.POSITION_TYPE_BUY else -1
+        profit = sign * (price - position['price_open']) * volume * spec['trade_contract_size']
+        deal_type = self.DEAL_TYPE_SELL if position['type'] == self.POSITION_TYPE_BUY else self.DEAL_TYPE_BUY
+        deal = self._record_deal(position, deal_type, self.DEAL_ENTRY_OUT, volume, price, profit, reason, now)
+        position['volume'] = round(position['volume'] - volume, 8)
+        if position['volume'] <= 0:
+            del self._positions[position['ticket']]
+        return deal
+
+    def _stops_valid(self, symbol, side, sl, tp, bid, ask):
+        spec = self._symbols[symbol]
+        distance = spec['trade_stops_level'] * spec['point']
+        if side == self.ORDER_TYPE_BUY:
+            return (not sl or sl < bid - distance) and (not tp or tp > bid + distance)
+        return (not sl or sl > ask + distance) and (not tp or tp < ask - distance)
+
+    def _check_stops(self):
+        """Close positions whose stop loss / take profit was touched since the last check."""
+        with self._lock:
+            now = self.clock.now()
+            for symbol in {p['symbol'] for p in self._positions.values()}:
+                since = self._checked_until.get(symbol, now)
+                self._checked_until[symbol] = now
+                if now <= since:
+                    continue
+                times, bid_low, bid_high, ask_low, ask_high, _ = self._price_path(symbol, since, now)
+                if not len(times):
+                    continue
+                for position in [p for p in self._positions.values() if p['symbol'] == symbol]:
+                    self._check_position_stops(position, times, bid_low, bid_high, ask_low, ask_high)
+
+    def _check_position_stops(self, position, times, bid_low, bid_high, ask_low, ask_high):
+        after = times > position['time']
+        sl, tp = position['sl'], position['tp']
+        if position['type'] == self.POSITION_TYPE_BUY:
+            sl_hit = after & (bid_low <= sl) if sl else np.zeros(len(times), dtype=bool)
+            tp_hit = after & (bid_high >= tp) if tp else np.zeros(len(times), dtype=bool)
+            worse = np.minimum
+        else:
+            sl_hit = after & (ask_high >= sl) if sl else np.zeros(len(times), dtype=bool)
+            tp_hit = after & (ask_low <= tp) if tp else np.zeros(len(times), dtype=bool)
+            worse = np.maximum
+        first_sl = int(np.argmax(sl_hit)) if sl_hit.any() else None
+        first_tp = int(np.argmax(tp_hit)) if tp_hit.any() else None
+        if first_sl is None and first_tp is None:
+            return
+        # Stop loss first when both are touched within the same price step
+        if first_sl is not None and (first_tp is None or first_sl <= first_tp):
+            # Gaps through the stop fill at the worse price
+            touched = bid_low[first_sl] if position['type'] == self.POSITION_TYPE_BUY else ask_high[first_sl]
+            self._close(position, position['volume'], float(worse(sl, touched)), self.DEAL_REASON_SL,
+                        float(times[first_sl]))
+        else:
+            self._close(position, position['volume'], float(tp), self.DEAL_REASON_TP, float(times[first_tp]))
+
+    def order_send(self, request):
+        """Execute a TRADE_ACTION_DEAL (open / close by ``position``) or TRADE_ACTION_SLTP request."""
+        with self._lock:
+            self._check_stops()
+            symbol = request.get('symbol')
+            if symbol not in self._symbols:
+                return self._result(self.TRADE_RETCODE_INVALID, request, "Unknown symbol")
+            spec = self._symbols[symbol]
+            now = self.clock.now()
+            quote = self._quote(symbol, now)
+            if quote is None:
+                return self._result(self.TRADE_RETCODE_MARKET_CLOSED, request, "No prices")
+            bid, ask = quote[0], quote[1]
+            action = request.get('action')
+
+            if action == self.TRADE_ACTION_SLTP:
+                position = self._positions.get(request.get('position'))
+                if position is None:
+                    return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, "Position not found")
+                sl, tp = request.get('sl', 0.0), request.get('tp', 0.0)
+                if not self._stops_valid(symbol, position['type'], sl, tp, bid, ask):
+                    return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, "Invalid stops", bid=bid, ask=ask)
+                position.update(sl=sl, tp=tp, time_update=now)
+                return self._result(self.TRADE_RETCODE_DONE, request, "Request executed",
+                                    order=position['ticket'], bid=bid, ask=ask)
+
+            if action != self.TRADE_ACTION_DEAL:
+                return self._result(self.TRADE_RETCODE_INVALID, request, "Unsupported trade action")
+            if spec['trade_mode'] == self.SYMBOL_TRADE_MODE_DISABLED:
+                return self._result(self.TRADE_RETCODE_MARKET_CLOSED, request, "Trade disabled")
+            filling = request.get('type_filling', self.ORDER_FILLING_FOK)
+            if filling != self.ORDER_FILLING_RETURN and not spec['filling_mode'] & (1 << filling):
+                return self._result(self.TRADE_RETCODE_INVALID_FILL, request, "Unsupported filling mode")
+
+            side = request.get('type')
+            volume = float(request.get('volume', 0.0))
+            steps = volume / spec['volume_step']
+            if volume < spec['volume_min'] or volume > spec['volume_max'] or abs(steps - round(steps)) > 1e-6:
+                return self._result(self.TRADE_RETCODE_INVALID_VOLUME, request, "Invalid volume")
+
+            slippage = self.slippage_points * spec['point']
+            price = ask + slippage if side == self.ORDER_TYPE_BUY else bid - slippage
+            price = round(price, spec['digits'])
+            requested = request.get('price')
+            deviation = request.get('deviation')
+            if requested and deviation is not None and abs(price - requested) > deviation * spec['point']:
+                return self._result(self.TRADE_RETCODE_REQUOTE, request, "Requote", bid=bid, ask=ask)
+
+            if request.get('position'):
+                position = self._positions.get(request['position'])
+                if position is None:
+                    return self._result(self.TRADE_RETCODE_POSITION_CLOSED, request, "Position not found")
+                if side == position['type'] or volume > position['volume'] + 1e-9:
+                    return self._result(self.TRADE_RETCODE_INVALID, request, "Invalid close request")
+                deal = self._close(position, volume, price, self.DEAL_REASON_EXPERT, now)
+                return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", deal=deal.ticket,
+                                    order=deal.order, volume=volume, price=price, bid=bid, ask=ask)
+
+            sl, tp = request.get('sl', 0.0), request.get('tp', 0.0)
+            if not self._stops_valid(symbol, side, sl, tp, bid, ask):
+                return self._result(self.TRADE_RETCODE_INVALID_STOPS, request, "Invalid stops", bid=bid, ask=ask)
+            profit, margin = self._floating()
+            required = volume * spec['trade_contract_size'] * price / self.leverage
+            if required > self.balance + profit - margin:
+                return self._result(self.TRADE_RETCODE_NO_MONEY, request, "No money", bid=bid, ask=ask)
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            position = {
+                'ticket': ticket, 'symbol': symbol, 'type': side, 'volume': volume, 'price_open': price,
+                'sl': sl, 'tp': tp, 'magic': request.get('magic', 0), 'comment': request.get('comment', ''),
+                'time': now, 'time_update': now,
+            }
+            self._positions[ticket] = position
+            self._checked_until[symbol] = now
+            deal_type = self.DEAL_TYPE_BUY if side == self.ORDER_TYPE_BUY else self.DEAL_TYPE_SELL
+            deal = self._record_deal(position, deal_type, self.DEAL_ENTRY_IN, volume, price, 0.0,
+                                     self.DEAL_REASON_EXPERT, now)
+            return self._result(self.TRADE_RETCODE_DONE, request, "Request executed", deal=deal.ticket,
+                                order=ticket, volume=volume, price=price, bid=bid, ask=ask)
+
+
+def install(replay):
+    """
+    Serve ``import MetaTrader5`` from ``replay``.
+
+    Modules that already imported the real (or another) MetaTrader5 as
+    ``mt5`` are re-pointed too. Undo with :func:`uninstall`.
+    """
+    previous = sys.modules.get('MetaTrader5')
+    repointed = []
+    for module in list(sys.modules.values()):
+        if module is not None and previous is not None and getattr(module, 'mt5', None) is previous:
+            module.mt5 = replay
+            repointed.append(module)
+    sys.modules['MetaTrader5'] = replay
+    replay._installed = (previous, repointed)
+    return replay
+
+
+def uninstall(replay):
+    """Restore the MetaTrader5 module that was active before :func:`install`."""
+    if not replay._installed:
+        return
+    previous, repointed = replay._installed
+    for module in repointed:
+        module.mt5 = previous
+    if previous is None:
+        sys.modules.pop('MetaTrader5', None)
+    else:
+        sys.modules['MetaTrader5'] = previous
+    replay._installed = None
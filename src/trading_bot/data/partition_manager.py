@@ -0,0 +1,220 @@
+import os
+import glob
+import sqlite3
+import logging
+from datetime import datetime, timedelta
+
+logger = logging.getLogger("PartitionManager")
+
+# Tables moved out of the live database once their month is closed
+PARTITIONED_TABLES = {
+    'market_data': '''
+        CREATE TABLE IF NOT EXISTS {schema}.market_data (
+            timestamp DATETIME,
+            symbol TEXT,
+            timeframe TEXT,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume INTEGER,
+            PRIMARY KEY (timestamp, symbol, timeframe)
+        )
+    ''',
+    'account_metrics': '''
+        CREATE TABLE IF NOT EXISTS {schema}.account_metrics (
+            timestamp DATETIME,
+            balance REAL,
+            equity REAL,
+            margin REAL,
+            free_margin REAL,
+            margin_level REAL,
+            total_profit REAL,
+            symbol_pnl REAL,
+            PRIMARY KEY (timestamp)
+        )
+    ''',
+}
+
+PARTITION_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_market_data_symbol_timestamp ON market_data (symbol, timestamp)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_market_data_symbol_tf_timestamp ON market_data (symbol, timeframe, timestamp)",
+]
+
+
+def _month_start(dt):
+    return datetime(dt.year, dt.month, 1)
+
+
+def _add_months(dt, months):
+    month = dt.month - 1 + months
+    return datetime(dt.year + month // 12, month % 12 + 1, 1)
+
+
+def _ts(dt):
+    # Same text layout as the sqlite3 datetime adapter, so string comparison orders correctly
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PartitionManager:
+    """
+    Monthly partitions and retention for ``market_data`` and ``account_metrics``.
+
+    The live database keeps the current month plus ``hot_months`` closed months.
+    Older rows are moved into one read-only-in-practice SQLite file per month
+    (``partitions/<db name>_YYYY_MM.db``), so the live file and its indexes stay
+    the same size as history grows. Account metrics older than
+    ``downsample_after_days`` are reduced to one row (the last) per
+    ``metrics_resolution`` seconds.
+
+    Readers use :meth:`fetch_newest`, which continues into partitions
+    (newest first) when the live database does not have enough rows.
+    """
+
+    def __init__(self, db_path, partition_dir=None, hot_months=1, downsample_after_days=7,
+                 metrics_resolution=60):
+        self.db_path = db_path
+        self.partition_dir = partition_dir or os.path.join(os.path.dirname(os.path.abspath(db_path)), "partitions")
+        self.hot_months = hot_months
+        self.downsample_after_days = downsample_after_days
+        self.metrics_resolution = metrics_resolution
+        self.prefix = os.path.splitext(os.path.basename(db_path))[0]
+
+    # ------------------------------------------------------------------ partition files
+
+    def partition_path(self, month):
+        return os.path.join(self.partition_dir, f"{self.prefix}_{month:%Y_%m}.db")
+
+    def partition_files(self):
+        """Existing partition files, newest month first."""
+        pattern = os.path.join(self.partition_dir, f"{self.prefix}_[0-9][0-9][0-9][0-9]_[0-9][0-9].db")
+        return sorted(glob.glob(pattern), reverse=True)
+
+    def fetch_newest(self, conn, sql, params, limit):
+        """
+        Run ``sql`` (ordered newest first, ending in ``LIMIT ?``) on the live
+        database, then on partitions until ``limit`` rows are collected.
+
+        Args:
+            conn: live database connection
+            sql: query against unqualified table names
+            params: query parameters, without the limit
+
+        Returns:
+            list: rows (as returned by the connection's row_factory), newest first
+        """
+        rows = list(conn.execute(sql, (*params, limit)).fetchall())
+        for path in self.partition_files():
+            if len(rows) >= limit:
+                break
+            try:
+                part = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+                part.row_factory = conn.row_factory
+                try:
+                    rows.extend(part.execute(sql, (*params, limit - len(rows))).fetchall())
+                finally:
+                    part.close()
+            except sqlite3.OperationalError as e:
+                # Partition without this table (e.g. a month with only metrics)
+                logger.debug(f"Skipping partition {os.path.basename(path)}: {e}")
+        return rows
+
+    # ------------------------------------------------------------------ maintenance
+
+    def run(self, now=None):
+        """
+        Downsample old metrics and move closed months out of the live database.
+
+        Returns:
+            dict: {'metrics_downsampled': rows deleted, 'rows_partitioned': {table: rows moved}}
+        """
+        now = now or datetime.now()
+        result = {'metrics_downsampled': 0, 'rows_partitioned': {}}
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        try:
+            result['metrics_downsampled'] = self.downsample_metrics(conn, now)
+            result['rows_partitioned'] = self.partition_old_months(conn, now)
+        finally:
+            conn.close()
+        return result
+
+    def downsample_metrics(self, conn, now):
+        """Keep the last account_metrics row per resolution bucket for rows older than the cutoff."""
+        if not self.downsample_after_days or not self.metrics_resolution:
+            return 0
+        start = self._get_watermark(conn, 'downsample_metrics')
+        cutoff = _ts(now - timedelta(days=self.downsample_after_days))
+        if start is not None and start >= cutoff:
+            return 0
+        lower = start or ''
+        with conn:
+            deleted = conn.execute('''
+                DELETE FROM account_metrics
+                WHERE timestamp >= ? AND timestamp < ?
+                AND timestamp NOT IN (
+                    SELECT MAX(timestamp) FROM account_metrics
+                    WHERE timestamp >= ? AND timestamp < ?
+                    GROUP BY CAST(strftime('%s', timestamp) AS INTEGER) / ?
+                )
+            ''', (lower, cutoff, lower, cutoff, self.metrics_resolution)).rowcount
+            self._set_watermark(conn, 'downsample_metrics', cutoff)
+        if deleted:
+            logger.info(f"Downsampled account metrics before {cutoff}: {deleted} rows removed")
+        return deleted
+
+    def partition_old_months(self, conn, now):
+        """Move rows of months before the hot window into their monthly partition files."""
+        cutoff = _add_months(_month_start(now), -self.hot_months)
+        moved = {}
+        for table in PARTITIONED_TABLES:
+            row = conn.execute(f"SELECT MIN(timestamp) FROM {table} WHERE timestamp < ?", (_ts(cutoff),)).fetchone()
+            if not row or not row[0]:
+                continue
+            month = _month_start(datetime.fromisoformat(str(row[0])[:19]))
+            while month < cutoff:
+                count = self._move_month(conn, table, month)
+                if count:
+                    moved[table] = moved.get(table, 0) + count
+                month = _add_months(month, 1)
+        return moved
+
+    def _move_month(self, conn, table, month):
+        lower, upper = _ts(month), _ts(_add_months(month, 1))
+        count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE timestamp >= ? AND timestamp < ?",
+                             (lower, upper)).fetchone()[0]
+        if not count:
+            return 0
+        os.makedirs(self.partition_dir, exist_ok=True)
+        path = self.partition_path(month)
+        conn.execute("ATTACH DATABASE ? AS part", (path,))
+        try:
+            conn.execute(PARTITIONED_TABLES[table].format(schema='part'))
+            for ddl in PARTITION_INDEXES:
+                if f" ON {table} " in ddl:
+                    conn.execute(ddl.format(schema='part'))
+            # Copy is idempotent, so an interrupted move is simply repeated by the next run
+            with conn:
+                conn.execute(f"INSERT OR REPLACE INTO part.{table} SELECT * FROM main.{table} "
+                             f"WHERE timestamp >= ? AND timestamp < ?", (lower, upper))
+                conn.execute(f"DELETE FROM main.{table} WHERE timestamp >= ? AND timestamp < ?", (lower, upper))
+        finally:
+            conn.execute("DETACH DATABASE part")
+        logger.info(f"Moved {count} {table} rows for {month:%Y-%m} to {os.path.basename(path)}")
+        return count
+
+    def _get_watermark(self, conn, task):
+        row = conn.execute("SELECT watermark FROM maintenance_log WHERE task = ?", (task,)).fetchone()
+        return row[0] if row else None
+
+    def _set_watermark(self, conn, task, watermark):
+        conn.execute("REPLACE INTO maintenance_log (task, last_run, watermark) VALUES (?, ?, ?)",
+                     (task, datetime.now(), watermark))
+
+    def last_run(self, conn):
+        row = conn.execute("SELECT last_run FROM maintenance_log WHERE task = 'retention'").fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def mark_run(self, conn, now=None):
+        with conn:
+            conn.execute("REPLACE INTO maintenance_log (task, last_run, watermark) VALUES ('retention', ?, NULL)",
+                         (now or datetime.now(),))
@@ -26,6 +26,7 @@ try:
     from ai.ai_client_factory import AIClientFactory
     from data.mt5_data_processor import MT5DataProcessor
     from data.database_manager import DatabaseManager
+    from data.bar_store import get_bar_store
     from analysis.confluence_analyzer import TrendlineAnalyzer, MomentumAnalyzer, ConfluenceAnalyzer
     from analysis.smc_validator import SMCQualityValidator
     from analysis.breakout_quality_filter import BreakoutQualityFilter
@@ -106,10 +107,12 @@ class SymbolTrader:
         self.confluence_config = DummyConfig()
         
         # 1. Initialize Strategies & Analyzers
-        self.trendline_analyzer = TrendlineAnalyzer(self.confluence_config)
-        self.momentum_analyzer = MomentumAnalyzer(self.confluence_config)
+        # All analyzers read bars from one shared, incrementally updated store
+        self.bar_store = get_bar_store()
+        self.trendline_analyzer = TrendlineAnalyzer(self.confluence_config, bar_store=self.bar_store)
+        self.momentum_analyzer = MomentumAnalyzer(self.confluence_config, bar_store=self.bar_store)
         self.confluence_analyzer = ConfluenceAnalyzer(self.confluence_config)
-        self.smc_validator = SMCQualityValidator()
+        self.smc_validator = SMCQualityValidator(bar_store=self.bar_store)
         self.quality_filter = BreakoutQualityFilter()
         self.advanced_analysis = AdvancedMarketAnalysisAdapter()
         self.data_processor = MT5DataProcessor()
@@ -666,16 +669,9 @@ class SymbolTrader:
                 logger.error(f"Last order details: price={price}, sl={sl}, tp={tp}")
 
     def update_candle_data(self):
-        # Fetch M5 Data
-        rates = mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, 500)
-        if rates is not None:
-            df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
-            
-            # Rename tick_volume to volume for compatibility with analysis modules
-            if 'tick_volume' in df.columns and 'volume' not in df.columns:
-                df.rename(columns={'tick_volume': 'volume'}, inplace=True)
-            
+        # Fetch M5 Data (incremental, shared with the analyzers through the bar store)
+        df = self.get_dataframe(self.timeframe, 500)
+        if df is not None:
             # Update SMC Analyzer's internal data if it uses it
             if hasattr(self.smc_validator, 'update_data'):
                 self.smc_validator.update_data(df)
@@ -939,16 +935,15 @@ class SymbolTrader:
                     except: pass
 
     def get_dataframe(self, timeframe, count):
-        rates = mt5.copy_rates_from_pos(self.symbol, timeframe, 0, count)
-        if rates is None: return None
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
+        df = self.bar_store.get_dataframe(self.symbol, timeframe, count)
+        if df is None: return None
         
         # Rename tick_volume to volume for compatibility with analysis modules
+        # (rename returns a private copy, the store's frame is shared)
         if 'tick_volume' in df.columns and 'volume' not in df.columns:
-            df.rename(columns={'tick_volume': 'volume'}, inplace=True)
+            return df.rename(columns={'tick_volume': 'volume'})
             
-        return df
+        return df.copy()
 
     def shutdown(self):
         """Clean shutdown of the bot and all its components"""
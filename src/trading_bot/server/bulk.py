@@ -0,0 +1,158 @@
+import io
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from sqlalchemy import select, func, tuple_, literal_column, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from sqlalchemy.util import await_only
+
+# PostgreSQL caps one statement at 65535 bind parameters
+PG_MAX_PARAMS = 60000
+# Conservative SQLite default (SQLITE_MAX_VARIABLE_NUMBER before 3.32)
+SQLITE_MAX_PARAMS = 999
+# From this many rows on, PostgreSQL batches are COPYed into a staging table first
+COPY_THRESHOLD = 20000
+
+MARKET_DATA_KEY = ("timestamp", "symbol", "timeframe")
+MARKET_DATA_FIELDS = MARKET_DATA_KEY + ("open", "high", "low", "close", "volume")
+TRADE_KEY = ("ticket",)
+TRADE_FIELDS = ("ticket", "symbol", "action", "volume", "price", "time", "result", "chat_id")
+
+
+def _dedupe(rows: Sequence[Dict], key: Sequence[str]) -> List[Dict]:
+    """Last row wins per key: ON CONFLICT cannot touch the same row twice in one statement."""
+    latest = {}
+    for row in rows:
+        latest[tuple(row[k] for k in key)] = row
+    return list(latest.values())
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _count_existing(db: Session, table, rows, key) -> int:
+    columns = [table.c[k] for k in key]
+    count = 0
+    for chunk in _chunks(rows, max(1, SQLITE_MAX_PARAMS // len(key))):
+        if len(key) == 1:
+            condition = columns[0].in_([row[key[0]] for row in chunk])
+        else:
+            condition = tuple_(*columns).in_([tuple(row[k] for k in key) for row in chunk])
+        count += db.execute(select(func.count()).select_from(table).where(condition)).scalar()
+    return count
+
+
+def _pg_upsert(db: Session, table, rows, key, fields) -> int:
+    inserted = 0
+    for chunk in _chunks(rows, max(1, PG_MAX_PARAMS // len(fields))):
+        stmt = postgresql.insert(table).values([{f: row[f] for f in fields} for row in chunk])
+        stmt = stmt.on_conflict_do_update(index_elements=list(key),
+                                          set_={f: stmt.excluded[f] for f in fields if f not in key})
+        # xmax is 0 only on tuples this statement inserted (updated ones carry our xid)
+        stmt = stmt.returning(literal_column("(xmax = 0)").label("inserted"))
+        inserted += sum(1 for (is_new,) in db.execute(stmt) if is_new)
+    return inserted
+
+
+def _copy_value(value) -> str:
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def _staging_sql(table, key, fields):
+    """CREATE / TRUNCATE for a temp staging table and the INSERT ... SELECT upserting from it."""
+    staging = f"{table.name}_staging"
+    columns = ", ".join(f'"{f}"' for f in fields)
+    updates = ", ".join(f'"{f}" = EXCLUDED."{f}"' for f in fields if f not in key)
+    conflict = ", ".join(f'"{k}"' for k in key)
+    return staging, [
+        f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE "{table.name}" INCLUDING DEFAULTS) ON COMMIT DROP',
+        f"TRUNCATE {staging}",
+    ], (f'INSERT INTO "{table.name}" ({columns}) SELECT {columns} FROM {staging} '
+        f"ON CONFLICT ({conflict}) DO UPDATE SET {updates} RETURNING (xmax = 0)")
+
+
+def _copy_upsert(db: Session, table, rows, key, fields) -> int:
+    """COPY the batch into a temp staging table, then upsert it with one INSERT ... SELECT."""
+    staging, setup, upsert = _staging_sql(table, key, fields)
+    columns = ", ".join(f'"{f}"' for f in fields)
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[f]) for f in fields))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    # Raw psycopg2 connection of the session's transaction
+    cursor = db.connection().connection.cursor()
+    try:
+        for sql in setup:
+            cursor.execute(sql)
+        cursor.copy_expert(f"COPY {staging} ({columns}) FROM STDIN", buffer)
+        cursor.execute(upsert)
+        return sum(1 for (is_new,) in cursor.fetchall() if is_new)
+    finally:
+        cursor.close()
+
+
+def _asyncpg_copy_upsert(db: Session, table, rows, key, fields) -> int:
+    """Same as ``_copy_upsert`` on an asyncpg connection (sync session from ``AsyncSession.run_sync``)."""
+    staging, setup, upsert = _staging_sql(table, key, fields)
+    for sql in setup:
+        db.execute(text(sql))
+    # asyncpg takes Python values and COPYs them in binary format
+    driver = db.connection().connection.driver_connection
+    await_only(driver.copy_records_to_table(staging, records=[tuple(row[f] for f in fields) for row in rows],
+                                            columns=list(fields)))
+    return sum(1 for (is_new,) in db.execute(text(upsert)) if is_new)
+
+
+def _sqlite_upsert(db: Session, table, rows, key, fields):
+    for chunk in _chunks(rows, max(1, SQLITE_MAX_PARAMS // len(fields))):
+        stmt = sqlite.insert(table).values([{f: row[f] for f in fields} for row in chunk])
+        stmt = stmt.on_conflict_do_update(index_elements=list(key),
+                                          set_={f: stmt.excluded[f] for f in fields if f not in key})
+        db.execute(stmt)
+
+
+def bulk_upsert(db: Session, model, rows: Sequence[Dict], key: Sequence[str], fields: Sequence[str]) -> Dict[str, int]:
+    """
+    Insert-or-update ``rows`` into ``model``'s table as set-based statements.
+
+    PostgreSQL uses ``INSERT ... ON CONFLICT (key) DO UPDATE`` over the whole
+    batch (chunked under the bind-parameter limit), or ``COPY`` into a staging
+    table for batches of ``COPY_THRESHOLD`` rows and more (psycopg2, or asyncpg
+    when called through ``AsyncSession.run_sync``). SQLite (local
+    development) uses its own ON CONFLICT upsert; other backends fall back to
+    ``Session.merge``. The caller commits.
+
+    Returns:
+        dict: inserted / updated row counts (duplicate keys in the batch count once)
+    """
+    rows = _dedupe(rows, key)
+    if not rows:
+        return {"inserted": 0, "updated": 0}
+    table = model.__table__
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        if len(rows) >= COPY_THRESHOLD and bind.dialect.driver == "psycopg2":
+            inserted = _copy_upsert(db, table, rows, key, fields)
+        elif len(rows) >= COPY_THRESHOLD and bind.dialect.driver == "asyncpg":
+            inserted = _asyncpg_copy_upsert(db, table, rows, key, fields)
+        else:
+            inserted = _pg_upsert(db, table, rows, key, fields)
+    else:
+        inserted = len(rows) - _count_existing(db, table, rows, key)
+        if bind.dialect.name == "sqlite":
+            _sqlite_upsert(db, table, rows, key, fields)
+        else:
+            for row in rows:
+                db.merge(model(**{f: row[f] for f in fields}))
+    return {"inserted": inserted, "updated": len(rows) - inserted}
@@ -0,0 +1,76 @@
+import os
+from typing import Dict
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from .models import DATABASE_URL
+
+# Pool sizing: every bot keeps a couple of requests in flight and ingestion
+# writes share one flusher connection (see ingest.py), so a small pool serves
+# many bots. A short checkout timeout turns saturation into a quick 503 (which
+# RemoteStorage spools and retries) instead of requests piling up.
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    """Swap a sync driver (psycopg2, pysqlite) for its asyncio counterpart."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ASYNC_DRIVERS:
+        parsed = parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return parsed.render_as_string(hide_password=False)
+
+
+def make_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    url = async_url(url)
+    if make_url(url).get_backend_name() == "sqlite":
+        # Local development: the SQLite dialect picks its own pool
+        return create_async_engine(url)
+    return create_async_engine(
+        url,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+
+engine = make_engine()
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats(engine) -> Dict:
+    """
+    Connection pool occupancy.
+
+    Args:
+        engine: AsyncEngine or Engine
+
+    Returns:
+        dict: size, checked_in, checked_out, overflow, capacity and saturation
+              (checked_out / capacity; 1.0 means new requests wait for a connection)
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if not hasattr(pool, "checkedout"):
+        return stats
+
+    size = pool.size()
+    capacity = size + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    stats.update({
+        "size": size,
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": max(pool.overflow(), 0),
+        "capacity": capacity,
+        "saturation": round(checked_out / capacity, 3) if capacity else 0.0,
+    })
+    return stats
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("IngestBuffer")
+
+# A writer runs on the flusher's sync session (AsyncSession.run_sync) and
+# receives the rows of every request of its kind in the flush, one list per
+# request; it returns one result per request, in the same order.
+Writer = Callable[..., List]
+
+
+class BufferFull(Exception):
+    """Too many rows are waiting for the database; the caller should retry later."""
+
+
+class _Entry:
+    __slots__ = ("writer", "rows", "future", "enqueued")
+
+    def __init__(self, writer, rows, future):
+        self.writer = writer
+        self.rows = rows
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class IngestBuffer:
+    """
+    Server-side micro-batching for ingestion writes (group commit).
+
+    Requests hand their rows to ``submit`` and wait. A single flusher task
+    collects pending requests until ``max_rows`` rows are waiting or the oldest
+    request has waited ``max_delay`` seconds, runs every request's writer in one
+    transaction and commits once, then answers all of them. Many bots posting
+    every second therefore share commits instead of each paying for its own.
+
+    If a combined flush fails, its requests are retried one transaction each so
+    a single bad request does not fail the others.
+    """
+
+    def __init__(self, session_factory, max_rows: int = 2000, max_delay: float = 0.02,
+                 max_pending_rows: int = 200000, latency_window: int = 1000):
+        """
+        Args:
+            session_factory: async_sessionmaker (or any callable returning an async session context)
+            max_rows: flush as soon as this many rows are pending
+            max_delay: flush at the latest this many seconds after the oldest pending request arrived
+            max_pending_rows: beyond this backlog ``submit`` raises BufferFull
+            latency_window: number of recent flushes the latency percentiles cover
+        """
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending_rows = max_pending_rows
+
+        self._pending: List[_Entry] = []
+        self._pending_rows = 0
+        self._has_pending: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self._flush_ms = deque(maxlen=latency_window)
+        self._wait_ms = deque(maxlen=latency_window)
+        self.stats = {
+            "requests": 0,
+            "rows": 0,
+            "flushes": 0,
+            "failed_flushes": 0,
+            "isolated_retries": 0,
+            "failed_requests": 0,
+            "rejected_full": 0,
+        }
+
+    def start(self):
+        """Start the flusher task on the running event loop."""
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._has_pending = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Flush whatever is pending and stop the flusher."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._has_pending.set()
+        self._full.set()
+        await self._task
+        self._task = None
+
+    async def submit(self, writer: Writer, rows: List):
+        """
+        Queue ``rows`` for ``writer`` and wait until they are committed.
+
+        Returns:
+            The writer's result for this request
+
+        Raises:
+            BufferFull: the backlog exceeds ``max_pending_rows``
+            Exception: whatever the write or commit raised
+        """
+        if self._task is None or self._stopping:
+            raise RuntimeError("IngestBuffer is not running")
+        if self._pending_rows + len(rows) > self.max_pending_rows and self._pending:
+            self.stats["rejected_full"] += 1
+            raise BufferFull(f"{self._pending_rows} rows waiting for the database")
+
+        entry = _Entry(writer, rows, asyncio.get_running_loop().create_future())
+        self._pending.append(entry)
+        self._pending_rows += len(rows)
+        self.stats["requests"] += 1
+        self._has_pending.set()
+        if self._pending_rows >= self.max_rows:
+            self._full.set()
+        return await entry.future
+
+    async def _run(self):
+        while True:
+            await self._has_pending.wait()
+            if not self._pending:
+                self._has_pending.clear()
+                if self._stopping:
+                    return
+                continue
+
+            # Size or latency trigger, whichever comes first
+            remaining = self._pending[0].enqueued + self.max_delay - time.monotonic()
+            if remaining > 0 and self._pending_rows < self.max_rows and not self._stopping:
+                try:
+                    await asyncio.wait_for(self._full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending
+            self._pending = []
+            self._pending_rows = 0
+            self._full.clear()
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[_Entry]):
+        started = time.monotonic()
+        try:
+            results = await self._write(batch)
+        except Exception as e:
+            self.stats["failed_flushes"] += 1
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            logger.error(f"Flush of {len(batch)} requests failed, retrying them one by one: {e}")
+            for entry in batch:
+                self.stats["isolated_retries"] += 1
+                try:
+                    result, = await self._write([entry])
+                except Exception as e:
+                    self._fail(entry, e)
+                else:
+                    self._succeed([entry], [result], started)
+            return
+        self._succeed(batch, results, started)
+
+    async def _write(self, batch: List[_Entry]) -> List:
+        async with self.session_factory() as db:
+            try:
+                results = await db.run_sync(_write_groups, batch)
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+        return results
+
+    def _succeed(self, batch: List[_Entry], results: List, started: float):
+        now = time.monotonic()
+        self.stats["flushes"] += 1
+        self._flush_ms.append((now - started) * 1000)
+        for entry, result in zip(batch, results):
+            self.stats["rows"] += len(entry.rows)
+            self._wait_ms.append((now - entry.enqueued) * 1000)
+            if not entry.future.done():
+                entry.future.set_result(result)
+
+    def _fail(self, entry: _Entry, error: Exception):
+        self.stats["failed_requests"] += 1
+        if not entry.future.done():
+            entry.future.set_exception(error)
+
+    def get_stats(self) -> Dict:
+        """Counters, backlog and latency percentiles (ms) over recent flushes."""
+        stats = dict(self.stats)
+        stats["pending_requests"] = len(self._pending)
+        stats["pending_rows"] = self._pending_rows
+        stats["avg_rows_per_flush"] = round(stats["rows"] / stats["flushes"], 1) if stats["flushes"] else 0.0
+        stats["flush_latency_ms"] = _percentiles(self._flush_ms)
+        # Enqueue to commit, as seen by the requests
+        stats["request_latency_ms"] = _percentiles(self._wait_ms)
+        return stats
+
+
+def _write_groups(db, batch: List[_Entry]) -> List:
+    """Run each writer once over all of its requests, in first-arrival order."""
+    groups: Dict[Writer, List[int]] = {}
+    for i, entry in enumerate(batch):
+        groups.setdefault(entry.writer, []).append(i)
+
+    results = [None] * len(batch)
+    for writer, indices in groups.items():
+        for i, result in zip(indices, writer(db, [batch[i].rows for i in indices])):
+            results[i] = result
+    return results
+
+
+def _percentiles(values) -> Dict:
+    if not values:
+        return {"last": None, "p50": None, "p95": None, "max": None}
+    arr = np.fromiter(values, dtype=float)
+    return {
+        "last": round(values[-1], 2),
+        "p50": round(float(np.percentile(arr, 50)), 2),
+        "p95": round(float(np.percentile(arr, 95)), 2),
+        "max": round(float(arr.max()), 2),
+    }
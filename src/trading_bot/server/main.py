@@ -1,75 +1,241 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Header, BackgroundTasks, Request, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import select, insert
+from sqlalchemy.exc import DBAPIError, DataError, IntegrityError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from datetime import datetime
+from typing import List, Optional, Union
 import uvicorn
+import logging
+import gzip
 import os
 
-from . import models, schemas
-from .models import SessionLocal, init_db
+from . import models, schemas, reads
+from .models import init_db
+from .database import engine, AsyncSessionLocal, pool_stats
+from .ingest import IngestBuffer, BufferFull
+from .bulk import bulk_upsert, MARKET_DATA_KEY, MARKET_DATA_FIELDS, TRADE_KEY, TRADE_FIELDS
+
+logger = logging.getLogger("TradingServer")
+
+class GzipRequest(Request):
+    """Request whose body is transparently gunzipped when sent with ``Content-Encoding: gzip``."""
+    async def body(self) -> bytes:
+        if not hasattr(self, "_body"):
+            body = await super().body()
+            if "gzip" in self.headers.get("content-encoding", ""):
+                body = gzip.decompress(body)
+            self._body = body
+        return self._body
+
+class GzipRoute(APIRoute):
+    def get_route_handler(self):
+        original_handler = super().get_route_handler()
+
+        async def handler(request: Request):
+            return await original_handler(GzipRequest(request.scope, request.receive))
+        return handler
 
 app = FastAPI(title="Quant Trading Bot Server")
+# Batches from utils/remote_storage.py may arrive gzip-compressed
+app.router.route_class = GzipRoute
+# Responses (read pages above all) are gzipped for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Ingestion writes are group-committed: one flusher transaction serves every
+# request that arrived within INGEST_MAX_DELAY_MS (or until INGEST_MAX_ROWS rows)
+ingest = IngestBuffer(
+    AsyncSessionLocal,
+    max_rows=int(os.getenv("INGEST_MAX_ROWS", "2000")),
+    max_delay=float(os.getenv("INGEST_MAX_DELAY_MS", "20")) / 1000,
+    max_pending_rows=int(os.getenv("INGEST_MAX_PENDING_ROWS", "200000")),
+)
+server_stats = {"pool_timeouts": 0}
 
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # API Key Auth
 API_KEY = os.getenv("SERVER_API_KEY", "your_secure_api_key_here")
 
-def verify_api_key(x_api_key: str = Header(...)):
+async def verify_api_key(x_api_key: str = Header(...)):
     if x_api_key != API_KEY:
         raise HTTPException(status_code=403, detail="Invalid API Key")
 
 @app.on_event("startup")
-def on_startup():
-    init_db()
+async def on_startup():
+    await init_db(engine)
+    ingest.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await ingest.stop()
+    await engine.dispose()
+
+# --- ERRORS ---
+# 503 tells utils/remote_storage.py to spool and retry; 422 makes it resend record by record
+@app.exception_handler(BufferFull)
+async def on_buffer_full(request: Request, exc: BufferFull):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(PoolTimeoutError)
+async def on_pool_timeout(request: Request, exc: PoolTimeoutError):
+    server_stats["pool_timeouts"] += 1
+    logger.error(f"Database pool exhausted: {exc}")
+    return JSONResponse(status_code=503, content={"detail": "Database busy"}, headers={"Retry-After": "1"})
+
+@app.exception_handler(IntegrityError)
+@app.exception_handler(DataError)
+async def on_bad_rows(request: Request, exc: DBAPIError):
+    return JSONResponse(status_code=422, content={"detail": str(exc.orig)})
+
+@app.exception_handler(DBAPIError)
+async def on_database_error(request: Request, exc: DBAPIError):
+    logger.error(f"Database error: {exc}")
+    return JSONResponse(status_code=503, content={"detail": "Database unavailable"})
+
+@app.get("/api/server/stats", dependencies=[Depends(verify_api_key)])
+async def get_server_stats():
+    # Pool saturation near 1.0 or a growing ingest backlog means the database is the bottleneck
+    return {
+        "pool": {**pool_stats(engine), "timeouts": server_stats["pool_timeouts"]},
+        "ingest": ingest.get_stats(),
+    }
+
+# --- READS ---
+class PageQuery:
+    """Keyset paging, time range, column selection and encoding shared by the read endpoints."""
+    def __init__(self, limit: int = Query(100, ge=1), cursor: Optional[str] = None,
+                 order: Optional[str] = Query(None, pattern="^(asc|desc)$"), fields: Optional[str] = None,
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 format: Optional[str] = Query(None, pattern="^(json|arrow)$")):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+        self.fields = fields
+        self.start = start
+        self.end = end
+        self.format = format
+
+async def _read_page(request: Request, db: AsyncSession, name: str, page: PageQuery, **filters):
+    """
+    One page of ``name``: the body is the row list (JSON, or Arrow IPC with
+    ``format=arrow`` / ``Accept: application/vnd.apache.arrow.stream``); paging
+    travels in headers so the body keeps the shape older clients expect.
+
+    X-Next-Cursor continues the listing, X-Has-More tells whether it has more
+    rows now, X-Delta-Cursor is an ascending cursor after the newest row served
+    (poll it with ``cursor=`` for incremental deltas).
+    """
+    resource = reads.RESOURCES[name]
+    try:
+        fields = reads.parse_fields(resource, page.fields)
+        stmt, order = reads.select_page(resource, fields, page.limit, order=page.order, cursor=page.cursor,
+                                        start=page.start, end=page.end, filters=filters)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    rows = (await db.execute(stmt)).all()
+    result = reads.make_page(resource, rows, fields, page.limit, order, cursor=page.cursor)
+
+    headers = {"X-Has-More": "1" if result["has_more"] else "0"}
+    if result["next_cursor"]:
+        headers["X-Next-Cursor"] = result["next_cursor"]
+    if result["delta_cursor"]:
+        headers["X-Delta-Cursor"] = result["delta_cursor"]
+
+    arrow = page.format == "arrow" or (page.format is None and
+                                       reads.ARROW_MEDIA_TYPE in request.headers.get("accept", ""))
+    if arrow:
+        if reads.pa is None:
+            raise HTTPException(status_code=406, detail="Arrow responses need pyarrow on the server")
+        content = reads.encode_arrow(resource, fields, result["rows"])
+        return Response(content=content, media_type=reads.ARROW_MEDIA_TYPE, headers=headers)
+    return Response(content=reads.encode_json(fields, result["rows"]), media_type="application/json",
+                    headers=headers)
+
+# --- WRITERS ---
+# Run on the flusher's session: each receives one row list per request and
+# returns one result per request (see ingest.IngestBuffer)
+def _inserter(model):
+    def write(db: Session, batches: List[List[dict]]) -> List[int]:
+        rows = [row for batch in batches for row in batch]
+        if rows:
+            # One executemany INSERT for every request in the flush
+            db.execute(insert(model), rows)
+        return [len(batch) for batch in batches]
+    return write
+
+_write_signals = _inserter(models.Signal)
+_write_metrics = _inserter(models.AccountMetric)
+
+def _write_trades(db: Session, batches: List[List[dict]]):
+    # One INSERT ... ON CONFLICT (ticket) DO UPDATE per request
+    return [bulk_upsert(db, models.Trade, rows, TRADE_KEY, TRADE_FIELDS) for rows in batches]
+
+TRADE_UPDATE_FIELDS = ("close_price", "close_time", "profit", "mfe", "mae", "result")
+
+def _write_trade_updates(db: Session, batches: List[List[dict]]):
+    tickets = list({update["ticket"] for batch in batches for update in batch})
+    trades = {}
+    for i in range(0, len(tickets), 500):
+        query = select(models.Trade).where(models.Trade.ticket.in_(tickets[i:i + 500]))
+        trades.update((trade.ticket, trade) for trade in db.scalars(query))
+
+    missing = []
+    for batch in batches:
+        missing.append([])
+        for update in batch:
+            db_trade = trades.get(update["ticket"])
+            if db_trade is None:
+                missing[-1].append(update["ticket"])
+                continue
+            for field in TRADE_UPDATE_FIELDS:
+                setattr(db_trade, field, update[field])
+    return missing
+
+def _write_market_data(db: Session, batches: List[List[dict]]):
+    # One INSERT ... ON CONFLICT (timestamp, symbol, timeframe) DO UPDATE per request (COPY for large backfills)
+    return [bulk_upsert(db, models.MarketData, rows, MARKET_DATA_KEY, MARKET_DATA_FIELDS) for rows in batches]
 
 # --- TRADES ---
 @app.post("/api/trades", dependencies=[Depends(verify_api_key)])
-def create_trade(trade: schemas.TradeCreate, db: Session = Depends(get_db)):
-    db_trade = models.Trade(**trade.dict())
-    # Upsert logic (simplified: merge)
-    existing = db.query(models.Trade).filter(models.Trade.ticket == trade.ticket).first()
-    if existing:
-        for key, value in trade.dict().items():
-            setattr(existing, key, value)
-    else:
-        db.add(db_trade)
-    db.commit()
-    return {"status": "ok"}
+async def create_trade(trade: schemas.TradeCreate):
+    counts = await ingest.submit(_write_trades, [trade.dict()])
+    return {"status": "ok", **counts}
+
+@app.post("/api/trades/batch", dependencies=[Depends(verify_api_key)])
+async def create_trades_batch(trades: List[schemas.TradeCreate]):
+    counts = await ingest.submit(_write_trades, [trade.dict() for trade in trades])
+    return {"status": "ok", "count": len(trades), **counts}
 
 @app.post("/api/trades/update", dependencies=[Depends(verify_api_key)])
-def update_trade(update: schemas.TradeUpdate, db: Session = Depends(get_db)):
-    db_trade = db.query(models.Trade).filter(models.Trade.ticket == update.ticket).first()
-    if not db_trade:
+async def update_trade(update: schemas.TradeUpdate):
+    if await ingest.submit(_write_trade_updates, [update.dict()]):
         raise HTTPException(status_code=404, detail="Trade not found")
-    
-    db_trade.close_price = update.close_price
-    db_trade.close_time = update.close_time
-    db_trade.profit = update.profit
-    db_trade.mfe = update.mfe
-    db_trade.mae = update.mae
-    db_trade.result = update.result
-    
-    db.commit()
     return {"status": "updated"}
 
+@app.post("/api/trades/update/batch", dependencies=[Depends(verify_api_key)])
+async def update_trades_batch(updates: List[schemas.TradeUpdate]):
+    # Unknown tickets are reported, not fatal: the rest of the batch still applies
+    missing = await ingest.submit(_write_trade_updates, [update.dict() for update in updates])
+    return {"status": "updated", "count": len(updates) - len(missing), "missing": missing}
+
 @app.get("/api/trades", dependencies=[Depends(verify_api_key)])
-def get_trades(limit: int = 100, symbol: Optional[str] = None, db: Session = Depends(get_db)):
-    query = db.query(models.Trade)
-    if symbol:
-        query = query.filter(models.Trade.symbol == symbol)
-    return query.order_by(models.Trade.time.desc()).limit(limit).all()
+async def get_trades(request: Request, page: PageQuery = Depends(), symbol: Optional[str] = None,
+                     result: Optional[str] = None, chat_id: Optional[str] = None,
+                     db: AsyncSession = Depends(get_db)):
+    return await _read_page(request, db, "trades", page, symbol=symbol, result=result, chat_id=chat_id)
 
 # --- SIGNALS ---
-@app.post("/api/signals", dependencies=[Depends(verify_api_key)])
-def create_signal(signal: schemas.SignalCreate, db: Session = Depends(get_db)):
+def _signal_row(signal: schemas.SignalCreate) -> dict:
     # Map schema to model
-    db_signal = models.Signal(
+    return dict(
         timestamp=signal.timestamp,
         symbol=signal.symbol,
         timeframe=signal.timeframe,
@@ -79,64 +245,64 @@ def create_signal(signal: schemas.SignalCreate, db: Session = Depends(get_db)):
         details=signal.details,
         chat_id=signal.chat_id
     )
-    db.add(db_signal)
-    db.commit()
+
+@app.post("/api/signals", dependencies=[Depends(verify_api_key)])
+async def create_signal(signal: schemas.SignalCreate):
+    await ingest.submit(_write_signals, [_signal_row(signal)])
     return {"status": "ok"}
 
+@app.post("/api/signals/batch", dependencies=[Depends(verify_api_key)])
+async def create_signals_batch(signals: List[schemas.SignalCreate]):
+    await ingest.submit(_write_signals, [_signal_row(signal) for signal in signals])
+    return {"status": "ok", "count": len(signals)}
+
+@app.get("/api/signals", dependencies=[Depends(verify_api_key)])
+async def get_signals(request: Request, page: PageQuery = Depends(), symbol: Optional[str] = None,
+                      timeframe: Optional[str] = None, source: Optional[str] = None,
+                      chat_id: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    return await _read_page(request, db, "signals", page, symbol=symbol, timeframe=timeframe,
+                            source=source, chat_id=chat_id)
+
 # --- ACCOUNT METRICS ---
 @app.post("/api/account_metrics", dependencies=[Depends(verify_api_key)])
-def create_metric(metric: schemas.AccountMetricCreate, db: Session = Depends(get_db)):
-    db_metric = models.AccountMetric(**metric.dict())
-    db.add(db_metric)
-    db.commit()
+async def create_metric(metric: schemas.AccountMetricCreate):
+    await ingest.submit(_write_metrics, [metric.dict()])
     return {"status": "ok"}
 
+@app.post("/api/account_metrics/batch", dependencies=[Depends(verify_api_key)])
+async def create_metrics_batch(metrics: List[schemas.AccountMetricCreate]):
+    await ingest.submit(_write_metrics, [metric.dict() for metric in metrics])
+    return {"status": "ok", "count": len(metrics)}
+
+@app.get("/api/account_metrics", dependencies=[Depends(verify_api_key)])
+async def get_account_metrics(request: Request, page: PageQuery = Depends(), chat_id: Optional[str] = None,
+                              db: AsyncSession = Depends(get_db)):
+    return await _read_page(request, db, "account_metrics", page, chat_id=chat_id)
+
 # --- MARKET DATA ---
 @app.post("/api/market_data", dependencies=[Depends(verify_api_key)])
-def create_market_data(data: schemas.MarketDataCreate, db: Session = Depends(get_db)):
-    # Upsert logic for market data
-    existing = db.query(models.MarketData).filter(
-        models.MarketData.timestamp == data.timestamp,
-        models.MarketData.symbol == data.symbol,
-        models.MarketData.timeframe == data.timeframe
-    ).first()
-    
-    if existing:
-        existing.open = data.open
-        existing.high = data.high
-        existing.low = data.low
-        existing.close = data.close
-        existing.volume = data.volume
-    else:
-        db_data = models.MarketData(**data.dict())
-        db.add(db_data)
-    
-    db.commit()
-    return {"status": "ok"}
+async def create_market_data(data: schemas.MarketDataCreate):
+    counts = await ingest.submit(_write_market_data, [data.dict()])
+    return {"status": "ok", **counts}
 
 @app.post("/api/market_data/batch", dependencies=[Depends(verify_api_key)])
-def create_market_data_batch(data_list: List[schemas.MarketDataCreate], db: Session = Depends(get_db)):
-    # Simplified batch insert
-    # In production, use bulk_insert_mappings for performance
-    for data in data_list:
-        existing = db.query(models.MarketData).filter(
-            models.MarketData.timestamp == data.timestamp,
-            models.MarketData.symbol == data.symbol,
-            models.MarketData.timeframe == data.timeframe
-        ).first()
-        
-        if existing:
-            existing.open = data.open
-            existing.high = data.high
-            existing.low = data.low
-            existing.close = data.close
-            existing.volume = data.volume
-        else:
-            db_data = models.MarketData(**data.dict())
-            db.add(db_data)
-    
-    db.commit()
-    return {"status": "ok", "count": len(data_list)}
+async def create_market_data_batch(payload: Union[schemas.MarketDataColumnar, List[schemas.MarketDataCreate]]):
+    # Row records or one columnar payload (see utils/remote_storage.encode_market_data)
+    if isinstance(payload, schemas.MarketDataColumnar):
+        try:
+            rows = payload.rows()
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    else:
+        rows = [data.dict() for data in payload]
+
+    counts = await ingest.submit(_write_market_data, rows)
+    return {"status": "ok", "count": len(rows), **counts}
+
+@app.get("/api/market_data", dependencies=[Depends(verify_api_key)])
+async def get_market_data(request: Request, page: PageQuery = Depends(), symbol: Optional[str] = None,
+                          timeframe: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    return await _read_page(request, db, "market_data", page, symbol=symbol, timeframe=timeframe)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,6 +1,5 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, BigInteger
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, BigInteger, Index, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 import os
 from datetime import datetime
 from dotenv import load_dotenv
@@ -19,9 +18,6 @@ os.environ["PGCLIENTENCODING"] = "utf-8"
 if "postgresql://" in DATABASE_URL and "postgresql+psycopg2://" not in DATABASE_URL:
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg2://")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 Base = declarative_base()
 
 class Trade(Base):
@@ -40,6 +36,11 @@ class Trade(Base):
     mfe = Column(Float, nullable=True)
     mae = Column(Float, nullable=True)
     chat_id = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Keyset of GET /api/trades (reads.py): last change (close, else open), then ticket
+        Index("ix_trades_changed", func.coalesce(close_time, time), ticket),
+    )
     
 class Signal(Base):
     __tablename__ = "signals"
@@ -80,9 +81,10 @@ class MarketData(Base):
     close = Column(Float)
     volume = Column(Float)
 
-def init_db():
+async def init_db(engine):
     try:
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
     except Exception as e:
         print("\n" + "="*50)
         print("❌ CRITICAL DATABASE ERROR")
@@ -0,0 +1,208 @@
+import base64
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import DateTime, Float, Integer, BigInteger, JSON, func, select, tuple_
+
+from . import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Larger requests are clamped; the client follows X-Next-Cursor for the rest
+MAX_PAGE_SIZE = 50000
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+class Resource:
+    """
+    A readable table: its keyset (a unique, totally ordered key), the column
+    time-range filters apply to and the columns clients may filter on by equality.
+    """
+
+    def __init__(self, name, model, key, time_column, filters):
+        self.name = name
+        self.model = model
+        self.key = list(key)
+        self.time_column = time_column
+        self.filters = tuple(filters)
+        self.table = model.__table__
+        self.columns = [column.name for column in self.table.columns]
+
+
+RESOURCES = {
+    # A trade moves to the end of the keyset when it closes (close_time > time),
+    # so delta readers see the close as well as the open
+    "trades": Resource("trades", models.Trade,
+                       [func.coalesce(models.Trade.close_time, models.Trade.time), models.Trade.ticket],
+                       models.Trade.time, ("symbol", "result", "chat_id")),
+    "signals": Resource("signals", models.Signal, [models.Signal.id],
+                        models.Signal.timestamp, ("symbol", "timeframe", "source", "chat_id")),
+    "account_metrics": Resource("account_metrics", models.AccountMetric, [models.AccountMetric.id],
+                                models.AccountMetric.timestamp, ("chat_id",)),
+    "market_data": Resource("market_data", models.MarketData,
+                            [models.MarketData.timestamp, models.MarketData.symbol, models.MarketData.timeframe],
+                            models.MarketData.timestamp, ("symbol", "timeframe")),
+}
+
+
+def encode_cursor(resource: Resource, order: str, values: Sequence) -> str:
+    """Opaque, URL-safe position after ``values`` (the key of the last row served)."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps([resource.name, order, values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(resource: Resource, cursor: str):
+    """
+    Returns:
+        tuple: (order, key values)
+
+    Raises:
+        ValueError: malformed cursor or one issued for another resource
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        name, order, values = json.loads(raw)
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if name != resource.name or order not in ("asc", "desc") or len(values) != len(resource.key):
+        raise ValueError(f"Cursor does not belong to {resource.name}")
+    try:
+        values = [datetime.fromisoformat(value) if isinstance(expr.type, DateTime) and value is not None else value
+                  for expr, value in zip(resource.key, values)]
+    except (TypeError, ValueError):
+        raise ValueError("Malformed cursor")
+    return order, values
+
+
+def parse_fields(resource: Resource, fields: Optional[str]) -> List[str]:
+    """Comma-separated column list (all columns when empty)."""
+    if not fields:
+        return list(resource.columns)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in resource.columns]
+    if unknown:
+        raise ValueError(f"Unknown {resource.name} fields: {', '.join(unknown)}")
+    return names
+
+
+def select_page(resource: Resource, fields: List[str], limit: int, order: Optional[str] = None,
+                cursor: Optional[str] = None, start: Optional[datetime] = None,
+                end: Optional[datetime] = None, filters: Optional[Dict] = None):
+    """
+    Keyset page query: ``fields`` plus the key (labelled ``_k0``...), one row
+    beyond ``limit`` to tell whether more follow.
+
+    Args:
+        order: "desc" (newest first, the default) or "asc"; a cursor carries its own
+        cursor: continue after this position (from a previous page)
+        start, end: time range on the resource's time column, [start, end)
+        filters: column -> value equality filters (None values are ignored)
+
+    Returns:
+        tuple: (statement, order)
+
+    Raises:
+        ValueError: bad cursor or an order contradicting it
+    """
+    after = None
+    if cursor:
+        cursor_order, after = decode_cursor(resource, cursor)
+        if order and order != cursor_order:
+            raise ValueError(f"Cursor continues an '{cursor_order}' listing")
+        order = cursor_order
+    order = order or "desc"
+
+    keys = resource.key
+    stmt = select(*[resource.table.c[name] for name in fields],
+                  *[expr.label(f"_k{i}") for i, expr in enumerate(keys)])
+    if after is not None:
+        # Row-value comparison walks a composite index in one range scan
+        lhs = keys[0] if len(keys) == 1 else tuple_(*keys)
+        rhs = after[0] if len(keys) == 1 else tuple_(*after)
+        stmt = stmt.where(lhs > rhs if order == "asc" else lhs < rhs)
+    if start is not None:
+        stmt = stmt.where(resource.time_column >= start)
+    if end is not None:
+        stmt = stmt.where(resource.time_column < end)
+    for name, value in (filters or {}).items():
+        if value is not None:
+            stmt = stmt.where(resource.table.c[name] == value)
+
+    stmt = stmt.order_by(*[expr.asc() if order == "asc" else expr.desc() for expr in keys])
+    return stmt.limit(min(limit, MAX_PAGE_SIZE) + 1), order
+
+
+def make_page(resource: Resource, rows: Sequence, fields: List[str], limit: int, order: str,
+              cursor: Optional[str] = None) -> Dict:
+    """
+    Split a ``select_page`` result into the page and its cursors.
+
+    Returns:
+        dict: rows (tuples of ``fields``), has_more, next_cursor (continue this
+              listing) and delta_cursor (ascending position after the newest row
+              served: poll it for rows added or trades closed since)
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    n = len(fields)
+
+    next_cursor = encode_cursor(resource, order, rows[-1][n:]) if rows else cursor
+    if rows:
+        newest = rows[-1] if order == "asc" else rows[0]
+        delta_cursor = encode_cursor(resource, "asc", newest[n:])
+    else:
+        delta_cursor = cursor if order == "asc" else None
+    return {
+        "rows": [row[:n] for row in rows],
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+        "delta_cursor": delta_cursor,
+    }
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_json(fields: List[str], rows: Sequence) -> bytes:
+    """List of row objects, the shape ``GET /api/trades`` has always returned."""
+    return json.dumps([dict(zip(fields, row)) for row in rows], default=_json_default,
+                      separators=(",", ":")).encode()
+
+
+def _arrow_type(column):
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, (Integer, BigInteger)):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    return pa.string()
+
+
+def encode_arrow(resource: Resource, fields: List[str], rows: Sequence) -> bytes:
+    """Arrow IPC stream of the page, one typed column per field (JSON columns as JSON text)."""
+    if pa is None:
+        raise ImportError("pyarrow is required for Arrow responses (pip install pyarrow)")
+    arrays = []
+    for i, name in enumerate(fields):
+        column = resource.table.c[name]
+        values = [row[i] for row in rows]
+        if isinstance(column.type, JSON):
+            values = [None if value is None else json.dumps(value, default=_json_default) for value in values]
+        arrays.append(pa.array(values, type=_arrow_type(column)))
+    table = pa.Table.from_arrays(arrays, names=fields)
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
 class TradeCreate(BaseModel):
@@ -46,8 +46,36 @@ class MarketDataCreate(BaseModel):
     timestamp: datetime
     symbol: str
     timeframe: str
-    open: float
-    high: float
-    low: float
-    close: float
-    volume: float
+    # Clients send null for missing (NaN) values
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+    volume: Optional[float] = None
+
+class MarketDataColumns(BaseModel):
+    timestamp: List[datetime]
+    open: List[Optional[float]]
+    high: List[Optional[float]]
+    low: List[Optional[float]]
+    close: List[Optional[float]]
+    volume: List[Optional[float]]
+
+class MarketDataColumnar(BaseModel):
+    """Column-oriented candle batch for one symbol/timeframe (utils/remote_storage.encode_market_data)."""
+    format: Literal["columnar"]
+    symbol: str
+    timeframe: str
+    chat_id: Optional[str] = None
+    columns: MarketDataColumns
+
+    def rows(self) -> List[Dict[str, Any]]:
+        c = self.columns
+        lengths = {len(c.timestamp), len(c.open), len(c.high), len(c.low), len(c.close), len(c.volume)}
+        if len(lengths) > 1:
+            raise ValueError("Columnar market data has columns of different lengths")
+        return [
+            {"timestamp": t, "symbol": self.symbol, "timeframe": self.timeframe,
+             "open": o, "high": h, "low": l, "close": cl, "volume": v}
+            for t, o, h, l, cl, v in zip(c.timestamp, c.open, c.high, c.low, c.close, c.volume)
+        ]
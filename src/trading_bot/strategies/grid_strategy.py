@@ -7,8 +7,10 @@ import os
 from .orb_strategy import GoldORBStrategy
 try:
     from analysis.advanced_analysis import AdvancedMarketAnalysis
+    from data.indicator_engine import IndicatorEngine
 except ImportError:
     from src.trading_bot.analysis.advanced_analysis import AdvancedMarketAnalysis
+    from src.trading_bot.data.indicator_engine import IndicatorEngine
 
 logger = logging.getLogger("KalmanGrid")
 
@@ -52,6 +54,11 @@ class KalmanGridStrategy:
         self.bb_lower = 0.0
         self.ma_value = 0.0
         self.atr_value = 0.0
+        self.indicators = IndicatorEngine()
+        self.indicators.register(symbol, None, 'sma', period=100)
+        self.indicators.register(symbol, None, 'std', period=100)
+        self.indicators.register(symbol, None, 'atr', period=14, smoothing='sma')
+        self.indicators.register(symbol, None, 'sma', period=20, field='tick_volume')
         
         # Market State
         self.is_ranging = False
@@ -167,21 +174,34 @@ class KalmanGridStrategy:
         self.prev_covariance = updated_covariance
         self.kalman_value = updated_state
         
+        # Rolling indicators are updated incrementally (only newly closed bars are consumed);
+        # frames without bar times can't be tracked that way and are computed in full
+        incremental = 'time' in df.columns or isinstance(df.index, pd.DatetimeIndex)
+        if incremental:
+            self.indicators.update(self.symbol, None, df)
+        
         # 2. Update Bollinger Bands & MA
-        rolling_mean = df['close'].rolling(window=100).mean()
-        rolling_std = df['close'].rolling(window=100).std()
+        if incremental:
+            rolling_mean = self.indicators.current(self.symbol, None, 'sma', period=100)
+            rolling_std = self.indicators.current(self.symbol, None, 'std', period=100)
+        else:
+            rolling_mean = df['close'].rolling(window=100).mean().iloc[-1]
+            rolling_std = df['close'].rolling(window=100).std().iloc[-1]
         
-        self.bb_upper = rolling_mean.iloc[-1] + (rolling_std.iloc[-1] * 2.0)
-        self.bb_lower = rolling_mean.iloc[-1] - (rolling_std.iloc[-1] * 2.0)
-        self.ma_value = rolling_mean.iloc[-1]
+        self.bb_upper = rolling_mean + (rolling_std * 2.0)
+        self.bb_lower = rolling_mean - (rolling_std * 2.0)
+        self.ma_value = rolling_mean
         
         # 3. Calculate ATR
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
-        self.atr_value = true_range.rolling(14).mean().iloc[-1]
+        if incremental:
+            self.atr_value = self.indicators.current(self.symbol, None, 'atr', period=14, smoothing='sma')
+        else:
+            high_low = df['high'] - df['low']
+            high_close = np.abs(df['high'] - df['close'].shift())
+            low_close = np.abs(df['low'] - df['close'].shift())
+            ranges = pd.concat([high_low, high_close, low_close], axis=1)
+            true_range = np.max(ranges, axis=1)
+            self.atr_value = true_range.rolling(14).mean().iloc[-1]
         
         # 4. Detect Ranging State (Volatility Contraction & Market Profile)
         # Enhanced detection logic for LLM input preparation
@@ -200,7 +220,10 @@ class KalmanGridStrategy:
         
         # C. Volume Profile (Simple)
         # Check if recent volume is below average (consolidation often has lower volume)
-        avg_volume = df['tick_volume'].rolling(20).mean().iloc[-1]
+        if incremental:
+            avg_volume = self.indicators.current(self.symbol, None, 'sma', period=20, field='tick_volume')
+        else:
+            avg_volume = df['tick_volume'].rolling(20).mean().iloc[-1]
         current_vol = df['tick_volume'].iloc[-1]
         is_low_volume = current_vol < avg_volume
         
@@ -2,59 +2,266 @@ import os
 import logging
 import requests
 import json
+import queue
 import threading
-import math
+import time
+import gzip
+import atexit
 from datetime import datetime
+import numpy as np
+import pandas as pd
+from requests.adapters import HTTPAdapter
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
 
 logger = logging.getLogger("RemoteStorage")
 
+_STOP = object()
+
+# Flush order inside one send cycle, so a trade is created before its close update arrives
+ENDPOINTS = ("trades", "trades/update", "signals", "account_metrics", "market_data")
+
+MARKET_DATA_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+def _nullable(values):
+    """Float column as a list with NaN replaced by None (JSON null)."""
+    values = np.asarray(values, dtype=float)
+    column = values.tolist()
+    for i in np.flatnonzero(np.isnan(values)).tolist():
+        column[i] = None
+    return column
+
+
+def encode_market_data(df, symbol, timeframe, chat_id=None, layout="columnar"):
+    """
+    Encode candles for ``/api/market_data/batch`` in one vectorized pass.
+
+    Args:
+        df: OHLCV DataFrame indexed by bar time
+        symbol, timeframe, chat_id: stamped once per payload (columnar) or per row (records)
+        layout: "columnar" -> ``{"format": "columnar", "symbol", "timeframe", "chat_id",
+            "columns": {"timestamp": [...], "open": [...], ...}}``;
+            "records" -> list of row dicts (the original wire format)
+
+    Returns:
+        dict or list: JSON-ready payload (NaN -> None, timestamps -> ISO 8601)
+    """
+    index = df.index
+    if isinstance(index, pd.DatetimeIndex):
+        if index.tz is not None:
+            index = index.tz_convert("UTC").tz_localize(None)
+        timestamps = np.datetime_as_string(index.values, unit="s").tolist()
+    else:
+        timestamps = index.astype(str).tolist()
+    columns = {"timestamp": timestamps}
+    for name in MARKET_DATA_COLUMNS:
+        columns[name] = _nullable(df[name])
+
+    if layout == "records":
+        n = len(timestamps)
+        rows = zip(timestamps, [chat_id] * n, [symbol] * n, [timeframe] * n,
+                   *(columns[name] for name in MARKET_DATA_COLUMNS))
+        keys = ("timestamp", "chat_id", "symbol", "timeframe") + MARKET_DATA_COLUMNS
+        return [dict(zip(keys, row)) for row in rows]
+    return {"format": "columnar", "symbol": symbol, "timeframe": timeframe, "chat_id": chat_id, "columns": columns}
+
+
+def _payload_size(body):
+    """Number of records in a list body or a columnar payload."""
+    if isinstance(body, dict):
+        return len(body["columns"]["timestamp"])
+    return len(body)
+
+
+class _Frame:
+    """Market data handed over by the caller; encoded on the sender thread."""
+    __slots__ = ('df', 'symbol', 'timeframe')
+
+    def __init__(self, df, symbol, timeframe):
+        self.df = df
+        self.symbol = symbol
+        self.timeframe = timeframe
+
+
+class _Spool:
+    """
+    Append-only JSON-lines file of batches the backend could not take.
+
+    Each line is ``{"endpoint": ..., "records": <request body>}``. Replay reads the
+    file in order and rewrites it (atomically) with whatever is still unsent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        try:
+            return os.path.getsize(self.path) > 0
+        except OSError:
+            return False
+
+    def append(self, endpoint, records):
+        line = json.dumps({"endpoint": endpoint, "records": records}, default=str, separators=(",", ":"))
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to spool {_payload_size(records)} {endpoint} records to {self.path}: {e}")
+                return False
+
+    def read(self):
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                return []
+        batches = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                batches.append((entry['endpoint'], entry['records']))
+            except Exception:
+                # Torn line from a crash mid-write; kept as None so positions match the file
+                logger.warning(f"Skipping unreadable spool line in {self.path}")
+                batches.append(None)
+        return batches
+
+    def replace(self, sent_count):
+        """Drop the first ``sent_count`` batches, keeping anything appended meanwhile."""
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+                remaining = lines[sent_count:]
+                if not remaining:
+                    os.remove(self.path)
+                    return
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.writelines(remaining)
+                os.replace(tmp_path, self.path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to rewrite spool {self.path}: {e}")
+
+
 class RemoteStorage:
     """
     Handles asynchronous data transmission to a remote PostgreSQL backend via HTTP.
-    Uses a background thread to prevent blocking the main trading loop.
+
+    Callers only enqueue records. One sender thread owns a pooled
+    ``requests.Session`` (keep-alive connections) and coalesces records per
+    endpoint into ``<endpoint>/batch`` requests of up to ``batch_size``
+    records, flushed when a buffer fills or ``flush_interval`` seconds after
+    its oldest record. Batches the backend cannot take (connection errors,
+    timeouts, 5xx) go to an append-only spool file and are replayed, in
+    order, once the backend answers again; while the spool holds data, new
+    batches queue behind it so trades and their updates keep their order.
+
+    Candles are encoded column-wise (see :func:`encode_market_data`) in
+    chunks of ``market_data_chunk`` bars, and request bodies of at least
+    ``compress_min_bytes`` are sent gzip-compressed.
     """
-    def __init__(self):
+    def __init__(self, batch_size=100, flush_interval=1.0, max_queue=10000, retry_interval=15.0,
+                 max_retry_interval=300.0, spool_path=None, timeout=10.0, session=None,
+                 market_data_layout="columnar", market_data_chunk=5000, compress_min_bytes=4096):
         self.api_url = os.getenv("POSTGRES_API_URL", "")
         self.api_key = os.getenv("POSTGRES_API_KEY", "")
         self.chat_id = os.getenv("TELEGRAM_CHAT_ID", "")  # Used to associate data with user
         self.enabled = bool(self.api_url)
-        
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self.timeout = timeout
+        self.market_data_layout = market_data_layout
+        self.market_data_chunk = market_data_chunk
+        self.compress_min_bytes = compress_min_bytes # None disables gzip
+        if spool_path is None:
+            spool_path = os.getenv("REMOTE_STORAGE_SPOOL") or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "remote_spool.jsonl")
+        self.spool = _Spool(spool_path)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self.stats = {
+            'enqueued': 0,
+            'sent': 0,
+            'batches': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'rejected': 0,
+            'dropped': 0,
+            'last_batch_ms': 0.0,
+        }
+
         if self.enabled:
             logger.info(f"Remote Storage Enabled. Target: {self.api_url}")
+            self.session = session or self._create_session()
+            self._thread = threading.Thread(target=self._run, name="RemoteStorage", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
         else:
             logger.info("Remote Storage Disabled (POSTGRES_API_URL not set)")
 
+    def _create_session(self):
+        session = requests.Session()
+        # A single sender thread: one keep-alive connection per host is enough
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json", "X-API-Key": self.api_key})
+        return session
+
+    # ------------------------------------------------------------------ producer side
+
     def _send_payload(self, endpoint, data):
-        """Internal method to send data via HTTP POST"""
+        """Queue one record for ``endpoint`` (enriched and serialized on the caller's thread)."""
         if not self.enabled:
             return
 
-        def task():
-            try:
-                url = f"{self.api_url}/{endpoint}"
-                headers = {
-                    "Content-Type": "application/json",
-                    "X-API-Key": self.api_key
-                }
-                
-                # Enrich data with metadata
-                payload = data.copy()
-                payload['chat_id'] = self.chat_id
-                payload['timestamp'] = payload.get('timestamp', datetime.now().isoformat())
-                
-                # Convert datetime objects to string if needed
-                # (requests.json encoder might handle standard types, but safer to pre-process)
-                payload = self._serialize_dates(payload)
-                
-                response = requests.post(url, json=payload, headers=headers, timeout=10)
-                
-                if response.status_code not in [200, 201]:
-                    logger.warning(f"Failed to send to {endpoint}: {response.status_code} {response.text}")
-            except Exception as e:
-                logger.error(f"Error sending to {endpoint}: {e}")
+        # Enrich data with metadata
+        payload = data.copy()
+        payload['chat_id'] = self.chat_id
+        # Stamped now, not at send time, so batched/spooled records keep their event time
+        payload['timestamp'] = payload.get('timestamp', datetime.now().isoformat())
+        # Snapshot: the caller may keep mutating its dict
+        self._put(endpoint, self._serialize_dates(payload))
 
-        # Run in background thread
-        threading.Thread(target=task, daemon=True).start()
+    def _put(self, endpoint, item):
+        if self._closed:
+            logger.error(f"RemoteStorage is closed, dropping {endpoint} record")
+            with self._lock:
+                self.stats['dropped'] += 1
+            return False
+        try:
+            self._queue.put_nowait((endpoint, item))
+        except queue.Full:
+            # Never block the trading thread: park the record on disk for the next replay
+            bodies = self._encode_frame(item) if isinstance(item, _Frame) else [[item]]
+            spooled = True
+            for body in bodies:
+                ok = self.spool.append(endpoint, body)
+                spooled &= ok
+                with self._lock:
+                    self.stats['spooled' if ok else 'dropped'] += _payload_size(body)
+            logger.warning(f"Send queue full, spooled {endpoint} data")
+            return spooled
+        with self._lock:
+            self.stats['enqueued'] += 1
+        return True
 
     def _serialize_dates(self, data):
         """Recursively convert datetime objects to ISO format strings"""
@@ -66,6 +273,197 @@ class RemoteStorage:
             return data.isoformat()
         return data
 
+    def get_stats(self):
+        """Counters plus the current queue depth and whether a spool backlog exists."""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['spool_pending'] = bool(self.spool)
+        return stats
+
+    def flush(self, timeout=None):
+        """Block until everything queued before this call was sent or spooled."""
+        if not self.enabled or self._closed or not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=5.0)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=15.0):
+        """Send (or spool) outstanding records and stop the sender thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=1.0)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.warning(f"RemoteStorage sender did not stop within {timeout}s")
+        try:
+            atexit.unregister(self.close)
+        except Exception:
+            pass
+
+    # ------------------------------------------------------------------ sender thread
+
+    def _run(self):
+        buffers = {endpoint: [] for endpoint in ENDPOINTS}
+        oldest = None # monotonic time of the oldest buffered record
+        retry_delay = self.retry_interval
+        next_replay = time.monotonic() # Leftovers from a previous run are retried right away
+        running = True
+        while running:
+            now = time.monotonic()
+            wait = 0.5
+            if oldest is not None:
+                wait = min(wait, max(0.0, oldest + self.flush_interval - now))
+            events = []
+            try:
+                item = self._queue.get(timeout=wait)
+            except queue.Empty:
+                item = None
+
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    endpoint, record = item
+                    if isinstance(record, _Frame):
+                        # Already-encoded request bodies, sent one per request
+                        buffers.setdefault(endpoint, []).extend(self._encode_frame(record))
+                    else:
+                        buffers.setdefault(endpoint, []).append(record)
+                    if oldest is None:
+                        oldest = time.monotonic()
+                try:
+                    # Take what is already queued without waiting
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            try:
+                now = time.monotonic()
+                if self.spool and (now >= next_replay or not running):
+                    if self._replay():
+                        retry_delay = self.retry_interval
+                    else:
+                        retry_delay = min(retry_delay * 2, self.max_retry_interval)
+                    next_replay = time.monotonic() + retry_delay
+
+                full = any(len(records) >= self.batch_size for records in buffers.values())
+                due = oldest is not None and now - oldest >= self.flush_interval
+                if full or due or events or not running:
+                    if not self._flush_buffers(buffers):
+                        next_replay = max(next_replay, time.monotonic() + retry_delay)
+                    oldest = None
+            except Exception as e:
+                logger.error(f"RemoteStorage sender error: {e}", exc_info=True)
+            finally:
+                for event in events:
+                    event.set()
+
+    def _flush_buffers(self, buffers):
+        """Send every buffered record in ENDPOINTS order; returns False if anything was spooled."""
+        delivered = True
+        for endpoint in list(buffers):
+            items = buffers[endpoint]
+            if endpoint == "market_data":
+                bodies = items
+            else:
+                bodies = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+            for body in bodies:
+                delivered &= self._deliver(endpoint, body)
+            items.clear()
+        return delivered
+
+    def _deliver(self, endpoint, body):
+        """Post one batch, or append it to the spool if the backend is down or a backlog exists."""
+        if not self.spool:
+            result = self._post(endpoint, body)
+            if result is None:
+                if isinstance(body, list) and len(body) > 1:
+                    # One invalid record fails validation for the whole batch: resend them singly
+                    return all([self._deliver(endpoint, [record]) for record in body])
+                with self._lock:
+                    self.stats['rejected'] += _payload_size(body)
+            if result is not False:
+                return True
+        spooled = self.spool.append(endpoint, body)
+        with self._lock:
+            self.stats['spooled' if spooled else 'dropped'] += _payload_size(body)
+        return False
+
+    def _replay(self):
+        """Resend spooled batches in order; stops at the first one the backend still cannot take."""
+        batches = self.spool.read()
+        sent = 0
+        for batch in batches:
+            if batch is None:
+                sent += 1
+                continue
+            endpoint, body = batch
+            result = self._post(endpoint, body)
+            if result is False:
+                break
+            sent += 1
+            with self._lock:
+                self.stats['replayed' if result else 'rejected'] += _payload_size(body)
+        if batches:
+            self.spool.replace(sent)
+            if sent:
+                logger.info(f"Replayed {sent}/{len(batches)} spooled batches")
+        return sent == len(batches)
+
+    def _post(self, endpoint, body):
+        """
+        POST ``body`` (record list or columnar payload) to ``<endpoint>/batch``.
+
+        Returns True when accepted, None when rejected for good (4xx: resending
+        would not help, so the batch is dropped) and False when the backend is
+        unreachable or failing (connection error, timeout, 408/429/5xx).
+        """
+        url = f"{self.api_url}/{endpoint}/batch"
+        count = _payload_size(body)
+        started = time.perf_counter()
+        try:
+            data = json.dumps(body, separators=(",", ":"), allow_nan=False).encode("utf-8")
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot serialize {count} {endpoint} records: {e}")
+            return None
+        headers = None
+        if self.compress_min_bytes is not None and len(data) >= self.compress_min_bytes:
+            data = gzip.compress(data, compresslevel=5)
+            headers = {"Content-Encoding": "gzip"}
+        try:
+            response = self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.warning(f"Backend unreachable for {endpoint} ({count} records): {e}")
+            return False
+
+        status = response.status_code
+        if status in (200, 201):
+            with self._lock:
+                self.stats['sent'] += count
+                self.stats['batches'] += 1
+                self.stats['last_batch_ms'] = (time.perf_counter() - started) * 1000
+            return True
+        if status in (408, 429) or status >= 500:
+            logger.warning(f"Backend failed {endpoint} batch: {status} {response.text[:500]}")
+            return False
+        logger.error(f"Backend rejected {count} {endpoint} records: {status} {response.text[:500]}")
+        return None
+
+    # ------------------------------------------------------------------ public API
+
     def save_trade(self, trade_data):
         """Send trade record to remote DB"""
         self._send_payload("trades", trade_data)
@@ -88,82 +486,119 @@ class RemoteStorage:
         """Send a batch of market data (candles) to remote DB"""
         if not self.enabled or df.empty:
             return
+        # Encoded on the sender thread
+        self._put("market_data", _Frame(df, symbol, timeframe))
 
-        def task():
-            try:
-                endpoint = "market_data/batch"
-                url = f"{self.api_url}/{endpoint}"
-                headers = {
-                    "Content-Type": "application/json",
-                    "X-API-Key": self.api_key
-                }
-                
-                # Convert DataFrame to list of dicts
-                # Assuming df index is timestamp
-                records = []
-                for index, row in df.iterrows():
-                    o = float(row['open'])
-                    h = float(row['high'])
-                    l = float(row['low'])
-                    c = float(row['close'])
-                    v = float(row['volume'])
-                    
-                    record = {
-                        "chat_id": self.chat_id,  # [FIX] Inject chat_id for multi-tenancy support
-                        "timestamp": index.isoformat() if isinstance(index, datetime) else str(index),
-                        "symbol": symbol,
-                        "timeframe": timeframe,
-                        "open": None if math.isnan(o) else o,
-                        "high": None if math.isnan(h) else h,
-                        "low": None if math.isnan(l) else l,
-                        "close": None if math.isnan(c) else c,
-                        "volume": None if math.isnan(v) else v
-                    }
-                    records.append(record)
-                
-                # Split into chunks if too large (e.g., 100 records per request)
-                chunk_size = 100
-                for i in range(0, len(records), chunk_size):
-                    chunk = records[i:i + chunk_size]
-                    response = requests.post(url, json=chunk, headers=headers, timeout=20)
-                    if response.status_code not in [200, 201]:
-                         # [FIX] Log more details for 500 errors
-                         logger.warning(f"Failed to send market data batch: {response.status_code} - {response.text[:500]}")
-            except Exception as e:
-                logger.error(f"Error sending market data batch: {e}")
+    def _encode_frame(self, frame):
+        """Request bodies for one frame, ``market_data_chunk`` bars each."""
+        df = frame.df
+        return [encode_market_data(df.iloc[i:i + self.market_data_chunk], frame.symbol, frame.timeframe,
+                                   chat_id=self.chat_id, layout=self.market_data_layout)
+                for i in range(0, len(df), self.market_data_chunk)]
+
+    # ------------------------------------------------------------------ reads
+
+    def fetch(self, resource, limit=1000, cursor=None, order=None, fields=None, start=None, end=None,
+              format="json", **filters):
+        """
+        One keyset page of ``GET /api/<resource>`` (synchronous call).
 
-        threading.Thread(target=task, daemon=True).start()
+        Args:
+            resource: "trades", "signals", "account_metrics" or "market_data"
+            limit: rows per page (the server caps it)
+            cursor: ``next_cursor`` / ``delta_cursor`` of an earlier page
+            order: "desc" (newest first, server default) or "asc"; ignored with a cursor
+            fields: columns to return (all when None)
+            start, end: time range [start, end) as datetime or ISO string
+            format: "json" -> list of dicts, "arrow" -> DataFrame (Arrow IPC on the wire)
+            **filters: equality filters such as symbol, timeframe, result, chat_id
 
-    def get_trades(self, limit=100, symbol=None):
-        """Retrieve trades from remote DB (Synchronous call)"""
+        Returns:
+            tuple: (rows, page) with page = {"next_cursor", "delta_cursor", "has_more"};
+                   rows is None when the request failed
+        """
+        page = {"next_cursor": cursor, "delta_cursor": None, "has_more": False}
         if not self.enabled:
-            return []
-            
+            return None, page
+
+        params = {key: value for key, value in filters.items() if value is not None}
+        params['limit'] = limit
+        if cursor:
+            params['cursor'] = cursor
+        elif order:
+            params['order'] = order
+        if fields:
+            params['fields'] = ",".join(fields)
+        for key, value in (('start', start), ('end', end)):
+            if value is not None:
+                params[key] = value.isoformat() if isinstance(value, datetime) else value
+        if format == "arrow":
+            params['format'] = "arrow"
+
         try:
-            endpoint = "trades"
-            url = f"{self.api_url}/{endpoint}"
-            headers = {"X-API-Key": self.api_key}
-            
-            params = {}
-            if self.chat_id:
-                params['chat_id'] = self.chat_id # [FIX] Include chat_id for retrieval
-                
-            if limit is not None:
-                params['limit'] = limit
-            else:
-                # If limit is explicitly None, try to fetch a large number to get "all"
-                # (assuming backend might default to a small page size if parameter is missing)
-                params['limit'] = 100000
-                
-            if symbol:
-                params['symbol'] = symbol
-                
-            response = requests.get(url, headers=headers, params=params, timeout=30) # Increased timeout for large data
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.warning(f"Failed to get trades: {response.status_code}")
-                return []
+            # Shares the sender's pooled session; responses arrive gzip-compressed
+            response = self.session.get(f"{self.api_url}/{resource}", params=params, timeout=30)
+            if response.status_code != 200:
+                logger.warning(f"Failed to get {resource}: {response.status_code}")
+                return None, page
+            page = {
+                "next_cursor": response.headers.get("X-Next-Cursor", cursor),
+                "delta_cursor": response.headers.get("X-Delta-Cursor"),
+                "has_more": response.headers.get("X-Has-More") == "1",
+            }
+            if format == "arrow":
+                if pa is None:
+                    raise ImportError("pyarrow is required for Arrow reads (pip install pyarrow)")
+                return pa.ipc.open_stream(response.content).read_all().to_pandas(), page
+            return response.json(), page
         except Exception as e:
-            logger.error(f"Error getting trades: {e}")
+            logger.error(f"Error getting {resource}: {e}")
+            return None, page
+
+    def fetch_deltas(self, resource, cursor=None, fields=None, page_size=5000, max_rows=None, **filters):
+        """
+        Rows added since ``cursor`` (oldest first), following pages until caught up.
+
+        Without a cursor the whole history is read from the start. Persist the
+        returned cursor and pass it next time; trades reappear once they close.
+
+        Returns:
+            tuple: (rows, cursor) - the cursor is unchanged when nothing new arrived
+        """
+        rows = []
+        while max_rows is None or len(rows) < max_rows:
+            size = page_size if max_rows is None else min(page_size, max_rows - len(rows))
+            batch, page = self.fetch(resource, limit=size, cursor=cursor, order="asc", fields=fields, **filters)
+            if batch is None:
+                break
+            rows.extend(batch)
+            cursor = page["next_cursor"] or cursor
+            if not page["has_more"]:
+                break
+        return rows, cursor
+
+    def get_trades(self, limit=100, symbol=None, fields=None, result=None, page_size=5000):
+        """
+        Retrieve trades from remote DB, newest change first (Synchronous call).
+
+        Args:
+            limit: number of trades, None for all of them (fetched page by page)
+            fields: columns to fetch (all when None)
+            result: e.g. "CLOSED" to skip open trades on the server
+        """
+        if not self.enabled:
             return []
+
+        trades = []
+        cursor = None
+        while limit is None or len(trades) < limit:
+            size = page_size if limit is None else min(page_size, limit - len(trades))
+            batch, page = self.fetch("trades", limit=size, cursor=cursor, fields=fields, symbol=symbol,
+                                     result=result, chat_id=self.chat_id or None)
+            if not batch:
+                break
+            trades.extend(batch)
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                break
+        return trades
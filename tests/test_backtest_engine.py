@@ -0,0 +1,65 @@
+import unittest
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from core.backtest_engine import BacktestEngine, example_strategy, example_vectorized_strategy
+
+
+def make_data(n=400, seed=11, atr_scale=1e-3):
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.001, n))
+    df = pd.DataFrame({
+        'open': np.roll(close, 1),
+        'high': close + 0.0005,
+        'low': close - 0.0005,
+        'close': close,
+        'atr': (0.5 + rng.random(n)) * atr_scale,
+    }, index=pd.date_range('2024-01-01', periods=n, freq='h'))
+    df['ema_fast'] = df['close'].ewm(span=12, adjust=False).mean()
+    df['ema_slow'] = df['close'].ewm(span=26, adjust=False).mean()
+    return df
+
+
+class TestVectorizedBacktest(unittest.TestCase):
+    """The vectorized mode must reproduce the bar-by-bar callback mode."""
+
+    def run_engine(self, data, strategy, vectorized):
+        engine = BacktestEngine(initial_capital=100000.0)
+        engine.load_data(data)
+        engine.set_strategy(strategy, vectorized=vectorized)
+        engine.run_backtest(risk_per_trade=0.01)
+        return engine
+
+    def assertSameResults(self, data):
+        loop = self.run_engine(data, example_strategy, vectorized=False)
+        vec = self.run_engine(data, example_vectorized_strategy, vectorized=True)
+
+        np.testing.assert_allclose(vec.results['equity_curve'], loop.results['equity_curve'], rtol=1e-12)
+        self.assertEqual(len(vec.trades), len(loop.trades))
+        pd.testing.assert_frame_equal(vec.trades, loop.trades, check_dtype=False)
+        for key in ('total_return', 'max_drawdown', 'sharpe_ratio', 'total_trades', 'win_rate'):
+            self.assertAlmostEqual(vec.results[key], loop.results[key], places=9)
+
+    def test_matches_callback_mode(self):
+        for seed in (1, 2, 3):
+            self.assertSameResults(make_data(seed=seed))
+
+    def test_matches_with_zero_sized_positions(self):
+        # Large ATR rounds position sizes down to zero lots
+        self.assertSameResults(make_data(atr_scale=1.0))
+
+    def test_signal_length_is_checked(self):
+        engine = BacktestEngine()
+        engine.load_data(make_data(n=50))
+        engine.set_strategy(lambda data, eng: np.zeros(10), vectorized=True)
+        with self.assertRaises(ValueError):
+            engine.run_backtest()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from data.bar_store import BarStore
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+    ('close', '<f8'), ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+
+class FakeTerminal:
+    """Serves copy_rates_from_pos from a growing in-memory history."""
+
+    def __init__(self, n_bars, bar_seconds=300):
+        self.bar_seconds = bar_seconds
+        self.history = np.zeros(n_bars, dtype=RATES_DTYPE)
+        self.history['time'] = np.arange(n_bars) * bar_seconds
+        self.history['close'] = np.arange(n_bars, dtype=float)
+        self.calls = []
+
+    def add_bar(self):
+        bar = self.history[-1:].copy()
+        bar['time'] += self.bar_seconds
+        bar['close'] += 1
+        self.history = np.concatenate([self.history, bar])
+
+    def copy_rates_from_pos(self, symbol, timeframe, start, count):
+        self.calls.append(count)
+        end = len(self.history) - start
+        return self.history[max(0, end - count):end].copy()
+
+
+class TestBarStore(unittest.TestCase):
+    def setUp(self):
+        self.terminal = FakeTerminal(1200)
+        self.store = BarStore(source=self.terminal, capacity=1000, min_refresh_interval=0)
+
+    def test_initial_load_and_shared_reads(self):
+        df = self.store.get_dataframe("XAUUSD", 5, 500)
+        self.assertEqual(len(df), 500)
+        self.assertEqual(df['close'].iloc[-1], 1199)
+        self.assertEqual(self.terminal.calls, [1000])
+
+        rates = self.store.get_rates("XAUUSD", 5, 100)
+        self.assertEqual(len(rates), 100)
+        self.assertFalse(rates.flags.writeable)
+
+    def test_incremental_fetch_appends_new_bars(self):
+        self.store.get_rates("XAUUSD", 5, 1000)
+        self.terminal.add_bar()
+        self.terminal.history[-2]['close'] = 42.0  # previously forming bar closed differently
+
+        rates = self.store.get_rates("XAUUSD", 5, 1000)
+        self.assertLess(self.terminal.calls[-1], 10)
+        self.assertEqual(len(rates), 1000)
+        self.assertEqual(rates['time'][-1], self.terminal.history['time'][-1])
+        self.assertEqual(rates['close'][-2], 42.0)
+        np.testing.assert_array_equal(rates, self.terminal.history[-1000:])
+
+    def test_gap_triggers_full_reload(self):
+        self.store.get_rates("XAUUSD", 5, 1000)
+        for _ in range(50):
+            self.terminal.add_bar()
+        rates = self.store.get_rates("XAUUSD", 5, 1000)
+        np.testing.assert_array_equal(rates, self.terminal.history[-1000:])
+
+    def test_larger_request_grows_capacity(self):
+        self.store.get_rates("XAUUSD", 5, 100)
+        rates = self.store.get_rates("XAUUSD", 5, 1100)
+        self.assertEqual(len(rates), 1100)
+
+
+if __name__ == '__main__':
+    unittest.main()
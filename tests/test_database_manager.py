@@ -0,0 +1,465 @@
+import unittest
+from unittest.mock import MagicMock
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from data.database_manager import DatabaseManager
+from data.db_writer import DatabaseWriter
+from data.db_migrations import MIGRATIONS, apply_migrations, get_schema_version
+from data.archive_catalog import ArchiveCatalog
+
+
+def make_bars(n, start='2024-01-01', seed=0):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': rng.integers(100, 1000, n),
+    }, index=pd.date_range(start, periods=n, freq='15min'))
+
+
+class TestSaveMarketData(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # Bars are from 2024: keep background retention from partitioning them mid-test
+        self.db = DatabaseManager(os.path.join(self.tmp.name, 'test.db'), maintenance_interval=None)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def fetch(self):
+        self.db.flush()
+        return self.db.conn.execute(
+            "SELECT timestamp, open, close, volume FROM market_data WHERE symbol='XAUUSD' AND timeframe='M15' ORDER BY timestamp"
+        ).fetchall()
+
+    def test_bulk_write(self):
+        df = make_bars(1000)
+        result = self.db.save_market_data(df, 'XAUUSD', 'M15')
+        self.assertEqual(result['rows_written'], 1000)
+        self.assertEqual(result['rows_skipped'], 0)
+        rows = self.fetch()
+        self.assertEqual(len(rows), 1000)
+        # Same text format the sqlite3 datetime adapter produced for row-by-row writes
+        self.assertEqual(rows[0][0], '2024-01-01 00:00:00')
+        self.assertAlmostEqual(rows[-1][2], df['close'].iloc[-1])
+        self.assertEqual(rows[-1][3], df['volume'].iloc[-1])
+
+    def test_incremental_write_skips_stored_bars(self):
+        df = make_bars(300)
+        self.db.save_market_data(df.iloc[:200], 'XAUUSD', 'M15')
+
+        updated = df.iloc[100:].copy()
+        updated.loc[updated.index[99], 'close'] += 5 # bar 199 was still forming when first saved
+        result = self.db.save_market_data(updated, 'XAUUSD', 'M15')
+        self.assertEqual(result['rows_skipped'], 99)
+        self.assertEqual(result['rows_written'], 101)
+
+        rows = self.fetch()
+        self.assertEqual(len(rows), 300)
+        self.assertAlmostEqual(rows[199][2], updated['close'].iloc[99])
+
+    def test_watermark_is_read_from_existing_database(self):
+        df = make_bars(50)
+        self.db.save_market_data(df, 'XAUUSD', 'M15')
+        self.db.flush()
+        reopened = DatabaseManager(self.db.db_path, maintenance_interval=None)
+        try:
+            result = reopened.save_market_data(df, 'XAUUSD', 'M15')
+            self.assertEqual(result['rows_skipped'], 49)
+            self.assertEqual(result['rows_written'], 1)
+        finally:
+            reopened.close()
+
+
+def make_signal(signal='buy', reason='trend'):
+    return {'final_signal': signal, 'strength': 0.8, 'details': {'reason': reason}}
+
+
+class TestSignalDebounce(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.db')
+        self.db = DatabaseManager(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def fetch(self, db=None):
+        db = db or self.db
+        db.flush()
+        return db.conn.execute("SELECT signal, details FROM signals ORDER BY timestamp").fetchall()
+
+    def test_duplicates_are_skipped_before_flush(self):
+        for _ in range(5):
+            self.db.save_signal('XAUUSD', 'M15', make_signal())
+        self.db.save_signal('XAUUSD', 'M15', make_signal(reason='breakout'))
+        self.db.save_signal('XAUUSD', 'M15', make_signal(signal='sell', reason='breakout'))
+        self.db.save_signal('XAUUSD', 'H1', make_signal())
+        self.assertEqual(len(self.fetch()), 4)
+
+    def test_repeat_after_debounce_window_is_saved(self):
+        self.db.save_signal('XAUUSD', 'M15', make_signal())
+        signal, reason, ts = self.db._signal_index[('XAUUSD', 'M15')]
+        self.db._signal_index[('XAUUSD', 'M15')] = (signal, reason, ts - timedelta(minutes=16))
+        self.db.save_signal('XAUUSD', 'M15', make_signal())
+        self.assertEqual(len(self.fetch()), 2)
+
+    def test_index_is_warmed_from_database(self):
+        self.db.save_signal('XAUUSD', 5, make_signal())
+        self.db.save_signal('XAUUSD', 5, make_signal(signal='sell'))
+        self.db.flush()
+        reopened = DatabaseManager(self.path)
+        try:
+            self.assertEqual(reopened._signal_index[('XAUUSD', '5')][:2], ('sell', 'trend'))
+            reopened.save_signal('XAUUSD', 5, make_signal(signal='sell'))
+            reopened.save_signal('XAUUSD', 5, make_signal(signal='buy'))
+            self.assertEqual([r[0] for r in self.fetch(reopened)], ['buy', 'sell', 'buy'])
+        finally:
+            reopened.close()
+
+
+class TestMigrations(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'test.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def plan(self, conn, sql, params=()):
+        return ' '.join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+    def test_fresh_database_is_at_latest_version(self):
+        db = DatabaseManager(self.path)
+        try:
+            conn = db.conn
+            self.assertEqual(get_schema_version(conn), MIGRATIONS[-1][0])
+            self.assertEqual(apply_migrations(conn), [])
+            self.assertIn('close_time', {r[1] for r in conn.execute("PRAGMA table_info(trades)")})
+
+            plan = self.plan(conn, "SELECT profit, mfe, mae, action, volume, close_time FROM trades "
+                                   "WHERE result = 'CLOSED' AND symbol = ? ORDER BY close_time DESC LIMIT 10", ('XAUUSD',))
+            self.assertIn('COVERING INDEX idx_trades_result_symbol_close_time', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+            plan = self.plan(conn, "SELECT * FROM signals ORDER BY timestamp DESC LIMIT 50")
+            self.assertIn('idx_signals_timestamp', plan)
+            plan = self.plan(conn, "SELECT * FROM market_data WHERE symbol = ? ORDER BY timestamp DESC LIMIT 100", ('XAUUSD',))
+            self.assertIn('idx_market_data_symbol_timestamp', plan)
+        finally:
+            db.close()
+
+    def test_legacy_database_is_upgraded_in_place(self):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE trades (ticket INTEGER PRIMARY KEY, symbol TEXT, action TEXT, volume REAL, "
+                         "price REAL, time DATETIME, result TEXT)")
+            conn.execute("INSERT INTO trades (ticket, symbol, action, volume, price, time, result) "
+                         "VALUES (1, 'XAUUSD', 'BUY', 0.1, 2000, '2024-01-01 00:00:00', 'OPEN')")
+        db = DatabaseManager(self.path)
+        try:
+            db.update_trade_performance(1, {'close_price': 2010.0, 'profit': 100.0})
+            db.flush()
+            self.assertEqual(db.conn.execute("SELECT profit FROM trades WHERE ticket = 1").fetchone()[0], 100.0)
+            self.assertEqual(get_schema_version(db.conn), MIGRATIONS[-1][0])
+        finally:
+            db.close()
+
+    def test_only_pending_migrations_run(self):
+        calls = []
+        migrations = [(1, "one", lambda conn: calls.append(1)), (2, "two", lambda conn: calls.append(2))]
+        conn = sqlite3.connect(self.path)
+        try:
+            self.assertEqual(apply_migrations(conn, migrations[:1]), [1])
+            self.assertEqual(apply_migrations(conn, migrations), [2])
+            self.assertEqual(apply_migrations(conn, migrations), [])
+            self.assertEqual(calls, [1, 2])
+        finally:
+            conn.close()
+
+    def test_failed_migration_is_rolled_back(self):
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        conn = sqlite3.connect(self.path)
+        try:
+            with self.assertRaises(RuntimeError):
+                apply_migrations(conn, [(1, "broken", broken)])
+            self.assertEqual(get_schema_version(conn), 0)
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            self.assertNotIn('half_done', tables)
+        finally:
+            conn.close()
+
+
+class TestRetention(unittest.TestCase):
+    NOW = datetime(2024, 4, 15, 12, 0)
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, 'test.db'), maintenance_interval=None)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def insert_metrics(self, start, n, step_seconds):
+        rows = [(start + timedelta(seconds=i * step_seconds), 1000.0 + i, 1000.0 + i, 0, 1000.0, 0, 0, 0) for i in range(n)]
+        with self.db.conn:
+            self.db.conn.executemany("INSERT INTO account_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def count(self, table):
+        return self.db.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+    def test_closed_months_move_to_partitions(self):
+        bars = make_bars(96 * 100, start='2024-01-01')
+        self.db.save_market_data(bars, 'XAUUSD', 'M15')
+        self.insert_metrics(datetime(2024, 2, 10), 10, 60)
+
+        result = self.db.maintain_storage(force=True, now=self.NOW)
+        self.assertEqual(result['rows_partitioned']['account_metrics'], 10)
+        self.assertEqual(result['rows_partitioned']['market_data'], 96 * (31 + 29))
+
+        names = sorted(os.path.basename(f) for f in self.db.partitions.partition_files())
+        self.assertEqual(names, ['test_2024_01.db', 'test_2024_02.db'])
+        self.assertEqual(self.count('market_data'), 96 * 40)
+        self.assertEqual(self.db.conn.execute("SELECT MIN(timestamp) FROM market_data").fetchone()[0], '2024-03-01 00:00:00')
+
+        # Reads span the live database and the partitions
+        df = self.db.get_market_data('XAUUSD', limit=96 * 100)
+        self.assertEqual(len(df), 96 * 100)
+        self.assertTrue(df['timestamp'].is_monotonic_increasing)
+        np.testing.assert_allclose(df['close'].values, bars['close'].values)
+        self.assertEqual(len(self.db.get_account_metrics_history(limit=50)), 10)
+
+        # Nothing left to move on a second run
+        result = self.db.maintain_storage(force=True, now=self.NOW)
+        self.assertEqual(result['rows_partitioned'], {})
+
+    def test_old_metrics_are_downsampled(self):
+        self.insert_metrics(datetime(2024, 4, 5), 120, 5)  # older than 7 days: 10 minutes of 5s heartbeats
+        self.insert_metrics(datetime(2024, 4, 14), 60, 5)  # recent: kept as is
+        result = self.db.maintain_storage(force=True, now=self.NOW)
+        self.assertEqual(result['metrics_downsampled'], 110)
+        self.assertEqual(self.count('account_metrics'), 70)
+        # The last row of each minute is kept
+        kept = [r[0] for r in self.db.conn.execute(
+            "SELECT timestamp FROM account_metrics WHERE timestamp < '2024-04-06' ORDER BY timestamp LIMIT 2")]
+        self.assertEqual(kept, ['2024-04-05 00:00:55', '2024-04-05 00:01:55'])
+
+    def test_runs_only_when_due(self):
+        self.assertIsNotNone(self.db.maintain_storage())
+        self.db.maintenance_interval = 3600
+        self.assertIsNone(self.db.maintain_storage())
+        self.assertIsNotNone(self.db.maintain_storage(force=True))
+
+
+def make_archive(path, trades):
+    """trades: list of (ticket, symbol, close_time, profit)"""
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE trades (ticket INTEGER PRIMARY KEY, symbol TEXT, action TEXT, volume REAL, price REAL, "
+                     "time DATETIME, result TEXT, close_price REAL, close_time DATETIME, profit REAL, mfe REAL, mae REAL)")
+        conn.executemany("INSERT INTO trades (ticket, symbol, action, volume, result, close_time, profit, mfe, mae) "
+                         "VALUES (?, ?, 'BUY', 0.1, 'CLOSED', ?, ?, 0, 0)", trades)
+    conn.close()
+
+
+class TestArchiveCatalog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, 'archived_data')
+        os.makedirs(self.dir)
+        make_archive(os.path.join(self.dir, 'trading_data_2024_01.db'),
+                     [(i, 'XAUUSD', f'2024-01-{i + 1:02d} 10:00:00', float(i)) for i in range(10)])
+        make_archive(os.path.join(self.dir, 'trading_data_2024_02.db'),
+                     [(100 + i, 'EURUSD', f'2024-02-{i + 1:02d} 10:00:00', float(i)) for i in range(5)])
+        make_archive(os.path.join(self.dir, 'trading_data_2024_03.db'),
+                     [(200 + i, 'XAUUSD', f'2024-03-{i + 1:02d} 10:00:00', 100.0 + i) for i in range(5)])
+        self.catalog = ArchiveCatalog(self.dir)
+
+    def tearDown(self):
+        self.catalog.close()
+        self.tmp.cleanup()
+
+    def test_plan_opens_only_contributing_archives(self):
+        names = lambda plan: [os.path.basename(p) for p in plan]
+        self.assertEqual(names(self.catalog.plan('XAUUSD')), ['trading_data_2024_03.db', 'trading_data_2024_01.db'])
+        self.assertEqual(names(self.catalog.plan('XAUUSD', limit=5)), ['trading_data_2024_03.db'])
+        self.assertEqual(names(self.catalog.plan('EURUSD')), ['trading_data_2024_02.db'])
+        self.assertEqual(self.catalog.plan('GBPUSD'), [])
+
+    def test_rows_are_newest_first_and_connections_are_pooled(self):
+        rows = self.catalog.fetch_closed_trades(['profit', 'close_time'], 'XAUUSD', limit=8)
+        self.assertEqual([r['profit'] for r in rows], [104.0, 103.0, 102.0, 101.0, 100.0, 9.0, 8.0, 7.0])
+        for _ in range(3):
+            self.catalog.fetch_closed_trades(['profit'], 'XAUUSD', limit=8)
+        self.assertEqual(self.catalog.stats['opens'], 2)
+        self.assertEqual(self.catalog.stats['scans'], 3)
+
+    def test_catalog_is_persisted_and_rescanned_on_change(self):
+        self.catalog.refresh(force=True)
+        reloaded = ArchiveCatalog(self.dir)
+        reloaded.refresh(force=True)
+        self.assertEqual(reloaded.stats['scans'], 0)
+        self.assertEqual(reloaded.entries['trading_data_2024_01.db']['symbols'], {'XAUUSD': 10})
+
+        make_archive(os.path.join(self.dir, 'trading_data_2024_04.db'), [(300, 'EURUSD', '2024-04-01 10:00:00', 1.0)])
+        os.remove(os.path.join(self.dir, 'trading_data_2024_02.db'))
+        reloaded.refresh(force=True)
+        self.assertEqual(reloaded.stats['scans'], 1)
+        self.assertEqual(sorted(reloaded.entries), ['trading_data_2024_01.db', 'trading_data_2024_03.db', 'trading_data_2024_04.db'])
+        reloaded.close()
+
+    def test_manager_falls_back_to_archives(self):
+        db = DatabaseManager(os.path.join(self.tmp.name, 'test.db'), maintenance_interval=None, archive_dir=self.dir)
+        db.remote_storage = MagicMock()
+        db.remote_storage.get_trades.return_value = []
+        try:
+            stats = db.get_trade_performance_stats(symbol='XAUUSD', limit=12)
+            self.assertEqual(len(stats), 12)
+            self.assertEqual(stats[0]['profit'], 104.0)
+            metrics = db.get_performance_metrics(symbol='EURUSD', limit=5)
+            self.assertEqual(metrics['win_rate'], 0.8)
+        finally:
+            db.close()
+
+
+class TestDatabaseWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'writer.db')
+        with sqlite3.connect(self.path) as conn:
+            conn.execute('CREATE TABLE t (id INTEGER PRIMARY KEY, value REAL NOT NULL)')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def count(self):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+
+    def test_writes_are_batched_into_one_transaction(self):
+        writer = DatabaseWriter(self.path, flush_interval=10.0)
+        try:
+            for i in range(100):
+                writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (i, i * 0.5))
+            writer.executemany('INSERT INTO t (id, value) VALUES (?, ?)', ((i, 0.0) for i in range(100, 150)))
+            self.assertTrue(writer.flush(timeout=5))
+            stats = writer.get_stats()
+            self.assertEqual(self.count(), 150)
+            self.assertEqual(stats['batches'], 1)
+            self.assertEqual(stats['written'], 101)
+            self.assertEqual(stats['queue_depth'], 0)
+            self.assertGreater(stats['max_queue_depth'], 0)
+        finally:
+            writer.shutdown()
+
+    def test_bad_write_does_not_lose_the_batch(self):
+        writer = DatabaseWriter(self.path, flush_interval=10.0)
+        try:
+            writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (1, 1.0))
+            writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (2, None)) # NOT NULL violation
+            writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (3, 3.0))
+            writer.flush(timeout=5)
+            self.assertEqual(self.count(), 2)
+            self.assertEqual(writer.get_stats()['failed'], 1)
+        finally:
+            writer.shutdown()
+
+    def test_shutdown_commits_pending_writes(self):
+        writer = DatabaseWriter(self.path, flush_interval=10.0)
+        for i in range(10):
+            writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (i, 0.0))
+        writer.shutdown()
+        self.assertEqual(self.count(), 10)
+        self.assertFalse(writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (99, 0.0)))
+        self.assertEqual(writer.get_stats()['dropped'], 1)
+
+    def test_locked_database_is_retried_not_dropped(self):
+        writer = DatabaseWriter(self.path, flush_interval=0.01, busy_timeout=0.05, max_retry_delay=0.05)
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute('BEGIN IMMEDIATE')
+        try:
+            for i in range(5):
+                writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (i, 0.0))
+            deadline = time.monotonic() + 5
+            while writer.get_stats()['retries'] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertGreater(writer.get_stats()['retries'], 0)
+        finally:
+            blocker.execute('ROLLBACK')
+            blocker.close()
+        try:
+            self.assertTrue(writer.flush(timeout=5))
+            self.assertEqual(self.count(), 5)
+            self.assertEqual(writer.get_stats()['failed'], 0)
+        finally:
+            writer.shutdown()
+
+    def test_full_queue_does_not_block_callers(self):
+        writer = DatabaseWriter(self.path, flush_interval=0.0, max_queue=2, put_timeout=0.05, busy_timeout=0.05)
+        # Hold the write lock so the writer thread stalls
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute('BEGIN IMMEDIATE')
+        try:
+            started = time.monotonic()
+            results = [writer.execute('INSERT INTO t (id, value) VALUES (?, ?)', (i, 0.0)) for i in range(10)]
+            self.assertIn(False, results)
+            self.assertGreater(writer.get_stats()['dropped'], 0)
+            self.assertFalse(writer.flush(timeout=0.1))
+            self.assertLess(time.monotonic() - started, 5)
+        finally:
+            blocker.execute('ROLLBACK')
+            blocker.close()
+            writer.shutdown(timeout=5)
+        self.assertFalse(writer._thread.is_alive())
+
+
+class TestWriteBehindManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, 'test.db'), flush_interval=10.0, maintenance_interval=None)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_writes_are_visible_after_flush(self):
+        self.db.save_trade({'ticket': 1, 'symbol': 'XAUUSD', 'action': 'BUY', 'volume': 0.1,
+                            'price': 2000.0, 'time': '2024-01-01 00:00:00'})
+        self.db.update_trade_performance(1, {'close_price': 2010.0, 'profit': 100.0})
+        self.assertEqual(self.db.get_writer_stats()['queue_depth'], 2)
+        self.db.flush()
+        row = self.db.conn.execute("SELECT result, close_price FROM trades WHERE ticket=1").fetchone()
+        self.assertEqual(row, ('CLOSED', 2010.0))
+
+    def test_unchanged_account_metrics_are_deduped_before_flush(self):
+        metrics = {'balance': 1000.0, 'equity': 1000.0, 'margin': 0, 'free_margin': 1000.0, 'total_profit': 0}
+        self.db.save_account_metrics(metrics)
+        self.db.save_account_metrics(dict(metrics))
+        self.db.flush()
+        self.assertEqual(self.db.conn.execute("SELECT COUNT(*) FROM account_metrics").fetchone()[0], 1)
+
+    def test_inline_mode(self):
+        db = DatabaseManager(os.path.join(self.tmp.name, 'inline.db'), write_behind=False)
+        try:
+            db.save_market_data(make_bars(10), 'XAUUSD', 'M15')
+            self.assertEqual(db.conn.execute("SELECT COUNT(*) FROM market_data").fetchone()[0], 10)
+            self.assertFalse(db.get_writer_stats()['write_behind'])
+        finally:
+            db.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
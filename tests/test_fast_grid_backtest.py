@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
+from analysis.fast_grid_backtest import (run_fast_grid_backtest, run_reference_grid_backtest,
+                                         run_batch_grid_backtest, GridBacktestObjective)
+from analysis.optimization import WOAm, TETA
+from analysis.parallel_eval import SharedArrays, ProcessPoolEvaluator
+import pickle
+
+
+def make_candles(n=2880, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 2, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n) * 2,
+        'low': np.minimum(open_, close) - rng.random(n) * 2,
+        'close': close,
+    })
+
+
+class TestFastGridBacktest(unittest.TestCase):
+    """The array kernel must score parameter sets exactly like the original loop."""
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(42)
+        for seed in range(5):
+            df = make_candles(seed=seed)
+            for _ in range(10):
+                params = [rng.uniform(100, 500), rng.uniform(1.1, 2.0), rng.uniform(10, 100)]
+                self.assertAlmostEqual(run_fast_grid_backtest(df, params),
+                                       run_reference_grid_backtest(df, params), delta=1e-6)
+
+    def test_short_and_empty_data(self):
+        params = [300.0, 1.5, 50.0]
+        for n in (1, 2, 5):
+            df = make_candles(n=n)
+            self.assertAlmostEqual(run_fast_grid_backtest(df, params),
+                                   run_reference_grid_backtest(df, params), delta=1e-9)
+
+
+class TestBatchGridBacktest(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.population = np.column_stack([rng.uniform(100, 500, 40), rng.uniform(1.1, 2.0, 40),
+                                           rng.uniform(10, 100, 40)])
+
+    def test_matches_single_evaluation(self):
+        for seed in range(3):
+            df = make_candles(seed=seed)
+            expected = [run_fast_grid_backtest(df, p) for p in self.population]
+            np.testing.assert_allclose(run_batch_grid_backtest(df, self.population), expected, rtol=0, atol=1e-9)
+
+    def test_optimizers_use_batch_mode(self):
+        objective = GridBacktestObjective(make_candles(n=500))
+        calls = []
+        batch = objective.evaluate_batch
+        objective.evaluate_batch = lambda population: calls.append(len(population)) or batch(population)
+        bounds = [(100.0, 500.0), (1.1, 2.0), (10.0, 100.0)]
+
+        for optimizer in (WOAm(pop_size=12, cache_size=0), TETA(pop_size=12, cache_size=0)):
+            calls.clear()
+            best_params, best_score = optimizer.optimize(objective, bounds, steps=[10.0, 0.1, 5.0], epochs=3)
+            self.assertEqual(calls, [12] * 4)
+            self.assertAlmostEqual(best_score, run_fast_grid_backtest(objective.df, best_params), delta=1e-6)
+
+
+class TestProcessPoolEvaluation(unittest.TestCase):
+    def test_shared_arrays_pickle_by_reference(self):
+        shared = SharedArrays({'close': np.arange(5.0), 'high': np.ones(5)})
+        try:
+            payload = pickle.dumps(shared)
+            self.assertLess(len(payload), 200)
+            attached = pickle.loads(payload)
+            np.testing.assert_array_equal(attached['close'], np.arange(5.0))
+            self.assertFalse(attached['high'].flags.writeable)
+            attached.close()
+        finally:
+            shared.unlink()
+
+    def test_process_pool_matches_serial(self):
+        df = make_candles(n=800)
+        objective = GridBacktestObjective(df)
+        rng = np.random.default_rng(3)
+        population = np.column_stack([rng.uniform(100, 500, 9), rng.uniform(1.1, 2.0, 9), rng.uniform(10, 100, 9)])
+        with ProcessPoolEvaluator(objective, 2) as pool:
+            scores = pool.evaluate(population)
+        np.testing.assert_allclose(scores, [run_fast_grid_backtest(df, p) for p in population], atol=1e-9)
+
+    def test_optimizer_picks_process_backend_for_gil_bound_objective(self):
+        optimizer = WOAm(pop_size=4)
+        with optimizer._evaluation_pool(GridBacktestObjective(make_candles(n=50)), 2) as pool:
+            self.assertIsInstance(pool, ProcessPoolEvaluator)
+        with optimizer._evaluation_pool(lambda params: 0.0, 2) as pool:
+            self.assertNotIsInstance(pool, ProcessPoolEvaluator)
+
+
+if __name__ == '__main__':
+    unittest.main()
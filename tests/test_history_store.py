@@ -0,0 +1,134 @@
+import unittest
+import pickle
+import tempfile
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from data.history_store import HistoryStore, HistoryArrays, timeframe_name
+from data.database_manager import DatabaseManager
+
+
+def make_bars(n, start='2024-01-01', seed=0, freq='1min'):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': rng.integers(100, 1000, n),
+    }, index=pd.date_range(start, periods=n, freq=freq))
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = HistoryStore(os.path.join(self.tmp.name, 'history'), max_segments=3)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_round_trip_and_date_range(self):
+        bars = make_bars(1000)
+        self.assertEqual(self.store.append('XAUUSD', 'M1', bars), 1000)
+
+        start, end = bars.index[100], bars.index[199]
+        arrays = self.store.read('XAUUSD', 'M1', start, end)
+        self.assertEqual(len(arrays), 100)
+        np.testing.assert_array_equal(arrays['close'], bars['close'].to_numpy()[100:200])
+        np.testing.assert_array_equal(arrays.times, bars.index[100:200].to_numpy().astype('datetime64[s]'))
+
+        frame = arrays.to_frame()
+        pd.testing.assert_frame_equal(frame, bars.iloc[100:200].rename_axis('time'), check_freq=False)
+
+    def test_single_segment_read_is_zero_copy(self):
+        self.store.append('XAUUSD', 'M1', make_bars(500))
+        arrays = self.store.read('XAUUSD', 'M1')
+        close = arrays['close']
+        self.assertFalse(close.flags.owndata)
+        self.assertFalse(close.flags.writeable)
+        with self.assertRaises(ValueError):
+            close[0] = 0.0
+
+    def test_append_is_incremental(self):
+        bars = make_bars(300)
+        self.store.append('XAUUSD', 'M1', bars.iloc[:200])
+        # Overlapping batch: only the 100 new bars are stored
+        self.assertEqual(self.store.append('XAUUSD', 'M1', bars.iloc[150:]), 100)
+        self.assertEqual(self.store.append('XAUUSD', 'M1', bars.iloc[150:]), 0)
+
+        arrays = self.store.read('XAUUSD', 'M1')
+        np.testing.assert_array_equal(arrays['close'], bars['close'].to_numpy())
+        self.assertEqual(len(self.store.segments('XAUUSD', 'M1')), 2)
+
+    def test_compaction_merges_segments(self):
+        bars = make_bars(400)
+        for i in range(4):
+            self.store.append('XAUUSD', 'M1', bars.iloc[i * 100:(i + 1) * 100])
+
+        segments = self.store.segments('XAUUSD', 'M1')
+        self.assertEqual(len(segments), 1)
+        self.assertEqual(segments[0]['rows'], 400)
+        files = [f for f in os.listdir(self.store.dataset_dir('XAUUSD', 'M1')) if f.endswith('.arrow')]
+        self.assertEqual(files, [segments[0]['file']])
+        np.testing.assert_array_equal(self.store.read('XAUUSD', 'M1')['close'], bars['close'].to_numpy())
+
+    def test_range_across_segments_and_last(self):
+        bars = make_bars(300)
+        self.store.append('XAUUSD', 'M1', bars.iloc[:150])
+        self.store.append('XAUUSD', 'M1', bars.iloc[150:])
+
+        arrays = self.store.read('XAUUSD', 'M1', bars.index[100], bars.index[199])
+        np.testing.assert_array_equal(arrays['close'], bars['close'].to_numpy()[100:200])
+        self.assertEqual(len(self.store.read('XAUUSD', 'M1', last=50)), 50)
+        self.assertEqual(len(self.store.read('XAUUSD', 'M5')), 0)
+
+    def test_pickle_maps_the_same_range(self):
+        bars = make_bars(200)
+        self.store.append('XAUUSD', 'M1', bars)
+        arrays = self.store.read('XAUUSD', 'M1', bars.index[10], bars.index[59])
+        # Later appends do not change what an unpickled view covers
+        self.store.append('XAUUSD', 'M1', make_bars(10, start=bars.index[-1] + pd.Timedelta(minutes=1)))
+
+        payload = pickle.dumps(arrays)
+        self.assertLess(len(payload), 1000)
+        restored = pickle.loads(payload)
+        self.assertIsInstance(restored, HistoryArrays)
+        np.testing.assert_array_equal(restored['close'], arrays['close'])
+
+    def test_timeframe_names(self):
+        self.assertEqual(timeframe_name(None), 'M15')
+        self.assertEqual(timeframe_name(16385), 'H1')
+        self.assertEqual(timeframe_name('M1'), 'M1')
+
+
+class TestSyncFromDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = DatabaseManager(os.path.join(self.tmp.name, 'test.db'), maintenance_interval=None)
+        self.store = HistoryStore(os.path.join(self.tmp.name, 'history'))
+
+    def tearDown(self):
+        self.store.close()
+        self.db.close()
+        self.tmp.cleanup()
+
+    def test_sync_appends_closed_bars_incrementally(self):
+        bars = make_bars(100, freq='15min')
+        self.db.save_market_data(bars.iloc[:60], 'XAUUSD', 'M15')
+        # Newest stored bar may still be forming and is left out
+        self.assertEqual(self.store.sync_from_database(self.db, 'XAUUSD', 'M15'), 59)
+
+        self.db.save_market_data(bars.iloc[59:], 'XAUUSD', 'M15')
+        self.assertEqual(self.store.sync_from_database(self.db, 'XAUUSD', 'M15'), 40)
+
+        arrays = self.store.read('XAUUSD', 'M15')
+        np.testing.assert_array_equal(arrays['close'], bars['close'].to_numpy()[:99])
+        np.testing.assert_array_equal(arrays['volume'], bars['volume'].to_numpy()[:99])
+
+
+if __name__ == '__main__':
+    unittest.main()
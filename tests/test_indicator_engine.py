@@ -0,0 +1,143 @@
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+import numpy as np
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
+from data.indicator_engine import IndicatorEngine, EMA, SMA, RollingStd, ATR, RSI, OBV, MACD
+from data.mt5_data_processor import MT5DataProcessor
+from analysis.confluence_analyzer import MomentumAnalyzer
+
+
+def make_bars(n=600, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1.5, n))
+    high = close + rng.random(n) * 2
+    low = close - rng.random(n) * 2
+    return pd.DataFrame({
+        'time': pd.date_range('2024-01-01', periods=n, freq='5min'),
+        'open': np.roll(close, 1),
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.integers(100, 1000, n).astype(float),
+        'tick_volume': rng.integers(100, 1000, n).astype(float),
+    })
+
+
+def run(indicator, df):
+    cols = [df[f].to_numpy(dtype=float) for f in indicator.fields]
+    return np.array([indicator.update(*(c[i] for c in cols)) for i in range(len(df))], dtype=object)
+
+
+class TestIndicatorParity(unittest.TestCase):
+    """Incremental indicators must reproduce the existing pandas implementations."""
+
+    def setUp(self):
+        self.df = make_bars()
+        self.processor = MT5DataProcessor()
+
+    def assertSeriesClose(self, actual, expected):
+        np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    def test_ema(self):
+        for period in (5, 12, 26, 200):
+            self.assertSeriesClose(run(EMA(period), self.df), self.processor.calculate_ema(self.df, period))
+
+    def test_atr_ema_smoothing(self):
+        self.assertSeriesClose(run(ATR(14), self.df), self.processor.calculate_atr(self.df, 14))
+
+    def test_atr_sma_smoothing(self):
+        df = self.df
+        ranges = pd.concat([df['high'] - df['low'],
+                            np.abs(df['high'] - df['close'].shift()),
+                            np.abs(df['low'] - df['close'].shift())], axis=1)
+        expected = np.max(ranges, axis=1).rolling(14).mean()
+        self.assertSeriesClose(run(ATR(14, smoothing='sma'), df), expected)
+
+    def test_rsi(self):
+        self.assertSeriesClose(run(RSI(14), self.df), self.processor.calculate_rsi(self.df, 14))
+
+    def test_obv(self):
+        self.assertSeriesClose(run(OBV(), self.df), self.processor.calculate_obv(self.df))
+
+    def test_macd(self):
+        expected = self.processor.calculate_macd(self.df)
+        values = np.array([list(v) for v in run(MACD(), self.df)])
+        self.assertSeriesClose(values[:, 0], expected['macd'])
+        self.assertSeriesClose(values[:, 1], expected['macd_signal'])
+        self.assertSeriesClose(values[:, 2], expected['macd_hist'])
+
+    def test_macd_matches_momentum_analyzer(self):
+        macd_line, signal_line, histogram = MomentumAnalyzer(MagicMock(spec=[]), bar_store=MagicMock()).calculate_macd(self.df)
+        values = np.array([list(v) for v in run(MACD(), self.df)])
+        self.assertSeriesClose(values[:, 2], histogram)
+
+    def test_rolling_mean_and_std(self):
+        self.assertSeriesClose(run(SMA(100), self.df), self.df['close'].rolling(100).mean())
+        self.assertSeriesClose(run(RollingStd(100), self.df), self.df['close'].rolling(100).std())
+        self.assertSeriesClose(run(SMA(20, field='tick_volume'), self.df), self.df['tick_volume'].rolling(20).mean())
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    def setUp(self):
+        self.df = make_bars()
+        self.engine = IndicatorEngine()
+        self.processor = MT5DataProcessor()
+
+    def test_incremental_updates_match_batch(self):
+        self.engine.register("XAUUSD", 5, 'ema', period=12)
+        self.engine.register("XAUUSD", 5, 'rsi', period=14)
+        self.engine.register("XAUUSD", 5, 'macd', fast=12, slow=26, signal=9)
+
+        self.engine.update("XAUUSD", 5, self.df.iloc[:300])
+        for end in range(300, len(self.df) + 1, 7):
+            # Callers pass a sliding window, the engine consumes only the new closed bars
+            window = self.df.iloc[max(0, end - 100):end]
+            self.engine.update("XAUUSD", 5, window)
+
+            history = self.df.iloc[:end]
+            self.assertAlmostEqual(self.engine.current("XAUUSD", 5, 'ema', period=12),
+                                   self.processor.calculate_ema(history, 12).iloc[-1], places=9)
+            self.assertAlmostEqual(self.engine.current("XAUUSD", 5, 'rsi', period=14),
+                                   self.processor.calculate_rsi(history, 14).iloc[-1], places=9)
+            macd = self.processor.calculate_macd(history)
+            tail = self.engine.tail("XAUUSD", 5, 'macd', 3, fast=12, slow=26, signal=9)
+            np.testing.assert_allclose([t[2] for t in tail], macd['macd_hist'].iloc[-3:], rtol=1e-9)
+
+    def test_forming_bar_is_not_committed(self):
+        self.engine.register("XAUUSD", 5, 'sma', period=3)
+        bars = self.df.iloc[:10].copy()
+        self.engine.update("XAUUSD", 5, bars)
+        bars.loc[bars.index[-1], 'close'] += 100
+        self.engine.update("XAUUSD", 5, bars)
+        self.assertAlmostEqual(self.engine.current("XAUUSD", 5, 'sma', period=3),
+                               bars['close'].rolling(3).mean().iloc[-1], places=9)
+
+    def test_bars_without_times_are_rejected(self):
+        self.engine.register("XAUUSD", 5, 'sma', period=5)
+        window = self.df.drop(columns='time').iloc[:100].reset_index(drop=True)
+        with self.assertRaises(ValueError):
+            self.engine.update("XAUUSD", 5, window)
+
+    def test_sliding_window_with_datetime_index(self):
+        self.engine.register("XAUUSD", 5, 'sma', period=5)
+        indexed = self.df.set_index('time')
+        for end in (100, 150, 200):
+            self.engine.update("XAUUSD", 5, indexed.iloc[end - 100:end])
+            self.assertAlmostEqual(self.engine.current("XAUUSD", 5, 'sma', period=5),
+                                   indexed['close'].iloc[end - 5:end].mean(), places=9)
+
+    def test_unknown_indicator(self):
+        with self.assertRaises(ValueError):
+            self.engine.register("XAUUSD", 5, 'vwap')
+
+
+if __name__ == '__main__':
+    unittest.main()
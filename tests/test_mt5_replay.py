@@ -0,0 +1,198 @@
+import unittest
+import sys
+import os
+import types
+import tempfile
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from data.mt5_replay import MT5Replay, ReplayClock, install, uninstall, timeframe_seconds
+from data.history_store import HistoryStore
+from data.database_manager import DatabaseManager
+
+START = datetime(2024, 1, 2)
+T0 = 1704153600 # 2024-01-02 00:00:00 UTC
+
+
+def make_m1(n=60, start=START):
+    close = 2000 + np.arange(n, dtype=float)
+    return pd.DataFrame({
+        'open': close - 0.5, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.full(n, 10),
+    }, index=pd.date_range(start, periods=n, freq='1min'))
+
+
+def make_ticks(prices, start=T0, step=1.0, spread=0.2):
+    prices = np.asarray(prices, dtype=float)
+    return pd.DataFrame({'time': start + np.arange(len(prices)) * step, 'bid': prices, 'ask': prices + spread})
+
+
+class TestReplayMarketData(unittest.TestCase):
+    def setUp(self):
+        self.mt5 = MT5Replay(ReplayClock(START))
+        self.bars = make_m1()
+        self.mt5.load_bars('XAUUSD', MT5Replay.TIMEFRAME_M1, self.bars)
+        m5 = self.bars.resample('5min').agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last',
+                                             'volume': 'sum'})
+        self.mt5.load_bars('XAUUSD', MT5Replay.TIMEFRAME_M5, m5)
+
+    def test_rates_stop_at_the_clock(self):
+        self.mt5.clock.set(T0 + 10 * 60 + 30) # 00:10:30
+        rates = self.mt5.copy_rates_from_pos('XAUUSD', MT5Replay.TIMEFRAME_M1, 0, 5)
+        self.assertEqual(len(rates), 5)
+        self.assertEqual(rates['time'][-1], T0 + 10 * 60)
+        # Forming bar: only its open is known without ticks
+        self.assertEqual(rates['close'][-1], self.bars['open'].iloc[10])
+        np.testing.assert_array_equal(rates['close'][:-1], self.bars['close'].to_numpy()[6:10])
+
+    def test_forming_bar_built_from_finer_bars(self):
+        self.mt5.clock.set(T0 + 7 * 60 + 30) # M5 bar 00:05 is forming, M1 bars 05 and 06 closed
+        rates = self.mt5.copy_rates_from_pos('XAUUSD', MT5Replay.TIMEFRAME_M5, 0, 2)
+        self.assertEqual(rates['time'][-1], T0 + 5 * 60)
+        self.assertEqual(rates['high'][-1], self.bars['high'].iloc[6])
+        self.assertEqual(rates['close'][-1], self.bars['open'].iloc[7])
+        self.assertLess(rates['high'][-1], self.bars['high'].iloc[9])
+
+    def test_range_and_tick(self):
+        self.mt5.clock.set(T0 + 30 * 60)
+        rates = self.mt5.copy_rates_range('XAUUSD', MT5Replay.TIMEFRAME_M1, START, datetime(2024, 1, 2, 0, 9))
+        self.assertEqual(len(rates), 10)
+        tick = self.mt5.symbol_info_tick('XAUUSD')
+        self.assertEqual(tick.bid, self.bars['open'].iloc[30])
+        self.assertAlmostEqual(tick.ask - tick.bid, 0.2)
+
+        self.mt5.load_ticks('XAUUSD', make_ticks([1990.0, 1991.0], start=T0 + 30 * 60 - 1))
+        tick = self.mt5.symbol_info_tick('XAUUSD')
+        self.assertEqual(tick.bid, 1991.0)
+        self.assertIsNone(self.mt5.symbol_info_tick('EURUSD'))
+
+    def test_history_store_and_database_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = HistoryStore(os.path.join(tmp, 'history'))
+            store.append('GOLD', 'M1', self.bars)
+            replay = MT5Replay(ReplayClock(T0 + 3600))
+            replay.load_history_store(store, 'GOLD', [MT5Replay.TIMEFRAME_M1])
+            np.testing.assert_array_equal(replay.copy_rates_from_pos('GOLD', MT5Replay.TIMEFRAME_M1, 0, 60)['close'],
+                                          self.bars['close'].to_numpy())
+
+            db = DatabaseManager(os.path.join(tmp, 'test.db'), maintenance_interval=None)
+            try:
+                db.save_market_data(self.bars, 'GOLD', 'M1')
+                replay.load_database(db, 'GOLD', {MT5Replay.TIMEFRAME_M1: 'M1'})
+            finally:
+                db.close()
+            self.assertEqual(len(replay.copy_rates_from_pos('GOLD', MT5Replay.TIMEFRAME_M1, 0, 100)), 60)
+            store.close()
+
+    def test_timeframe_seconds(self):
+        self.assertEqual(timeframe_seconds(MT5Replay.TIMEFRAME_M15), 900)
+        self.assertEqual(timeframe_seconds(MT5Replay.TIMEFRAME_H4), 14400)
+        self.assertEqual(timeframe_seconds(MT5Replay.TIMEFRAME_D1), 86400)
+
+
+class TestReplayBroker(unittest.TestCase):
+    def setUp(self):
+        self.mt5 = MT5Replay(ReplayClock(T0), balance=10000.0)
+        self.mt5.load_ticks('XAUUSD', make_ticks([2000.0, 2001.0, 2002.0, 1995.0, 1990.0, 2010.0]))
+        self.mt5.clock.set(T0)
+
+    def buy(self, volume=0.1, **extra):
+        request = {'action': MT5Replay.TRADE_ACTION_DEAL, 'symbol': 'XAUUSD', 'volume': volume,
+                   'type': MT5Replay.ORDER_TYPE_BUY, 'price': 2000.2, 'deviation': 20, 'magic': 7,
+                   'type_filling': MT5Replay.ORDER_FILLING_IOC}
+        request.update(extra)
+        return self.mt5.order_send(request)
+
+    def test_open_mark_and_close(self):
+        result = self.buy()
+        self.assertEqual(result.retcode, MT5Replay.TRADE_RETCODE_DONE)
+        self.assertEqual(result.price, 2000.2)
+
+        self.mt5.clock.set(T0 + 2)
+        position, = self.mt5.positions_get(symbol='XAUUSD')
+        self.assertEqual(position.magic, 7)
+        self.assertAlmostEqual(position.profit, (2002.0 - 2000.2) * 0.1 * 100)
+        self.assertAlmostEqual(self.mt5.account_info().equity, 10000.0 + position.profit)
+
+        close = self.mt5.order_send({'action': MT5Replay.TRADE_ACTION_DEAL, 'symbol': 'XAUUSD', 'volume': 0.1,
+                                     'type': MT5Replay.ORDER_TYPE_SELL, 'position': position.ticket,
+                                     'type_filling': MT5Replay.ORDER_FILLING_IOC})
+        self.assertEqual(close.retcode, MT5Replay.TRADE_RETCODE_DONE)
+        self.assertEqual(self.mt5.positions_get(), ())
+        self.assertAlmostEqual(self.mt5.account_info().balance, 10000.0 + (2002.0 - 2000.2) * 10)
+        self.assertEqual([d.entry for d in self.mt5.history_deals_get()], [0, 1])
+
+    def test_stop_loss_hit_between_polls(self):
+        result = self.buy(sl=1993.0, tp=2020.0)
+        ticket = result.order
+        # Jump past the 1990 tick: closed at the gap price, not the stop level
+        self.mt5.clock.set(T0 + 5)
+        self.assertEqual(self.mt5.positions_get(ticket=ticket), ())
+        deal = self.mt5.history_deals_get(position=ticket)[-1]
+        self.assertEqual(deal.reason, MT5Replay.DEAL_REASON_SL)
+        self.assertEqual(deal.price, 1990.0)
+        self.assertEqual(deal.time, T0 + 4)
+
+    def test_take_profit_on_bars(self):
+        replay = MT5Replay(ReplayClock(START))
+        bars = make_m1()
+        replay.load_bars('XAUUSD', MT5Replay.TIMEFRAME_M1, bars)
+        replay.clock.set(T0 + 60)
+        ticket = replay.order_send({'action': MT5Replay.TRADE_ACTION_DEAL, 'symbol': 'XAUUSD', 'volume': 0.01,
+                                    'type': MT5Replay.ORDER_TYPE_BUY, 'tp': 2005.0,
+                                    'type_filling': MT5Replay.ORDER_FILLING_FOK}).order
+        replay.clock.set(T0 + 20 * 60)
+        self.assertEqual(replay.positions_get(), ())
+        deal = replay.history_deals_get(position=ticket)[-1]
+        self.assertEqual((deal.reason, deal.price), (MT5Replay.DEAL_REASON_TP, 2005.0))
+
+    def test_rejections(self):
+        self.assertEqual(self.buy(sl=2000.5).retcode, MT5Replay.TRADE_RETCODE_INVALID_STOPS)
+        self.assertEqual(self.buy(volume=0.015).retcode, MT5Replay.TRADE_RETCODE_INVALID_VOLUME)
+        self.assertEqual(self.buy(volume=50.0).retcode, MT5Replay.TRADE_RETCODE_NO_MONEY)
+        self.assertEqual(self.buy(price=1990.0).retcode, MT5Replay.TRADE_RETCODE_REQUOTE)
+        self.mt5.add_symbol('XAUUSD', filling_mode=1)
+        self.assertEqual(self.buy().retcode, MT5Replay.TRADE_RETCODE_INVALID_FILL)
+        self.assertEqual(self.mt5.last_error()[0], MT5Replay.TRADE_RETCODE_INVALID_FILL)
+        self.assertEqual(self.mt5.positions_get(), ())
+
+    def test_modify_stops(self):
+        ticket = self.buy().order
+        result = self.mt5.order_send({'action': MT5Replay.TRADE_ACTION_SLTP, 'symbol': 'XAUUSD', 'position': ticket,
+                                      'sl': 1980.0, 'tp': 2050.0})
+        self.assertEqual(result.retcode, MT5Replay.TRADE_RETCODE_DONE)
+        position, = self.mt5.positions_get(ticket=ticket)
+        self.assertEqual((position.sl, position.tp), (1980.0, 2050.0))
+
+
+class TestInstall(unittest.TestCase):
+    def test_install_repoints_imported_modules(self):
+        fake_terminal = types.ModuleType('MetaTrader5')
+        previous = sys.modules.get('MetaTrader5')
+        sys.modules['MetaTrader5'] = fake_terminal
+        consumer = types.ModuleType('replay_consumer')
+        consumer.mt5 = fake_terminal
+        sys.modules['replay_consumer'] = consumer
+        replay = MT5Replay()
+        try:
+            install(replay)
+            import MetaTrader5
+            self.assertIs(MetaTrader5, replay)
+            self.assertIs(consumer.mt5, replay)
+            uninstall(replay)
+            self.assertIs(sys.modules['MetaTrader5'], fake_terminal)
+            self.assertIs(consumer.mt5, fake_terminal)
+        finally:
+            sys.modules.pop('replay_consumer', None)
+            if previous is None:
+                sys.modules.pop('MetaTrader5', None)
+            else:
+                sys.modules['MetaTrader5'] = previous
+
+
+if __name__ == '__main__':
+    unittest.main()
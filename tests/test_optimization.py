@@ -0,0 +1,189 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+import tempfile
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
+from analysis.optimization import WOAm, TETA, EvaluationCache, EarlyStopping
+
+BOUNDS = [(100.0, 500.0), (1.1, 2.0), (10.0, 100.0)]
+STEPS = [10.0, 0.1, 5.0]
+
+
+class CountingObjective:
+    def __init__(self, fingerprint="data-v1"):
+        self.calls = 0
+        self._fingerprint = fingerprint
+
+    def fingerprint(self):
+        return self._fingerprint
+
+    def __call__(self, params):
+        self.calls += 1
+        return -((params[0] - 300) ** 2) - ((params[1] - 1.5) * 100) ** 2 - (params[2] - 50) ** 2
+
+
+class TestEvaluationCache(unittest.TestCase):
+    def test_discretized_search_skips_duplicates(self):
+        for optimizer in (WOAm(pop_size=20), TETA(pop_size=20)):
+            objective = CountingObjective()
+            optimizer.optimize(objective, BOUNDS, steps=STEPS, epochs=15)
+            report = optimizer.get_report()
+            self.assertEqual(objective.calls, report['evaluations'])
+            self.assertEqual(report['cache_misses'], objective.calls)
+            self.assertEqual(report['cache_hits'] + report['cache_misses'], 20 * 16)
+            self.assertGreater(report['cache_hits'], 0)
+
+    def test_cached_scores_match_objective(self):
+        optimizer = WOAm(pop_size=10)
+        objective = CountingObjective()
+        population = np.array([[100.0, 1.1, 10.0], [100.0 + 1e-12, 1.1, 10.0], [200.0, 1.5, 20.0]])
+        first = optimizer._evaluate_population(objective, population)
+        second = optimizer._evaluate_population(objective, population)
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(first, [objective(p) for p in population], rtol=1e-12)
+        self.assertEqual(optimizer.cache.hits, 4)
+
+    def test_lru_eviction(self):
+        cache = EvaluationCache(maxsize=2)
+        cache.put(('f', (1.0,)), 1.0)
+        cache.put(('f', (2.0,)), 2.0)
+        cache.get(('f', (1.0,)))
+        cache.put(('f', (3.0,)), 3.0)
+        self.assertIsNone(cache.get(('f', (2.0,))))
+        self.assertEqual(cache.get(('f', (1.0,))), 1.0)
+        self.assertEqual(len(cache), 2)
+
+    def test_persistent_cache_starts_warm(self):
+        population = np.array([[100.0, 1.1, 10.0], [200.0, 1.5, 20.0], [300.0, 2.0, 30.0]])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.pkl')
+            first = WOAm(pop_size=3, cache_path=path)
+            first._evaluate_population(CountingObjective(), population)
+            first._finish_run()
+
+            warm = CountingObjective()
+            second = TETA(pop_size=3, cache_path=path)
+            second._evaluate_population(warm, population)
+            self.assertEqual(warm.calls, 0)
+
+            # A different dataset fingerprint must not reuse those scores
+            other = CountingObjective(fingerprint="data-v2")
+            second._evaluate_population(other, population)
+            self.assertEqual(other.calls, 3)
+
+    def test_reused_optimizer_does_not_leak_scores_between_closures(self):
+        def make(sign):
+            return lambda params: sign * float(np.sum(params))
+
+        population = np.array([[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]])
+        optimizer = WOAm(pop_size=3)
+        np.testing.assert_array_equal(optimizer._evaluate_population(make(1.0), population), [1, 2, 3])
+        np.testing.assert_array_equal(optimizer._evaluate_population(make(-1.0), population), [-1, -2, -3])
+
+        # Same through optimize(): each run must score with its own objective
+        for sign in (1.0, -1.0):
+            optimizer.optimize(make(sign), [(0.0, 2.0), (0.0, 2.0)], steps=[1.0, 1.0], epochs=5)
+            self.assertEqual(optimizer.best_score, make(sign)(optimizer.best_solution))
+
+    def test_report_counters_are_per_run(self):
+        optimizer = WOAm(pop_size=10)
+        for _ in range(2):
+            optimizer.optimize(CountingObjective(), BOUNDS, steps=STEPS, epochs=5)
+            report = optimizer.get_report()
+            self.assertEqual(report['cache_hits'] + report['cache_misses'], 10 * 6)
+            self.assertLessEqual(report['evaluations'], report['cache_misses'])
+
+    def test_cache_can_be_disabled(self):
+        objective = CountingObjective()
+        optimizer = WOAm(pop_size=5, cache_size=0)
+        optimizer._evaluate_population(objective, np.array([[100.0, 1.1, 10.0]] * 5))
+        self.assertEqual(objective.calls, 5)
+        self.assertNotIn('cache_hits', optimizer.get_report())
+
+
+class TestEarlyStopping(unittest.TestCase):
+    def test_flat_landscape_stops_on_patience(self):
+        for cls in (WOAm, TETA):
+            optimizer = cls(pop_size=10, early_stopping=EarlyStopping(patience=5))
+            optimizer.optimize(lambda params: 1.0, BOUNDS, epochs=100)
+            report = optimizer.get_report()
+            self.assertEqual(report['stop_reason'], 'no_improvement')
+            self.assertEqual(report['stop_epoch'], 5)
+            self.assertEqual(report['epochs_run'], 6)
+            self.assertEqual(len(optimizer.history), 6)
+
+    def test_diversity_floor(self):
+        optimizer = WOAm(pop_size=10, early_stopping=EarlyStopping(diversity_floor=10.0))
+        optimizer.optimize(CountingObjective(), BOUNDS, epochs=50)
+        self.assertEqual(optimizer.stop_reason, 'diversity_floor')
+        self.assertEqual(optimizer.stop_epoch, 0)
+
+    def test_time_budget(self):
+        optimizer = TETA(pop_size=5, early_stopping=EarlyStopping(time_budget=0.0))
+        optimizer.optimize(CountingObjective(), BOUNDS, epochs=50)
+        self.assertEqual(optimizer.stop_reason, 'time_budget')
+        self.assertEqual(optimizer.epochs_run, 1)
+
+    def test_runs_all_epochs_without_criteria(self):
+        optimizer = WOAm(pop_size=5)
+        optimizer.optimize(lambda params: 1.0, BOUNDS, epochs=7)
+        self.assertIsNone(optimizer.stop_reason)
+        self.assertEqual(optimizer.epochs_run, 7)
+
+
+def reference_teta_move(rng, population, local_best_pos, best_solution, bounds, steps):
+    """Original per-agent, per-dimension TETA move loop."""
+    n, dim = population.shape
+    new_pop = population.copy()
+    for i in range(n):
+        for j in range(dim):
+            rnd = rng.random()
+            rnd *= rnd
+            pair = max(0, min(n - 1, int(rnd * (n - 1))))
+            if i != pair:
+                if i < pair:
+                    val = population[i, j] + rnd * (local_best_pos[pair, j] - local_best_pos[i, j])
+                elif rng.random() > rnd:
+                    val = local_best_pos[i, j] + (1.0 - rnd) * (local_best_pos[pair, j] - local_best_pos[i, j])
+                else:
+                    val = local_best_pos[pair, j]
+            else:
+                val = rng.normal(best_solution[j], (bounds[j][1] - bounds[j][0]) / 6.0)
+            val = max(bounds[j][0], min(bounds[j][1], val))
+            if steps[j] > 0:
+                val = round(val / steps[j]) * steps[j]
+            new_pop[i, j] = val
+    return new_pop
+
+
+class TestVectorizedTETA(unittest.TestCase):
+    def test_move_is_statistically_equivalent(self):
+        rng = np.random.default_rng(5)
+        optimizer = TETA(pop_size=8)
+        optimizer.rng = np.random.default_rng(6)
+        population = optimizer._initialize_population(8, 3, BOUNDS)
+        local_best = population + rng.normal(0, 5, population.shape)
+        optimizer.best_solution = local_best[0]
+        steps = [10.0, 0.0, 5.0]
+
+        trials = 2000
+        vectorized = np.array([optimizer._move(population, local_best, BOUNDS, steps) for _ in range(trials)])
+        reference = np.array([reference_teta_move(rng, population, local_best, optimizer.best_solution, BOUNDS, steps)
+                              for _ in range(trials)])
+
+        # Per-cell means agree within 5 standard errors, spreads within 15%
+        std_error = np.sqrt((vectorized.var(axis=0) + reference.var(axis=0)) / trials)
+        self.assertTrue(np.all(np.abs(vectorized.mean(axis=0) - reference.mean(axis=0)) <= 5 * std_error + 1e-12))
+        np.testing.assert_allclose(vectorized.std(axis=0), reference.std(axis=0), rtol=0.15, atol=1e-9)
+        self.assertTrue(np.all(vectorized >= np.array(BOUNDS)[:, 0]) and np.all(vectorized <= np.array(BOUNDS)[:, 1]))
+        np.testing.assert_allclose(vectorized[..., 0] % 10.0, 0.0, atol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
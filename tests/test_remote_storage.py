@@ -0,0 +1,259 @@
+import unittest
+from unittest.mock import patch
+import threading
+import tempfile
+import gzip
+import json
+import sys
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import requests
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from utils.remote_storage import RemoteStorage, encode_market_data
+
+ENV = {"POSTGRES_API_URL": "http://backend/api", "POSTGRES_API_KEY": "k", "TELEGRAM_CHAT_ID": "42"}
+
+
+class FakeResponse:
+    def __init__(self, status_code, text="", body=None, headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        return self.body
+
+
+class FakeSession:
+    """Records POSTs; ``down`` makes every call fail like an unreachable backend."""
+
+    def __init__(self):
+        self.posts = []
+        self.gzipped = []
+        self.down = False
+        self.status = 200
+        self.lock = threading.Lock()
+        self.gets = []
+        self.rows = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        if self.down:
+            raise requests.ConnectionError("connection refused")
+        compressed = (headers or {}).get("Content-Encoding") == "gzip"
+        body = json.loads(gzip.decompress(data) if compressed else data)
+        with self.lock:
+            self.posts.append((url, body))
+            self.gzipped.append(compressed)
+        if callable(self.status):
+            return FakeResponse(self.status(body))
+        return FakeResponse(self.status)
+
+    def get(self, url, params=None, timeout=None):
+        """Keyset pages over ``self.rows`` (oldest first); the cursor is '<order>:<index of last row served>'."""
+        self.gets.append(params)
+        if params.get('cursor'):
+            order, last = params['cursor'].split(':')
+            last = int(last)
+        else:
+            order = params.get('order', 'desc')
+            last = -1 if order == 'asc' else len(self.rows)
+        if order == 'asc':
+            indices = list(range(last + 1, len(self.rows)))
+        else:
+            indices = list(range(last - 1, -1, -1))
+        page, rest = indices[:params['limit']], indices[params['limit']:]
+        headers = {'X-Has-More': '1' if rest else '0'}
+        if page:
+            headers['X-Next-Cursor'] = f"{order}:{page[-1]}"
+        elif params.get('cursor'):
+            headers['X-Next-Cursor'] = params['cursor']
+        return FakeResponse(200, body=[self.rows[i] for i in page], headers=headers)
+
+    def endpoints(self):
+        return [url.rsplit('/api/', 1)[1] for url, _ in self.posts]
+
+
+class TestRemoteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.spool_path = os.path.join(self.tmp.name, 'spool.jsonl')
+        self.session = FakeSession()
+        self.env = patch.dict(os.environ, ENV)
+        self.env.start()
+        self.storages = []
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def make(self, **kwargs):
+        settings = dict(batch_size=10, flush_interval=60.0, retry_interval=60.0, spool_path=self.spool_path,
+                        session=self.session)
+        settings.update(kwargs)
+        storage = RemoteStorage(**settings)
+        self.storages.append(storage)
+        return storage
+
+    def metric(self, i):
+        return {'balance': 1000.0 + i, 'equity': 1000.0, 'margin': 0.0, 'free_margin': 1000.0,
+                'margin_level': 0.0, 'total_profit': 0.0, 'symbol_pnl': 0.0, 'timestamp': datetime(2024, 1, 2, 0, i)}
+
+    def test_records_are_coalesced_per_endpoint(self):
+        storage = self.make()
+        for i in range(25):
+            storage.save_account_metrics(self.metric(i))
+        storage.save_trade({'ticket': 1, 'symbol': 'GOLD', 'action': 'BUY', 'volume': 0.01, 'price': 2000.0,
+                            'time': datetime(2024, 1, 2)})
+        storage.update_trade_performance(1, {'close_price': 2001.0, 'close_time': datetime(2024, 1, 2, 1),
+                                             'profit': 1.0, 'mfe': 1.0, 'mae': 0.0})
+        self.assertTrue(storage.flush(timeout=5))
+
+        endpoints = self.session.endpoints()
+        self.assertEqual(endpoints.count('account_metrics/batch'), 3)
+        self.assertLess(endpoints.index('trades/batch'), endpoints.index('trades/update/batch'))
+        self.assertTrue(all(len(batch) <= 10 for _, batch in self.session.posts))
+        metrics = [r for url, batch in self.session.posts if 'account_metrics' in url for r in batch]
+        self.assertEqual([m['balance'] for m in metrics], [1000.0 + i for i in range(25)])
+        self.assertEqual(metrics[3]['timestamp'], '2024-01-02T00:03:00')
+        self.assertEqual(metrics[0]['chat_id'], '42')
+        update = self.session.posts[endpoints.index('trades/update/batch')][1][0]
+        self.assertEqual((update['ticket'], update['close_time']), (1, '2024-01-02T01:00:00'))
+        self.assertEqual(storage.get_stats()['sent'], 27)
+
+    def test_time_trigger(self):
+        storage = self.make(flush_interval=0.05)
+        storage.save_signal({'symbol': 'GOLD', 'final_signal': 'buy'})
+        for _ in range(100):
+            if self.session.posts:
+                break
+            threading.Event().wait(0.02)
+        self.assertEqual(self.session.endpoints(), ['signals/batch'])
+
+    def test_unreachable_backend_spools_and_replays_in_order(self):
+        self.session.down = True
+        storage = self.make()
+        storage.save_account_metrics(self.metric(0))
+        storage.flush(timeout=5)
+        self.assertEqual(storage.get_stats()['spooled'], 1)
+
+        # Backend is back, but the older spooled batch has not been replayed yet: new records queue behind it
+        self.session.down = False
+        storage.save_account_metrics(self.metric(1))
+        storage.flush(timeout=5)
+        self.assertEqual(self.session.posts, [])
+        with open(self.spool_path) as f:
+            self.assertEqual([json.loads(line)['endpoint'] for line in f], ['account_metrics', 'account_metrics'])
+        self.session.down = True
+        storage.close()
+
+        # A restarted bot replays the spool first
+        self.session.down = False
+        restarted = self.make()
+        restarted.flush(timeout=5)
+        sent = [r['balance'] for _, batch in self.session.posts for r in batch]
+        self.assertEqual(sent, [1000.0, 1001.0])
+        self.assertFalse(os.path.exists(self.spool_path))
+        self.assertEqual(restarted.get_stats()['replayed'], 2)
+
+    def test_server_errors_are_retried_but_bad_records_are_not(self):
+        self.session.status = 503
+        storage = self.make()
+        storage.save_account_metrics(self.metric(0))
+        storage.flush(timeout=5)
+        self.assertEqual(storage.get_stats()['spooled'], 1)
+        storage.close()
+        os.remove(self.spool_path)
+
+        # 422 on a batch: records are resent one by one so only the invalid one is lost
+        self.session.posts.clear()
+        self.session.status = lambda batch: 422 if any(r['balance'] < 0 for r in batch) else 200
+        storage = self.make()
+        for i in (0, 1):
+            storage.save_account_metrics(self.metric(i))
+        storage.save_account_metrics(dict(self.metric(2), balance=-1.0))
+        storage.flush(timeout=5)
+        stats = storage.get_stats()
+        self.assertEqual((stats['sent'], stats['rejected'], stats['spooled']), (2, 1, 0))
+        self.assertFalse(os.path.exists(self.spool_path))
+
+    def test_market_data_frames(self):
+        storage = self.make(market_data_chunk=100)
+        index = pd.date_range('2024-01-02', periods=150, freq='1min')
+        df = pd.DataFrame({'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0}, index=index)
+        df.iloc[3, df.columns.get_loc('close')] = np.nan
+        storage.save_market_data_batch(df, 'GOLD', 'M1')
+        storage.flush(timeout=5)
+        self.assertEqual(self.session.endpoints(), ['market_data/batch', 'market_data/batch'])
+        # Large bodies are compressed
+        self.assertEqual(self.session.gzipped, [True, False])
+        body = self.session.posts[0][1]
+        self.assertEqual((body['format'], body['symbol'], body['timeframe'], body['chat_id']),
+                         ('columnar', 'GOLD', 'M1', '42'))
+        self.assertEqual(len(body['columns']['timestamp']), 100)
+        self.assertEqual(body['columns']['timestamp'][0], '2024-01-02T00:00:00')
+        self.assertIsNone(body['columns']['close'][3])
+        self.assertEqual(storage.get_stats()['sent'], 150)
+
+    def test_encoder_matches_row_records(self):
+        index = pd.date_range('2024-01-02 23:58', periods=4, freq='1min')
+        df = pd.DataFrame({'open': [1.0, np.nan, 3.0, 4.0], 'high': 5.0, 'low': 0.5, 'close': 2.0,
+                           'volume': [1, 2, 3, np.nan]}, index=index)
+        expected = [{
+            'timestamp': t.isoformat(), 'chat_id': '7', 'symbol': 'GOLD', 'timeframe': 'M1',
+            **{name: None if np.isnan(row[name]) else float(row[name])
+               for name in ('open', 'high', 'low', 'close', 'volume')},
+        } for t, row in df.iterrows()]
+        self.assertEqual(encode_market_data(df, 'GOLD', 'M1', chat_id='7', layout='records'), expected)
+
+        columnar = encode_market_data(df.tz_localize('Asia/Shanghai'), 'GOLD', 'M1')
+        self.assertEqual(columnar['columns']['timestamp'][0], '2024-01-02T15:58:00') # UTC
+        self.assertEqual(columnar['columns']['volume'], [1.0, 2.0, 3.0, None])
+        # Strict JSON: no NaN tokens
+        json.dumps(columnar, allow_nan=False)
+
+    def test_get_trades_pages_with_server_side_filters(self):
+        self.session.rows = [{'ticket': i} for i in range(12)]
+        storage = self.make()
+        trades = storage.get_trades(limit=10, symbol='GOLD', fields=['ticket', 'profit'], result='CLOSED',
+                                    page_size=4)
+        self.assertEqual([t['ticket'] for t in trades], list(range(11, 1, -1)))
+        self.assertEqual([params['limit'] for params in self.session.gets], [4, 4, 2])
+        first = self.session.gets[0]
+        self.assertEqual((first['symbol'], first['result'], first['fields'], first['chat_id']),
+                         ('GOLD', 'CLOSED', 'ticket,profit', '42'))
+        self.assertNotIn('cursor', first)
+        self.assertEqual(self.session.gets[1]['cursor'], 'desc:8')
+
+        self.assertEqual(len(storage.get_trades(limit=None, page_size=5)), 12)
+
+    def test_fetch_deltas_resumes_from_cursor(self):
+        self.session.rows = [{'id': i} for i in range(5)]
+        storage = self.make()
+        rows, cursor = storage.fetch_deltas('signals', page_size=2)
+        self.assertEqual([r['id'] for r in rows], list(range(5)))
+        self.assertEqual(self.session.gets[0]['order'], 'asc')
+
+        self.session.rows += [{'id': 5}]
+        rows, cursor = storage.fetch_deltas('signals', cursor=cursor)
+        self.assertEqual(rows, [{'id': 5}])
+        self.assertEqual(storage.fetch_deltas('signals', cursor=cursor), ([], cursor))
+
+    def test_disabled_without_url(self):
+        with patch.dict(os.environ, {"POSTGRES_API_URL": ""}):
+            storage = RemoteStorage(spool_path=self.spool_path)
+        storage.save_trade({'ticket': 1})
+        self.assertIsNone(storage._thread)
+        self.assertTrue(storage.flush())
+        storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import tempfile
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+# The server reads its database URL at import time; point it at a throwaway SQLite file
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("POSTGRES_CONNECTION_STRING", f"sqlite:///{os.path.join(_tmp.name, 'server.db')}")
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from server import models
+from server.bulk import (bulk_upsert, _copy_value, MARKET_DATA_KEY, MARKET_DATA_FIELDS,
+                         TRADE_KEY, TRADE_FIELDS)
+
+T0 = datetime(2024, 1, 2)
+
+
+def bars(n, start=0, close=1.0):
+    return [{'timestamp': T0 + timedelta(minutes=start + i), 'symbol': 'GOLD', 'timeframe': 'M1',
+             'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': close, 'volume': None} for i in range(n)]
+
+
+class FakePostgresSession:
+    """Compiles statements for PostgreSQL and answers RETURNING with 'first row new, rest updated'."""
+
+    def __init__(self):
+        self.statements = []
+        self.bind = type('Bind', (), {'dialect': postgresql.dialect()})()
+
+    def get_bind(self):
+        return self.bind
+
+    def execute(self, stmt):
+        compiled = stmt.compile(dialect=self.bind.dialect)
+        self.statements.append((str(compiled), compiled.params))
+        rows = len([k for k in compiled.params if k.startswith('symbol')])
+        return [(i == 0,) for i in range(rows)]
+
+
+class TestBulkUpsert(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'bulk.db')}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def upsert_bars(self, rows):
+        counts = bulk_upsert(self.db, models.MarketData, rows, MARKET_DATA_KEY, MARKET_DATA_FIELDS)
+        self.db.commit()
+        return counts
+
+    def test_market_data_inserts_then_updates(self):
+        # More rows than fit in one SQLite statement
+        self.assertEqual(self.upsert_bars(bars(300)), {'inserted': 300, 'updated': 0})
+        counts = self.upsert_bars(bars(100, start=250, close=9.0))
+        self.assertEqual(counts, {'inserted': 50, 'updated': 50})
+        self.assertEqual(self.db.query(models.MarketData).count(), 350)
+        row = self.db.get(models.MarketData, (T0 + timedelta(minutes=260), 'GOLD', 'M1'))
+        self.assertEqual(row.close, 9.0)
+        self.assertIsNone(row.volume)
+
+    def test_duplicate_keys_in_one_batch(self):
+        rows = bars(2) + bars(1, close=5.0)
+        self.assertEqual(self.upsert_bars(rows), {'inserted': 2, 'updated': 0})
+        self.assertEqual(self.db.get(models.MarketData, (T0, 'GOLD', 'M1')).close, 5.0)
+        self.assertEqual(self.upsert_bars([]), {'inserted': 0, 'updated': 0})
+
+    def test_trades(self):
+        trade = {'ticket': 7, 'symbol': 'GOLD', 'action': 'BUY', 'volume': 0.1, 'price': 2000.0,
+                 'time': T0, 'result': 'OPEN', 'chat_id': '1'}
+        counts = bulk_upsert(self.db, models.Trade, [trade, dict(trade, ticket=8)], TRADE_KEY, TRADE_FIELDS)
+        self.assertEqual(counts, {'inserted': 2, 'updated': 0})
+        counts = bulk_upsert(self.db, models.Trade, [dict(trade, price=2001.0)], TRADE_KEY, TRADE_FIELDS)
+        self.db.commit()
+        self.assertEqual(counts, {'inserted': 0, 'updated': 1})
+        self.assertEqual(self.db.get(models.Trade, 7).price, 2001.0)
+
+    def test_postgres_statement(self):
+        db = FakePostgresSession()
+        counts = bulk_upsert(db, models.MarketData, bars(3), MARKET_DATA_KEY, MARKET_DATA_FIELDS)
+        self.assertEqual(counts, {'inserted': 1, 'updated': 2})
+        (sql, params), = db.statements
+        self.assertIn('ON CONFLICT (timestamp, symbol, timeframe) DO UPDATE SET open = excluded.open', sql)
+        self.assertIn('RETURNING (xmax = 0)', sql)
+        self.assertEqual(len(params), 3 * len(MARKET_DATA_FIELDS))
+
+    def test_copy_text_format(self):
+        self.assertEqual(_copy_value(None), '\\N')
+        self.assertEqual(_copy_value(T0), '2024-01-02 00:00:00')
+        self.assertEqual(_copy_value('a\tb\\c\nd'), 'a\\tb\\\\c\\nd')
+        self.assertEqual(_copy_value(1.5), '1.5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+import unittest
+import asyncio
+import tempfile
+import sys
+import os
+from datetime import datetime
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+# The server reads its database URL at import time; point it at a throwaway SQLite file
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("POSTGRES_CONNECTION_STRING", f"sqlite:///{os.path.join(_tmp.name, 'server.db')}")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from server import models
+from server.ingest import IngestBuffer, BufferFull
+
+
+class FakeAsyncSession:
+    """Async session facade over a sync SQLite session, counting commits like a database would see them."""
+
+    def __init__(self, factory, log):
+        self.db = factory()
+        self.log = log
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.db.close()
+
+    async def run_sync(self, fn, *args):
+        await asyncio.sleep(0.01) # a round trip to the database
+        return fn(self.db, *args)
+
+    async def commit(self):
+        self.db.commit()
+        self.log.append('commit')
+
+    async def rollback(self):
+        self.db.rollback()
+        self.log.append('rollback')
+
+
+def write_metrics(db, batches):
+    rows = [row for batch in batches for row in batch]
+    db.execute(insert(models.AccountMetric), rows)
+    return [len(batch) for batch in batches]
+
+
+def write_failing(db, batches):
+    if any(row.get('bad') for batch in batches for row in batch):
+        raise ValueError("bad row")
+    return [len(batch) for batch in batches]
+
+
+def metric(i, chat_id='1'):
+    return {'timestamp': datetime(2024, 1, 2, 0, i % 60), 'balance': 1000.0 + i, 'equity': 1000.0,
+            'margin': 0.0, 'free_margin': 1000.0, 'margin_level': 0.0, 'total_profit': 0.0,
+            'symbol_pnl': 0.0, 'chat_id': chat_id}
+
+
+class TestIngestBuffer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'ingest.db')}")
+        models.Base.metadata.create_all(self.engine)
+        factory = sessionmaker(bind=self.engine)
+        self.log = []
+        self.session_factory = lambda: FakeAsyncSession(factory, self.log)
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def run_buffer(self, scenario, **kwargs):
+        async def main():
+            buffer = IngestBuffer(self.session_factory, **kwargs)
+            buffer.start()
+            try:
+                return await scenario(buffer)
+            finally:
+                await buffer.stop()
+        return asyncio.run(main())
+
+    def count_metrics(self):
+        db = sessionmaker(bind=self.engine)()
+        try:
+            return db.query(models.AccountMetric).count()
+        finally:
+            db.close()
+
+    def test_concurrent_requests_share_commits(self):
+        async def scenario(buffer):
+            # 30 bots posting one metric each at the same moment
+            results = await asyncio.gather(*[buffer.submit(write_metrics, [metric(i, str(i))]) for i in range(30)])
+            return results, buffer.get_stats()
+
+        results, stats = self.run_buffer(scenario, max_delay=0.05)
+        self.assertEqual(results, [1] * 30)
+        self.assertEqual(self.count_metrics(), 30)
+        self.assertEqual(self.log, ['commit'])
+        self.assertEqual((stats['requests'], stats['rows'], stats['flushes']), (30, 30, 1))
+        self.assertEqual(stats['avg_rows_per_flush'], 30.0)
+        self.assertIsNotNone(stats['flush_latency_ms']['p95'])
+        self.assertEqual(stats['pending_rows'], 0)
+
+    def test_size_trigger_does_not_wait_for_the_delay(self):
+        async def scenario(buffer):
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await buffer.submit(write_metrics, [metric(i) for i in range(5)])
+            return loop.time() - started
+
+        elapsed = self.run_buffer(scenario, max_rows=5, max_delay=10.0)
+        self.assertLess(elapsed, 5.0)
+        self.assertEqual(self.count_metrics(), 5)
+
+    def test_latency_trigger(self):
+        async def scenario(buffer):
+            first = await buffer.submit(write_metrics, [metric(0)])
+            second = await buffer.submit(write_metrics, [metric(1)])
+            return first, second, buffer.get_stats()
+
+        first, second, stats = self.run_buffer(scenario, max_rows=1000, max_delay=0.01)
+        self.assertEqual((first, second), (1, 1))
+        self.assertEqual(stats['flushes'], 2)
+
+    def test_bad_request_does_not_fail_the_others(self):
+        async def scenario(buffer):
+            return await asyncio.gather(
+                buffer.submit(write_metrics, [metric(0)]),
+                buffer.submit(write_failing, [{'bad': True}]),
+                buffer.submit(write_metrics, [metric(1)]),
+                return_exceptions=True)
+
+        good, bad, other = self.run_buffer(scenario, max_delay=0.05)
+        self.assertEqual((good, other), (1, 1))
+        self.assertIsInstance(bad, ValueError)
+        self.assertEqual(self.count_metrics(), 2)
+        # The combined transaction rolled back, then each request ran on its own
+        self.assertEqual(self.log, ['rollback', 'commit', 'rollback', 'commit'])
+
+    def test_backlog_limit(self):
+        async def scenario(buffer):
+            first = asyncio.ensure_future(buffer.submit(write_metrics, [metric(i) for i in range(8)]))
+            await asyncio.sleep(0)
+            with self.assertRaises(BufferFull):
+                await buffer.submit(write_metrics, [metric(i) for i in range(8)])
+            await first
+            return buffer.get_stats()
+
+        stats = self.run_buffer(scenario, max_rows=100, max_delay=0.05, max_pending_rows=10)
+        self.assertEqual(stats['rejected_full'], 1)
+        self.assertEqual(self.count_metrics(), 8)
+
+    def test_stop_flushes_pending_requests(self):
+        async def main():
+            buffer = IngestBuffer(self.session_factory, max_delay=10.0)
+            buffer.start()
+            pending = asyncio.ensure_future(buffer.submit(write_metrics, [metric(0)]))
+            await asyncio.sleep(0)
+            await buffer.stop()
+            return await pending
+
+        self.assertEqual(asyncio.run(main()), 1)
+        self.assertEqual(self.count_metrics(), 1)
+
+
+class TestPoolStats(unittest.TestCase):
+    def test_queue_pool(self):
+        try:
+            from server.database import pool_stats
+        except ImportError:
+            self.skipTest("async database driver not installed")
+        engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2, max_overflow=3)
+        conn = engine.connect()
+        stats = pool_stats(engine)
+        conn.close()
+        engine.dispose()
+        self.assertEqual((stats['checked_out'], stats['capacity']), (1, 5))
+        self.assertEqual(stats['saturation'], 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
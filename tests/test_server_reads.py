@@ -0,0 +1,140 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+# The server reads its database URL at import time; point it at a throwaway SQLite file
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("POSTGRES_CONNECTION_STRING", f"sqlite:///{os.path.join(_tmp.name, 'server.db')}")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from server import models, reads
+
+T0 = datetime(2024, 1, 2)
+
+
+class TestKeysetReads(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'reads.db')}")
+        models.Base.metadata.create_all(self.engine)
+        self.db = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.db.close()
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def read(self, name, fields=None, limit=100, **kwargs):
+        resource = reads.RESOURCES[name]
+        fields = reads.parse_fields(resource, fields)
+        stmt, order = reads.select_page(resource, fields, limit, **kwargs)
+        rows = self.db.execute(stmt).all()
+        return reads.make_page(resource, rows, fields, limit, order, cursor=kwargs.get('cursor'))
+
+    def read_all(self, name, page_size, **kwargs):
+        seen, cursor = [], None
+        while True:
+            page = self.read(name, limit=page_size, cursor=cursor, **kwargs)
+            seen.extend(page['rows'])
+            cursor = page['next_cursor']
+            if not page['has_more']:
+                return seen, page
+
+    def add_bars(self, symbol, n):
+        self.db.add_all([models.MarketData(timestamp=T0 + timedelta(minutes=i), symbol=symbol, timeframe='M1',
+                                           open=1.0, high=2.0, low=0.5, close=float(i), volume=1.0)
+                         for i in range(n)])
+        self.db.commit()
+
+    def test_pages_cover_every_row_once(self):
+        self.add_bars('GOLD', 25)
+        self.add_bars('EURUSD', 25)
+        rows, last = self.read_all('market_data', 7, fields='timestamp,symbol,close')
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(len(set(rows)), 50)
+        # Newest first, ties broken by the rest of the key
+        self.assertEqual(rows[0], (T0 + timedelta(minutes=24), 'GOLD', 24.0))
+        self.assertEqual(rows[1], (T0 + timedelta(minutes=24), 'EURUSD', 24.0))
+        self.assertFalse(last['has_more'])
+
+        asc, _ = self.read_all('market_data', 10, fields='close', order='asc', filters={'symbol': 'GOLD'})
+        self.assertEqual([r[0] for r in asc], [float(i) for i in range(25)])
+
+    def test_time_range_and_fields(self):
+        self.add_bars('GOLD', 30)
+        page = self.read('market_data', fields='close', start=T0 + timedelta(minutes=10),
+                         end=T0 + timedelta(minutes=20), filters={'symbol': 'GOLD', 'timeframe': 'M1'})
+        self.assertEqual([r[0] for r in page['rows']], [float(i) for i in range(19, 9, -1)])
+        with self.assertRaises(ValueError):
+            reads.parse_fields(reads.RESOURCES['market_data'], 'close,bogus')
+
+    def test_deltas_pick_up_new_rows_and_closed_trades(self):
+        def trade(ticket, minutes):
+            return models.Trade(ticket=ticket, symbol='GOLD', action='BUY', volume=0.1, price=2000.0,
+                                time=T0 + timedelta(minutes=minutes), result='OPEN', chat_id='1')
+        self.db.add_all([trade(1, 0), trade(2, 1)])
+        self.db.commit()
+
+        page = self.read('trades', fields='ticket,result', limit=10)
+        self.assertEqual(page['rows'], [(2, 'OPEN'), (1, 'OPEN')])
+        cursor = page['delta_cursor']
+        self.assertEqual(self.read('trades', cursor=cursor)['rows'], [])
+
+        # Trade 1 closes, trade 3 opens: both show up after the cursor, in change order
+        closed = self.db.get(models.Trade, 1)
+        closed.result, closed.close_time, closed.profit = 'CLOSED', T0 + timedelta(minutes=5), 3.0
+        self.db.add(trade(3, 2))
+        self.db.commit()
+        delta = self.read('trades', fields='ticket,result', cursor=cursor)
+        self.assertEqual(delta['rows'], [(3, 'OPEN'), (1, 'CLOSED')])
+        self.assertEqual(self.read('trades', cursor=delta['next_cursor'])['rows'], [])
+        # Nothing new: the cursor stays where it was
+        self.assertEqual(self.read('trades', cursor=delta['next_cursor'])['next_cursor'], delta['next_cursor'])
+
+    def test_append_only_deltas(self):
+        metric = dict(timestamp=T0, balance=1.0, equity=1.0, margin=0.0, free_margin=1.0, margin_level=0.0,
+                      total_profit=0.0, symbol_pnl=0.0, chat_id='1')
+        self.db.add_all([models.AccountMetric(**metric) for _ in range(3)])
+        self.db.commit()
+        rows, last = self.read_all('account_metrics', 2, fields='id', order='asc')
+        self.assertEqual(rows, [(1,), (2,), (3,)])
+        self.db.add(models.AccountMetric(**metric))
+        self.db.commit()
+        self.assertEqual(self.read('account_metrics', fields='id', cursor=last['next_cursor'])['rows'], [(4,)])
+
+    def test_cursor_validation(self):
+        cursor = reads.encode_cursor(reads.RESOURCES['signals'], 'asc', [5])
+        self.assertEqual(reads.decode_cursor(reads.RESOURCES['signals'], cursor), ('asc', [5]))
+        with self.assertRaises(ValueError):
+            reads.decode_cursor(reads.RESOURCES['trades'], cursor)
+        with self.assertRaises(ValueError):
+            reads.decode_cursor(reads.RESOURCES['signals'], 'not-a-cursor')
+        with self.assertRaises(ValueError):
+            reads.select_page(reads.RESOURCES['signals'], ['id'], 10, order='desc', cursor=cursor)
+
+    def test_encoders(self):
+        self.db.add(models.Signal(timestamp=T0, symbol='GOLD', timeframe='M15', signal='buy', strength=0.7,
+                                  source='smc', details={'score': 1}, chat_id='1'))
+        self.db.commit()
+        fields = ['id', 'timestamp', 'details', 'strength']
+        page = self.read('signals', fields=','.join(fields))
+        self.assertEqual(json.loads(reads.encode_json(fields, page['rows'])),
+                         [{'id': 1, 'timestamp': '2024-01-02T00:00:00', 'details': {'score': 1}, 'strength': 0.7}])
+        if reads.pa is None:
+            self.skipTest("pyarrow not installed")
+        table = reads.pa.ipc.open_stream(reads.encode_arrow(reads.RESOURCES['signals'], fields, page['rows'])).read_all()
+        self.assertEqual(table.column_names, fields)
+        self.assertEqual(str(table.schema.field('timestamp').type), 'timestamp[us]')
+        self.assertEqual(table.column('details').to_pylist(), ['{"score": 1}'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,8 @@ import os
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
 
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
 from strategies.orb_strategy import GoldORBStrategy
 from strategies.grid_strategy import KalmanGridStrategy
 from analysis.smc_validator import SMCQualityValidator
@@ -66,6 +68,17 @@ class TestGridStrategy(unittest.TestCase):
         self.assertIn('price', orders[1])
         self.assertIn('type', orders[1])
 
+    def test_sliding_window_without_time_column(self):
+        # Frames with a RangeIndex and no 'time' column fall back to full rolling computation
+        rng = np.random.default_rng(3)
+        close = 2000 + np.arange(300, dtype=float)
+        df = pd.DataFrame({'open': close, 'high': close + rng.random(300), 'low': close - rng.random(300),
+                           'close': close, 'tick_volume': rng.integers(100, 1000, 300).astype(float)})
+        for end in (150, 200, 300):
+            window = df.iloc[end - 150:end].reset_index(drop=True)
+            self.strategy.update_market_data(window)
+            self.assertAlmostEqual(self.strategy.ma_value, close[end - 100:end].mean(), places=9)
+
 class TestSMCValidator(unittest.TestCase):
     def setUp(self):
         self.validator = SMCQualityValidator()
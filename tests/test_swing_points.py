@@ -0,0 +1,148 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
+from analysis.swing_points import swing_highs, swing_lows
+from analysis.confluence_analyzer import TrendlineAnalyzer
+from analysis.advanced_analysis import SMCAnalyzer, MTFAnalyzer
+
+
+def brute_force_highs(values, left, right, strict, partial):
+    n = len(values)
+    result = []
+    for i in range(n):
+        if not partial and (i < left or i >= n - right):
+            continue
+        neighbours = [values[j] for j in range(i - left, i + right + 1) if j != i and 0 <= j < n]
+        if all(values[i] > v if strict else values[i] >= v for v in neighbours):
+            result.append(i)
+    return result
+
+
+class TestSwingPoints(unittest.TestCase):
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(3)
+        for _ in range(20):
+            values = np.round(100 + np.cumsum(rng.normal(0, 1, 200)))  # rounding creates ties
+            for left, right in ((2, 2), (3, 3), (5, 5), (20, 20), (2, 4)):
+                for strict in (True, False):
+                    for partial in (True, False):
+                        expected = brute_force_highs(values, left, right, strict, partial)
+                        self.assertEqual(list(swing_highs(values, left, right, strict, partial)), expected)
+                        expected_lows = brute_force_highs(-values, left, right, strict, partial)
+                        self.assertEqual(list(swing_lows(values, left, right, strict, partial)), expected_lows)
+
+    def test_short_series(self):
+        self.assertEqual(len(swing_highs([1.0, 2.0, 1.0], 5)), 0)
+        self.assertEqual(list(swing_highs([1.0, 2.0, 1.0], 5, partial=True)), [1])
+        self.assertEqual(len(swing_lows([], 2)), 0)
+
+
+
+def make_rates(n, seed):
+    rng = np.random.default_rng(seed)
+    close = np.round(2000 + np.cumsum(rng.normal(0, 1, n)), 1)  # rounding creates ties
+    rates = np.zeros(n, dtype=[('time', 'i8'), ('open', 'f8'), ('high', 'f8'), ('low', 'f8'), ('close', 'f8')])
+    rates['time'] = 1704067200 + np.arange(n) * 900
+    rates['open'] = close
+    rates['close'] = close
+    rates['high'] = close + np.round(rng.random(n), 1)
+    rates['low'] = close - np.round(rng.random(n), 1)
+    return rates
+
+
+def make_frame(n, seed):
+    df = pd.DataFrame(make_rates(n, seed))
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+# Loops the vectorized call sites replaced
+def legacy_trendline_swings(df, lookback):
+    highs, lows = [], []
+    for i in range(lookback, len(df) - lookback):
+        if all(df['high'].iloc[j] < df['high'].iloc[i] for j in range(i - lookback, i + lookback + 1) if j != i):
+            highs.append({'index': i, 'price': df['high'].iloc[i], 'time': df['time'].iloc[i]})
+        if all(df['low'].iloc[j] > df['low'].iloc[i] for j in range(i - lookback, i + lookback + 1) if j != i):
+            lows.append({'index': i, 'price': df['low'].iloc[i], 'time': df['time'].iloc[i]})
+    return highs, lows
+
+
+def legacy_structure_points(df):
+    highs = df['high'].values; lows = df['low'].values
+    n = len(df)
+    points = []
+    for i in range(n - 3, 2, -1):
+        is_sh = True
+        is_sl = True
+        for k in range(1, 4):
+            if i - k >= 0 and highs[i] <= highs[i - k]: is_sh = False
+            if i + k < n and highs[i] <= highs[i + k]: is_sh = False
+        for k in range(1, 4):
+            if i - k >= 0 and lows[i] >= lows[i - k]: is_sl = False
+            if i + k < n and lows[i] >= lows[i + k]: is_sl = False
+        if is_sh: points.append({'type': 'SH', 'price': highs[i], 'index': i, 'time': df.index[i]})
+        if is_sl: points.append({'type': 'SL', 'price': lows[i], 'index': i, 'time': df.index[i]})
+        if len(points) >= 10: break
+    return sorted(points, key=lambda x: x['index'])
+
+
+def legacy_zones(rates, swing_len):
+    demand, supply = [], []
+    tr_sum = 0
+    for i in range(len(rates) - 14, len(rates)): tr_sum += (rates[i]['high'] - rates[i]['low'])
+    atr = tr_sum / 14 if tr_sum > 0 else 0.001
+    box_width = atr * 1.0
+    highs = np.array([r['high'] for r in rates]); lows = np.array([r['low'] for r in rates])
+    for i in range(swing_len, len(rates) - swing_len):
+        curr_low = lows[i]
+        if not (np.min(lows[i - swing_len:i]) < curr_low or np.min(lows[i + 1:i + swing_len + 1]) < curr_low):
+            if len(demand) < 50: demand.append((curr_low + box_width, curr_low))
+        curr_high = highs[i]
+        if not (np.max(highs[i - swing_len:i]) > curr_high or np.max(highs[i + 1:i + swing_len + 1]) > curr_high):
+            if len(supply) < 50: supply.append((curr_high, curr_high - box_width))
+    return demand, supply
+
+
+class TestCallSiteParity(unittest.TestCase):
+    """The analyzers must return what their previous loops returned."""
+
+    def test_trendline_find_swing_points(self):
+        analyzer = TrendlineAnalyzer(MagicMock(), bar_store=MagicMock())
+        for seed in range(5):
+            df = make_frame(300, seed)
+            for lookback in (3, 5, 10):
+                self.assertEqual(analyzer.find_swing_points(df, lookback), legacy_trendline_swings(df, lookback))
+
+    def test_smc_detect_structure_points(self):
+        analyzer = SMCAnalyzer()
+        for seed in range(10):
+            for n in (8, 40, 300):
+                df = make_frame(n, seed).set_index('time')
+                expected = legacy_structure_points(df)
+                actual = analyzer.detect_structure_points(df)
+                self.assertEqual(actual, expected)
+
+    def test_mtf_update_zones(self):
+        for seed in range(5):
+            rates = make_rates(500, seed)
+            analyzer = MTFAnalyzer(swing_length=20)
+            with patch('analysis.advanced_analysis.mt5') as mt5:
+                mt5.copy_rates_from_pos.return_value = rates
+                analyzer.update_zones("XAUUSD")
+            demand, supply = legacy_zones(rates, 20)
+            self.assertGreater(len(demand), 0)
+            self.assertEqual(analyzer.demand_zones, demand)
+            self.assertEqual(analyzer.supply_zones, supply)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+import sys
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+
+from data.mt5_replay import MT5Replay, ReplayClock, install, uninstall
+from core.tick_backtester import TickBacktester, SimulatedTime, ticks_from_bars
+
+START = datetime(2024, 1, 2)
+REAL_TIME = time
+
+
+def make_m1(n=240, seed=5):
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1.0, n))
+    open_ = np.concatenate([[2000.0], close[:-1]])
+    return pd.DataFrame({
+        'open': open_, 'high': np.maximum(open_, close) + 0.5, 'low': np.minimum(open_, close) - 0.5,
+        'close': close, 'volume': np.full(n, 10),
+    }, index=pd.date_range(START, periods=n, freq='1min'))
+
+
+class MiniTrader:
+    """SymbolTrader-shaped strategy: throttled analysis, market entries with stops, time-based exits."""
+
+    def __init__(self, symbol='XAUUSD', sleep_on_entry=0.0):
+        import MetaTrader5 as mt5
+        self.mt5 = mt5
+        self.symbol = symbol
+        self.magic_number = 888888
+        self.sleep_on_entry = sleep_on_entry
+        self.last_analysis_time = 0
+        self.ticks_seen = 0
+
+    def process_tick(self, tick):
+        self.ticks_seen += 1
+        if time.time() - self.last_analysis_time >= 60:
+            self.last_analysis_time = time.time()
+            self._analyze_confluence(tick.bid)
+        self.manage_positions(tick.bid)
+
+    def _analyze_confluence(self, current_price):
+        mt5 = self.mt5
+        rates = mt5.copy_rates_from_pos(self.symbol, mt5.TIMEFRAME_M1, 0, 3)
+        if rates is None or len(rates) < 3 or mt5.positions_get(symbol=self.symbol):
+            return
+        buy = rates['close'][-2] > rates['close'][-3]
+        tick = mt5.symbol_info_tick(self.symbol)
+        price = tick.ask if buy else tick.bid
+        sl = price - 3.0 if buy else price + 3.0
+        tp = price + 3.0 if buy else price - 3.0
+        if self.sleep_on_entry:
+            time.sleep(self.sleep_on_entry)
+        mt5.order_send({'action': mt5.TRADE_ACTION_DEAL, 'symbol': self.symbol, 'volume': 0.01,
+                        'type': mt5.ORDER_TYPE_BUY if buy else mt5.ORDER_TYPE_SELL, 'sl': sl, 'tp': tp,
+                        'magic': self.magic_number, 'type_filling': mt5.ORDER_FILLING_IOC})
+
+    def manage_positions(self, current_price):
+        mt5 = self.mt5
+        for pos in mt5.positions_get(symbol=self.symbol) or ():
+            if time.time() - pos.time_msc / 1000 > 600:
+                mt5.order_send({'action': mt5.TRADE_ACTION_DEAL, 'symbol': self.symbol, 'volume': pos.volume,
+                                'type': mt5.ORDER_TYPE_SELL if pos.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY,
+                                'position': pos.ticket, 'magic': self.magic_number,
+                                'type_filling': mt5.ORDER_FILLING_IOC})
+
+
+class TestTickBacktester(unittest.TestCase):
+    def setUp(self):
+        self.broker = MT5Replay(ReplayClock(START), balance=10000.0)
+        self.bars = make_m1()
+        self.broker.load_bars('XAUUSD', MT5Replay.TIMEFRAME_M1, self.bars)
+        install(self.broker)
+
+    def tearDown(self):
+        uninstall(self.broker)
+
+    def test_replays_bars_as_ticks_and_reports(self):
+        trader = MiniTrader()
+        report = TickBacktester(trader, self.broker).run()
+
+        self.assertEqual(report['ticks'], 4 * len(self.bars))
+        self.assertEqual(trader.ticks_seen, report['ticks'])
+        self.assertEqual(report['errors'], 0)
+        self.assertGreater(len(report['trades']), 5)
+        self.assertTrue({t['reason'] for t in report['trades']} <= {'SL', 'TP', 'EXPERT'})
+        # Faster than real time: four hours of ticks
+        self.assertGreater(report['sim_seconds'], 3 * 3600)
+        self.assertLess(report['wall_seconds'], report['sim_seconds'])
+
+        closed = sum(t['profit'] + t['commission'] for t in report['trades'])
+        open_profit = report['final_equity'] - report['final_balance']
+        self.assertAlmostEqual(report['net_profit'], closed + open_profit, places=6)
+        self.assertEqual(report['equity']['time'].iloc[0], pd.Timestamp(START))
+        self.assertGreaterEqual(report['max_drawdown'], 0.0)
+
+        latency = report['latency']
+        self.assertEqual(latency['process_tick']['calls'], report['ticks'])
+        self.assertEqual(latency['manage_positions']['calls'], report['ticks'])
+        # Analysis is throttled to once a simulated minute
+        self.assertAlmostEqual(latency['_analyze_confluence']['calls'], len(self.bars), delta=2)
+
+    def test_patches_are_undone(self):
+        trader = MiniTrader()
+        TickBacktester(trader, self.broker).run(max_ticks=10)
+        self.assertIs(sys.modules[__name__].time, REAL_TIME)
+        self.assertNotIn('process_tick', vars(trader))
+        self.assertNotIn('manage_positions', vars(trader))
+
+    def test_sleep_advances_the_clock(self):
+        trader = MiniTrader(sleep_on_entry=30.0)
+        started = REAL_TIME.perf_counter()
+        report = TickBacktester(trader, self.broker).run(end=START + pd.Timedelta(minutes=10))
+        self.assertLess(REAL_TIME.perf_counter() - started, 5.0)
+        self.assertGreater(len(self.broker.history_deals_get()), 0)
+        self.assertGreater(report['sim_seconds'], 10 * 60 - 60)
+
+    def test_range_selection(self):
+        report = TickBacktester(MiniTrader(), self.broker).run(start=START + pd.Timedelta(hours=1),
+                                                              end=START + pd.Timedelta(hours=2))
+        self.assertEqual(report['ticks'], 4 * 60 + 1)
+
+
+class TestHelpers(unittest.TestCase):
+    def test_ticks_from_bars_path(self):
+        rates = np.zeros(2, dtype=[('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                                   ('close', '<f8'), ('spread', '<i4')])
+        rates['time'] = [0, 60]
+        rates['open'], rates['high'], rates['low'], rates['close'] = [10, 12], [13, 13], [9, 8], [12, 9]
+        ticks = ticks_from_bars(rates, 60, point=0.01, default_spread=20)
+        self.assertEqual(ticks['bid'].tolist(), [10, 9, 13, 12, 12, 13, 8, 9])
+        self.assertEqual(ticks['time_msc'].tolist()[:4], [0, 18000, 36000, 57000])
+        np.testing.assert_allclose(ticks['ask'] - ticks['bid'], 0.2)
+
+    def test_simulated_time(self):
+        clock = ReplayClock(100)
+        fake = SimulatedTime(clock)
+        fake.sleep(5)
+        self.assertEqual(fake.time(), 105)
+        self.assertIs(fake.perf_counter, REAL_TIME.perf_counter)
+
+
+if __name__ == '__main__':
+    unittest.main()
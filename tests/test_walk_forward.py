@@ -0,0 +1,158 @@
+import unittest
+from unittest.mock import MagicMock
+import tempfile
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src', 'trading_bot')))
+sys.modules.setdefault('MetaTrader5', MagicMock())
+
+from analysis.walk_forward import WalkForwardOptimizer, CandleWindow, make_folds, bar_times
+from analysis.fast_grid_backtest import GridBacktestObjective, run_fast_grid_backtest
+
+BOUNDS = [(100.0, 500.0), (1.1, 2.0), (10.0, 100.0)]
+STEPS = [10.0, 0.1, 5.0]
+
+
+def make_m15(days=24, seed=1, start='2024-01-01'):
+    # Generated at full length and cut, so a longer history extends a shorter one
+    n = 40 * 96
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1.5, n))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n),
+        'low': np.minimum(open_, close) - rng.random(n),
+        'close': close,
+        'volume': np.full(n, 100.0),
+    }, index=pd.DatetimeIndex(pd.date_range(start, periods=n, freq='15min'), name='time')).iloc[:days * 96]
+
+
+class CountingFactory:
+    """Objective factory recording how many train windows were optimized (serial runs only)."""
+
+    def __init__(self):
+        self.train_windows = []
+
+    def __call__(self, window):
+        objective = GridBacktestObjective(window)
+        original = objective.evaluate_batch
+
+        def evaluate_batch(population):
+            if not self.train_windows or self.train_windows[-1] != (window.start, window.stop):
+                self.train_windows.append((window.start, window.stop))
+            return original(population)
+        objective.evaluate_batch = evaluate_batch
+        return objective
+
+
+def make_optimizer(**kwargs):
+    settings = dict(train_days=7, test_days=3, epochs=2, pop_size=6, seed=11,
+                    param_names=['grid_step', 'lot_multiplier', 'global_tp'])
+    settings.update(kwargs)
+    return WalkForwardOptimizer(BOUNDS, STEPS, **settings)
+
+
+class TestFolds(unittest.TestCase):
+    def test_windows_are_anchored_to_the_calendar(self):
+        times = bar_times(make_m15(days=24))
+        folds = make_folds(times, 7, 3)
+        self.assertEqual(len(folds), 6)
+        first = folds[0]
+        # First multiple of 3 days since the epoch with 7 days of bars behind it
+        self.assertEqual(pd.Timestamp(first['test_start'], unit='s'), pd.Timestamp('2024-01-09'))
+        self.assertEqual(first['train_rows'], (96, 8 * 96))
+        self.assertTrue(all(f['complete'] for f in folds[:-1]))
+        self.assertFalse(folds[-1]['complete'])
+
+        # One more day of history: earlier folds keep their windows and rows
+        extended = make_folds(bar_times(make_m15(days=25)), 7, 3)
+        for old, new in zip(folds[:-1], extended):
+            self.assertEqual(old, new)
+        self.assertEqual(extended[len(folds) - 1]['test_start'], folds[-1]['test_start'])
+        self.assertGreater(extended[len(folds) - 1]['test_rows'][1], folds[-1]['test_rows'][1])
+
+    def test_time_column_and_short_history(self):
+        df = make_m15(days=5).reset_index()
+        self.assertEqual(bar_times(df)[1] - bar_times(df)[0], 900)
+        self.assertEqual(make_folds(bar_times(df), 7, 3), [])
+        report = make_optimizer().run(df, n_jobs=1)
+        self.assertEqual(report['folds'], [])
+        self.assertIsNone(report['recommended_params'])
+
+
+class TestWalkForwardOptimizer(unittest.TestCase):
+    def test_folds_are_scored_out_of_sample(self):
+        df = make_m15()
+        report = make_optimizer().run(df, n_jobs=1)
+        folds = report['folds']
+        self.assertEqual(len(folds), 6)
+        for fold in folds:
+            lo, hi = fold['test_rows']
+            self.assertAlmostEqual(fold['out_of_sample_score'],
+                                   run_fast_grid_backtest(df.iloc[lo:hi], fold['params']), places=9)
+            self.assertLess(fold['train_end'], fold['test_end'])
+            self.assertEqual(fold['test_bars'], hi - lo)
+
+        summary = report['summary']
+        self.assertEqual(summary['folds'], 6)
+        self.assertAlmostEqual(summary['oos_total'], sum(f['out_of_sample_score'] for f in folds))
+        self.assertEqual(set(report['stability']), {'grid_step', 'lot_multiplier', 'global_tp'})
+        self.assertGreaterEqual(report['stability']['grid_step']['range_std'], 0.0)
+        self.assertEqual(report['recommended_params'], folds[-1]['params'])
+
+    def test_extending_history_reoptimizes_only_the_newest_fold(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, 'folds.pkl')
+            first = make_optimizer(cache_path=cache_path).run(make_m15(days=24), n_jobs=1)
+
+            factory = CountingFactory()
+            rerun = make_optimizer(cache_path=cache_path, objective_factory=factory)
+            second = rerun.run(make_m15(days=24), n_jobs=1)
+            self.assertEqual(factory.train_windows, [])
+            self.assertEqual(second['summary']['cached_folds'], 6)
+            self.assertEqual([f['params'] for f in first['folds']], [f['params'] for f in second['folds']])
+
+            # A day later the partial fold only grows its test window; crossing a
+            # boundary adds one new fold, the only one optimized
+            factory = CountingFactory()
+            third = make_optimizer(cache_path=cache_path, objective_factory=factory).run(make_m15(days=27), n_jobs=1)
+            self.assertEqual(len(third['folds']), 7)
+            self.assertEqual(factory.train_windows, [third['folds'][-1]['train_rows']])
+            self.assertEqual(third['summary']['cached_folds'], 6)
+
+    def test_parallel_folds_match_serial(self):
+        df = make_m15(days=17)
+        serial = make_optimizer().run(df, n_jobs=1)
+        parallel = make_optimizer().run(df, n_jobs=2)
+        self.assertEqual([f['params'] for f in serial['folds']], [f['params'] for f in parallel['folds']])
+        np.testing.assert_allclose([f['out_of_sample_score'] for f in serial['folds']],
+                                   [f['out_of_sample_score'] for f in parallel['folds']])
+
+    def test_history_store_candles(self):
+        try:
+            from data.history_store import HistoryStore
+            with tempfile.TemporaryDirectory() as tmp:
+                store = HistoryStore(os.path.join(tmp, 'history'))
+                df = make_m15(days=12)
+                store.append('GOLD', 'M15', df)
+                report = make_optimizer().run(store.read('GOLD', 'M15'), n_jobs=2)
+                expected = make_optimizer().run(df, n_jobs=1)
+                store.close()
+        except ImportError:
+            self.skipTest("pyarrow not installed")
+        self.assertEqual([f['params'] for f in report['folds']], [f['params'] for f in expected['folds']])
+
+    def test_candle_window_is_a_view(self):
+        columns = {'close': np.arange(10.0)}
+        window = CandleWindow(columns, 2, 5)
+        self.assertEqual(len(window), 3)
+        self.assertTrue(np.shares_memory(window['close'], columns['close']))
+
+
+if __name__ == '__main__':
+    unittest.main()